@@ -0,0 +1,6 @@
+"""
+工作流系统基准测试
+
+包含针对核心组件的性能与内存基准脚本，每个脚本均可单独运行:
+    python -m backend.benchmarks.<脚本名>
+"""
@@ -0,0 +1,87 @@
+"""
+批量图编辑基准
+
+比较逐条 Workflow.connect() 与 WorkflowTransaction 批量提交构建大规模工作流的耗时，
+测量在大型工作流上提交小事务的耗时，以及 Workflow.save / Workflow.load 的耗时。
+
+运行方式:
+    python -m backend.benchmarks.bench_bulk_edit [连接数量]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import MathOperationModule, NumberGeneratorModule
+
+logging.disable(logging.INFO)
+
+
+def make_modules(num_edges: int):
+    """创建一个数字源和 num_edges/2 个运算模块，每个运算模块有两条入边"""
+    source = NumberGeneratorModule("源")
+    modules = [MathOperationModule(f"运算{i}") for i in range(num_edges // 2)]
+    return source, modules
+
+
+def edge_specs(source, modules):
+    """链式连接 + 每个模块连接到公共源"""
+    previous = source
+    for module in modules:
+        yield (previous.id, "number" if previous is source else "result", module.id, "number1")
+        yield (source.id, "number", module.id, "number2")
+        previous = module
+
+
+def main(num_edges: int) -> None:
+    source, modules = make_modules(num_edges)
+    workflow = Workflow("逐条连接")
+    workflow.add_module(source)
+    for module in modules:
+        workflow.add_module(module)
+    start = time.perf_counter()
+    for spec in edge_specs(source, modules):
+        workflow.connect(*spec)
+    print(f"逐条 connect(): {len(workflow.connections)} 条连接, {(time.perf_counter() - start) * 1000:.1f} 毫秒")
+
+    source, modules = make_modules(num_edges)
+    workflow = Workflow("批量事务")
+    start = time.perf_counter()
+    with workflow.transaction() as tx:
+        tx.add_module(source)
+        for module in modules:
+            tx.add_module(module)
+        for spec in edge_specs(source, modules):
+            tx.connect(*spec)
+    print(f"事务批量提交: {len(workflow.connections)} 条连接, {(time.perf_counter() - start) * 1000:.1f} 毫秒")
+
+    # 在大型工作流上提交小事务: 拓扑序只为新模块和新连接增量更新，耗时与工作流规模基本无关
+    existing_connections = len(workflow.connections)
+    extra_source, extra_modules = make_modules(20)
+    start = time.perf_counter()
+    with workflow.transaction() as tx:
+        tx.add_module(extra_source)
+        for module in extra_modules:
+            tx.add_module(module)
+        for spec in edge_specs(extra_source, extra_modules):
+            tx.connect(*spec)
+    print(f"小事务提交 (已有 {existing_connections} 条连接): {(time.perf_counter() - start) * 1000:.2f} 毫秒")
+
+    registry = ModuleRegistry()
+    registry.register(NumberGeneratorModule)
+    registry.register(MathOperationModule)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "workflow.json")
+        start = time.perf_counter()
+        workflow.save(path)
+        print(f"Workflow.save: {(time.perf_counter() - start) * 1000:.1f} 毫秒, {os.path.getsize(path) / 1024 / 1024:.1f} MiB")
+        start = time.perf_counter()
+        loaded = Workflow.load(path, registry)
+        print(f"Workflow.load: {len(loaded.modules)} 个模块, {len(loaded.connections)} 条连接, {(time.perf_counter() - start) * 1000:.1f} 毫秒")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,71 @@
+"""
+大数据 DBSCAN 基准
+
+生成 N 个二维点 (若干高斯簇加 5% 均匀噪声)，测量 DBSCANModule 的耗时和峰值内存 (tracemalloc，包括 NumPy 数组):
+- default 变体 (sklearn DBSCAN，同时保存所有点的邻域)，只在前 M 行上运行，N 很大时内存会耗尽
+- large_data 变体 (分批半径查询 + 并查集)，float64 / float32 各一次
+标签与 sklearn DBSCAN 相同由 backend/tests/test_dbscan.py 验证。
+
+运行方式:
+    python -m backend.benchmarks.bench_dbscan_large [行数 N] [default 变体的行数 M] [n_jobs]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from backend.workflow_modules.analysis.dbscan_module import DBSCANModule
+
+EPS = 0.05
+MIN_SAMPLES = 10
+
+
+def make_points(num_rows: int, num_clusters: int = 50, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    num_noise = num_rows // 20
+    centers = rng.uniform(0, 100, size=(num_clusters, 2))
+    assignment = rng.integers(0, num_clusters, size=num_rows - num_noise)
+    points = np.concatenate([centers[assignment] + rng.normal(0, 1, size=(len(assignment), 2)),
+                             rng.uniform(0, 100, size=(num_noise, 2))])
+    rng.shuffle(points)
+    return pd.DataFrame(points, columns=["x", "y"])
+
+
+def measure(label: str, module: DBSCANModule, data: pd.DataFrame) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    outputs = module.execute({"data_input": data})
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    clustered = outputs["clustered_data"]
+    print(f"{label:26s} {len(data):>9d} 行  {elapsed:8.2f} s  峰值内存 {peak / 2 ** 20:9.1f} MiB  "
+          f"簇 {clustered['cluster_label'].nunique():5d}  非噪声点 {len(clustered):>9d}")
+
+
+def main(num_rows: int, baseline_rows: int, n_jobs) -> None:
+    data = make_points(num_rows)
+    baseline = data.iloc[:baseline_rows]
+    print(f"eps={EPS}, min_samples={MIN_SAMPLES}, 输入 {data.memory_usage().sum() / 2 ** 20:.1f} MiB")
+
+    default = DBSCANModule()
+    default.set_parameter("eps", EPS)
+    default.set_parameter("min_samples", MIN_SAMPLES)
+    measure("default (sklearn)", default, baseline)
+
+    for dtype in (None, "float32"):
+        module = DBSCANModule(initial_variant_id="large_data")
+        module.set_parameter("eps", EPS)
+        module.set_parameter("min_samples", MIN_SAMPLES)
+        module.set_parameter("n_jobs", n_jobs)
+        module.set_parameter("dtype", dtype)
+        measure(f"large_data ({dtype or 'float64'})", module, data.iloc[:baseline_rows])
+        measure(f"large_data ({dtype or 'float64'})", module, data)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200_000,
+         int(sys.argv[3]) if len(sys.argv) > 3 else -1)
@@ -0,0 +1,97 @@
+"""
+轻量模块链融合基准
+
+构建 N 条 数学运算 -> 条件分支 -> 文本处理 的链 (共享一个数字源和一个阈值源)，
+分别测量:
+- 直接按执行计划调用各模块 execute() 的耗时 (模块自身的计算开销)
+- 引擎逐模块调度的耗时
+- 引擎启用链融合 (execute(fuse=True)) 的耗时
+- 执行计划编译与链融合本身的耗时 (每次运行一次，与模块数量线性相关)
+并据此计算引擎在每个模块上的调度开销 (扣除模块自身计算和规划耗时)。
+运行时注册一个空的进度回调，模拟界面订阅事件的情况。
+
+运行方式:
+    python -m backend.benchmarks.bench_fusion [链数量] [重复次数]
+"""
+import logging
+import sys
+import time
+
+from backend.core.engine import WorkflowEngine
+from backend.core.execution_plan import compile_plan, run_plan
+from backend.core.module_registry import ModuleRegistry
+from backend.core.optimizer import fuse_chains
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import (
+    ConditionalModule, MathOperationModule, NumberGeneratorModule, TextProcessingModule
+)
+
+logging.disable(logging.CRITICAL)
+
+
+def build_workflow(num_chains: int) -> Workflow:
+    """构建 num_chains 条三模块链"""
+    workflow = Workflow("融合基准")
+    source = NumberGeneratorModule("源")
+    threshold = NumberGeneratorModule("阈值")
+    with workflow.transaction() as tx:
+        tx.add_module(source)
+        tx.add_module(threshold)
+        for i in range(num_chains):
+            math_module = MathOperationModule(f"运算{i}")
+            conditional = ConditionalModule(f"条件{i}")
+            text = TextProcessingModule(f"文本{i}")
+            for module in (math_module, conditional, text):
+                tx.add_module(module)
+            tx.connect(source.id, "number", math_module.id, "number1")
+            tx.connect(source.id, "number", math_module.id, "number2")
+            tx.connect(math_module.id, "result", conditional.id, "value")
+            tx.connect(threshold.id, "number", conditional.id, "threshold")
+            tx.connect(conditional.id, "false_result", text.id, "text")
+    return workflow
+
+
+def best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(num_chains: int, repeat: int) -> None:
+    workflow = build_workflow(num_chains)
+    num_modules = len(workflow.modules)
+
+    engine = WorkflowEngine(ModuleRegistry())
+    engine.workflows[workflow.id] = workflow
+    engine.set_current_workflow(workflow.id)
+    events = []
+    engine.register_progress_callback(lambda event_type, data: events.append(event_type))
+
+    plan = compile_plan(workflow)
+    raw = best_of(repeat, lambda: run_plan(plan.steps, {}))
+    compile_time = best_of(repeat, lambda: compile_plan(workflow))
+    fuse_time = best_of(repeat, lambda: fuse_chains(plan))
+    unfused = best_of(repeat, lambda: engine.execute(async_run=False))
+    unfused_events = len(events)
+    events.clear()
+    fused = best_of(repeat, lambda: engine.execute(async_run=False, fuse=True))
+    fused_events = len(events)
+    assert engine.execution_status == "completed", engine.error_message
+    assert len(engine.execution_results) == num_modules
+
+    def per_module_overhead(total: float, planning: float) -> float:
+        return (total - raw - planning) / num_modules * 1e6
+
+    print(f"模块数量: {num_modules} ({num_chains} 条链), 取 {repeat} 次中的最好成绩")
+    print(f"直接调用 execute():  {raw * 1000:8.1f} ms")
+    print(f"规划: 编译 {compile_time * 1000:.1f} ms, 链融合 {fuse_time * 1000:.1f} ms")
+    print(f"引擎逐模块调度:      {unfused * 1000:8.1f} ms  每模块调度开销 {per_module_overhead(unfused, compile_time):6.1f} µs  事件 {unfused_events // repeat}")
+    print(f"引擎链融合:          {fused * 1000:8.1f} ms  每模块调度开销 {per_module_overhead(fused, compile_time + fuse_time):6.1f} µs  事件 {fused_events // repeat}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,68 @@
+"""
+工作流图元数据内存基准
+
+构建一个由数学运算模块组成的大规模工作流（每个模块有两条入边），
+使用 tracemalloc 分别统计每个模块与每条连接占用的内存。
+
+运行方式:
+    python -m backend.benchmarks.bench_graph_memory [模块数量]
+"""
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import MathOperationModule, NumberGeneratorModule
+
+logging.disable(logging.INFO)
+
+
+def measure(num_modules: int) -> None:
+    """分别测量模块与连接的内存占用"""
+    gc.collect()
+    tracemalloc.start()
+
+    workflow = Workflow("内存基准")
+    base_current, _ = tracemalloc.get_traced_memory()
+
+    # 阶段一: 创建模块
+    start = time.perf_counter()
+    source = NumberGeneratorModule("源")
+    workflow.add_module(source)
+    modules = []
+    for i in range(num_modules):
+        module = MathOperationModule(f"运算{i}")
+        workflow.add_module(module)
+        modules.append(module)
+    module_time = time.perf_counter() - start
+    gc.collect()
+    modules_current, _ = tracemalloc.get_traced_memory()
+
+    # 阶段二: 创建连接 (链式连接 + 每个模块连接到公共源)
+    start = time.perf_counter()
+    num_edges = 0
+    previous = source
+    for module in modules:
+        out_port = "number" if previous is source else "result"
+        if workflow.connect(previous.id, out_port, module.id, "number1"):
+            num_edges += 1
+        if workflow.connect(source.id, "number", module.id, "number2"):
+            num_edges += 1
+        previous = module
+    edge_time = time.perf_counter() - start
+    gc.collect()
+    edges_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    module_bytes = (modules_current - base_current) / (num_modules + 1)
+    edge_bytes = (edges_current - modules_current) / max(num_edges, 1)
+    print(f"模块数量: {num_modules + 1}, 连接数量: {num_edges}")
+    print(f"每个模块内存: {module_bytes:,.0f} 字节 (创建耗时 {module_time * 1e6 / (num_modules + 1):.1f} 微秒/个)")
+    print(f"每条连接内存: {edge_bytes:,.0f} 字节 (创建耗时 {edge_time * 1e6 / max(num_edges, 1):.1f} 微秒/条)")
+    print(f"图元数据总计: {(edges_current - base_current) / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    measure(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,47 @@
+"""
+网格 DBSCAN 基准
+
+对 N 个二维点 (若干高斯簇加 5% 均匀噪声) 测量 grid_dbscan 的耗时、每秒处理的点数和峰值内存
+(tracemalloc)，并在前 M 行上与 sklearn DBSCAN 和 large_data 变体 (dbscan_chunked) 对比。
+标签与 sklearn DBSCAN 相同由 backend/tests/test_grid_dbscan.py 验证。
+
+运行方式:
+    python -m backend.benchmarks.bench_grid_dbscan [行数 N] [对比的行数 M]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+from backend.benchmarks.bench_dbscan_large import EPS, MIN_SAMPLES, make_points
+from backend.workflow_modules.analysis.dbscan_module import dbscan_chunked
+from backend.workflow_modules.analysis.grid_dbscan_module import grid_dbscan
+
+
+def measure(label: str, func, num_rows: int) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    labels = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:22s} {num_rows:>10d} 行  {elapsed:8.2f} s  {num_rows / elapsed / 1e6:7.2f} M点/s  "
+          f"峰值内存 {peak / 2 ** 20:9.1f} MiB  簇 {labels.max() + 1:6d}")
+
+
+def main(num_rows: int, compare_rows: int) -> None:
+    # 簇的数量随行数增加，点的密度 (每个点的邻居数) 与默认规模相近
+    points = np.ascontiguousarray(make_points(num_rows, num_clusters=max(50, num_rows // 20000)).to_numpy())
+    subset = points[:compare_rows]
+    print(f"eps={EPS}, min_samples={MIN_SAMPLES}")
+    measure("sklearn DBSCAN", lambda: DBSCAN(eps=EPS, min_samples=MIN_SAMPLES).fit(subset).labels_, len(subset))
+    measure("dbscan_chunked", lambda: dbscan_chunked(subset, EPS, MIN_SAMPLES, n_jobs=-1), len(subset))
+    measure("grid_dbscan", lambda: grid_dbscan(subset, EPS, MIN_SAMPLES), len(subset))
+    measure("grid_dbscan", lambda: grid_dbscan(points, EPS, MIN_SAMPLES), num_rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200_000)
@@ -0,0 +1,72 @@
+"""
+热运行基准
+
+对一个由 1 个数字生成模块和 M 个运算模块组成的小工作流，比较每次执行的耗时:
+- 普通执行 (execute(async_run=False): 每次创建快照、编译计划)
+- 热运行 (run_hot: 复用预备计划、结果槽位和模块对象)
+- 只调用各模块的 execute (模块本身的计算量)
+热运行的额外开销 = 热运行耗时 - 模块计算耗时。没有进度回调时，目标为每次运行的额外开销
+不超过 HOT_RUN_OVERHEAD_TARGET_US 微秒 (与模块数量无关的固定部分) 加每个模块 HOT_RUN_PER_MODULE_TARGET_US 微秒，
+未达到目标时以非零状态退出。最后注册一个回调再测一次热运行，作为有订阅者时的对比。
+每项取多次运行中的最好成绩。
+
+运行方式:
+    python -m backend.benchmarks.bench_hot_run [每个工作流的运算模块数量] [执行次数]
+"""
+import logging
+import sys
+import time
+
+from backend.benchmarks.bench_serialization import build_workflow
+from backend.core.engine import WorkflowEngine
+from backend.core.module_registry import ModuleRegistry
+
+logging.disable(logging.INFO)
+
+# 每次热运行的额外开销目标 (微秒)
+HOT_RUN_OVERHEAD_TARGET_US = 20.0
+HOT_RUN_PER_MODULE_TARGET_US = 1.0
+
+
+def per_run(count: int, repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / count
+
+
+def main(num_modules: int, count: int, repeat: int = 5) -> int:
+    workflow = build_workflow(num_modules)
+    engine = WorkflowEngine(ModuleRegistry())
+    engine.workflows[workflow.id] = workflow
+    modules = [workflow.modules[module_id] for module_id in workflow._get_execution_order()]
+    print(f"工作流 {len(modules)} 个模块, 执行 {count} 次, 取 {repeat} 次中的最好成绩")
+
+    def bare() -> None:
+        outputs = modules[0].execute({})
+        for module in modules[1:]:
+            outputs = module.execute({"number1": outputs.get("number", outputs.get("result"))})
+
+    normal = per_run(count, repeat, lambda: engine.execute(workflow.id, async_run=False))
+    expected = engine.execution_results
+    hot = per_run(count, repeat, lambda: engine.run_hot(workflow.id))
+    assert engine.execution_status == "completed", engine.error_message
+    assert engine.execution_results.keys() == expected.keys()
+    compute = per_run(count, repeat, bare)
+    engine.register_progress_callback(lambda event_type, event_data: None)
+    subscribed = per_run(count, repeat, lambda: engine.run_hot(workflow.id))
+
+    overhead = hot - compute
+    target = HOT_RUN_OVERHEAD_TARGET_US + HOT_RUN_PER_MODULE_TARGET_US * len(modules)
+    for label, value in (("普通执行", normal), ("热运行", hot), ("热运行 (有回调)", subscribed), ("模块计算", compute)):
+        print(f"{label:14s} 每次 {value * 1e6:8.2f} µs")
+    print(f"热运行额外开销 {overhead * 1e6:.2f} µs (目标 <= {target:.1f} µs), 普通执行额外开销 {(normal - compute) * 1e6:.2f} µs")
+    return 0 if overhead * 1e6 <= target else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 2000))
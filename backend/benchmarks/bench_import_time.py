@@ -0,0 +1,67 @@
+"""
+导入耗时基准
+
+在新的解释器进程中分别测量:
+- 延迟注册: import backend.workflow_modules (只登记模块名称和类别)
+- 延迟注册 + 列出模块类别 (API 获取模块列表时的开销)
+- 延迟注册 + 创建一个 DBSCANModule 实例 (第一次使用时才导入 pandas / numpy / sklearn)
+- 全部导入: 导入后调用 get_all()，相当于之前导入包时立即导入全部模块的行为
+每项取多次运行中的最好成绩。
+
+运行方式:
+    python -m backend.benchmarks.bench_import_time [重复次数]
+"""
+import subprocess
+import sys
+
+SCENARIOS = [
+    ("延迟注册", "import backend.workflow_modules"),
+    ("延迟注册 + 列出类别",
+     "import backend.workflow_modules\n"
+     "from backend.core.module_registry import gmodule_registry\n"
+     "gmodule_registry.get_categories()"),
+    ("延迟注册 + 创建 DBSCAN",
+     "import backend.workflow_modules\n"
+     "from backend.core.module_registry import gmodule_registry\n"
+     "gmodule_registry.create_instance('DBSCANModule')"),
+    ("全部导入 (get_all)",
+     "import backend.workflow_modules\n"
+     "from backend.core.module_registry import gmodule_registry\n"
+     "gmodule_registry.get_all()"),
+]
+
+TEMPLATE = """
+import time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+import sys
+print(elapsed, len(sys.modules))
+"""
+
+
+def run_once(code: str):
+    """在新进程中执行代码，返回 (耗时秒数, 已加载的模块数)；失败时返回错误信息"""
+    completed = subprocess.run([sys.executable, "-c", TEMPLATE.format(code=code)],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return lines[-1] if lines else f"退出码 {completed.returncode}"
+    elapsed, module_count = completed.stdout.split()
+    return float(elapsed), int(module_count)
+
+
+def main(repeat: int) -> None:
+    print(f"Python {sys.version.split()[0]}, 取 {repeat} 次中的最好成绩")
+    for label, code in SCENARIOS:
+        results = [run_once(code) for _ in range(repeat)]
+        failures = [result for result in results if isinstance(result, str)]
+        if failures:
+            print(f"{label:24s} 失败: {failures[0]}")
+            continue
+        best, module_count = min(results)
+        print(f"{label:24s} {best * 1000:8.1f} ms  已加载模块 {module_count}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,65 @@
+"""
+延迟加载基准
+
+把一个由 N 个运算模块组成的工作流保存为二进制格式，比较:
+- 完整加载 (Workflow.load) 的耗时
+- 延迟加载 (Workflow.load(..., lazy=True)) 打开文件的耗时
+- 延迟加载后访问少量模块、只执行其中一个模块及其上游 (requested_outputs) 的耗时
+
+运行方式:
+    python -m backend.benchmarks.bench_lazy_load [模块数量]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from backend.benchmarks.bench_serialization import build_workflow
+from backend.core.engine import WorkflowEngine
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import MathOperationModule, NumberGeneratorModule
+
+logging.disable(logging.INFO)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main(num_modules: int) -> None:
+    registry = ModuleRegistry()
+    registry.register(NumberGeneratorModule)
+    registry.register(MathOperationModule)
+    workflow = build_workflow(num_modules)
+    # 链上第 10 个运算模块: 执行它只需要数字源和前面的 9 个模块
+    target_id = workflow._get_execution_order()[10]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "workflow.wfb")
+        workflow.save_binary(path)
+        print(f"模块数量: {len(workflow.modules)}, 文件大小 {os.path.getsize(path) / 1024:.1f} KiB")
+
+        _, eager_time = timed(lambda: Workflow.load(path, registry))
+        print(f"完整加载:            {eager_time * 1000:8.1f} ms")
+
+        lazy, open_time = timed(lambda: Workflow.load(path, registry, lazy=True))
+        print(f"延迟加载打开文件:    {open_time * 1000:8.1f} ms  已创建模块 {lazy.modules.loaded_count}")
+
+        module_ids = list(lazy.modules)[:20]
+        _, access_time = timed(lambda: [lazy.modules[module_id].name for module_id in module_ids])
+        print(f"访问 20 个模块:      {access_time * 1000:8.1f} ms  已创建模块 {lazy.modules.loaded_count}")
+
+        engine = WorkflowEngine(registry)
+        engine.workflows[lazy.id] = lazy
+        engine.set_current_workflow(lazy.id)
+        _, run_time = timed(lambda: engine.execute(async_run=False, requested_outputs=[target_id]))
+        assert engine.execution_status == "completed", engine.error_message
+        print(f"只执行一个模块及上游: {run_time * 1000:7.1f} ms  已创建模块 {lazy.modules.loaded_count}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,70 @@
+"""
+模块定义清单基准
+
+注册全部示例模块，比较有无模块定义清单 (ModuleManifest) 时:
+- 查询一个模块的变体定义 (get_module_variant_details)
+- 生成一个模块的变体列表响应 (GET /api/modules/{module_type_id}/variants)
+- 生成全部模块的变体响应 (前端启动时逐个请求)
+每项为多次调用的平均耗时。
+
+运行方式:
+    python -m backend.benchmarks.bench_module_definitions [重复次数]
+"""
+import dataclasses
+import json
+import os
+import sys
+import tempfile
+import time
+
+from backend.core.module_manifest import refresh_manifest
+from backend.core.module_registry import ModuleRegistry
+from backend.examples.example_modules import (ConditionalModule, MathOperationModule, NumberGeneratorModule,
+                                              TextProcessingModule, TimeDelayModule)
+
+
+def per_call(repeat: int, func) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def variants_response(registry: ModuleRegistry, module_name: str) -> bytes:
+    """未使用清单时 API 层生成变体列表响应的方式"""
+    variants = registry.get_module_variant_details(module_name) or {}
+    return json.dumps([dataclasses.asdict(variant) for variant in variants.values()], ensure_ascii=False).encode('utf-8')
+
+
+def main(repeat: int) -> None:
+    registry = ModuleRegistry()
+    for module_class, category in ((NumberGeneratorModule, "输入与生成"), (MathOperationModule, "数学运算"),
+                                   (TextProcessingModule, "文本处理"), (ConditionalModule, "逻辑控制"),
+                                   (TimeDelayModule, "辅助工具")):
+        registry.register(module_class, category)
+    module_names = registry.get_names()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manifest_path = os.path.join(tmp_dir, "module_manifest.json")
+        start = time.perf_counter()
+        manifest = refresh_manifest(registry, manifest_path)
+        print(f"模块数量: {len(module_names)}, 生成清单 {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"清单大小 {os.path.getsize(manifest_path) / 1024:.1f} KiB")
+
+        target = "TextProcessingModule"
+        rows = [("变体定义", lambda: registry.get_module_variant_details(target)),
+                ("单个模块变体响应", lambda: variants_response(registry, target)),
+                ("全部模块变体响应", lambda: [variants_response(registry, name) for name in module_names])]
+        plain = [per_call(repeat, func) for _, func in rows]
+
+        registry.use_manifest(manifest)
+        cached = [per_call(repeat, lambda: registry.get_module_variant_details(target)),
+                  per_call(repeat, lambda: manifest.variants_json(target)),
+                  per_call(repeat, lambda: [manifest.variants_json(name) for name in module_names])]
+
+    for (label, _), without, with_manifest in zip(rows, plain, cached):
+        print(f"{label:12s} 无清单 {without * 1e6:9.2f} µs   清单 {with_manifest * 1e6:9.2f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,60 @@
+"""
+模块实例化基准
+
+测量大规模加载和生成工作流时最常见的操作:
+- 创建 N 个 MathOperationModule (默认变体)
+- 以指定变体和端口配置创建 N 个模块 (Workflow.load 的方式)
+- 在 default 和 unary_op 两个变体之间切换 N 次 (set_variant)
+- 查询 N 次变体定义
+每项取多次运行中的最好成绩。
+
+运行方式:
+    python -m backend.benchmarks.bench_module_instantiation [数量] [重复次数]
+"""
+import sys
+import time
+
+from backend.examples.example_modules import MathOperationModule
+
+
+def best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def create_default(count: int) -> None:
+    for _ in range(count):
+        MathOperationModule()
+
+
+def create_configured(count: int) -> None:
+    for _ in range(count):
+        MathOperationModule(initial_variant_id="unary_op", initial_ports_config={})
+
+
+def switch_variants(count: int) -> None:
+    module = MathOperationModule()
+    for i in range(count):
+        module.set_variant("unary_op" if i % 2 == 0 else "default")
+
+
+def query_definitions(count: int) -> None:
+    for _ in range(count):
+        MathOperationModule.get_variant_definitions()
+
+
+def main(count: int, repeat: int) -> None:
+    print(f"数量: {count}, 取 {repeat} 次中的最好成绩")
+    for label, func in (("创建 (默认变体)", create_default), ("创建 (指定变体)", create_configured),
+                        ("切换变体", switch_variants), ("查询变体定义", query_definitions)):
+        elapsed = best_of(repeat, lambda: func(count))
+        print(f"{label:16s} {elapsed * 1000:9.1f} ms  每次 {elapsed / count * 1e6:7.2f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,70 @@
+"""
+SQLite 工作流仓库基准
+
+向仓库写入 N 个工作流 (每个包含 M 个运算模块)，测量:
+- 首次保存 (写入全部行) 与修改一个参数后增量保存的耗时
+- 列出工作流 (分页、按名称前缀、按模块类型) 的耗时
+- 冷加载 (从数据库读取) 与热加载 (命中 LRU 缓存) 的耗时
+
+运行方式:
+    python -m backend.benchmarks.bench_repository [工作流数量] [每个工作流的模块数量]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from backend.benchmarks.bench_serialization import build_workflow
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow_repository import WorkflowRepository
+from backend.examples.example_modules import MathOperationModule, NumberGeneratorModule
+
+logging.disable(logging.INFO)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main(num_workflows: int, num_modules: int) -> None:
+    registry = ModuleRegistry()
+    registry.register(NumberGeneratorModule)
+    registry.register(MathOperationModule)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        repository = WorkflowRepository(os.path.join(tmp_dir, "workflows.db"), cache_size=16)
+        workflow_ids = []
+        start = time.perf_counter()
+        for i in range(num_workflows):
+            workflow = build_workflow(num_modules)
+            workflow.name = f"工作流{i:05d}"
+            repository.save(workflow)
+            workflow_ids.append(workflow.id)
+        print(f"工作流数量: {num_workflows}, 每个 {num_modules + 1} 个模块, 首次保存共 {time.perf_counter() - start:.2f} s")
+
+        last_module = list(workflow.modules.values())[-1]
+        last_module.set_parameter("operation", "divide")
+        changed, save_time = timed(lambda: repository.save(workflow))
+        print(f"修改一个参数后保存:   {save_time * 1000:8.2f} ms  写入 {changed} 行")
+
+        _, list_time = timed(lambda: repository.list_workflows(limit=50, offset=num_workflows // 2))
+        _, prefix_time = timed(lambda: repository.list_workflows(name_prefix="工作流0001"))
+        _, type_time = timed(lambda: repository.list_workflows(module_type="NumberGeneratorModule", limit=50))
+        print(f"列出 (分页):          {list_time * 1000:8.2f} ms")
+        print(f"列出 (名称前缀):      {prefix_time * 1000:8.2f} ms")
+        print(f"列出 (模块类型):      {type_time * 1000:8.2f} ms")
+
+        cold_id = workflow_ids[0]
+        _, cold_time = timed(lambda: repository.load(cold_id, registry))
+        _, hot_time = timed(lambda: repository.load(cold_id, registry))
+        print(f"冷加载:               {cold_time * 1000:8.2f} ms")
+        print(f"热加载 (缓存命中):    {hot_time * 1000:8.4f} ms")
+        repository.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
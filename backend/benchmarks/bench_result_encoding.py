@@ -0,0 +1,69 @@
+"""
+结果流式编码基准
+
+构造一个 N 行的聚类结果 DataFrame (x, y, cluster)，比较:
+- 一次性编码 (DataFrame.to_json 生成整个 JSON 文档)
+- 流式 NDJSON 编码 (encode_result)
+- 从结果存储中流式编码 (encode_stored_result，按页内存映射读取)
+- 流式 Arrow IPC 编码 (安装了 pyarrow 时)
+的耗时和编码过程中的峰值内存 (tracemalloc，不包括 DataFrame 本身)。
+
+运行方式:
+    python -m backend.benchmarks.bench_result_encoding [行数] [分块行数]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from backend.core.result_encoding import encode_result, encode_stored_result, pa
+from backend.core.result_store import ResultStore
+
+
+def measure(label: str, func) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    total_bytes = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:24s} {elapsed * 1000:9.1f} ms  输出 {total_bytes / 1024 / 1024:8.1f} MiB  "
+          f"峰值内存 {peak / 1024 / 1024:8.1f} MiB")
+
+
+def drain(chunks) -> int:
+    """模拟逐块写入响应: 只累计大小，不保留数据"""
+    return sum(len(chunk) for chunk in chunks)
+
+
+def main(num_rows: int, chunk_rows: int) -> None:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "x": rng.normal(size=num_rows),
+        "y": rng.normal(size=num_rows),
+        "cluster": rng.integers(-1, 20, size=num_rows),
+    })
+    print(f"行数: {num_rows}, 分块行数: {chunk_rows}")
+
+    measure("一次性 to_json", lambda: len(df.to_json(orient="records").encode('utf-8')))
+    measure("流式 NDJSON", lambda: drain(encode_result(df, chunk_rows=chunk_rows)))
+    measure("流式 NDJSON (两列)", lambda: drain(encode_result(df, columns=["x", "cluster"], chunk_rows=chunk_rows)))
+    if pa is not None:
+        measure("流式 Arrow IPC", lambda: drain(encode_result(df, format="arrow", chunk_rows=chunk_rows)))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = ResultStore(tmp_dir)
+        run = store.open_run(store.save_run({"dbscan": {"clustered_data": df}}))
+        measure("结果存储 -> NDJSON", lambda: drain(
+            encode_stored_result(run, "dbscan", "clustered_data", chunk_rows=chunk_rows)))
+        if pa is not None:
+            measure("结果存储 -> Arrow IPC", lambda: drain(
+                encode_stored_result(run, "dbscan", "clustered_data", format="arrow", chunk_rows=chunk_rows)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 8192)
@@ -0,0 +1,92 @@
+"""
+工作流序列化格式基准
+
+构建一个由 N 个运算模块组成的工作流 (链式连接 + 公共数字源)，比较 JSON 格式
+(Workflow.save / load) 与二进制格式 (Workflow.save_binary / load) 的:
+- 文件大小
+- 保存耗时
+- 只解码文件 (json.loads 与 BinaryWorkflowReader 解码全部记录) 的耗时
+- 完整加载 (包括创建模块实例和重建连接) 的耗时
+
+运行方式:
+    python -m backend.benchmarks.bench_serialization [模块数量] [重复次数]
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from backend.core.binary_format import BinaryWorkflowReader
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import MathOperationModule, NumberGeneratorModule
+
+logging.disable(logging.INFO)
+
+
+def build_workflow(num_modules: int) -> Workflow:
+    workflow = Workflow("序列化基准")
+    source = NumberGeneratorModule("源")
+    with workflow.transaction() as tx:
+        tx.add_module(source)
+        previous = source
+        for i in range(num_modules):
+            module = MathOperationModule(f"运算{i}")
+            module.set_parameter("operation", ("add", "subtract", "multiply")[i % 3])
+            module.position = (float(i % 100) * 20, float(i // 100) * 20)
+            tx.add_module(module)
+            tx.connect(previous.id, "number" if previous is source else "result", module.id, "number1")
+            tx.connect(source.id, "number", module.id, "number2")
+            previous = module
+    return workflow
+
+
+def best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def decode_binary(path: str) -> None:
+    with open(path, 'rb') as f:
+        reader = BinaryWorkflowReader(f.read())
+    for _ in reader.iter_module_data():
+        pass
+    for _ in reader.iter_connections():
+        pass
+
+
+def decode_json(path: str) -> None:
+    with open(path, 'r', encoding='utf-8') as f:
+        json.load(f)
+
+
+def main(num_modules: int, repeat: int) -> None:
+    workflow = build_workflow(num_modules)
+    registry = ModuleRegistry()
+    registry.register(NumberGeneratorModule)
+    registry.register(MathOperationModule)
+    print(f"模块数量: {len(workflow.modules)}, 连接数量: {len(workflow.connections)}, 取 {repeat} 次中的最好成绩")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "workflow.json")
+        binary_path = os.path.join(tmp_dir, "workflow.wfb")
+        rows = [
+            ("JSON", json_path, best_of(repeat, lambda: workflow.save(json_path)), decode_json),
+            ("二进制", binary_path, best_of(repeat, lambda: workflow.save_binary(binary_path)), decode_binary),
+        ]
+        for label, path, save_time, decode in rows:
+            decode_time = best_of(repeat, lambda: decode(path))
+            load_time = best_of(repeat, lambda: Workflow.load(path, registry))
+            print(f"{label:6s} 大小 {os.path.getsize(path) / 1024:9.1f} KiB  保存 {save_time * 1000:8.1f} ms  "
+                  f"解码 {decode_time * 1000:8.1f} ms  完整加载 {load_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3)
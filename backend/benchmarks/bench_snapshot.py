@@ -0,0 +1,73 @@
+"""
+工作流快照基准
+
+构建一个由 N 个运算模块组成的工作流 (链式连接 + 公共数字源)，测量:
+- Workflow.snapshot() 的耗时 (结构共享，应与模块数量无关)
+- 快照之后第一次修改结构的耗时 (写时复制内部字典) 与之后修改的耗时
+- 快照之后修改模块参数的耗时 (为快照保留模块副本)
+- 基于快照与基于工作流本身编译执行计划的耗时
+
+运行方式:
+    python -m backend.benchmarks.bench_snapshot [模块数量]
+"""
+import logging
+import sys
+import time
+
+from backend.core.execution_plan import compile_plan
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import MathOperationModule, NumberGeneratorModule
+
+logging.disable(logging.INFO)
+
+
+def build_workflow(num_modules: int) -> Workflow:
+    workflow = Workflow("快照基准")
+    source = NumberGeneratorModule("源")
+    with workflow.transaction() as tx:
+        tx.add_module(source)
+        previous = source
+        for i in range(num_modules):
+            module = MathOperationModule(f"运算{i}")
+            tx.add_module(module)
+            tx.connect(previous.id, "number" if previous is source else "result", module.id, "number1")
+            tx.connect(source.id, "number", module.id, "number2")
+            previous = module
+    return workflow
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(num_modules: int) -> None:
+    workflow = build_workflow(num_modules)
+    modules = list(workflow.modules.values())
+    print(f"模块数量: {len(modules)}, 连接数量: {len(workflow.connections)}")
+
+    snapshots = []
+    snapshot_time = min(timed(lambda: snapshots.append(workflow.snapshot())) for _ in range(100))
+    print(f"snapshot():           {snapshot_time * 1e6:8.1f} µs")
+    snapshots.clear()
+
+    snapshot = workflow.snapshot()
+    first_edit = timed(lambda: workflow.add_module(MathOperationModule("新增")))
+    second_edit = timed(lambda: workflow.add_module(MathOperationModule("新增")))
+    print(f"快照后第一次修改结构: {first_edit * 1000:8.2f} ms (复制内部字典)")
+    print(f"之后修改结构:         {second_edit * 1e6:8.1f} µs")
+
+    first_parameter = timed(lambda: modules[-1].set_parameter("operation", "multiply"))
+    second_parameter = timed(lambda: modules[-1].set_parameter("operation", "subtract"))
+    print(f"快照后第一次修改参数: {first_parameter * 1e6:8.1f} µs (保留模块副本)")
+    print(f"之后修改参数:         {second_parameter * 1e6:8.1f} µs")
+    assert snapshot.modules[modules[-1].id].get_parameter("operation") != "multiply"
+
+    compile_live = min(timed(lambda: compile_plan(workflow)) for _ in range(3))
+    compile_snapshot = min(timed(lambda: compile_plan(snapshot)) for _ in range(3))
+    print(f"编译执行计划: 工作流 {compile_live * 1000:.1f} ms, 快照 {compile_snapshot * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
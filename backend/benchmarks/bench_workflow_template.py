@@ -0,0 +1,63 @@
+"""
+工作流模板基准
+
+以一个由 M 个运算模块组成的工作流为模板，比较创建 N 个只有两个参数不同的工作流:
+- 每次从头构建 (创建模块 + 连接校验)
+- 每次从模板创建实例 (WorkflowTemplate.instantiate，只保存参数覆盖)
+的耗时和每个工作流占用的内存 (tracemalloc，会拖慢两者)，并执行一个实例确认结果正确。
+从头构建较慢，只构建 N/10 个。
+
+运行方式:
+    python -m backend.benchmarks.bench_workflow_template [实例数量] [每个工作流的模块数量]
+"""
+import logging
+import sys
+import time
+import tracemalloc
+
+from backend.benchmarks.bench_serialization import build_workflow
+from backend.core.engine import WorkflowEngine
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow_template import WorkflowTemplate
+
+logging.disable(logging.INFO)
+
+
+def measure(label: str, count: int, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:12s} 共 {elapsed * 1000:9.1f} ms  每个 {elapsed / count * 1e6:9.1f} µs  "
+          f"内存 每个 {current / count / 1024:8.2f} KiB")
+    return result
+
+
+def main(num_instances: int, num_modules: int) -> None:
+    workflow = build_workflow(num_modules)
+    order = workflow._get_execution_order()
+    source_id, first_id = order[0], order[1]
+    print(f"实例数量: {num_instances}, 每个工作流 {len(workflow.modules)} 个模块 / {len(workflow.connections)} 个连接")
+
+    count = max(1, num_instances // 10)
+    measure("从头构建", count, lambda: [build_workflow(num_modules) for _ in range(count)])
+
+    template = WorkflowTemplate(workflow)
+    instances = measure("模板实例", num_instances, lambda: [
+        template.instantiate({source_id: {"min_value": i, "max_value": i}, first_id: {"operation": "multiply"}})
+        for i in range(num_instances)
+    ])
+
+    engine = WorkflowEngine(ModuleRegistry())
+    instance = instances[7]
+    engine.workflows[instance.id] = instance
+    engine.execute(instance.id, async_run=False)
+    assert engine.execution_status == "completed", engine.error_message
+    print(f"执行实例 7: 第一个运算模块结果 {engine.execution_results[first_id]['result']} (7 * 7 = 49)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 100)
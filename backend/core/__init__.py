@@ -4,8 +4,23 @@
 包含工作流系统的基础组件和核心功能:
 - BaseModule: 模块基类，定义了模块的基本属性和方法
 - Workflow: 工作流类，管理模块和连接
+- WorkflowSnapshot: 工作流的写时复制只读快照，执行基于快照进行
+- WorkflowPatch / WorkflowPatchLog: 带修订号的增量补丁，以及追加式补丁日志 (定期压缩)
+- binary_format: 工作流的紧凑二进制格式 (字符串表 + 定长记录)
+- WorkflowTemplate / WorkflowInstance: 共享结构的工作流模板，实例只保存参数覆盖
+- WorkflowRepository: 基于 SQLite 的工作流仓库，增量保存并缓存常用工作流
 - ModuleRegistry: 模块注册表类，负责模块类型的注册和管理
+- ModuleManifest: 预先生成的模块定义清单 (带源文件指纹)，查询模块定义时不导入模块代码
 - WorkflowEngine: 工作流引擎类，负责工作流的执行和控制
+- ResultStore: 执行结果的持久化存储 (按运行/模块/端口分列存储，按需分页读取)
+- result_encoding: 把表格类结果分块流式编码为 NDJSON 或 Arrow IPC 流 (列选择、行范围)
+- RunProfiler: 单次运行的性能剖析器，输出折叠栈或按模块的 cProfile 统计
+- MetricsRegistry: 进程内指标注册表，支持 Prometheus 文本格式导出
+- ExecutionPlan: 编译后的执行计划，预先解析每个步骤的输入来源
+- PreparedPlan: 为重复执行准备的计划 (预先分配结果槽位)，用于引擎的热运行 (run_hot)
+- SubWorkflowModule: 复合模块，把一个工作流封装为单个模块并在执行时展开
+- optimize_plan: 执行计划优化 (合并重复模块、常量折叠、删除无用模块)
+- fuse_chains: 把轻量模块组成的线性链融合为一个执行任务
 """
 
 # 空文件，仅作为包标识 
\ No newline at end of file
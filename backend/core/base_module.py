@@ -1,10 +1,58 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Set, Tuple, Union, Literal
+from typing import Dict, Any, List, Optional, Set, Tuple, Union, Literal, Mapping, Sequence
 from uuid import uuid4
+import copy
 import dataclasses
+import itertools
+import sys
+import threading
+import types
+import weakref
 
-# 新增 PortDefinition 数据类
-@dataclasses.dataclass
+# 紧凑ID: 进程级随机前缀 + 自增计数，比每个对象生成一次 uuid4 更快、字符串更短
+_COMPACT_ID_PREFIX = uuid4().hex[:8]
+_compact_id_counter = itertools.count(1)
+
+def new_compact_id() -> str:
+    """生成进程内唯一、跨进程大概率唯一的紧凑ID (用于端口和连接)"""
+    return f"{_COMPACT_ID_PREFIX}{next(_compact_id_counter):x}"
+
+
+class SnapshotClock:
+    """
+    快照时钟: 每创建一个工作流快照，全局纪元 (epoch) 加一
+
+    模块在修改自身状态前比较全局纪元与上次保存状态时的纪元，如果期间创建过快照，
+    就先保存一份修改前的副本供这些快照使用 (写时复制)。创建快照本身只需 O(1)。
+    """
+    def __init__(self):
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._live = weakref.WeakKeyDictionary()  # 存活的快照 -> 纪元
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def tick(self, snapshot: Any) -> int:
+        """登记一个新快照，返回它的纪元"""
+        with self._lock:
+            self._epoch += 1
+            self._live[snapshot] = self._epoch
+            return self._epoch
+
+    def oldest_live_epoch(self) -> Optional[int]:
+        """仍然存活的最早快照的纪元，没有存活快照时返回None"""
+        with self._lock:
+            epochs = list(self._live.values())
+        return min(epochs) if epochs else None
+
+
+gsnapshot_clock = SnapshotClock()
+
+
+# 新增 PortDefinition 数据类 (不可变，类级别缓存的定义在所有实例之间共享)
+@dataclasses.dataclass(frozen=True)
 class PortDefinition:
     name: str
     port_io_type: Literal['input', 'output']
@@ -15,23 +63,42 @@ class PortDefinition:
     allow_multiple_connections: bool
 
 # 新增 VariantDefinition 数据类
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class VariantDefinition:
     variant_id: str
     variant_name: str
     description: str
-    port_definitions: List[PortDefinition]
+    port_definitions: Sequence[PortDefinition]
+
+# 端口模板: 某个变体在某个端口配置下启用的端口 ((是否为输入端口, 名称, 数据类型, 描述), ...)
+PortTemplate = Tuple[Tuple[bool, str, str, str], ...]
+# 每个模块类缓存的端口模板数量上限 (端口配置的组合通常只有几种)
+_MAX_PORT_TEMPLATES = 256
 
 class Port:
     """
     端口类，代表模块的输入或输出接口
+    使用 __slots__ 并驻留 (intern) 名称与类型字符串，以降低大规模工作流的元数据内存
     """
+    __slots__ = ('_id', '_name', '_type', '_description', '_connected_to')
+
     def __init__(self, name: str, port_type: str, description: str = ""):
-        self._id = str(uuid4())
-        self._name = name
-        self._type = port_type
+        self._id = new_compact_id()
+        self._name = sys.intern(name)
+        self._type = sys.intern(port_type)
         self._description = description
-        self._connected_to: Set[str] = set()  # 存储连接到此端口的其他端口的 *名称*
+        self._connected_to: Tuple[str, ...] = ()  # 存储连接到此端口的其他端口的 *名称* (去重，通常只有一两个)
+
+    @classmethod
+    def _from_template(cls, name: str, port_type: str, description: str) -> 'Port':
+        """按端口模板创建端口 (模板中的字符串已经驻留，跳过 __init__ 中的处理)"""
+        port = cls.__new__(cls)
+        port._id = new_compact_id()
+        port._name = name
+        port._type = port_type
+        port._description = description
+        port._connected_to = ()
+        return port
 
     @property
     def id(self) -> str:
@@ -51,20 +118,21 @@ class Port:
     
     @property
     def connected_to(self) -> Set[str]: # 现在返回的是连接的端口名称集合
-        return self._connected_to
+        return set(self._connected_to)
     
     def connect(self, port_name: str) -> None: # 参数改为 port_name
         """将此端口连接到另一个端口 (通过名称)"""
-        self._connected_to.add(port_name)
+        if port_name not in self._connected_to:
+            self._connected_to = self._connected_to + (port_name,)
     
     def disconnect(self, port_name: str) -> None: # 参数改为 port_name
         """断开与指定端口的连接 (通过名称)"""
         if port_name in self._connected_to:
-            self._connected_to.remove(port_name)
+            self._connected_to = tuple(name for name in self._connected_to if name != port_name)
     
     def disconnect_all(self) -> None:
         """断开所有连接"""
-        self._connected_to.clear()
+        self._connected_to = ()
 
 
 class BaseModule(ABC):
@@ -72,16 +140,29 @@ class BaseModule(ABC):
     工作流模块基类
     定义了工作流中每个模块必须实现的基本属性和方法
     """
+    # 相同的变体、参数和输入总是产生相同的输出且没有副作用时设为 True，
+    # 优化器 (optimizer.py) 只会合并或预先计算这类模块
+    deterministic: bool = False
+    # 执行开销很小 (远小于引擎调度每个模块的固定开销) 的模块设为 True，
+    # fuse_chains 会把这类模块组成的线性链融合为一个执行任务
+    fusible: bool = False
+
     def __init__(self, name: str, description: str = "", initial_variant_id: Optional[str] = None, initial_ports_config: Optional[Dict[str, bool]] = None):
         self._id = str(uuid4())
         self._name = name
         self._description = description
         self._input_ports: Dict[str, Port] = {}  # 输入端口字典
         self._output_ports: Dict[str, Port] = {} # 输出端口字典
+        self._input_ports_by_name: Dict[str, Port] = {}  # 端口名称 -> 输入端口 (同名时保留最先添加的端口)
+        self._output_ports_by_name: Dict[str, Port] = {} # 端口名称 -> 输出端口
         self._parameters: Dict[str, Any] = {}    # 模块参数
         self._position: Tuple[float, float] = (0.0, 0.0)  # 模块在画布中的位置
         self._execution_status: str = "idle"  # 执行状态：idle, running, completed, error
         self._error_message: str = ""  # 错误信息
+        # 写时复制: 上次保存状态副本时的快照纪元，以及 [(纪元, 副本), ...]，
+        # 条目 (e, 副本) 表示纪元不大于 e (且大于前一条目) 的快照看到的模块状态
+        self._cow_epoch: int = gsnapshot_clock.epoch
+        self._cow_history: List[Tuple[int, 'BaseModule']] = []
 
         # 新增：模块变体相关属性
         self._current_variant_id: Optional[str] = initial_variant_id
@@ -93,7 +174,7 @@ class BaseModule(ABC):
             self._apply_active_variant_and_config()
         else:
             # 如果没有提供初始变体，尝试获取并应用默认变体
-            variant_definitions = self._get_variant_definitions()
+            variant_definitions = self.get_variant_definitions()
             if variant_definitions:
                 # 假设第一个定义的变体或名为 'default' 的变体是默认的
                 default_variant_id = next(iter(variant_definitions.keys()))
@@ -103,12 +184,7 @@ class BaseModule(ABC):
                 if default_variant_id:
                     self._current_variant_id = default_variant_id
                     # 对于默认变体，可选端口的初始状态由 PortDefinition 中的 default_enabled 决定
-                    selected_variant_def = variant_definitions[self._current_variant_id]
-                    self._current_ports_config = {
-                        pd.name: pd.default_enabled 
-                        for pd in selected_variant_def.port_definitions 
-                        if pd.is_optional
-                    }
+                    self._current_ports_config = self._default_ports_config(default_variant_id)
                     self._apply_active_variant_and_config()
 
 
@@ -122,6 +198,7 @@ class BaseModule(ABC):
     
     @name.setter
     def name(self, value: str) -> None:
+        self._before_mutation()
         self._name = value
     
     @property
@@ -130,6 +207,7 @@ class BaseModule(ABC):
     
     @description.setter
     def description(self, value: str) -> None:
+        self._before_mutation()
         self._description = value
     
     @property
@@ -141,8 +219,13 @@ class BaseModule(ABC):
         return self._output_ports
     
     @property
-    def parameters(self) -> Dict[str, Any]:
-        return self._parameters
+    def parameters(self) -> Mapping[str, Any]:
+        """
+        参数的只读视图 (MappingProxyType)，修改参数请使用 set_parameter (保证快照的写时复制)
+        
+        注意: 以前返回内部参数字典本身，直接对其赋值的代码现在会抛出 TypeError
+        """
+        return types.MappingProxyType(self._parameters)
     
     @property
     def position(self) -> Tuple[float, float]:
@@ -162,34 +245,103 @@ class BaseModule(ABC):
     
     def add_input_port(self, name: str, port_type: str, description: str = "") -> Port:
         """添加输入端口"""
+        self._before_mutation()
         port = Port(name, port_type, description)
         self._input_ports[port.id] = port
+        self._input_ports_by_name.setdefault(port.name, port)
         return port
     
     def add_output_port(self, name: str, port_type: str, description: str = "") -> Port:
         """添加输出端口"""
+        self._before_mutation()
         port = Port(name, port_type, description)
         self._output_ports[port.id] = port
+        self._output_ports_by_name.setdefault(port.name, port)
         return port
     
     def remove_port(self, port_id: str) -> bool:
         """移除指定ID的端口"""
-        if port_id in self._input_ports:
-            del self._input_ports[port_id]
-            return True
-        if port_id in self._output_ports:
-            del self._output_ports[port_id]
+        self._before_mutation()
+        for ports, ports_by_name in ((self._input_ports, self._input_ports_by_name),
+                                     (self._output_ports, self._output_ports_by_name)):
+            port = ports.pop(port_id, None)
+            if port is None:
+                continue
+            if ports_by_name.get(port.name) is port:
+                # 如果还有同名端口，则由最先添加的那个接替索引
+                del ports_by_name[port.name]
+                for other in ports.values():
+                    if other.name == port.name:
+                        ports_by_name[port.name] = other
+                        break
             return True
         return False
     
+    def get_input_port(self, name: str) -> Optional[Port]:
+        """根据名称获取输入端口"""
+        return self._input_ports_by_name.get(name)
+    
+    def get_output_port(self, name: str) -> Optional[Port]:
+        """根据名称获取输出端口"""
+        return self._output_ports_by_name.get(name)
+    
     def set_parameter(self, key: str, value: Any) -> None:
         """设置模块参数"""
+        self._before_mutation()
         self._parameters[key] = value
     
     def get_parameter(self, key: str, default: Any = None) -> Any:
         """获取模块参数"""
         return self._parameters.get(key, default)
     
+    def get_constant_outputs(self) -> Optional[Dict[str, Any]]:
+        """
+        如果模块的输出与输入无关且在当前参数下固定不变，返回该输出 (以端口名称为键)，
+        优化器会在执行前直接使用该结果；默认返回None
+        """
+        return None
+    
+    def _before_mutation(self) -> None:
+        """
+        修改模块状态 (名称、描述、参数、变体和端口) 之前调用:
+        如果上次保存副本之后创建过工作流快照，先为这些快照保存一份修改前的状态
+        """
+        epoch = gsnapshot_clock._epoch
+        if epoch != self._cow_epoch or self._cow_history:
+            self._preserve_state(epoch)
+
+    def _preserve_state(self, epoch: int) -> None:
+        oldest = gsnapshot_clock.oldest_live_epoch()
+        # 丢弃已经没有快照使用的旧副本
+        history = [entry for entry in self._cow_history if oldest is not None and entry[0] >= oldest]
+        if epoch != self._cow_epoch and oldest is not None and epoch >= oldest:
+            history.append((epoch, self._snapshot_clone()))
+        self._cow_history = history
+        self._cow_epoch = epoch
+
+    def _snapshot_clone(self) -> 'BaseModule':
+        """
+        复制供快照使用的模块状态副本: 复制参数和端口等可变容器，端口与参数值本身共享
+        (参数值应当整体替换而不是原地修改)。子类有其他可变状态时应扩展此方法
+        """
+        clone = copy.copy(self)
+        clone._parameters = dict(self._parameters)
+        clone._input_ports = dict(self._input_ports)
+        clone._output_ports = dict(self._output_ports)
+        clone._input_ports_by_name = dict(self._input_ports_by_name)
+        clone._output_ports_by_name = dict(self._output_ports_by_name)
+        clone._current_ports_config = dict(self._current_ports_config)
+        clone._cow_history = []
+        return clone
+
+    def state_at(self, epoch: int) -> 'BaseModule':
+        """返回纪元为 epoch 的快照所看到的模块 (之后未被修改时就是模块本身)"""
+        if epoch <= self._cow_epoch:
+            for entry_epoch, clone in self._cow_history:
+                if entry_epoch >= epoch:
+                    return clone
+        return self
+
     def reset(self) -> None:
         """重置模块状态"""
         self._execution_status = "idle"
@@ -217,67 +369,105 @@ class BaseModule(ABC):
         """
         pass
 
+    @classmethod
+    def get_variant_definitions(cls) -> Mapping[str, VariantDefinition]:
+        """
+        获取模块支持的所有变体定义 (只读，每个模块类只调用一次 _get_variant_definitions 并缓存)。
+        _get_variant_definitions 的结果必须是固定的；需要重新读取时调用 clear_variant_cache。
+        """
+        cached = cls.__dict__.get('_cached_variant_definitions')
+        if cached is None:
+            cached = types.MappingProxyType({
+                variant_id: dataclasses.replace(variant, port_definitions=tuple(variant.port_definitions))
+                for variant_id, variant in (cls._get_variant_definitions() or {}).items()
+            })
+            cls._cached_variant_definitions = cached
+            cls._cached_port_templates = {}
+            cls._cached_default_ports_configs = {}
+        return cached
+
+    @classmethod
+    def clear_variant_cache(cls) -> None:
+        """清除类级别缓存的变体定义和端口模板"""
+        for attribute in ('_cached_variant_definitions', '_cached_port_templates', '_cached_default_ports_configs'):
+            if attribute in cls.__dict__:
+                delattr(cls, attribute)
+
+    @classmethod
+    def _default_ports_config(cls, variant_id: str) -> Dict[str, bool]:
+        """变体的默认可选端口配置 (可选端口名称 -> 是否默认启用)，返回副本"""
+        variant = cls.get_variant_definitions()[variant_id]
+        defaults = cls._cached_default_ports_configs.get(variant_id)
+        if defaults is None:
+            defaults = cls._cached_default_ports_configs[variant_id] = {
+                pd.name: pd.default_enabled for pd in variant.port_definitions if pd.is_optional
+            }
+        return dict(defaults)
+
+    @classmethod
+    def _port_template(cls, variant_id: str, ports_config: Dict[str, bool]) -> PortTemplate:
+        """获取 (变体, 端口配置) 对应的端口模板，按配置缓存"""
+        variant = cls.get_variant_definitions()[variant_id]
+        templates = cls._cached_port_templates
+        key = (variant_id, tuple(sorted(ports_config.items()))) if ports_config else (variant_id, ())
+        template = templates.get(key)
+        if template is None:
+            template = tuple(
+                (pd.port_io_type == 'input', sys.intern(pd.name), sys.intern(pd.data_type), pd.description)
+                for pd in variant.port_definitions
+                if pd.port_io_type in ('input', 'output')
+                and (not pd.is_optional or ports_config.get(pd.name, pd.default_enabled))
+            )
+            if len(templates) >= _MAX_PORT_TEMPLATES:
+                templates.clear()
+            templates[key] = template
+        return template
+
     def _apply_active_variant_and_config(self) -> None:
         """
         根据当前激活的变体ID和端口配置来创建或更新模块的实际端口。
         """
+        self._before_mutation()
         if not self._current_variant_id:
             # self._input_ports.clear() # 清理旧端口
             # self._output_ports.clear()
             # print(f"模块 {self.name} ({self.id}) 没有激活的变体ID，端口已清空。")
             return
 
-        variant_definitions = self._get_variant_definitions()
-        if self._current_variant_id not in variant_definitions:
+        if self._current_variant_id not in self.get_variant_definitions():
             # print(f"模块 {self.name} ({self.id}) 的变体ID '{self._current_variant_id}' 未在定义中找到。")
             # self._input_ports.clear() # 清理旧端口
             # self._output_ports.clear()
             return
 
-        active_variant_def = variant_definitions[self._current_variant_id]
+        template = self._port_template(self._current_variant_id, self._current_ports_config)
         
-        # 记录当前连接，以便在重建端口后尝试恢复
-        # 注意：这里的连接信息是基于旧端口ID的，如果端口ID在变体切换后改变，恢复会复杂
-        # 计划1.3.2中推荐使用端口名称进行连接，这里暂时保留基于ID的逻辑，后续需要与Workflow类协同修改
-        existing_connections = {}
-        for port_dict in [self._input_ports, self._output_ports]:
-            for port_id, port_obj in port_dict.items():
-                if port_obj.connected_to:
-                    existing_connections[port_obj.name] = list(port_obj.connected_to) # 使用端口名作为键
-
-        # 清理旧端口
-        self._input_ports.clear()
-        self._output_ports.clear()
-
-        # print(f"模块 {self.name} ({self.id}) 应用变体: {active_variant_def.variant_name} ({self._current_variant_id})")
-        # print(f"  当前端口配置: {self._current_ports_config}")
-
-        for port_def in active_variant_def.port_definitions:
-            is_enabled = True # 非可选端口默认启用
-            if port_def.is_optional:
-                is_enabled = self._current_ports_config.get(port_def.name, port_def.default_enabled)
-            
-            # print(f"  处理端口定义: {port_def.name}, 可选: {port_def.is_optional}, 配置启用: {self._current_ports_config.get(port_def.name)}, 默认启用: {port_def.default_enabled}, 最终启用: {is_enabled}")
+        # 记录现有端口，新变体中名称、类型和描述均未变化的端口直接复用，
+        # 这样端口ID和连接状态保持不变，也避免重复创建对象
+        reusable_ports = {}
+        if self._input_ports or self._output_ports:
+            for is_input, port_dict in ((True, self._input_ports), (False, self._output_ports)):
+                for port_obj in port_dict.values():
+                    reusable_ports.setdefault((is_input, port_obj.name), port_obj)
 
-            if is_enabled:
-                new_port = Port(name=port_def.name, port_type=port_def.data_type, description=port_def.description)
-                # 尝试恢复连接 (基于端口名称匹配旧连接)
-                # 这部分逻辑比较复杂，且依赖 Workflow 侧的改动，暂时简化处理或后续完善
-                # if new_port.name in existing_connections:
-                #     for connected_old_port_id in existing_connections[new_port.name]:
-                #         # 这里需要一种机制将旧的port_id映射到新的port_id或直接使用port_name
-                #         # 简化：假设连接的是对端Port的ID，这里暂时无法直接恢复
-                #         pass # new_port.connect(connected_old_port_id)
+            # 清理旧端口
+            self._input_ports.clear()
+            self._output_ports.clear()
+            self._input_ports_by_name.clear()
+            self._output_ports_by_name.clear()
 
+        # 按端口模板生成端口
+        for is_input, port_name, data_type, description in template:
+            new_port = reusable_ports.pop((is_input, port_name), None) if reusable_ports else None
+            if new_port is None or new_port.type != data_type or new_port.description != description:
+                new_port = Port._from_template(port_name, data_type, description)
 
-                if port_def.port_io_type == 'input':
-                    self._input_ports[new_port.id] = new_port # 使用新端口的ID
-                    # print(f"    添加输入端口: {new_port.name} (ID: {new_port.id})")
-                elif port_def.port_io_type == 'output':
-                    self._output_ports[new_port.id] = new_port # 使用新端口的ID
-                    # print(f"    添加输出端口: {new_port.name} (ID: {new_port.id})")
-        # print(f"  应用变体后，输入端口: {[p.name for p in self._input_ports.values()]}")
-        # print(f"  应用变体后，输出端口: {[p.name for p in self._output_ports.values()]}")
+            if is_input:
+                self._input_ports[new_port.id] = new_port # 使用新端口的ID
+                self._input_ports_by_name.setdefault(port_name, new_port)
+            else:
+                self._output_ports[new_port.id] = new_port # 使用新端口的ID
+                self._output_ports_by_name.setdefault(port_name, new_port)
 
 
     def set_variant(self, variant_id: str, optional_ports_override: Optional[Dict[str, bool]] = None) -> None:
@@ -289,9 +479,9 @@ class BaseModule(ABC):
             optional_ports_override: 可选端口的覆盖配置 (port_name -> is_enabled)。
                                      如果为None，则使用变体定义中的默认值或保持现有配置。
         """
-        variant_definitions = self._get_variant_definitions()
-        if variant_id not in variant_definitions:
+        if variant_id not in self.get_variant_definitions():
             raise ValueError(f"模块 {self.name} 不支持变体ID: {variant_id}")
+        self._before_mutation()
 
         # TODO: 根据 dev_plan.md 1.3.2，在切换变体导致端口移除时，需要处理连接断开。
         # 这部分逻辑需要 Workflow 实例的参与，暂时在此处留作TODO。
@@ -300,16 +490,12 @@ class BaseModule(ABC):
 
         self._current_variant_id = variant_id
         
-        # 更新可选端口配置
-        active_variant_def = variant_definitions[variant_id]
-        new_ports_config = {}
-        for pd in active_variant_def.port_definitions:
-            if pd.is_optional:
-                if optional_ports_override is not None and pd.name in optional_ports_override:
-                    new_ports_config[pd.name] = optional_ports_override[pd.name]
-                else:
-                    # 如果没有覆盖，则使用此变体定义中的默认启用状态
-                    new_ports_config[pd.name] = pd.default_enabled
+        # 更新可选端口配置: 没有覆盖的可选端口使用此变体定义中的默认启用状态
+        new_ports_config = self._default_ports_config(variant_id)
+        if optional_ports_override:
+            for port_name in new_ports_config:
+                if port_name in optional_ports_override:
+                    new_ports_config[port_name] = optional_ports_override[port_name]
         
         self._current_ports_config = new_ports_config
         self._apply_active_variant_and_config()
@@ -0,0 +1,248 @@
+from typing import Dict, List, Any, Optional, Tuple
+from array import array
+from itertools import accumulate
+import json
+import struct
+import sys
+
+# 工作流二进制格式 (.wfb)
+#
+# 与 JSON 格式 (Workflow.save) 保存相同的信息，但体积更小、加载更快:
+# - 所有字符串 (模块ID、名称、端口名称等) 驻留在一张字符串表中，其他位置只保存 u32 序号；
+#   参数、端口配置等小字典以紧凑 JSON 字符串的形式驻留，相同的参数只保存并解析一次
+# - 模块和连接是定长记录 (struct)，可以按序号直接定位，用 struct.iter_unpack 批量解码
+# - 字符串表记录每个字符串的字节数，读取时按偏移在第一次访问时才解码 (延迟加载不解码参数)
+# - 不保存端口ID和 connected_to 等加载时会重新生成的冗余信息
+#
+# 文件布局 (小端序):
+#     头部      HEADER (见下)
+#     字符串表  n_strings 个 u32 (每个字符串的 UTF-8 字节数；版本 1 为字符数) + 所有字符串拼接后的 UTF-8 字节
+#     模块表    n_modules 条 MODULE_RECORD
+#     连接表    n_connections 条 CONNECTION_RECORD
+
+MAGIC = b"WFB1"
+FORMAT_VERSION = 2
+
+# 魔数, 格式版本, 标志位, 字符串数, 模块数, 连接数, 工作流元数据 (JSON 字符串序号),
+# 字符串表偏移, 模块表偏移, 连接表偏移
+HEADER = struct.Struct("<4sHHIIIIQQQ")
+# 模块ID, 模块类型, 名称, 描述, 变体ID, 端口配置 (JSON), 参数 (JSON), 其他字段 (JSON), 位置 x, 位置 y
+MODULE_RECORD = struct.Struct("<IIIIIIIIdd")
+# 源模块ID, 源端口名称, 目标模块ID, 目标端口名称
+CONNECTION_RECORD = struct.Struct("<IIII")
+
+NO_STRING = 0xFFFFFFFF  # 表示 None
+
+# 模块 to_dict() 中由定长记录保存、或加载时会重新生成的字段，其余字段存入 "其他字段"
+_RECORD_FIELDS = {"id", "module_type", "name", "description", "current_variant_id", "current_ports_config",
+                  "parameters", "position", "input_ports", "output_ports", "execution_status"}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+class _StringTable:
+    """编码时的字符串驻留表"""
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self._index.get(value)
+        if index is None:
+            index = len(self.strings)
+            self._index[value] = index
+            self.strings.append(value)
+        return index
+
+    def add_json(self, value: Any) -> int:
+        return NO_STRING if value is None else self.add(_dumps(value))
+
+
+def encode_workflow(data: Dict[str, Any]) -> bytes:
+    """把 Workflow.to_dict() 格式的数据编码为二进制格式"""
+    strings = _StringTable()
+    meta = {key: value for key, value in data.items() if key not in ("modules", "connections")}
+    meta_index = strings.add_json(meta)
+
+    module_records = bytearray()
+    modules = data.get("modules", {})
+    for module_id, module_data in modules.items():
+        extra = {key: value for key, value in module_data.items() if key not in _RECORD_FIELDS}
+        position = module_data.get("position") or (0.0, 0.0)
+        module_records += MODULE_RECORD.pack(
+            strings.add(module_data.get("id", module_id)),
+            strings.add(module_data.get("module_type")),
+            strings.add(module_data.get("name")),
+            strings.add(module_data.get("description")),
+            strings.add(module_data.get("current_variant_id")),
+            strings.add_json(module_data.get("current_ports_config")),
+            strings.add_json(module_data.get("parameters", {})),
+            strings.add_json(extra or None),
+            float(position[0]), float(position[1])
+        )
+
+    connection_records = bytearray()
+    connections = data.get("connections", {})
+    for conn_data in connections.values():
+        connection_records += CONNECTION_RECORD.pack(
+            strings.add(conn_data["source_module_id"]),
+            strings.add(conn_data["source_port_name"]),
+            strings.add(conn_data["target_module_id"]),
+            strings.add(conn_data["target_port_name"])
+        )
+
+    encoded = [value.encode('utf-8') for value in strings.strings]
+    lengths = array('I', map(len, encoded))
+    if sys.byteorder != 'little':
+        lengths.byteswap()
+    string_section = lengths.tobytes() + b"".join(encoded)
+
+    strings_offset = HEADER.size
+    modules_offset = strings_offset + len(string_section)
+    connections_offset = modules_offset + len(module_records)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(strings.strings), len(modules), len(connections),
+                         meta_index, strings_offset, modules_offset, connections_offset)
+    return b"".join((header, string_section, bytes(module_records), bytes(connection_records)))
+
+
+def is_binary_workflow(buffer) -> bool:
+    """判断数据 (bytes / mmap 等) 是否以二进制工作流的魔数开头"""
+    return bytes(buffer[:len(MAGIC)]) == MAGIC
+
+
+class BinaryWorkflowReader:
+    """
+    二进制工作流的读取器
+
+    构造时只解析头部和字符串表的长度列；字符串 (包括参数 JSON) 在第一次访问时才按偏移解码，
+    模块与连接记录按需解码 (定长记录可以按序号直接定位)。版本 1 的文件只记录字符数，
+    构造时一次解码全部字符串。buffer 可以是 bytes 或 mmap 等支持切片的对象。
+    """
+    def __init__(self, buffer):
+        if len(buffer) < HEADER.size or not is_binary_workflow(buffer):
+            raise ValueError("不是有效的二进制工作流文件")
+        (_, version, _, n_strings, n_modules, n_connections, meta_index,
+         strings_offset, modules_offset, connections_offset) = HEADER.unpack_from(buffer, 0)
+        if version > FORMAT_VERSION:
+            raise ValueError(f"不支持的二进制工作流格式版本: {version}")
+        self._buffer = buffer
+        self._n_modules = n_modules
+        self._n_connections = n_connections
+        self._modules_offset = modules_offset
+        self._connections_offset = connections_offset
+
+        lengths = array('I')
+        lengths_end = strings_offset + 4 * n_strings
+        lengths.frombytes(bytes(buffer[strings_offset:lengths_end]))
+        if sys.byteorder != 'little':
+            lengths.byteswap()
+        if version >= 2:
+            # 第 i 个字符串位于 [offsets[i], offsets[i + 1})，未解码的为None
+            self._string_offsets = array('Q', accumulate(lengths, initial=lengths_end))
+            self._strings: List[Optional[str]] = [None] * n_strings
+        else:
+            text = bytes(buffer[lengths_end:modules_offset]).decode('utf-8')
+            ends = list(accumulate(lengths))
+            self._string_offsets = None
+            self._strings = [text[end - length:end] for end, length in zip(ends, lengths)]
+        self._json_cache: Dict[int, Any] = {}
+        self._meta: Dict[str, Any] = json.loads(self._get_string(meta_index)) if meta_index != NO_STRING else {}
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """工作流元数据 (id、name、description、revision 等)"""
+        return self._meta
+
+    @property
+    def module_count(self) -> int:
+        return self._n_modules
+
+    @property
+    def connection_count(self) -> int:
+        return self._n_connections
+
+    def close(self) -> None:
+        """释放底层缓冲区 (mmap 时关闭映射及其文件句柄)，之后不能再读取记录"""
+        close = getattr(self._buffer, 'close', None)
+        if close is not None:
+            close()
+        self._buffer = b""
+
+    def _get_string(self, index: int) -> str:
+        """第 index 个字符串，第一次访问时解码"""
+        value = self._strings[index]
+        if value is None:
+            offsets = self._string_offsets
+            value = str(self._buffer[offsets[index]:offsets[index + 1]], 'utf-8')
+            self._strings[index] = value
+        return value
+
+    def _string(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        return self._strings[index] or self._get_string(index)
+
+    def _json(self, index: int) -> Any:
+        """解析驻留的 JSON 字符串；只含标量值的字典只解析一次，每次返回新的副本"""
+        if index == NO_STRING:
+            return None
+        cached = self._json_cache.get(index)
+        if cached is not None:
+            return dict(cached)
+        value = json.loads(self._get_string(index))
+        if isinstance(value, dict) and not any(isinstance(item, (dict, list)) for item in value.values()):
+            self._json_cache[index] = value
+            return dict(value)
+        return value
+
+    def module_ids(self) -> List[str]:
+        """按记录顺序返回所有模块ID (只读取ID列)"""
+        strings = self._strings
+        get_string = self._get_string
+        # 已解码的字符串直接取列表元素 (空字符串会重新解码，结果相同)
+        return [strings[record[0]] or get_string(record[0]) for record in self._iter_module_records()]
+
+    def _iter_module_records(self):
+        end = self._modules_offset + MODULE_RECORD.size * self._n_modules
+        return struct.iter_unpack(MODULE_RECORD.format, self._buffer[self._modules_offset:end])
+
+    def _module_data(self, record: Tuple) -> Dict[str, Any]:
+        (id_index, type_index, name_index, description_index, variant_index,
+         ports_config_index, parameters_index, extra_index, x, y) = record
+        data = {
+            "id": self._strings[id_index] or self._get_string(id_index),
+            "module_type": self._string(type_index),
+            "name": self._string(name_index),
+            "description": self._string(description_index),
+            "current_variant_id": self._string(variant_index),
+            "current_ports_config": self._json(ports_config_index),
+            "parameters": self._json(parameters_index) or {},
+            "position": (x, y)
+        }
+        if extra_index != NO_STRING:
+            data.update(json.loads(self._get_string(extra_index)))
+        return data
+
+    def module_data(self, position: int) -> Dict[str, Any]:
+        """解码第 position 条模块记录为 BaseModule.to_dict() 格式的字典"""
+        if not 0 <= position < self._n_modules:
+            raise IndexError(position)
+        return self._module_data(MODULE_RECORD.unpack_from(self._buffer, self._modules_offset + MODULE_RECORD.size * position))
+
+    def iter_module_data(self):
+        for record in self._iter_module_records():
+            yield self._module_data(record)
+
+    def iter_connections(self):
+        """按记录顺序返回 (源模块ID, 源端口名称, 目标模块ID, 目标端口名称)"""
+        strings = self._strings
+        get_string = self._get_string
+        end = self._connections_offset + CONNECTION_RECORD.size * self._n_connections
+        for source_id, source_port, target_id, target_port in struct.iter_unpack(
+                CONNECTION_RECORD.format, self._buffer[self._connections_offset:end]):
+            yield (strings[source_id] or get_string(source_id), strings[source_port] or get_string(source_port),
+                   strings[target_id] or get_string(target_id), strings[target_port] or get_string(target_port))
@@ -2,11 +2,17 @@ from typing import Dict, List, Any, Optional, Set, Tuple, Union, Callable
 import time
 import threading
 import logging
+import weakref
 from uuid import uuid4
 
-from .workflow import Workflow
+from .workflow import Workflow, WorkflowSnapshot
 from .base_module import BaseModule
 from .module_registry import ModuleRegistry
+from .profiler import RunProfiler
+from .execution_plan import compile_plan, PreparedPlan, OP_EXECUTE, OP_CONSTANT
+from .optimizer import optimize_plan, fuse_chains, OptimizationReport
+from .metrics import MetricsRegistry, EngineMetrics, gmetrics_registry, estimate_nbytes
+from .result_store import ResultStore
 
 # 配置日志
 logging.basicConfig(
@@ -30,6 +36,7 @@ class ProgressCallbackType:
     MODULE_START = "module_start"  # 模块开始执行
     MODULE_COMPLETE = "module_complete"  # 模块执行完成
     MODULE_ERROR = "module_error"  # 模块执行错误
+    MODULE_BATCH_COMPLETE = "module_batch_complete"  # 融合步骤中的一批模块执行完成
     PAUSE = "pause"  # 暂停
     RESUME = "resume"  # 恢复
     COMPLETE = "complete"  # 完成
@@ -40,7 +47,8 @@ class WorkflowEngine:
     """
     工作流引擎类，负责工作流的执行和控制
     """
-    def __init__(self, module_registry: ModuleRegistry):
+    def __init__(self, module_registry: ModuleRegistry, metrics_registry: Optional[MetricsRegistry] = None,
+                 result_store: Optional[ResultStore] = None):
         self._module_registry = module_registry
         self._workflows: Dict[str, Workflow] = {}  # 已加载的工作流
         self._current_workflow_id: Optional[str] = None  # 当前活动工作流ID
@@ -51,6 +59,23 @@ class WorkflowEngine:
         self._progress_callbacks: List[Callable[[str, Dict[str, Any]], None]] = []  # 进度回调
         self._execution_results: Dict[str, Dict[str, Any]] = {}  # 执行结果
         self._error_message: str = ""  # 错误信息
+        self._profiler: Optional[RunProfiler] = None  # 当前运行的剖析器（未启用剖析时为None）
+        self._profile_output: Optional[str] = None  # 剖析结果输出路径
+        self._last_profile: Optional[RunProfiler] = None  # 最近一次启用剖析的运行结果
+        self._metrics = EngineMetrics(metrics_registry if metrics_registry is not None else gmetrics_registry)  # 引擎指标
+        weakref.finalize(self, self._metrics.release)  # 引擎释放后删除它的结果占用样本
+        self._submit_time: float = 0.0  # 最近一次提交执行的时间 (perf_counter)
+        self._execution_results_bytes: int = 0  # 执行结果估算占用的字节数
+        self._optimize: bool = False  # 本次运行是否在执行前优化执行计划
+        self._requested_outputs: Optional[List[str]] = None  # 本次运行需要结果的模块ID (只执行它们及其上游)
+        self._last_optimization_report: Optional[OptimizationReport] = None  # 最近一次优化的报告
+        self._fuse: bool = False  # 本次运行是否融合轻量模块组成的线性链
+        self._pending_durations: Dict[str, List[float]] = {}  # 融合步骤中尚未写入直方图的模块耗时 (按模块类型)
+        self._pending_duration_count: int = 0  # 自上次写入以来执行的融合步骤数
+        self._run_snapshot: Optional[WorkflowSnapshot] = None  # 本次运行所基于的工作流快照
+        self._result_store = result_store  # 执行结果的持久化存储 (为None时不持久化)
+        self._last_run_id: Optional[str] = None  # 最近一次持久化的运行ID
+        self._prepared_plans: Dict[str, Tuple[Any, Optional[List[str]], PreparedPlan]] = {}  # run_hot 缓存的预备计划 (工作流ID -> (工作流, requested_outputs, 计划))
     
     @property
     def workflows(self) -> Dict[str, Workflow]:
@@ -84,11 +109,31 @@ class WorkflowEngine:
         """获取执行结果"""
         return self._execution_results
     
+    @property
+    def result_store(self) -> Optional[ResultStore]:
+        """获取执行结果的持久化存储"""
+        return self._result_store
+    
+    @property
+    def last_run_id(self) -> Optional[str]:
+        """获取最近一次完成并持久化结果的运行ID (未配置结果存储时为None)"""
+        return self._last_run_id
+    
     @property
     def error_message(self) -> str:
         """获取错误信息"""
         return self._error_message
     
+    @property
+    def last_profile(self) -> Optional[RunProfiler]:
+        """获取最近一次启用剖析的运行的剖析器"""
+        return self._last_profile
+    
+    @property
+    def last_optimization_report(self) -> Optional[OptimizationReport]:
+        """获取最近一次启用优化的运行的优化报告"""
+        return self._last_optimization_report
+    
     def create_workflow(self, name: str, description: str = "") -> Workflow:
         """
         创建新工作流
@@ -119,7 +164,7 @@ class WorkflowEngine:
         Returns:
             加载的工作流
         """
-        workflow = Workflow.load(filepath, self._module_registry.get_all())
+        workflow = Workflow.load(filepath, self._module_registry)
         self._workflows[workflow.id] = workflow
         
         # 如果没有活动工作流，则设置为活动
@@ -147,6 +192,7 @@ class WorkflowEngine:
         
         # 从工作流集合中移除
         del self._workflows[workflow_id]
+        self._prepared_plans.pop(workflow_id, None)
         
         # 如果是当前活动工作流，则需要设置新的活动工作流
         if workflow_id == self._current_workflow_id:
@@ -216,13 +262,26 @@ class WorkflowEngine:
             except Exception as e:
                 glogger.error(f"回调函数执行错误: {str(e)}")
     
-    def execute(self, workflow_id: Optional[str] = None, async_run: bool = True) -> bool:
+    def execute(self, workflow_id: Optional[str] = None, async_run: bool = True,
+                profile: Optional[str] = None, profile_output: Optional[str] = None,
+                optimize: bool = False, requested_outputs: Optional[List[str]] = None,
+                fuse: bool = False) -> bool:
         """
         执行工作流
         
         Args:
             workflow_id: 工作流ID，如果为None则使用当前活动工作流
             async_run: 是否异步执行，True为异步（启动新线程），False为同步（阻塞当前线程）
+            profile: 剖析模式，None（默认）表示不剖析，可选 ProfileMode.SAMPLING / ProfileMode.CPROFILE
+            profile_output: 剖析结果输出路径，sampling 模式为折叠栈文件，cprofile 模式为目录；
+                            为None时仅保留在 last_profile 中
+            optimize: 是否在执行前优化执行计划 (合并重复模块、预先计算常量、删除无用模块)，
+                      优化报告保存在 last_optimization_report 中
+            requested_outputs: 需要结果的模块ID列表；指定时只执行这些模块及其上游模块
+                               (延迟加载的工作流不会创建其他模块)，optimize 为True时还会据此删除无用模块；
+                               为None时执行整个工作流
+            fuse: 是否把轻量模块组成的线性链融合为一个执行任务；融合链上的模块不再逐个发送
+                  MODULE_START / MODULE_COMPLETE，而是整条链完成后发送一个 MODULE_BATCH_COMPLETE
             
         Returns:
             是否成功启动执行
@@ -245,6 +304,14 @@ class WorkflowEngine:
         self._pause_event.set()  # 确保非暂停状态
         self._stop_event.clear()  # 确保非停止状态
         self._error_message = ""
+        self._profiler = RunProfiler(profile) if profile is not None else None
+        self._profile_output = profile_output
+        self._optimize = optimize
+        self._fuse = fuse
+        self._requested_outputs = list(requested_outputs) if requested_outputs is not None else None
+        self._submit_time = time.perf_counter()
+        # 在提交执行的线程上创建快照 (O(1))，运行期间对工作流的编辑不会影响本次执行
+        self._run_snapshot = self._workflows[self._current_workflow_id].snapshot()
         
         if async_run:
             # 异步执行
@@ -257,103 +324,237 @@ class WorkflowEngine:
             self._execute_workflow()
             return True
     
-    def _get_source_data(self, workflow: Workflow, target_module_id: str, target_port_name: str) -> Any:
+    def prepare(self, workflow_id: Optional[str] = None, requested_outputs: Optional[List[str]] = None,
+                optimize: bool = False, fuse: bool = False) -> Optional[PreparedPlan]:
         """
-        获取目标端口的数据源 (基于端口名称)
+        为重复执行准备工作流: 创建快照并编译执行计划，预先分配结果槽位 (见 PreparedPlan)
         
         Args:
-            workflow: 工作流实例
-            target_module_id: 目标模块ID
-            target_port_name: 目标端口的名称
+            workflow_id: 工作流ID，如果为None则使用当前活动工作流
+            requested_outputs / optimize / fuse: 与 execute 相同 (融合步骤在预备计划中按成员逐个执行)
             
         Returns:
-            数据源或None
+            预备计划；工作流不存在时返回None，存在循环依赖时抛出 ValueError
         """
-        target_module = workflow.modules.get(target_module_id)
-        if not target_module:
-            glogger.warning(f"获取连接数据失败：未找到目标模块ID {target_module_id}")
+        if workflow_id is None:
+            workflow_id = self._current_workflow_id
+        workflow = self._workflows.get(workflow_id) if workflow_id is not None else None
+        if workflow is None:
             return None
-
-        # glogger.info(f"获取连接数据 - 目标: {target_module.name}.{target_port_name}")
+        snapshot = workflow.snapshot()
+        plan = compile_plan(snapshot, requested_outputs)
+        if optimize:
+            plan, report = optimize_plan(plan, requested_outputs)
+            self._last_optimization_report = report
+        if fuse:
+            plan, _ = fuse_chains(plan)
+        return PreparedPlan(plan, snapshot)
+    
+    def run_prepared(self, prepared: PreparedPlan) -> bool:
+        """
+        在当前线程上执行预备计划 (快速路径，适合反复执行的小工作流)
         
-        found_connections = []
-        for conn in workflow.connections.values():
-            if conn.target_module_id == target_module_id and conn.target_port_name == target_port_name:
-                found_connections.append(conn)
-                
-        if not found_connections:
-            # glogger.info(f"  - 未找到连接到 {target_module.name}.{target_port_name} 的连接")
-            return None # 或者根据端口是否可选返回默认值
-            
-        # 通常输入端口只应该有一个连接（除非允许多重连接，这里简化处理，取第一个有效连接）
-        # TODO: 如果 target_port 允许多重连接，这里的逻辑需要调整为收集所有源数据
-        for conn in found_connections:
-            source_module_id = conn.source_module_id
-            source_port_name = conn.source_port_name # 使用端口名称
-            
-            source_module = workflow.modules.get(source_module_id)
-            if not source_module:
-                glogger.warning(f"  - 连接中指定的源模块ID {source_module_id} 未在工作流中找到。")
-                continue
-            
-            # glogger.info(f"  - 找到连接: {source_module.name}.{source_port_name} -> {target_module.name}.{target_port_name}")
-            
-            if source_module_id in self._execution_results:
-                source_module_outputs = self._execution_results[source_module_id]
-                # glogger.info(f"  - 源模块 '{source_module.name}' 的原始输出数据: {source_module_outputs}")
-                
-                # 检查源模块的实际输出端口中是否存在名为 source_port_name 的端口
-                actual_source_port_exists = any(p.name == source_port_name for p in source_module.output_ports.values())
-                if not actual_source_port_exists:
-                    # glogger.warning(f"  - 源模块 '{source_module.name}' 当前变体下不存在名为 '{source_port_name}' 的输出端口。")
-                    continue # 跳过此连接，尝试其他可能的连接（如果有）
-
-                # 直接按端口名称从执行结果中获取数据
-                if isinstance(source_module_outputs, dict) and source_port_name in source_module_outputs:
-                    data = source_module_outputs[source_port_name]
-                    # glogger.info(f"  - 从 '{source_module.name}' 的输出端口 '{source_port_name}' 获取数据: {data}")
-                    return data
-                # elif not isinstance(source_module_outputs, dict) and actual_source_port_exists:
-                    # 如果输出不是字典，但端口确实存在（例如，模块直接返回单个值且只有一个输出端口）
-                    # 这种情况比较模糊，需要约定模块如何返回单输出值。为安全起见，要求输出是包含端口名的字典。
-                    # glogger.warning(f"  - 源模块 '{source_module.name}' 的输出不是字典，但期望端口 '{source_port_name}' 存在。输出: {source_module_outputs}. 无法按名称提取。"))
-                    # 如果只有一个输出端口，且名称匹配，可以考虑直接返回值。但需谨慎。
-                    # if len(source_module.output_ports) == 1 and list(source_module.output_ports.values())[0].name == source_port_name:
-                    #     return source_module_outputs
-                # else:
-                    # glogger.info(f"  - 在源模块 '{source_module.name}' 的输出中未直接找到名为 '{source_port_name}' 的键。Outputs: {source_module_outputs}")
-            # else:
-                # glogger.info(f"  - 源模块 '{source_module.name}' (ID: {source_module_id}) 尚未执行或无结果。")
-        
-        # glogger.info(f"  - 未找到有效的数据源或源模块 '{source_module.name if 'source_module' in locals() else '未知'}' 的输出中不包含端口 '{source_port_name if 'source_port_name' in locals() else '未知'}'。")
-        return None # 如果遍历完所有连接都没有找到数据
+        与 execute(async_run=False) 相比: 不重新创建快照和编译计划，输入从预先分配的槽位中读取；
+        不检查暂停/停止，只记录运行级指标 (runs_started / runs_completed / runs_failed / run_duration)；
+        没有进度回调时不构造任何事件。有回调时发送的事件与普通执行相同 (融合步骤按成员逐个发送)。
+        预备计划的槽位在执行之间复用，同一个预备计划不能同时被多个引擎执行。
+        
+        Returns:
+            是否执行成功；已有运行在进行中时返回False
+        """
+        if self._execution_status in (ExecutionStatus.RUNNING, ExecutionStatus.PAUSED):
+            return False
+        metrics = self._metrics
+        run_start = time.perf_counter()
+        metrics.runs_started.inc()
+        self._execution_status = ExecutionStatus.RUNNING
+        self._error_message = ""
+        workflow = prepared.snapshot
+        notify = bool(self._progress_callbacks)
+        if notify:
+            self._notify_progress(ProgressCallbackType.START, {
+                "workflow_id": workflow.id,
+                "workflow_name": workflow.name,
+                "timestamp": time.time()
+            })
+        
+        slots = prepared.slots
+        steps = prepared.steps
+        epoch = workflow.epoch
+        for position, kind, module, payload in prepared.ops:
+            # 执行时按快照纪元解析模块: 准备之后被修改的模块使用修改前保存的副本
+            module = module.state_at(epoch)
+            if kind == OP_EXECUTE:
+                inputs = {}
+                for port_name, candidates in payload:
+                    for source, source_port_name in candidates:
+                        outputs = slots[source]
+                        if isinstance(outputs, dict) and source_port_name in outputs:
+                            data = outputs[source_port_name]
+                            if data is not None:
+                                inputs[port_name] = data
+                            break
+                if notify:
+                    self._notify_progress(ProgressCallbackType.MODULE_START, {
+                        "workflow_id": workflow.id,
+                        "module_id": steps[position].key,
+                        "module_name": module.name,
+                        "parent_module_id": steps[position].parent_key,
+                        "timestamp": time.time()
+                    })
+                try:
+                    outputs = module.execute(inputs)
+                except Exception as e:
+                    self._report_module_error(workflow, steps[position], e)
+                    metrics.runs_failed.inc()
+                    metrics.run_duration.observe(time.perf_counter() - run_start)
+                    return False
+            elif kind == OP_CONSTANT:
+                outputs = dict(payload)
+            else:
+                outputs = {}
+                for port_name, inner, inner_port_name in payload:
+                    inner_outputs = slots[inner]
+                    if isinstance(inner_outputs, dict) and inner_port_name in inner_outputs:
+                        outputs[port_name] = inner_outputs[inner_port_name]
+            slots[position] = outputs
+            module._execution_status = "completed"
+            if notify:
+                self._notify_progress(ProgressCallbackType.MODULE_COMPLETE, {
+                    "workflow_id": workflow.id,
+                    "module_id": steps[position].key,
+                    "module_name": module.name,
+                    "parent_module_id": steps[position].parent_key,
+                    "outputs": outputs,
+                    "timestamp": time.time()
+                })
+        
+        self._execution_results = prepared.results()
+        run_id = self._persist_results(workflow.id)
+        self._execution_status = ExecutionStatus.COMPLETED
+        if self._progress_callbacks:
+            self._notify_progress(ProgressCallbackType.COMPLETE, {
+                "workflow_id": workflow.id,
+                "run_id": run_id,
+                "timestamp": time.time()
+            })
+        metrics.runs_completed.inc()
+        metrics.run_duration.observe(time.perf_counter() - run_start)
+        return True
+    
+    def run_hot(self, workflow_id: Optional[str] = None, requested_outputs: Optional[List[str]] = None) -> bool:
+        """
+        热运行: 同步执行工作流，复用上次为它准备的预备计划 (见 prepare / run_prepared)
+        
+        工作流结构或计划中任何模块的状态 (参数、变体、端口) 改变后自动重新准备；
+        requested_outputs 与上次不同时也重新准备。工作流实例 (WorkflowInstance) 每次都重新准备。
+        
+        Returns:
+            是否执行成功；工作流不存在或已有运行在进行中时返回False
+        """
+        if workflow_id is None:
+            workflow_id = self._current_workflow_id
+        workflow = self._workflows.get(workflow_id) if workflow_id is not None else None
+        if workflow is None:
+            return False
+        self._current_workflow_id = workflow_id
+        if requested_outputs is not None:
+            requested_outputs = list(requested_outputs)
+        cached = self._prepared_plans.get(workflow_id)
+        hit = (cached is not None and cached[0] is workflow and cached[1] == requested_outputs
+               and cached[2].is_current(workflow))
+        self._metrics.record_cache_lookup("prepared_plan", hit)
+        if hit:
+            prepared = cached[2]
+        else:
+            try:
+                prepared = self.prepare(workflow_id, requested_outputs)
+            except Exception as e:
+                self._execution_status = ExecutionStatus.ERROR
+                self._error_message = f"工作流执行失败: {str(e)}"
+                glogger.error(f"工作流 '{workflow.name}' (ID: {workflow.id}) 执行失败: {str(e)}")
+                return False
+            self._prepared_plans[workflow_id] = (workflow, requested_outputs, prepared)
+        return self.run_prepared(prepared)
     
     def _execute_workflow(self) -> None:
-        """工作流执行逻辑"""
-        if self._current_workflow_id is None:
-            return
+        """工作流执行逻辑（记录运行指标，按需包裹剖析器）"""
+        metrics = self._metrics
+        run_start = time.perf_counter()
+        metrics.queue_wait.observe(run_start - self._submit_time)
+        metrics.runs_started.inc()
+        metrics.active_runs.inc()
+        try:
+            profiler = self._profiler
+            if profiler is None:
+                self._run_workflow(None)
+                return
+            
+            profiler.start()
+            try:
+                self._run_workflow(profiler)
+            finally:
+                profiler.stop()
+                self._profiler = None
+                self._last_profile = profiler
+                if self._profile_output:
+                    try:
+                        profiler.write_output(self._profile_output)
+                    except Exception as e:
+                        glogger.error(f"写出剖析结果失败: {str(e)}")
+        finally:
+            self._flush_pending_durations()
+            # 释放快照，模块可以丢弃为它保留的状态副本
+            self._run_snapshot = None
+            metrics.active_runs.dec()
+            metrics.run_duration.observe(time.perf_counter() - run_start)
+            if self._execution_status == ExecutionStatus.COMPLETED:
+                metrics.runs_completed.inc()
+            elif self._execution_status == ExecutionStatus.ERROR:
+                metrics.runs_failed.inc()
+    
+    def _run_workflow(self, profiler: Optional[RunProfiler]) -> None:
+        """
+        按执行计划顺序执行当前工作流 (复合模块已在计划中展开为内部模块步骤)
         
-        workflow = self._workflows[self._current_workflow_id]
+        Args:
+            profiler: 剖析器，为None时直接调用模块的 execute
+        """
+        workflow = self._run_snapshot
+        if workflow is None:
+            return
         
         # 更新状态
         self._execution_status = ExecutionStatus.RUNNING
         
-        # 通知开始执行
-        self._notify_progress(ProgressCallbackType.START, {
-            "workflow_id": workflow.id,
-            "workflow_name": workflow.name,
-            "timestamp": time.time()
-        })
+        # 通知开始执行 (没有订阅者时不构造事件)
+        notify = bool(self._progress_callbacks)
+        if notify:
+            self._notify_progress(ProgressCallbackType.START, {
+                "workflow_id": workflow.id,
+                "workflow_name": workflow.name,
+                "timestamp": time.time()
+            })
         
         try:
-            # 获取执行顺序
-            execution_order = workflow._get_execution_order()
+            # 基于快照编译执行计划: 拓扑排序并预先解析每个步骤的输入来源
+            plan = compile_plan(workflow, self._requested_outputs)
+            if self._optimize:
+                plan, report = optimize_plan(plan, self._requested_outputs)
+                self._last_optimization_report = report
+                if report.changed:
+                    glogger.info(report.summary())
+            if self._fuse:
+                plan, _ = fuse_chains(plan)
             
             # 重置执行数据
             self._execution_results = {}
+            self._execution_results_bytes = 0
+            self._metrics.set_result_bytes(0)
             
             # 按顺序执行模块
-            for module_id in execution_order:
+            epoch = workflow.epoch
+            for step in plan.steps:
                 # 检查是否暂停
                 if not self._pause_event.is_set():
                     self._execution_status = ExecutionStatus.PAUSED
@@ -382,84 +583,99 @@ class WorkflowEngine:
                 if self._stop_event.is_set():
                     return
                 
-                module = workflow._modules[module_id]
+                # 执行时按快照纪元解析模块: 运行期间被修改的模块使用修改前保存的副本，
+                # 尚未执行的模块不会看到运行开始之后的修改
+                module = step.module.state_at(epoch)
+                module_id = step.key
+                
+                # 复合模块的汇总步骤: 内部模块均已执行，汇总暴露的输出端口
+                if step.output_aliases is not None:
+                    outputs = step.collect_outputs(self._execution_results)
+                    self._execution_results[module_id] = outputs
+                    module._execution_status = "completed"
+                    if notify:
+                        self._notify_progress(ProgressCallbackType.MODULE_COMPLETE, {
+                            "workflow_id": workflow.id,
+                            "module_id": module_id,
+                            "module_name": module.name,
+                            "parent_module_id": step.parent_key,
+                            "outputs": outputs,
+                            "timestamp": time.time()
+                        })
+                    continue
+                
+                # 融合步骤: 作为一个任务依次执行链上的模块
+                if step.members is not None:
+                    if not self._run_fused_step(workflow, step, profiler):
+                        return
+                    continue
                 
                 # 通知模块开始执行
-                self._notify_progress(ProgressCallbackType.MODULE_START, {
-                    "workflow_id": workflow.id,
-                    "module_id": module_id,
-                    "module_name": module.name,
-                    "timestamp": time.time()
-                })
+                if notify:
+                    self._notify_progress(ProgressCallbackType.MODULE_START, {
+                        "workflow_id": workflow.id,
+                        "module_id": module_id,
+                        "module_name": module.name,
+                        "parent_module_id": step.parent_key,
+                        "timestamp": time.time()
+                    })
                 
-                # 准备输入数据
-                inputs = {}
-                for port_id, port_obj in module.input_ports.items(): # 使用 port_obj 获取名称
-                    # 查找连接的数据源 (现在传递 port_obj.name)
-                    source_data = self._get_source_data(workflow, module_id, port_obj.name)
-                    if source_data is not None:
-                        # glogger.info(f"为模块 '{module.name}' 的输入端口 '{port_obj.name}' (ID: {port_id}) 找到数据: {source_data}")
-                        inputs[port_obj.name] = source_data # 使用端口名称作为键存储输入
-                    # else:
-                        # glogger.info(f"为模块 '{module.name}' 的输入端口 '{port_obj.name}' (ID: {port_id}) 未找到数据源或数据为None。")
+                # 准备输入数据 (按端口名称，从计划中预先解析的数据源获取)
+                inputs = step.gather_inputs(self._execution_results)
                 
                 # 记录输入数据日志
                 # glogger.info(f"模块 '{module.name}' (ID: {module_id}) 的输入数据 (按名称): {inputs}")
                 
                 # 执行模块
                 module._execution_status = "running"
+                module_type = module.__class__.__name__
+                module_start = time.perf_counter()
                 try:
-                    outputs = module.execute(inputs)
+                    if step.constant_outputs is not None:
+                        # 优化器预先计算的常量输出
+                        outputs = dict(step.constant_outputs)
+                    elif profiler is None:
+                        outputs = module.execute(inputs)
+                    else:
+                        outputs = profiler.run_module(module_id, module, inputs)
+                    self._metrics.module_duration.observe(time.perf_counter() - module_start, module_type=module_type)
                     module._execution_status = "completed"
                     
                     # 存储输出数据 (模块的 execute 应返回以端口名为键的字典)
                     self._execution_results[module_id] = outputs
+                    self._execution_results_bytes += estimate_nbytes(outputs)
+                    self._metrics.set_result_bytes(self._execution_results_bytes)
                     
                     # 记录输出数据日志
                     # glogger.info(f"模块 '{module.name}' (ID: {module_id}) 的输出数据: {outputs}")
                     
                     # 通知模块执行完成
-                    self._notify_progress(ProgressCallbackType.MODULE_COMPLETE, {
-                        "workflow_id": workflow.id,
-                        "module_id": module_id,
-                        "module_name": module.name,
-                        "outputs": outputs,
-                        "timestamp": time.time()
-                    })
+                    if notify:
+                        self._notify_progress(ProgressCallbackType.MODULE_COMPLETE, {
+                            "workflow_id": workflow.id,
+                            "module_id": module_id,
+                            "module_name": module.name,
+                            "parent_module_id": step.parent_key,
+                            "outputs": outputs,
+                            "timestamp": time.time()
+                        })
                 except Exception as e:
-                    module._execution_status = "error"
-                    module._error_message = str(e)
-                    
-                    # 通知模块执行错误
-                    self._notify_progress(ProgressCallbackType.MODULE_ERROR, {
-                        "workflow_id": workflow.id,
-                        "module_id": module_id,
-                        "module_name": module.name,
-                        "error": str(e),
-                        "timestamp": time.time()
-                    })
-                    
-                    glogger.error(f"模块 '{module.name}' (ID: {module_id}) 执行失败: {str(e)}")
-                    self._execution_status = ExecutionStatus.ERROR
-                    self._error_message = f"模块 '{module.name}' 执行失败: {str(e)}"
-                    
-                    # 通知工作流执行错误
-                    self._notify_progress(ProgressCallbackType.ERROR, {
-                        "workflow_id": workflow.id,
-                        "error": self._error_message,
-                        "timestamp": time.time()
-                    })
-                    
+                    self._report_module_error(workflow, step, e)
                     return
             
+            # 持久化执行结果 (失败时只记录日志，不影响本次运行的状态)
+            run_id = self._persist_results(workflow.id)
+            
             # 更新状态
             self._execution_status = ExecutionStatus.COMPLETED
             
             # 通知执行完成
-            self._notify_progress(ProgressCallbackType.COMPLETE, {
-                "workflow_id": workflow.id,
-                "timestamp": time.time()
-            })
+            if self._progress_callbacks:
+                self._notify_progress(ProgressCallbackType.COMPLETE, {
+                    "workflow_id": workflow.id,
+                    "run_id": run_id,
+                    "timestamp": time.time()
+                })
             
         except Exception as e:
             # 更新状态
@@ -475,6 +691,119 @@ class WorkflowEngine:
             
             glogger.error(f"工作流 '{workflow.name}' (ID: {workflow.id}) 执行失败: {str(e)}")
     
+    def _persist_results(self, workflow_id: str) -> Optional[str]:
+        """把本次执行结果写入结果存储，返回运行ID (未配置存储或写入失败时返回None，失败只记录日志)"""
+        if self._result_store is None:
+            return None
+        try:
+            run_id = self._result_store.save_run(self._execution_results, workflow_id=workflow_id)
+        except Exception as e:
+            glogger.error(f"持久化执行结果失败: {str(e)}")
+            return None
+        self._last_run_id = run_id
+        return run_id
+    
+    def _run_fused_step(self, workflow: WorkflowSnapshot, step, profiler: Optional[RunProfiler]) -> bool:
+        """
+        依次执行融合步骤的成员模块，整条链只发送一个 MODULE_BATCH_COMPLETE 事件
+        (事件数据 "modules" 为各成员的 module_id / module_name / parent_module_id / outputs)
+        
+        Returns:
+            是否全部执行成功；失败时已完成错误处理和通知
+        """
+        results = self._execution_results
+        durations = self._pending_durations
+        completed: List[Dict[str, Any]] = []
+        added_bytes = 0
+        epoch = workflow.epoch
+        for member in step.members:
+            module = member.module.state_at(epoch)
+            inputs = member.gather_inputs(results)
+            module._execution_status = "running"
+            module_start = time.perf_counter()
+            try:
+                if profiler is None:
+                    outputs = module.execute(inputs)
+                else:
+                    outputs = profiler.run_module(member.key, module, inputs)
+            except Exception as e:
+                self._record_batch_metrics(added_bytes)
+                self._notify_batch_complete(workflow, completed)
+                self._report_module_error(workflow, member, e)
+                return False
+            module_type = module.__class__.__name__
+            elapsed = time.perf_counter() - module_start
+            type_durations = durations.get(module_type)
+            if type_durations is None:
+                durations[module_type] = [elapsed]
+            else:
+                type_durations.append(elapsed)
+            module._execution_status = "completed"
+            results[member.key] = outputs
+            added_bytes += estimate_nbytes(outputs)
+            completed.append({
+                "module_id": member.key,
+                "module_name": module.name,
+                "parent_module_id": member.parent_key,
+                "outputs": outputs
+            })
+        self._record_batch_metrics(added_bytes)
+        self._notify_batch_complete(workflow, completed)
+        return True
+    
+    def _record_batch_metrics(self, added_bytes: int) -> None:
+        """记录融合步骤的结果占用；缓存的模块耗时积累到一定数量后再批量写入直方图"""
+        self._execution_results_bytes += added_bytes
+        self._metrics.set_result_bytes(self._execution_results_bytes)
+        self._pending_duration_count += 1
+        if self._pending_duration_count >= 256:
+            self._flush_pending_durations()
+    
+    def _flush_pending_durations(self) -> None:
+        """把融合步骤中缓存的模块耗时批量写入直方图"""
+        for module_type, values in self._pending_durations.items():
+            self._metrics.module_duration.observe_many(values, module_type=module_type)
+        self._pending_durations = {}
+        self._pending_duration_count = 0
+    
+    def _notify_batch_complete(self, workflow: Workflow, completed: List[Dict[str, Any]]) -> None:
+        """发送一批模块执行完成的事件"""
+        if completed and self._progress_callbacks:
+            self._notify_progress(ProgressCallbackType.MODULE_BATCH_COMPLETE, {
+                "workflow_id": workflow.id,
+                "modules": completed,
+                "timestamp": time.time()
+            })
+    
+    def _report_module_error(self, workflow: WorkflowSnapshot, step, error: Exception) -> None:
+        """记录模块执行失败: 更新模块和引擎状态，并发送模块错误和工作流错误事件"""
+        module = step.module.state_at(workflow.epoch)
+        module_id = step.key
+        self._metrics.module_failures.inc(module_type=module.__class__.__name__)
+        module._execution_status = "error"
+        module._error_message = str(error)
+        
+        # 通知模块执行错误
+        self._notify_progress(ProgressCallbackType.MODULE_ERROR, {
+            "workflow_id": workflow.id,
+            "module_id": module_id,
+            "module_name": module.name,
+            "parent_module_id": step.parent_key,
+            "error": str(error),
+            "timestamp": time.time()
+        })
+        
+        glogger.error(f"模块 '{module.name}' (ID: {module_id}) 执行失败: {str(error)}")
+        self._execution_status = ExecutionStatus.ERROR
+        self._error_message = f"模块 '{module.name}' 执行失败: {str(error)}"
+        
+        # 通知工作流执行错误
+        self._notify_progress(ProgressCallbackType.ERROR, {
+            "workflow_id": workflow.id,
+            "error": self._error_message,
+            "timestamp": time.time()
+        })
+    
     def pause(self) -> bool:
         """
         暂停工作流执行
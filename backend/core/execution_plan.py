@@ -0,0 +1,403 @@
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Set
+
+from .base_module import BaseModule
+from .metrics import record_cache_lookup
+
+# 输入绑定: (输入端口名称, [(源步骤键, 源端口名称), ...])，候选源按连接顺序排列，取第一个已有结果的源
+InputBinding = Tuple[str, List[Tuple[str, str]]]
+
+# 子工作流单独执行时，暴露的输入端口数据存放在该键下
+SUB_WORKFLOW_INPUTS_KEY = "__inputs__"
+
+
+class PlanStep:
+    """
+    执行计划中的一个步骤
+
+    普通步骤执行 module，并把输出以 key 存入执行结果；
+    汇总步骤 (output_aliases 不为None) 不执行模块，只把复合模块内部步骤的输出
+    按暴露的输出端口名称汇总到复合模块自身的键下，供下游模块和结果展示使用；
+    常量步骤 (constant_outputs 不为None，由优化器折叠得到) 直接使用预先计算的输出；
+    融合步骤 (members 不为None，由 fuse_chains 得到) 作为一个任务依次执行链上的各个成员步骤。
+    """
+    __slots__ = ('key', 'module', 'input_bindings', 'parent_key', 'output_aliases', 'constant_outputs', 'members')
+
+    def __init__(self, key: str, module: BaseModule, input_bindings: List[InputBinding],
+                 parent_key: Optional[str] = None,
+                 output_aliases: Optional[Dict[str, Tuple[str, str]]] = None,
+                 constant_outputs: Optional[Dict[str, Any]] = None,
+                 members: Optional[List['PlanStep']] = None):
+        self.key = key  # 执行结果键: 外层模块ID，或 "复合模块ID/内部步骤键"
+        self.module = module
+        self.input_bindings = input_bindings
+        self.parent_key = parent_key  # 所属复合模块的键 (顶层步骤为None)
+        self.output_aliases = output_aliases  # 暴露的输出端口名称 -> (内部步骤键, 端口名称)
+        self.constant_outputs = constant_outputs  # 预先计算的输出
+        self.members = members  # 融合的成员步骤 (按执行顺序)，融合步骤的 key/module 为最后一个成员
+
+    @property
+    def is_collect(self) -> bool:
+        """是否为复合模块的输出汇总步骤"""
+        return self.output_aliases is not None
+
+    def gather_inputs(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        从已有的执行结果中收集本步骤的输入 (以端口名称为键)
+        与逐条查找连接的旧逻辑一致: 每个端口取第一个已有输出的源，值为None时不传入
+        """
+        inputs = {}
+        for port_name, candidates in self.input_bindings:
+            for source_key, source_port_name in candidates:
+                outputs = results.get(source_key)
+                if isinstance(outputs, dict) and source_port_name in outputs:
+                    data = outputs[source_port_name]
+                    if data is not None:
+                        inputs[port_name] = data
+                    break
+        return inputs
+
+    def collect_outputs(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """汇总复合模块暴露的输出端口"""
+        outputs = {}
+        for port_name, (inner_key, inner_port_name) in self.output_aliases.items():
+            inner_outputs = results.get(inner_key)
+            if isinstance(inner_outputs, dict) and inner_port_name in inner_outputs:
+                outputs[port_name] = inner_outputs[inner_port_name]
+        return outputs
+
+
+class ExecutionPlan:
+    """
+    编译后的工作流执行计划: 按拓扑顺序排列的步骤列表，每个步骤的输入来源已预先解析
+
+    复合模块 (SubWorkflowModule) 在编译时被展开，其内部模块作为独立步骤参与调度；
+    内部工作流的计划只编译一次，所有引用它的复合模块共享 (在快照上编译时缓存在快照上，
+    否则按版本号缓存在内部工作流上)。
+    """
+    def __init__(self, workflow_id: str, version: int, steps: List[PlanStep],
+                 input_redirects: Optional[Dict[Tuple[str, str], Tuple[str, str]]] = None):
+        self._workflow_id = workflow_id
+        self._version = version
+        self._steps = steps
+        # 嵌套复合模块的输入端口 -> 展开后实际接收数据的 (步骤键, 端口名称)
+        self._input_redirects = input_redirects or {}
+
+    @property
+    def workflow_id(self) -> str:
+        return self._workflow_id
+
+    @property
+    def version(self) -> int:
+        """编译时工作流的结构版本号"""
+        return self._version
+
+    @property
+    def steps(self) -> List[PlanStep]:
+        return self._steps
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+    def resolve_input(self, target: Tuple[str, str]) -> Tuple[str, str]:
+        """把 (模块ID, 输入端口名称) 解析为展开后实际接收数据的 (步骤键, 端口名称)"""
+        return self._input_redirects.get(target, target)
+
+    def flatten_into(self, prefix: str, input_sources: Dict[Tuple[str, str], List[Tuple[str, str]]],
+                     parent_key: str) -> List[PlanStep]:
+        """
+        以给定前缀展开本计划的步骤，用于嵌入外层计划
+
+        Args:
+            prefix: 步骤键前缀 (通常为复合模块ID)
+            input_sources: (内部步骤键, 内部输入端口名称) -> 外层候选源，对应复合模块暴露的输入端口
+            parent_key: 展开后步骤所属的复合模块键
+
+        Returns:
+            新的步骤列表 (模块对象与本计划共享)
+        """
+        external_by_step: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        for (inner_key, port_name), external in input_sources.items():
+            if external:
+                external_by_step.setdefault(inner_key, {})[port_name] = external
+
+        flattened: List[PlanStep] = []
+        for step in self._steps:
+            if step.output_aliases is not None:
+                output_aliases = {port_name: (f"{prefix}/{inner_key}", inner_port_name)
+                                  for port_name, (inner_key, inner_port_name) in step.output_aliases.items()}
+            else:
+                output_aliases = None
+            external_ports = dict(external_by_step.get(step.key, ()))
+            bindings: List[InputBinding] = []
+            for port_name, candidates in step.input_bindings:
+                rewritten = [(f"{prefix}/{source_key}", source_port_name) for source_key, source_port_name in candidates]
+                external = external_ports.pop(port_name, None)
+                if external:
+                    # 外部数据优先于内部连接，与单独执行子工作流时的行为保持一致
+                    rewritten = external + rewritten
+                bindings.append((port_name, rewritten))
+            for port_name, external in external_ports.items():
+                bindings.append((port_name, list(external)))
+            flattened.append(PlanStep(
+                f"{prefix}/{step.key}", step.module, bindings,
+                parent_key=f"{prefix}/{step.parent_key}" if step.parent_key else parent_key,
+                output_aliases=output_aliases,
+                constant_outputs=step.constant_outputs
+            ))
+        return flattened
+
+
+def upstream_closure(workflow, targets: Iterable[str]) -> Set[str]:
+    """目标模块及其所有上游模块的ID (只访问连接，不访问模块对象；不存在的目标被忽略)"""
+    needed: Set[str] = set()
+    stack = [module_id for module_id in targets if module_id in workflow.modules]
+    while stack:
+        module_id = stack.pop()
+        if module_id in needed:
+            continue
+        needed.add(module_id)
+        stack.extend(conn.source_module_id for conn in workflow.get_incoming_connections(module_id))
+    return needed
+
+
+def compile_plan(workflow, targets: Optional[Iterable[str]] = None) -> ExecutionPlan:
+    """
+    把工作流编译为执行计划
+
+    Args:
+        workflow: 工作流实例或工作流快照 (WorkflowSnapshot)；传入快照时，
+                  所有步骤 (包括展开的复合模块内部步骤) 都使用快照创建时的模块状态。
+                  编译之后才被修改的模块仍是模块本身，执行时应再用 state_at(快照纪元) 解析
+        targets: 只编译这些模块及其上游模块；为None时编译整个工作流。
+                 延迟加载的工作流中，不需要的模块不会被创建
+
+    Returns:
+        执行计划；工作流存在循环依赖时抛出 ValueError
+    """
+    steps: List[PlanStep] = []
+    input_redirects: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    modules = workflow.modules
+    order = workflow._get_execution_order()
+    if targets is not None:
+        needed = upstream_closure(workflow, targets)
+        order = [module_id for module_id in order if module_id in needed]
+    for module_id in order:
+        module = modules[module_id]
+        # 按目标端口名称分组该模块的入边 (保持连接顺序)
+        incoming: Dict[str, List[Tuple[str, str]]] = {}
+        for conn in workflow.get_incoming_connections(module_id):
+            source_module = modules.get(conn.source_module_id)
+            # 源模块当前变体下不存在该输出端口时跳过，与逐条查找连接时的处理一致
+            if source_module is None or source_module.get_output_port(conn.source_port_name) is None:
+                continue
+            incoming.setdefault(conn.target_port_name, []).append((conn.source_module_id, conn.source_port_name))
+        bindings: List[InputBinding] = []
+        if incoming:
+            for port in module.input_ports.values():
+                candidates = incoming.get(port.name)
+                if candidates:
+                    bindings.append((port.name, candidates))
+
+        if getattr(module, 'is_composite', False):
+            inner_plan = _get_inner_plan(workflow, module)
+            if inner_plan is not None:
+                input_sources: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+                for port_name, candidates in bindings:
+                    target = module.exposed_inputs.get(port_name)
+                    if target is not None:
+                        input_sources.setdefault(inner_plan.resolve_input(target), []).extend(candidates)
+                for port_name, target in module.exposed_inputs.items():
+                    inner_key, inner_port_name = inner_plan.resolve_input(target)
+                    input_redirects[(module_id, port_name)] = (f"{module_id}/{inner_key}", inner_port_name)
+                steps.extend(inner_plan.flatten_into(module_id, input_sources, module_id))
+                steps.append(PlanStep(module_id, module, [], output_aliases={
+                    port_name: (f"{module_id}/{inner_key}", inner_port_name)
+                    for port_name, (inner_key, inner_port_name) in module.exposed_outputs.items()
+                }))
+                continue
+
+        steps.append(PlanStep(module_id, module, bindings))
+
+    resolve_module = getattr(workflow, 'resolve_module', None)
+    if resolve_module is not None:
+        for step in steps:
+            step.module = resolve_module(step.module)
+    return ExecutionPlan(workflow.id, workflow.version, steps, input_redirects)
+
+
+def _get_inner_plan(workflow, module) -> Optional[ExecutionPlan]:
+    """
+    复合模块内部工作流的执行计划
+
+    在快照上编译时，内部工作流解析为同一纪元的快照 (与外层快照一起冻结)，计划缓存在快照上，
+    同一次编译中引用同一内部工作流的复合模块共享；不在执行线程上写入正在编辑的工作流。
+    在工作流本身上编译时使用内部工作流上按版本号缓存的计划。
+    """
+    resolve_workflow = getattr(workflow, 'resolve_workflow', None)
+    inner = module.workflow
+    if resolve_workflow is None or inner is None:
+        return module.get_inner_plan()
+    plans = workflow._inner_plans
+    key = id(inner)
+    if key in plans:
+        plan = plans[key]
+        if plan is None:
+            raise ValueError(f"子工作流 '{inner.name}' 存在循环引用，无法展开")
+        record_cache_lookup("plan", True)
+        return plan
+    record_cache_lookup("plan", False)
+    plans[key] = None  # 正在编译，再次遇到说明存在循环引用
+    try:
+        plan = compile_plan(resolve_workflow(inner))
+    except Exception:
+        del plans[key]
+        raise
+    plans[key] = plan
+    return plan
+
+
+def get_cached_plan(workflow) -> ExecutionPlan:
+    """获取工作流的执行计划，结构版本号未变化时复用上次编译的结果"""
+    plan = getattr(workflow, '_compiled_plan', None)
+    hit = plan is not None and plan.version == workflow.version
+    record_cache_lookup("plan", hit)
+    if not hit:
+        if getattr(workflow, '_compiling_plan', False):
+            raise ValueError(f"子工作流 '{workflow.name}' 存在循环引用，无法展开")
+        workflow._compiling_plan = True
+        try:
+            plan = compile_plan(workflow)
+        finally:
+            workflow._compiling_plan = False
+        workflow._compiled_plan = plan
+    return plan
+
+
+def run_plan(plan_steps: List[PlanStep], results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    按顺序直接执行步骤列表 (不发送进度事件，用于复合模块脱离引擎单独执行)
+
+    Args:
+        plan_steps: 步骤列表
+        results: 执行结果字典，会被原地更新
+
+    Returns:
+        results
+    """
+    for step in plan_steps:
+        if step.output_aliases is not None:
+            results[step.key] = step.collect_outputs(results)
+        elif step.constant_outputs is not None:
+            results[step.key] = dict(step.constant_outputs)
+        elif step.members is not None:
+            run_plan(step.members, results)
+        else:
+            results[step.key] = step.module.execute(step.gather_inputs(results))
+    return results
+
+
+def _expand_members(plan_steps: List[PlanStep]) -> List[PlanStep]:
+    """把融合步骤展开为成员步骤 (预备执行不区分融合与否)"""
+    expanded: List[PlanStep] = []
+    for step in plan_steps:
+        if step.members is not None:
+            expanded.extend(_expand_members(step.members))
+        else:
+            expanded.append(step)
+    return expanded
+
+
+# 预备计划中的操作类型
+OP_EXECUTE = 0  # 执行模块
+OP_CONSTANT = 1  # 使用预先计算的常量输出
+OP_COLLECT = 2  # 汇总复合模块暴露的输出
+
+
+class PreparedPlan:
+    """
+    为重复执行准备的计划 (由 WorkflowEngine.prepare 创建)
+
+    在执行计划的基础上把每个步骤的结果位置预先分配为列表下标 (槽位)，输入绑定改写为
+    (输入端口名称, ((源槽位, 源端口名称), ...))，执行时不再按键查找字典；槽位列表在多次执行之间复用。
+    计划持有编译时的工作流快照，执行时按快照纪元解析每个模块 (BaseModule.state_at)，
+    所以准备之后修改的模块不影响执行，过期的计划仍然执行快照创建时的状态。
+    """
+    __slots__ = ('_snapshot', '_workflow_id', '_version', '_epoch', '_keys', '_steps', '_ops', '_modules',
+                 '_inner_workflows', 'slots')
+
+    def __init__(self, plan: ExecutionPlan, snapshot):
+        steps = _expand_members(plan.steps)
+        index = {step.key: position for position, step in enumerate(steps)}
+        ops = []
+        for position, step in enumerate(steps):
+            if step.output_aliases is not None:
+                payload = tuple((port_name, index[inner_key], inner_port_name)
+                                for port_name, (inner_key, inner_port_name) in step.output_aliases.items()
+                                if inner_key in index)
+                ops.append((position, OP_COLLECT, step.module, payload))
+            elif step.constant_outputs is not None:
+                ops.append((position, OP_CONSTANT, step.module, step.constant_outputs))
+            else:
+                # 计划外的源 (执行结果中不会出现) 直接去掉，与 gather_inputs 找不到结果时的处理一致
+                payload = tuple((port_name, tuple((index[source_key], source_port_name)
+                                                  for source_key, source_port_name in candidates
+                                                  if source_key in index))
+                                for port_name, candidates in step.input_bindings)
+                ops.append((position, OP_EXECUTE, step.module, payload))
+        self._snapshot = snapshot
+        self._workflow_id = plan.workflow_id
+        self._version = plan.version
+        self._epoch = getattr(snapshot, 'epoch', None)
+        self._keys = tuple(step.key for step in steps)
+        self._steps = steps
+        self._ops = tuple(ops)
+        self._modules = tuple({id(step.module): step.module for step in steps}.values())
+        inner_workflows = (getattr(step.module, 'workflow', None) for step in steps if step.output_aliases is not None)
+        self._inner_workflows = tuple({id(inner): inner for inner in inner_workflows if inner is not None}.values())
+        self.slots: List[Any] = [None] * len(steps)  # 每个步骤的输出 (按步骤下标)
+
+    @property
+    def workflow_id(self) -> str:
+        return self._workflow_id
+
+    @property
+    def snapshot(self):
+        """编译计划时的工作流快照"""
+        return self._snapshot
+
+    @property
+    def keys(self) -> Tuple[str, ...]:
+        """各槽位对应的执行结果键"""
+        return self._keys
+
+    @property
+    def steps(self) -> List[PlanStep]:
+        return self._steps
+
+    @property
+    def ops(self) -> Tuple[Tuple[int, int, BaseModule, Any], ...]:
+        """(槽位, 操作类型, 模块, 输入绑定 / 常量输出 / 输出汇总) 的序列，按执行顺序排列"""
+        return self._ops
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    def is_current(self, workflow) -> bool:
+        """
+        计划是否仍然反映工作流的当前状态: 工作流结构版本号未变化，且计划中的模块
+        (包括复合模块的内部模块) 和复合模块的内部工作流结构在创建快照之后没有被修改
+        """
+        if getattr(workflow, 'version', None) != self._version or self._epoch is None:
+            return False
+        epoch = self._epoch
+        for module in self._modules:
+            if module._cow_epoch >= epoch:
+                return False
+        for inner in self._inner_workflows:
+            if inner._cow_epoch >= epoch:
+                return False
+        return True
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        """最近一次执行的结果 (步骤键 -> 输出)"""
+        return dict(zip(self._keys, self.slots))
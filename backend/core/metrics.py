@@ -0,0 +1,380 @@
+from typing import Dict, List, Any, Optional, Tuple, Sequence
+import itertools
+import math
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 默认直方图分桶（秒），覆盖从亚毫秒级的小模块到分钟级的重计算模块
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _format_value(value: float) -> str:
+    """按 Prometheus 文本格式输出数值"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """生成 {a="x",b="y"} 形式的标签字符串"""
+    pairs = list(zip(label_names, label_values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    """指标基类，按标签值组合保存各自的样本"""
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self._name = name
+        self._documentation = documentation
+        self._label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def _label_key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self._label_names):
+            raise ValueError(f"指标 {self._name} 需要标签 {self._label_names}，但收到了 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self._label_names)
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """按 Prometheus 文本格式输出此指标"""
+        lines = [f"# HELP {self._name} {self._documentation}", f"# TYPE {self._name} {self.metric_type}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    """只增计数器"""
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self._label_names:
+            self._values[()] = 0.0  # 无标签指标从 0 开始导出
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """增加计数"""
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        """获取当前计数"""
+        return self._values.get(self._label_key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self._name}{_format_labels(self._label_names, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self._label_names:
+            self._values[()] = 0.0  # 无标签指标从 0 开始导出
+
+    def set(self, value: float, **labels: str) -> None:
+        """设置当前值"""
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """增加当前值"""
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        """减少当前值"""
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> float:
+        """获取当前值"""
+        return self._values.get(self._label_key(labels), 0.0)
+
+    def remove(self, **labels: str) -> None:
+        """删除一组标签值对应的样本 (例如对应的对象已被释放)"""
+        key = self._label_key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self._name}{_format_labels(self._label_names, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """累计分桶直方图"""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self._buckets = tuple(sorted(buckets))
+        # 标签值 -> [各桶计数..., 总和, 总次数]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        if not self._label_names:
+            self._values[()] = [0.0] * (len(self._buckets) + 2)
+
+    def observe(self, value: float, **labels: str) -> None:
+        """记录一次观测值"""
+        key = self._label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self._buckets) + 2)
+                self._values[key] = state
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def observe_many(self, values: Sequence[float], **labels: str) -> None:
+        """批量记录同一组标签下的多个观测值 (只计算一次标签、加一次锁)"""
+        if not values:
+            return
+        key = self._label_key(labels)
+        buckets = self._buckets
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(buckets) + 2)
+                self._values[key] = state
+            for value in values:
+                for i, bound in enumerate(buckets):
+                    if value <= bound:
+                        state[i] += 1
+                        break
+                state[-2] += value
+            state[-1] += len(values)
+
+    def get_count(self, **labels: str) -> float:
+        """获取观测次数"""
+        state = self._values.get(self._label_key(labels))
+        return state[-1] if state else 0.0
+
+    def get_sum(self, **labels: str) -> float:
+        """获取观测值总和"""
+        state = self._values.get(self._label_key(labels))
+        return state[-2] if state else 0.0
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for key, state in self._values.items():
+            cumulative = 0.0
+            for i, bound in enumerate(self._buckets):
+                cumulative += state[i]
+                lines.append(f"{self._name}_bucket{_format_labels(self._label_names, key, ('le', _format_value(bound)))} {_format_value(cumulative)}")
+            lines.append(f"{self._name}_bucket{_format_labels(self._label_names, key, ('le', '+Inf'))} {_format_value(state[-1])}")
+            lines.append(f"{self._name}_sum{_format_labels(self._label_names, key)} {_format_value(state[-2])}")
+            lines.append(f"{self._name}_count{_format_labels(self._label_names, key)} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表，负责创建指标并以 Prometheus 文本格式导出
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name: str, documentation: str, label_names: Sequence[str], **kwargs: Any):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, label_names, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise TypeError(f"指标 {name} 已以 {metric.metric_type} 类型注册")
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """获取或创建计数器"""
+        return self._get_or_create(Counter, name, documentation, label_names)
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        """获取或创建瞬时值指标"""
+        return self._get_or_create(Gauge, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """获取或创建直方图"""
+        return self._get_or_create(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """获取指定名称的指标"""
+        return self._metrics.get(name)
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式 (version 0.0.4) 导出所有指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def dump_to_file(self, filepath: str) -> None:
+        """
+        将指标写入文件（先写临时文件再替换，可供 node_exporter textfile collector 读取）
+
+        Args:
+            filepath: 输出文件路径
+        """
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, filepath)
+
+    def start_http_server(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        在后台线程启动本地 HTTP 服务，GET /metrics 返回 Prometheus 文本格式
+
+        Args:
+            port: 监听端口，0 表示由系统分配
+            host: 监听地址，默认只监听本机
+
+        Returns:
+            HTTP 服务实例，可调用 shutdown() 停止
+        """
+        registry = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?', 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # 保持静默，避免抓取请求刷屏
+
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, name="MetricsHTTPServer")
+        thread.daemon = True
+        thread.start()
+        return server
+
+
+_SCALAR_TYPES = (bool, int, float, complex, str, bytes)
+_CONTAINER_TYPES = (list, tuple, set, frozenset)
+
+
+def estimate_nbytes(value: Any) -> int:
+    """
+    估算对象占用的内存字节数（用于结果占用统计）
+    DataFrame/Series/ndarray 使用其自身的内存统计，容器递归估算，其他对象使用 sys.getsizeof
+    """
+    value_type = type(value)
+    if value is None or value_type in _SCALAR_TYPES:
+        return sys.getsizeof(value)
+    # 常见容器先于属性探测处理，避免每次触发 AttributeError
+    if value_type is dict:
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    if value_type in _CONTAINER_TYPES:
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    memory_usage = getattr(value, 'memory_usage', None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(index=True, deep=False)
+            return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+        except Exception:
+            pass
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    try:
+        return sys.getsizeof(value)
+    except TypeError:
+        return 0
+
+
+# 缓存查询计数器: 引擎的预备计划缓存、子工作流的执行计划缓存和工作流仓库的 LRU 缓存共用，按 cache 标签区分
+_CACHE_REQUESTS = ("workflow_cache_requests_total", "缓存查询次数，result 为 hit 或 miss", ["cache", "result"])
+# 引擎编号，用作 workflow_execution_results_bytes 的 engine 标签
+_gengine_ids = itertools.count(1)
+
+
+def record_cache_lookup(cache: str, hit: bool, registry: Optional[MetricsRegistry] = None) -> None:
+    """记录一次缓存查询 (供引擎以外的缓存使用)，registry 为None时使用全局注册表"""
+    counter = (registry if registry is not None else gmetrics_registry).counter(*_CACHE_REQUESTS)
+    counter.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class EngineMetrics:
+    """
+    工作流引擎使用的指标集合
+
+    结果占用的字节数按引擎编号 (engine 标签) 分别导出，多个引擎不会互相覆盖；
+    引擎被释放后对应的样本随之删除。
+    """
+    def __init__(self, registry: MetricsRegistry):
+        self.runs_started = registry.counter("workflow_runs_started_total", "已开始的工作流运行次数")
+        self.runs_completed = registry.counter("workflow_runs_completed_total", "成功完成的工作流运行次数")
+        self.runs_failed = registry.counter("workflow_runs_failed_total", "失败的工作流运行次数")
+        self.active_runs = registry.gauge("workflow_active_runs", "正在执行的工作流运行数")
+        self.run_duration = registry.histogram("workflow_run_duration_seconds", "工作流运行总耗时（秒）")
+        self.queue_wait = registry.histogram("workflow_queue_wait_seconds", "从提交执行到开始运行的等待时间（秒）")
+        self.module_duration = registry.histogram("workflow_module_duration_seconds", "模块 execute() 耗时（秒）", ["module_type"])
+        self.module_failures = registry.counter("workflow_module_failures_total", "模块执行失败次数", ["module_type"])
+        self.result_bytes = registry.gauge("workflow_execution_results_bytes", "引擎执行结果 (_execution_results) 估算占用的字节数", ["engine"])
+        self.cache_requests = registry.counter(*_CACHE_REQUESTS)
+        self.engine_label = str(next(_gengine_ids))
+
+    def set_result_bytes(self, value: int) -> None:
+        """设置本引擎执行结果估算占用的字节数"""
+        self.result_bytes.set(value, engine=self.engine_label)
+
+    def release(self) -> None:
+        """删除本引擎的结果占用样本 (引擎被释放时调用)"""
+        self.result_bytes.remove(engine=self.engine_label)
+
+    def record_cache_lookup(self, cache: str, hit: bool) -> None:
+        """记录一次缓存查询，命中率 = hit / (hit + miss)"""
+        self.cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# 创建全局指标注册表实例
+gmetrics_registry = MetricsRegistry()
@@ -0,0 +1,250 @@
+from typing import Dict, List, Any, Optional, Type
+import dataclasses
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+
+from .base_module import BaseModule, PortDefinition, VariantDefinition
+from .module_registry import ModuleRegistry
+
+MANIFEST_FORMAT_VERSION = 1
+# 默认的清单文件位置 (由构建步骤生成: python -m backend.core.module_manifest)
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "module_manifest.json")
+# 包根目录 (backend 包所在的目录)，其中的源文件在清单中保存为相对路径，检出到其他位置后清单仍然有效
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _relative_path(path: str) -> str:
+    """包根目录下的文件转换为相对路径 (使用 '/' 分隔)，其他文件 (如标准库) 保留绝对路径"""
+    relative = os.path.relpath(path, PACKAGE_ROOT)
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep) or os.path.isabs(relative):
+        return path
+    return relative.replace(os.sep, "/")
+
+
+def _resolve_path(path: str) -> str:
+    """清单中的路径转换为当前的绝对路径 (相对路径相对于包根目录)"""
+    return path if os.path.isabs(path) else os.path.join(PACKAGE_ROOT, *path.split("/"))
+
+
+def _file_fingerprint(path: str, with_hash: bool = True) -> Dict[str, Any]:
+    stat = os.stat(path)
+    fingerprint = {"path": _relative_path(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        with open(path, 'rb') as f:
+            fingerprint["sha256"] = hashlib.sha256(f.read()).hexdigest()
+    return fingerprint
+
+
+def _source_files(module_class: Type[BaseModule]) -> List[str]:
+    """模块类及其所有基类所在的源文件 (变体定义可能继承自基类)"""
+    files = []
+    for klass in module_class.__mro__:
+        module = sys.modules.get(klass.__module__)
+        path = getattr(module, "__file__", None)
+        if path and path not in files:
+            files.append(os.path.abspath(path))
+    return files
+
+
+def _init_default(module_class: Type[BaseModule], parameter: str, fallback: str) -> str:
+    """读取构造函数参数的默认值 (模块的显示名称和描述)"""
+    try:
+        default = inspect.signature(module_class.__init__).parameters[parameter].default
+    except (KeyError, TypeError, ValueError):
+        return fallback
+    return default if isinstance(default, str) else fallback
+
+
+def _describe_module(registry: ModuleRegistry, module_name: str, category: str) -> Optional[Dict[str, Any]]:
+    """生成一个模块的清单条目 (需要导入模块类)"""
+    module_class = registry.get(module_name)
+    if module_class is None:
+        return None
+    variants = module_class.get_variant_definitions()
+    return {
+        "import_path": f"{module_class.__module__}:{module_class.__qualname__}",
+        "category": category,
+        "display_name": _init_default(module_class, "name", module_name),
+        "description": _init_default(module_class, "description", ""),
+        "fingerprints": [_file_fingerprint(path) for path in _source_files(module_class)],
+        "variants": [dataclasses.asdict(variant) for variant in variants.values()],
+    }
+
+
+def _variants_from_entry(entry: Dict[str, Any]) -> Dict[str, VariantDefinition]:
+    return {
+        variant["variant_id"]: VariantDefinition(
+            variant_id=variant["variant_id"],
+            variant_name=variant["variant_name"],
+            description=variant["description"],
+            port_definitions=tuple(PortDefinition(**port) for port in variant["port_definitions"])
+        )
+        for variant in entry["variants"]
+    }
+
+
+class ModuleManifest:
+    """
+    预先生成的模块定义清单
+
+    记录每个已注册模块的导入路径、类别、显示名称、变体及端口定义，以及模块类 (含基类) 源文件的指纹
+    (包根目录下的源文件保存相对路径，检查时相对于当前的包根目录解析)。
+    注册表使用清单后 (ModuleRegistry.use_manifest)，查询变体定义不再导入模块代码；模块定义列表和每个模块的变体列表的 JSON 响应在加载时预先生成。
+    源文件的大小或修改时间变化时再比较内容哈希，内容改变的条目视为过期。
+    """
+    def __init__(self, modules: Dict[str, Dict[str, Any]], created_at: Optional[float] = None):
+        self._modules = modules
+        self._created_at = created_at if created_at is not None else time.time()
+        self._variant_cache: Dict[str, Dict[str, VariantDefinition]] = {}
+        self._variants_json: Dict[str, bytes] = {}
+        self._definitions: List[Dict[str, Any]] = []
+        self._definitions_json = b""
+        self._prepare()
+
+    def _prepare(self) -> None:
+        """预先生成 API 响应"""
+        self._variant_cache.clear()
+        self._definitions = [{
+            "id": module_name,
+            "name": entry["display_name"],
+            "description": entry["description"],
+            "category": entry["category"],
+        } for module_name, entry in self._modules.items()]
+        self._definitions_json = json.dumps(self._definitions, ensure_ascii=False).encode('utf-8')
+        self._variants_json = {module_name: json.dumps(entry["variants"], ensure_ascii=False).encode('utf-8')
+                               for module_name, entry in self._modules.items()}
+
+    @property
+    def created_at(self) -> float:
+        return self._created_at
+
+    def module_names(self) -> List[str]:
+        return list(self._modules)
+
+    def __contains__(self, module_name: str) -> bool:
+        return module_name in self._modules
+
+    def entry(self, module_name: str) -> Optional[Dict[str, Any]]:
+        return self._modules.get(module_name)
+
+    @classmethod
+    def build(cls, registry: ModuleRegistry) -> 'ModuleManifest':
+        """为注册表中的全部模块生成清单 (会导入所有模块)"""
+        modules = {}
+        for category, module_names in registry.get_categories().items():
+            for module_name in module_names:
+                if module_name not in modules:
+                    entry = _describe_module(registry, module_name, category)
+                    if entry is not None:
+                        modules[module_name] = entry
+        return cls(modules)
+
+    @classmethod
+    def load(cls, path: str) -> 'ModuleManifest':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("format_version") != MANIFEST_FORMAT_VERSION:
+            raise ValueError(f"不支持的模块清单版本: {data.get('format_version')}")
+        return cls(data["modules"], data.get("created_at"))
+
+    def save(self, path: str) -> None:
+        data = {"format_version": MANIFEST_FORMAT_VERSION, "created_at": self._created_at, "modules": self._modules}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def is_stale(self, module_name: str) -> bool:
+        """检查条目是否过期 (源文件不存在或内容已改变)"""
+        entry = self._modules.get(module_name)
+        if entry is None:
+            return True
+        for fingerprint in entry["fingerprints"]:
+            path = _resolve_path(fingerprint["path"])
+            try:
+                current = _file_fingerprint(path, with_hash=False)
+            except OSError:
+                return True
+            if current["size"] == fingerprint["size"] and current["mtime_ns"] == fingerprint["mtime_ns"]:
+                continue
+            # 修改时间变化但内容可能相同 (例如重新检出)，比较内容哈希
+            if _file_fingerprint(path)["sha256"] != fingerprint["sha256"]:
+                return True
+        return False
+
+    def stale_modules(self) -> List[str]:
+        return [module_name for module_name in self._modules if self.is_stale(module_name)]
+
+    def drop(self, module_names: List[str]) -> None:
+        """删除条目 (注册表对这些模块退回到导入模块类)"""
+        for module_name in module_names:
+            self._modules.pop(module_name, None)
+        self._prepare()
+
+    def get_variant_details(self, module_name: str) -> Optional[Dict[str, VariantDefinition]]:
+        """返回清单中的变体定义 (每个模块只构建一次)；模块不在清单中时返回None"""
+        variants = self._variant_cache.get(module_name)
+        if variants is None:
+            entry = self._modules.get(module_name)
+            if entry is None:
+                return None
+            variants = self._variant_cache[module_name] = _variants_from_entry(entry)
+        return dict(variants)
+
+    def variants_json(self, module_name: str) -> Optional[bytes]:
+        """GET /api/modules/{module_type_id}/variants 的响应体"""
+        return self._variants_json.get(module_name)
+
+    def definitions(self) -> List[Dict[str, Any]]:
+        return [dict(definition) for definition in self._definitions]
+
+    def definitions_json(self) -> bytes:
+        """GET /api/modules/definitions 的响应体"""
+        return self._definitions_json
+
+
+def refresh_manifest(registry: ModuleRegistry, path: str) -> ModuleManifest:
+    """
+    生成或更新清单文件: 只重新生成过期或缺失的条目 (只导入这些模块)，删除已不再注册的模块
+
+    Returns:
+        更新后的清单
+    """
+    manifest = ModuleManifest.load(path) if os.path.exists(path) else ModuleManifest({})
+    modules = dict(manifest._modules)
+    categories = {}
+    for category, module_names in registry.get_categories().items():
+        for module_name in module_names:
+            categories.setdefault(module_name, category)
+    changed = False
+    for module_name in list(modules):
+        if module_name not in categories:
+            del modules[module_name]
+            changed = True
+    for module_name, category in categories.items():
+        entry = modules.get(module_name)
+        if entry is not None and entry["category"] == category and not manifest.is_stale(module_name):
+            continue
+        entry = _describe_module(registry, module_name, category)
+        if entry is not None:
+            modules[module_name] = entry
+            changed = True
+    if not changed and os.path.exists(path):
+        return manifest
+    manifest = ModuleManifest(modules)
+    manifest.save(path)
+    return manifest
+
+
+if __name__ == '__main__':
+    # 构建/更新步骤: 注册核心工作流模块后生成清单
+    import backend.workflow_modules  # noqa: F401  导入时注册模块
+    from .module_registry import gmodule_registry
+
+    output_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MANIFEST_PATH
+    result = refresh_manifest(gmodule_registry, output_path)
+    print(f"模块清单已写入 {output_path}: {len(result.module_names())} 个模块")
@@ -1,13 +1,21 @@
-from typing import Dict, Type, List, Any, Optional
+from typing import Dict, Type, List, Any, Optional, TYPE_CHECKING
+import importlib
+import threading
 from .base_module import BaseModule, VariantDefinition
 
+if TYPE_CHECKING:
+    from .module_manifest import ModuleManifest
+
 class ModuleRegistry:
     """
     模块注册表类，负责管理工作流中可用的模块类型
     """
     def __init__(self):
         self._registry: Dict[str, Type[BaseModule]] = {}
+        self._lazy: Dict[str, str] = {}  # 尚未导入的模块: 模块名称 -> "包.模块:类名"
+        self._lazy_lock = threading.Lock()
         self._categories: Dict[str, List[str]] = {}  # 按类别组织模块
+        self._manifest: Optional['ModuleManifest'] = None  # 预先生成的模块定义清单 (见 module_manifest.py)
     
     def register(self, module_class: Type[BaseModule], category: str = "默认") -> None:
         """
@@ -24,14 +32,65 @@ class ModuleRegistry:
         
         # 注册到主注册表
         self._registry[module_name] = module_class
+        self._lazy.pop(module_name, None)
+        self._add_to_category(module_name, category)
+    
+    def register_lazy(self, module_name: str, import_path: str, category: str = "默认") -> None:
+        """
+        按导入路径注册模块类，类所在的模块在第一次需要该类时才导入
+        (get / create_instance / get_module_variant_details / get_all)
         
-        # 添加到类别
+        Args:
+            module_name: 模块类名称 (与类的 __name__ 一致)
+            import_path: "包.模块:类名" 形式的导入路径
+            category: 模块类别，用于UI中的分组显示
+        """
+        module_path, _, class_name = import_path.partition(":")
+        if not module_path or not class_name:
+            raise ValueError(f"导入路径应为 '包.模块:类名' 的形式: {import_path}")
+        if module_name not in self._registry:
+            self._lazy[module_name] = import_path
+        self._add_to_category(module_name, category)
+    
+    def _add_to_category(self, module_name: str, category: str) -> None:
+        """添加到类别"""
         if category not in self._categories:
             self._categories[category] = []
         
         if module_name not in self._categories[category]:
             self._categories[category].append(module_name)
     
+    def _import_lazy(self, module_name: str) -> Optional[Type[BaseModule]]:
+        """导入延迟注册的模块类并移入主注册表 (导入失败时抛出 ImportError)"""
+        with self._lazy_lock:
+            module_class = self._registry.get(module_name)
+            if module_class is not None:
+                return module_class
+            import_path = self._lazy.get(module_name)
+            if import_path is None:
+                return None
+            module_path, _, class_name = import_path.partition(":")
+            module_class = getattr(importlib.import_module(module_path), class_name, None)
+            if module_class is None:
+                raise ImportError(f"模块 '{module_path}' 中不存在类 '{class_name}'")
+            if not (isinstance(module_class, type) and issubclass(module_class, BaseModule)):
+                raise TypeError(f"{import_path} 必须是BaseModule的子类")
+            self._registry[module_name] = module_class
+            del self._lazy[module_name]
+            return module_class
+    
+    def is_registered(self, module_name: str) -> bool:
+        """检查模块类是否已注册 (不会导入延迟注册的模块)"""
+        return module_name in self._registry or module_name in self._lazy
+    
+    def is_loaded(self, module_name: str) -> bool:
+        """检查模块类是否已导入"""
+        return module_name in self._registry
+    
+    def get_names(self) -> List[str]:
+        """获取所有已注册的模块名称 (不会导入延迟注册的模块)"""
+        return list(self._registry) + list(self._lazy)
+    
     def unregister(self, module_name: str) -> bool:
         """
         取消注册模块类
@@ -42,11 +101,12 @@ class ModuleRegistry:
         Returns:
             是否成功取消注册
         """
-        if module_name not in self._registry:
+        if module_name not in self._registry and module_name not in self._lazy:
             return False
         
         # 从主注册表中移除
-        del self._registry[module_name]
+        self._registry.pop(module_name, None)
+        self._lazy.pop(module_name, None)
         
         # 从所有类别中移除
         for category, modules in self._categories.items():
@@ -57,7 +117,7 @@ class ModuleRegistry:
     
     def get(self, module_name: str) -> Optional[Type[BaseModule]]:
         """
-        获取指定名称的模块类
+        获取指定名称的模块类 (延迟注册的模块在此时导入)
         
         Args:
             module_name: 模块类名称
@@ -65,15 +125,20 @@ class ModuleRegistry:
         Returns:
             模块类或None（如果不存在）
         """
-        return self._registry.get(module_name)
+        module_class = self._registry.get(module_name)
+        if module_class is None and module_name in self._lazy:
+            module_class = self._import_lazy(module_name)
+        return module_class
     
     def get_all(self) -> Dict[str, Type[BaseModule]]:
         """
-        获取所有注册的模块类
+        获取所有注册的模块类 (会导入全部延迟注册的模块；只需要名称时使用 get_names)
         
         Returns:
             模块类字典，键为模块名称，值为模块类
         """
+        for module_name in list(self._lazy):
+            self._import_lazy(module_name)
         return self._registry.copy()
     
     def get_categories(self) -> Dict[str, List[str]]:
@@ -127,9 +192,32 @@ class ModuleRegistry:
         # BaseModule 的 __init__ 现在接受这些参数
         return module_class(*args, **kwargs) # 直接传递所有kwargs
 
+    @property
+    def manifest(self) -> Optional['ModuleManifest']:
+        """获取正在使用的模块定义清单"""
+        return self._manifest
+    
+    def use_manifest(self, manifest: Optional['ModuleManifest'], check_stale: bool = True) -> List[str]:
+        """
+        使用预先生成的模块定义清单查询变体定义 (不导入模块代码)
+        
+        Args:
+            manifest: 模块定义清单，为None时停止使用
+            check_stale: 是否检查源文件指纹并删除过期的条目 (这些模块退回到导入模块类)
+            
+        Returns:
+            被删除的过期条目的模块名称
+        """
+        stale = manifest.stale_modules() if manifest is not None and check_stale else []
+        if stale:
+            manifest.drop(stale)
+        self._manifest = manifest
+        return stale
+    
     def get_module_variant_details(self, module_name: str) -> Optional[Dict[str, VariantDefinition]]:
         """
         获取指定模块类型支持的所有变体定义及其端口定义。
+        使用模块定义清单时，清单中的模块直接返回清单中的定义。
 
         Args:
             module_name: 模块类名称。
@@ -137,11 +225,15 @@ class ModuleRegistry:
         Returns:
             一个字典，键是变体ID，值是 VariantDefinition；如果模块不存在或未实现则返回None。
         """
+        if self._manifest is not None and self.is_registered(module_name):
+            variants = self._manifest.get_variant_details(module_name)
+            if variants is not None:
+                return variants
         module_class = self.get(module_name)
         if module_class and hasattr(module_class, '_get_variant_definitions'):
             try:
-                # _get_variant_definitions 是一个类方法
-                return module_class._get_variant_definitions()
+                # get_variant_definitions 返回类级别缓存的只读定义
+                return dict(module_class.get_variant_definitions())
             except NotImplementedError:
                 # 如果子类没有正确实现 _get_variant_definitions
                 return None # 或者返回一个空字典，或者记录一个错误
@@ -0,0 +1,259 @@
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Set
+
+from .execution_plan import ExecutionPlan, PlanStep, InputBinding
+
+
+class OptimizationReport:
+    """
+    一次优化的结果报告
+
+    - merged: 被合并的重复步骤键 -> 保留的步骤键 (公共子表达式消除)
+    - folded: 在执行前预先计算出输出的步骤键 (常量折叠)
+    - removed: 被删除的步骤键 (死模块消除)
+    """
+    def __init__(self, steps_before: int):
+        self.steps_before = steps_before
+        self.steps_after = steps_before
+        self.merged: Dict[str, str] = {}
+        self.folded: List[str] = []
+        self.removed: List[str] = []
+        self._names: Dict[str, str] = {}  # 步骤键 -> 模块名称，用于生成可读的摘要
+
+    @property
+    def changed(self) -> bool:
+        """优化是否修改了执行计划"""
+        return bool(self.merged or self.folded or self.removed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "steps_before": self.steps_before,
+            "steps_after": self.steps_after,
+            "merged": dict(self.merged),
+            "folded": list(self.folded),
+            "removed": list(self.removed)
+        }
+
+    def summary(self) -> str:
+        """生成可读的优化摘要"""
+        def label(key: str) -> str:
+            return f"'{self._names.get(key, key)}' ({key})"
+
+        lines = [f"执行计划优化: {self.steps_before} 个步骤 -> {self.steps_after} 个需要执行的步骤"]
+        for key, kept in self.merged.items():
+            lines.append(f"  合并重复模块 {label(key)} -> {label(kept)}")
+        for key in self.folded:
+            lines.append(f"  预先计算常量模块 {label(key)}")
+        for key in self.removed:
+            lines.append(f"  删除无用模块 {label(key)}")
+        return "\n".join(lines)
+
+
+def _freeze(value: Any) -> Any:
+    """把参数值转换为可哈希的形式，无法转换时抛出 TypeError"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(item) for item in value)
+    hash(value)
+    return value
+
+
+def _step_identity(step: PlanStep, bindings: List[InputBinding], constant: bool) -> Optional[Tuple]:
+    """
+    计算步骤的标识: 模块类、变体、端口配置、参数和 (已规范化的) 输入来源均相同的步骤视为重复。
+    只有确定性模块或输出为常量的模块才参与合并；参数无法哈希时返回None
+    """
+    module = step.module
+    if not constant and not module.deterministic:
+        return None
+    try:
+        parameters = _freeze(module._parameters)
+        ports_config = _freeze(module._current_ports_config)
+    except TypeError:
+        return None
+    inputs = tuple(sorted((port_name, tuple(candidates)) for port_name, candidates in bindings))
+    return (module.__class__, module._current_variant_id, ports_config, parameters, inputs)
+
+
+def _step_dependencies(step: PlanStep) -> List[str]:
+    """步骤依赖的其他步骤键"""
+    dependencies = [source_key for _, candidates in step.input_bindings for source_key, _ in candidates]
+    if step.output_aliases is not None:
+        dependencies.extend(inner_key for inner_key, _ in step.output_aliases.values())
+    return dependencies
+
+
+def optimize_plan(plan: ExecutionPlan, requested_outputs: Optional[Iterable[str]] = None) -> Tuple[ExecutionPlan, OptimizationReport]:
+    """
+    对执行计划做优化，返回新的计划和优化报告 (原计划和工作流不会被修改)
+
+    依次完成:
+    1. 常量折叠: get_constant_outputs() 返回固定输出的模块直接使用该输出；
+       所有输入都来自常量的确定性模块在优化时执行一次，结果作为常量
+    2. 公共子表达式消除: 合并类、变体、参数和输入都相同的确定性 (或常量) 模块，
+       下游改为读取保留的步骤；被合并的步骤只保留一个转发结果的汇总步骤
+    3. 死模块消除: 删除结果无法到达任何终点的步骤。终点为 requested_outputs 中的模块
+       以及没有输出端口的模块；未指定 requested_outputs 时所有顶层模块都是终点 (执行结果与
+       不优化时包含相同的键)，只删除复合模块中未暴露、也不被使用的内部模块
+
+    Args:
+        plan: 执行计划
+        requested_outputs: 需要结果的步骤键 (模块ID) 列表，为None时保留所有顶层结果
+
+    Returns:
+        (优化后的执行计划, 优化报告)
+    """
+    report = OptimizationReport(sum(1 for step in plan.steps if step.output_aliases is None))
+    canonical: Dict[str, str] = {}           # 被合并的步骤键 -> 保留的步骤键
+    seen: Dict[Tuple, str] = {}              # 步骤标识 -> 步骤键
+    folded: Dict[str, Dict[str, Any]] = {}   # 步骤键 -> 常量输出
+    steps: List[PlanStep] = []
+
+    for step in plan.steps:
+        report._names[step.key] = step.module.name
+        bindings: List[InputBinding] = []
+        for port_name, candidates in step.input_bindings:
+            rewritten: List[Tuple[str, str]] = []
+            for source_key, source_port_name in candidates:
+                source = (canonical.get(source_key, source_key), source_port_name)
+                if source not in rewritten:
+                    rewritten.append(source)
+            bindings.append((port_name, rewritten))
+
+        if step.output_aliases is not None:
+            aliases = {port_name: (canonical.get(inner_key, inner_key), inner_port_name)
+                       for port_name, (inner_key, inner_port_name) in step.output_aliases.items()}
+            new_step = PlanStep(step.key, step.module, [], step.parent_key, output_aliases=aliases)
+            if all(inner_key in folded for inner_key, _ in aliases.values()):
+                folded[step.key] = new_step.collect_outputs(folded)
+            steps.append(new_step)
+            continue
+
+        # 常量折叠
+        module = step.module
+        constant = step.constant_outputs
+        if constant is None:
+            try:
+                constant = module.get_constant_outputs()
+            except Exception:
+                constant = None
+        if constant is None and module.deterministic and all(
+                source_key in folded for _, candidates in bindings for source_key, _ in candidates):
+            try:
+                constant = module.execute(PlanStep(step.key, module, bindings).gather_inputs(folded))
+            except Exception:
+                # 交给实际执行时报告错误
+                constant = None
+
+        # 公共子表达式消除
+        identity = _step_identity(step, bindings, constant is not None)
+        if identity is not None:
+            kept = seen.get(identity)
+            if kept is not None:
+                canonical[step.key] = kept
+                report.merged[step.key] = kept
+                if kept in folded:
+                    folded[step.key] = folded[kept]
+                steps.append(PlanStep(step.key, module, [], step.parent_key, output_aliases={
+                    port.name: (kept, port.name) for port in module.output_ports.values()
+                }))
+                continue
+            seen[identity] = step.key
+
+        if constant is not None:
+            folded[step.key] = constant
+            report.folded.append(step.key)
+            steps.append(PlanStep(step.key, module, [], step.parent_key, constant_outputs=constant))
+        else:
+            steps.append(PlanStep(step.key, module, bindings, step.parent_key))
+
+    # 死模块消除: 从终点出发逆序标记所有被依赖的步骤
+    if requested_outputs is not None:
+        roots: Set[str] = set(requested_outputs)
+    else:
+        # 被折叠的步骤不再有输入绑定，只保留没有下游的模块会丢掉折叠步骤的常量来源的结果
+        roots = {step.key for step in plan.steps if step.parent_key is None}
+    roots.update(step.key for step in steps if step.output_aliases is None and not step.module.output_ports)
+
+    live: Set[str] = set()
+    for step in reversed(steps):
+        if step.key in roots or step.key in live:
+            live.add(step.key)
+            live.update(_step_dependencies(step))
+    kept_steps = []
+    for step in steps:
+        # 被合并的步骤只转发结果，开销可以忽略；只要保留的步骤仍需执行，就继续提供它的结果
+        if step.key in live or report.merged.get(step.key) in live:
+            kept_steps.append(step)
+        else:
+            report.removed.append(step.key)
+
+    # 被合并后只做结果转发的汇总步骤不计入需要执行的步骤
+    report.steps_after = sum(1 for step in kept_steps
+                             if step.output_aliases is None and step.constant_outputs is None)
+    return ExecutionPlan(plan.workflow_id, plan.version, kept_steps, plan._input_redirects), report
+
+
+def _is_fusible(step: PlanStep) -> bool:
+    return (step.output_aliases is None and step.constant_outputs is None and step.members is None
+            and step.module.fusible)
+
+
+def fuse_chains(plan: ExecutionPlan, min_length: int = 2) -> Tuple[ExecutionPlan, List[List[str]]]:
+    """
+    把由轻量模块 (类属性 fusible 为True) 组成、且中间结果只有一个下游的线性链融合为一个步骤
+
+    融合步骤放在链上最后一个成员原来的位置: 成员的外部输入都在各自原位置之前产生，
+    而中间成员的结果只被链上的下一个成员使用，因此整条链可以推迟到该位置连续执行。
+    应在 optimize_plan 之后调用。
+
+    Args:
+        plan: 执行计划
+        min_length: 参与融合的最少步骤数
+
+    Returns:
+        (融合后的执行计划, 被融合的链列表 (每条链为成员步骤键列表))
+    """
+    # 步骤键 -> 唯一的下游步骤键；有多个下游时为None
+    only_consumer: Dict[str, Optional[str]] = {}
+    for step in plan.steps:
+        key = step.key
+        for source_key in _step_dependencies(step):
+            previous = only_consumer.get(source_key, key)
+            only_consumer[source_key] = key if previous == key else None
+    by_key = {step.key: step for step in plan.steps}
+
+    chain_of: Dict[str, List[PlanStep]] = {}  # 链上最后一个成员的键 -> 链
+    fused_keys: Set[str] = set()
+    for step in plan.steps:
+        if step.key in fused_keys or not _is_fusible(step):
+            continue
+        chain = [step]
+        current = step
+        while True:
+            next_key = only_consumer.get(current.key)
+            if next_key is None:
+                break
+            next_step = by_key[next_key]
+            if next_key in fused_keys or not _is_fusible(next_step):
+                break
+            chain.append(next_step)
+            current = next_step
+        if len(chain) >= max(min_length, 2):
+            fused_keys.update(member.key for member in chain)
+            chain_of[chain[-1].key] = chain
+
+    if not chain_of:
+        return plan, []
+
+    steps: List[PlanStep] = []
+    for step in plan.steps:
+        chain = chain_of.get(step.key)
+        if chain is not None:
+            steps.append(PlanStep(step.key, step.module, [], step.parent_key, members=chain))
+        elif step.key not in fused_keys:
+            steps.append(step)
+    return (ExecutionPlan(plan.workflow_id, plan.version, steps, plan._input_redirects),
+            [[member.key for member in chain] for chain in chain_of.values()])
@@ -0,0 +1,208 @@
+from typing import Dict, List, Any, Optional, Tuple
+import cProfile
+import pstats
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class ProfileMode:
+    """性能剖析模式常量"""
+    SAMPLING = "sampling"  # 采样剖析，输出 flamegraph 可用的折叠栈 (collapsed stacks)
+    CPROFILE = "cprofile"  # 确定性剖析，按模块输出 cProfile 统计
+
+
+class RunProfiler:
+    """
+    单次工作流运行的性能剖析器
+
+    仅在调用 WorkflowEngine.execute(profile=...) 时创建；未启用剖析时引擎不会创建
+    任何剖析对象，也不会执行额外的代码路径。
+
+    - sampling 模式: 后台线程定期采样执行线程的调用栈，栈底以模块名标注，
+      可通过 write_collapsed() 写出折叠栈文件 (flamegraph.pl / speedscope 可直接读取)。
+    - cprofile 模式: 每个模块的 execute() 调用使用独立的 cProfile.Profile，
+      可通过 dump_stats() 按模块写出 .prof 文件，或通过 get_module_stats() 获取文本报告。
+    """
+    def __init__(self, mode: str, sample_interval: float = 0.005):
+        if mode not in (ProfileMode.SAMPLING, ProfileMode.CPROFILE):
+            raise ValueError(f"不支持的剖析模式: {mode}")
+        self._mode = mode
+        self._sample_interval = sample_interval
+
+        # 采样模式状态
+        self._stack_counts: Counter = Counter()  # 折叠栈 -> 采样次数
+        self._target_thread_id: Optional[int] = None
+        self._current_label: Optional[str] = None  # 当前正在执行的模块标签
+        self._sampler_thread: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
+
+        # cProfile 模式状态
+        self._module_profiles: Dict[str, cProfile.Profile] = {}  # 模块ID -> Profile
+        self._module_labels: Dict[str, str] = {}  # 模块ID -> 显示标签
+
+        self._module_durations: Dict[str, float] = {}  # 模块ID -> 执行耗时(秒)
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def module_durations(self) -> Dict[str, float]:
+        """获取各模块 execute() 的耗时（秒）"""
+        return dict(self._module_durations)
+
+    @property
+    def sample_count(self) -> int:
+        """获取采样总次数 (仅 sampling 模式)"""
+        return sum(self._stack_counts.values())
+
+    def start(self) -> None:
+        """在执行线程中调用，开始剖析"""
+        if self._mode == ProfileMode.SAMPLING:
+            self._target_thread_id = threading.get_ident()
+            self._sampler_stop.clear()
+            self._sampler_thread = threading.Thread(target=self._sample_loop, name="RunProfilerSampler")
+            self._sampler_thread.daemon = True
+            self._sampler_thread.start()
+
+    def stop(self) -> None:
+        """结束剖析"""
+        if self._sampler_thread is not None:
+            self._sampler_stop.set()
+            self._sampler_thread.join(timeout=1.0)
+            self._sampler_thread = None
+
+    def run_module(self, module_id: str, module: Any, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        在剖析下执行模块
+
+        Args:
+            module_id: 模块ID
+            module: 模块实例
+            inputs: 输入数据字典（以端口名称为键）
+
+        Returns:
+            模块的输出字典
+        """
+        label = f"{module.name} [{module.__class__.__name__}:{module_id}]"
+        self._module_labels[module_id] = label
+        start_time = time.perf_counter()
+        try:
+            if self._mode == ProfileMode.CPROFILE:
+                profile = self._module_profiles.get(module_id)
+                if profile is None:
+                    profile = cProfile.Profile()
+                    self._module_profiles[module_id] = profile
+                profile.enable()
+                try:
+                    return module.execute(inputs)
+                finally:
+                    profile.disable()
+            else:
+                self._current_label = label
+                try:
+                    return module.execute(inputs)
+                finally:
+                    self._current_label = None
+        finally:
+            self._module_durations[module_id] = time.perf_counter() - start_time
+
+    def _sample_loop(self) -> None:
+        """采样线程主循环"""
+        while not self._sampler_stop.wait(self._sample_interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+            label = self._current_label or "engine"
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name}@{os.path.basename(code.co_filename)}:{code.co_firstlineno}")
+                frame = frame.f_back
+            stack.append(f"module:{label}")
+            stack.reverse()
+            self._stack_counts[";".join(stack)] += 1
+
+    def get_collapsed_stacks(self) -> List[Tuple[str, int]]:
+        """获取折叠栈列表 [(栈, 次数), ...] (仅 sampling 模式)"""
+        return sorted(self._stack_counts.items())
+
+    def write_collapsed(self, filepath: str) -> None:
+        """
+        写出 flamegraph 可用的折叠栈文件，每行格式为 "frame1;frame2;... count"
+
+        Args:
+            filepath: 输出文件路径
+        """
+        if self._mode != ProfileMode.SAMPLING:
+            raise ValueError("只有 sampling 模式可以输出折叠栈文件")
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for stack, count in self.get_collapsed_stacks():
+                f.write(f"{stack.replace(' ', '_')} {count}\n")
+
+    def get_module_stats(self, module_id: str, sort_by: str = "cumulative", limit: int = 30) -> str:
+        """
+        获取指定模块的 cProfile 文本报告 (仅 cprofile 模式)
+
+        Args:
+            module_id: 模块ID
+            sort_by: pstats 排序键
+            limit: 输出的函数条数
+
+        Returns:
+            文本报告；如果模块未被剖析则返回空字符串
+        """
+        profile = self._module_profiles.get(module_id)
+        if profile is None:
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats(sort_by).print_stats(limit)
+        return stream.getvalue()
+
+    def dump_stats(self, output_dir: str) -> Dict[str, str]:
+        """
+        按模块写出 cProfile 统计文件 (可用 snakeviz / pstats 打开)，
+        同时写出合并了所有模块的 all_modules.prof
+
+        Args:
+            output_dir: 输出目录
+
+        Returns:
+            模块ID -> 文件路径 的字典
+        """
+        if self._mode != ProfileMode.CPROFILE:
+            raise ValueError("只有 cprofile 模式可以输出 cProfile 统计文件")
+        os.makedirs(output_dir, exist_ok=True)
+        written: Dict[str, str] = {}
+        merged: Optional[pstats.Stats] = None
+        for module_id, profile in self._module_profiles.items():
+            # 复合模块内部步骤的键形如 "复合模块ID/内部模块ID"，写文件时替换路径分隔符
+            path = os.path.join(output_dir, f"{module_id.replace('/', '__')}.prof")
+            profile.dump_stats(path)
+            written[module_id] = path
+            if merged is None:
+                merged = pstats.Stats(profile)
+            else:
+                merged.add(profile)
+        if merged is not None:
+            merged.dump_stats(os.path.join(output_dir, "all_modules.prof"))
+        with open(os.path.join(output_dir, "modules.txt"), 'w', encoding='utf-8') as f:
+            for module_id, label in self._module_labels.items():
+                f.write(f"{module_id}\t{self._module_durations.get(module_id, 0.0):.6f}\t{label}\n")
+        return written
+
+    def write_output(self, output_path: str) -> None:
+        """
+        按模式写出剖析结果: sampling 写折叠栈文件，cprofile 写按模块划分的统计目录
+
+        Args:
+            output_path: sampling 模式为文件路径，cprofile 模式为目录路径
+        """
+        if self._mode == ProfileMode.SAMPLING:
+            self.write_collapsed(output_path)
+        else:
+            self.dump_stats(output_path)
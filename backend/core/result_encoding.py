@@ -0,0 +1,226 @@
+from typing import Dict, List, Any, Optional, Sequence, Iterator, Iterable
+import json
+import math
+
+from .result_store import StoredRun
+
+# 可选依赖: 没有安装时对应类型的数据不会出现，Arrow 格式不可用
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover
+    pd = None
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover
+    pa = None
+
+# 每个分块的默认行数
+DEFAULT_CHUNK_ROWS = 8192
+# 各编码格式的 HTTP Content-Type
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+# 在结果存储中只能整体读取的类型 (其余类型按页读取，见 iter_stored_chunks)
+_WHOLE_KINDS = ("inline", "json", "pickle")
+
+
+def _jsonable(value: Any) -> Any:
+    """把单个值转换为 JSON 可编码的形式 (numpy 标量转为 Python 标量，NaN/Inf 转为 null)"""
+    if np is not None and isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if np is not None and isinstance(value, np.ndarray):
+        return _jsonable(value.tolist())
+    return value
+
+
+def _as_frame(value: Any) -> Any:
+    """Series 按单列 DataFrame 处理 (列名为 Series 的名称，未命名时为 0)"""
+    if pd is not None and isinstance(value, pd.Series):
+        return value.to_frame()
+    return value
+
+
+def _project_columns(columns: Optional[Sequence[Any]], row: Dict[str, Any]) -> Dict[str, Any]:
+    return row if columns is None else {column: row.get(column) for column in columns}
+
+
+def iter_chunks(value: Any, columns: Optional[Sequence[Any]] = None, offset: int = 0,
+                limit: Optional[int] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Any]:
+    """
+    把内存中的结果按行切分为分块 (DataFrame 的行、数组的第一维、列表的元素)
+
+    Series 按单列 DataFrame 切分。columns 对 DataFrame 和由字典组成的列表表示列名，
+    对二维数组表示第二维的下标。其他值 (标量、字典等) 作为一个分块整体返回。
+    """
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows 必须为正数")
+    value = _as_frame(value)
+    if pd is not None and isinstance(value, pd.DataFrame):
+        if columns is not None:
+            value = value[list(columns)]
+    elif np is not None and isinstance(value, np.ndarray):
+        if value.ndim == 0:
+            yield value
+            return
+        if columns is not None and value.ndim > 1:
+            value = value[:, list(columns)]
+    elif not isinstance(value, list):
+        yield value
+        return
+
+    stop = len(value) if limit is None else min(len(value), offset + limit)
+    for start in range(offset, stop, chunk_rows):
+        end = min(start + chunk_rows, stop)
+        if isinstance(value, list):
+            chunk = value[start:end]
+            if columns is not None:
+                chunk = [_project_columns(columns, row) if isinstance(row, dict) else row for row in chunk]
+            yield chunk
+        elif np is not None and isinstance(value, np.ndarray):
+            yield value[start:end]
+        else:
+            yield value.iloc[start:end]
+
+
+def iter_stored_chunks(run: StoredRun, module_id: str, port_name: str, columns: Optional[Sequence[Any]] = None,
+                       offset: int = 0, limit: Optional[int] = None,
+                       chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Any]:
+    """
+    按页从结果存储中读取一个端口的结果
+
+    DataFrame、Series 和数值数组每次只读取 chunk_rows 行: 未压缩时通过内存映射，
+    压缩的 Arrow 文件只解压与当前分块重叠的批次，gzip 压缩的 .npy 文件每个分块从头顺序解压
+    (内存与分块大小成正比，总耗时与分块数的平方成正比，需要反复翻页的结果不宜压缩)。
+    对象数组、内联值、JSON 文件和 pickle 文件只能整体读取后再切分。
+    """
+    info = run.describe(module_id, port_name)
+    if info["kind"] in _WHOLE_KINDS:
+        yield from iter_chunks(run.get(module_id, port_name), columns, offset, limit, chunk_rows)
+        return
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows 必须为正数")
+    rows = info.get("rows", 0)
+    stop = rows if limit is None else min(rows, offset + limit)
+    for start in range(offset, stop, chunk_rows):
+        yield run.get(module_id, port_name, columns=columns, offset=start, limit=min(chunk_rows, stop - start))
+
+
+def _ndjson_lines(chunk: Any) -> bytes:
+    """把一个分块编码为 NDJSON (每行一个 JSON 文档)"""
+    chunk = _as_frame(chunk)
+    if pd is not None and isinstance(chunk, pd.DataFrame):
+        # pandas 的 C 实现: NaN 编码为 null，时间编码为毫秒时间戳
+        text = chunk.to_json(orient="records", lines=True, force_ascii=False)
+        return (text if text.endswith("\n") else text + "\n").encode('utf-8') if text else b""
+    if np is not None and isinstance(chunk, np.ndarray) and chunk.ndim:
+        rows = chunk.tolist()
+    elif isinstance(chunk, list):
+        rows = chunk
+    else:
+        rows = [chunk]
+    return "".join(json.dumps(_jsonable(row), ensure_ascii=False, allow_nan=False) + "\n"
+                   for row in rows).encode('utf-8')
+
+
+def _to_record_batch(chunk: Any):
+    """把一个分块转换为 Arrow RecordBatch"""
+    chunk = _as_frame(chunk)
+    if pd is not None and isinstance(chunk, pd.DataFrame):
+        return pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+    if np is not None and isinstance(chunk, np.ndarray):
+        if chunk.ndim == 1:
+            return pa.RecordBatch.from_arrays([pa.array(chunk)], names=["value"])
+        if chunk.ndim == 2:
+            return pa.RecordBatch.from_arrays([pa.array(chunk[:, i]) for i in range(chunk.shape[1])],
+                                              names=[str(i) for i in range(chunk.shape[1])])
+    if isinstance(chunk, list):
+        if all(isinstance(row, dict) for row in chunk):
+            return pa.RecordBatch.from_pylist(chunk)
+        return pa.RecordBatch.from_arrays([pa.array(chunk)], names=["value"])
+    raise ValueError(f"无法把 {type(chunk).__name__} 编码为 Arrow 表格")
+
+
+class _ChunkSink:
+    """接收 Arrow 写入的字节，每写完一个批次由调用方取走"""
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _encode_arrow(chunks: Iterable[Any]) -> Iterator[bytes]:
+    """编码为 Arrow IPC 流: 第一个分块同时输出 schema，之后每个分块一个 RecordBatch"""
+    sink = _ChunkSink()
+    writer = None
+    for chunk in chunks:
+        batch = _to_record_batch(chunk)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        elif batch.schema != writer.schema:
+            # 列表类结果推断出的类型可能逐块变化，按第一个分块的 schema 转换
+            batch = batch.cast(writer.schema)
+        writer.write_batch(batch)
+        yield sink.take()
+    if writer is None:
+        return
+    writer.close()
+    tail = sink.take()
+    if tail:
+        yield tail
+
+
+def encode_chunks(chunks: Iterable[Any], format: str = "ndjson") -> Iterator[bytes]:
+    """
+    把分块序列编码为字节流 (每个分块对应一段输出，适合作为 HTTP 分块响应体)
+
+    Args:
+        chunks: iter_chunks / iter_stored_chunks 产生的分块
+        format: "ndjson" 或 "arrow" (Arrow IPC 流格式)
+    """
+    if format == "ndjson":
+        return (_ndjson_lines(chunk) for chunk in chunks)
+    if format == "arrow":
+        if pa is None:
+            raise ValueError("Arrow 格式需要安装 pyarrow")
+        return _encode_arrow(chunks)
+    raise ValueError(f"不支持的编码格式: {format}")
+
+
+def encode_result(value: Any, format: str = "ndjson", columns: Optional[Sequence[Any]] = None,
+                  offset: int = 0, limit: Optional[int] = None,
+                  chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """流式编码内存中的结果 (见 iter_chunks 和 encode_chunks)"""
+    return encode_chunks(iter_chunks(value, columns, offset, limit, chunk_rows), format)
+
+
+def encode_stored_result(run: StoredRun, module_id: str, port_name: str, format: str = "ndjson",
+                         columns: Optional[Sequence[Any]] = None, offset: int = 0, limit: Optional[int] = None,
+                         chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[bytes]:
+    """流式编码结果存储中的结果 (见 iter_stored_chunks 和 encode_chunks)"""
+    return encode_chunks(iter_stored_chunks(run, module_id, port_name, columns, offset, limit, chunk_rows), format)
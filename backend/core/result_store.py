@@ -0,0 +1,390 @@
+from typing import Dict, List, Any, Optional, Sequence
+import bisect
+import gzip
+import json
+import os
+import pickle
+import re
+import shutil
+import threading
+import time
+from uuid import uuid4
+
+# 可选依赖: 没有安装时对应类型的结果退回到更通用的格式
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover
+    pd = None
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover
+    pa = None
+
+MANIFEST_NAME = "manifest.json"
+# 小于该大小 (JSON 编码后) 的标量和简单容器直接写在清单中
+INLINE_LIMIT = 64 * 1024
+# Arrow IPC 原生支持的压缩算法；其他格式在指定压缩时统一使用 gzip
+_ARROW_COMPRESSIONS = ("zstd", "lz4")
+# Arrow 文件每个 RecordBatch 的最大行数 (分页读取时只解压与页面重叠的批次)
+ARROW_BATCH_ROWS = 64 * 1024
+_SAFE_NAME = re.compile(r"[^0-9A-Za-z_.-]")
+
+
+def _file_stem(module_id: str, port_name: str) -> str:
+    """把 (模块ID, 端口名称) 转换为安全的文件名 (复合模块内部步骤的键包含 '/')"""
+    return f"{_SAFE_NAME.sub('_', module_id)}__{_SAFE_NAME.sub('_', port_name)}"
+
+
+class ResultStore:
+    """
+    执行结果的持久化存储
+
+    每次运行保存在 root_dir/<run_id>/ 下，按 (运行, 模块, 端口) 分别存储:
+    - DataFrame 和 Series (按单列 DataFrame 存储，读取时还原为 Series): Arrow IPC 文件
+      (按列存储，每 ARROW_BATCH_ROWS 行一个批次，可内存映射；未安装 pyarrow 时每列一个 .npy 文件)
+    - ndarray: .npy 文件 (可内存映射)
+    - 标量和可 JSON 编码的小型容器: 直接写入清单 (manifest.json)；较大的写入单独的 .json 文件
+    - 其他对象: pickle 文件
+    compression 可选 "zstd" / "lz4" (Arrow 原生压缩) 或 "gzip"；.npy、JSON 和 pickle 文件在指定任何压缩时
+    使用 gzip，不能再内存映射。分页读取压缩的 Arrow 文件时只解压与页面重叠的批次；
+    压缩的数值 .npy 文件从头顺序解压到页面位置 (内存只与页面大小有关，但耗时与偏移量成正比)，
+    对象数组、JSON 和 pickle 文件则需要整体读取。
+    读取时只加载清单，数据按需读取，并支持列选择和按行分页 (见 StoredRun.get)。
+    """
+    def __init__(self, root_dir: str, compression: Optional[str] = None):
+        if compression not in (None, "gzip") + _ARROW_COMPRESSIONS:
+            raise ValueError(f"不支持的压缩算法: {compression}")
+        self._root_dir = root_dir
+        self._compression = compression
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    @property
+    def root_dir(self) -> str:
+        return self._root_dir
+
+    def save_run(self, results: Dict[str, Dict[str, Any]], workflow_id: Optional[str] = None,
+                 run_id: Optional[str] = None) -> str:
+        """
+        保存一次运行的全部结果
+
+        Args:
+            results: 执行结果 (步骤键 -> {端口名称: 数据})，即 engine.execution_results
+            workflow_id: 工作流ID (写入清单)
+            run_id: 运行ID，为None时自动生成
+
+        Returns:
+            运行ID
+        """
+        run_id = run_id or str(uuid4())
+        run_dir = os.path.join(self._root_dir, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for module_id, outputs in results.items():
+            if not isinstance(outputs, dict):
+                continue
+            module_entries = entries.setdefault(module_id, {})
+            for port_name, value in outputs.items():
+                module_entries[port_name] = self._write_value(run_dir, _file_stem(module_id, port_name), value)
+        manifest = {
+            "run_id": run_id,
+            "workflow_id": workflow_id,
+            "created_at": time.time(),
+            "compression": self._compression,
+            "results": entries
+        }
+        tmp_path = os.path.join(run_dir, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(run_dir, MANIFEST_NAME))
+        return run_id
+
+    def open_run(self, run_id: str) -> 'StoredRun':
+        """打开已保存的运行 (只读取清单)，不存在时抛出 ValueError"""
+        run_dir = os.path.join(self._root_dir, run_id)
+        manifest_path = os.path.join(run_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"运行结果不存在: {run_id}")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return StoredRun(run_dir, json.load(f))
+
+    def list_runs(self, workflow_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出已保存的运行 (按创建时间从新到旧)"""
+        runs = []
+        for run_id in os.listdir(self._root_dir):
+            manifest_path = os.path.join(self._root_dir, run_id, MANIFEST_NAME)
+            if not os.path.exists(manifest_path):
+                continue
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if workflow_id is None or manifest.get("workflow_id") == workflow_id:
+                runs.append({"run_id": manifest["run_id"], "workflow_id": manifest.get("workflow_id"),
+                             "created_at": manifest.get("created_at")})
+        runs.sort(key=lambda run: run["created_at"] or 0, reverse=True)
+        return runs
+
+    def delete_run(self, run_id: str) -> bool:
+        run_dir = os.path.join(self._root_dir, run_id)
+        if not os.path.isdir(run_dir):
+            return False
+        shutil.rmtree(run_dir)
+        return True
+
+    # ---- 写入 ----
+
+    def _open_for_write(self, path: str):
+        return gzip.open(path + ".gz", 'wb') if self._compression else open(path, 'wb')
+
+    def _write_value(self, run_dir: str, stem: str, value: Any) -> Dict[str, Any]:
+        """写入单个端口的数据，返回清单条目"""
+        if np is not None and isinstance(value, np.generic):
+            value = value.item()
+        if pd is not None and isinstance(value, pd.DataFrame):
+            return self._write_dataframe(run_dir, stem, value)
+        if pd is not None and isinstance(value, pd.Series):
+            # 按单列 DataFrame 存储 (同样支持分页)，记录名称以便读取时还原
+            entry = self._write_dataframe(run_dir, stem, value.to_frame())
+            name = value.name
+            entry["series"] = True
+            entry["name"] = name if name is None or isinstance(name, (str, int, float, bool)) else str(name)
+            return entry
+        if np is not None and isinstance(value, np.ndarray) and value.dtype != object:
+            return self._write_ndarray(run_dir, stem, value)
+        try:
+            encoded = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            encoded = None
+        if encoded is not None:
+            if len(encoded) <= INLINE_LIMIT:
+                return {"kind": "inline", "value": value}
+            file_name = stem + ".json"
+            with self._open_for_write(os.path.join(run_dir, file_name)) as f:
+                f.write(encoded.encode('utf-8'))
+            entry = {"kind": "json", "file": file_name + (".gz" if self._compression else "")}
+            if isinstance(value, list):
+                entry["rows"] = len(value)
+            return entry
+        file_name = stem + ".pkl"
+        with self._open_for_write(os.path.join(run_dir, file_name)) as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return {"kind": "pickle", "file": file_name + (".gz" if self._compression else ""),
+                "type": type(value).__name__}
+
+    def _write_ndarray(self, run_dir: str, stem: str, array) -> Dict[str, Any]:
+        file_name = stem + ".npy"
+        with self._open_for_write(os.path.join(run_dir, file_name)) as f:
+            np.save(f, array, allow_pickle=False)
+        return {"kind": "npy", "file": file_name + (".gz" if self._compression else ""),
+                "shape": list(array.shape), "dtype": str(array.dtype),
+                "rows": int(array.shape[0]) if array.ndim else 1}
+
+    def _write_dataframe(self, run_dir: str, stem: str, df) -> Dict[str, Any]:
+        columns = [str(column) for column in df.columns]
+        entry = {"rows": int(len(df)), "columns": columns,
+                 "dtypes": {str(column): str(dtype) for column, dtype in df.dtypes.items()}}
+        if pa is not None:
+            file_name = stem + ".arrow"
+            # 保存实际的索引列，分页读取时保留原始行索引
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            compression = self._compression if self._compression in _ARROW_COMPRESSIONS else (
+                "zstd" if self._compression else None)
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            batch_starts = []
+            position = 0
+            with pa.OSFile(os.path.join(run_dir, file_name), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                    for batch in table.to_batches(max_chunksize=ARROW_BATCH_ROWS):
+                        writer.write_batch(batch)
+                        batch_starts.append(position)
+                        position += batch.num_rows
+            # 每个批次的起始行号，分页读取时据此定位需要读取的批次
+            entry.update(kind="arrow", file=file_name, batch_starts=batch_starts)
+            return entry
+
+        # 未安装 pyarrow: 每列 (以及索引) 一个 .npy 文件，同样可以只读取需要的列
+        column_dir = stem + ".columns"
+        os.makedirs(os.path.join(run_dir, column_dir), exist_ok=True)
+        files = []
+        for position, column in enumerate(df.columns):
+            files.append(self._write_column(run_dir, column_dir, f"col{position}", df[column].to_numpy()))
+        entry.update(kind="columns", dir=column_dir, files=files,
+                     index=self._write_column(run_dir, column_dir, "index", df.index.to_numpy()))
+        return entry
+
+    def _write_column(self, run_dir: str, column_dir: str, name: str, values) -> str:
+        file_name = name + ".npy"
+        with self._open_for_write(os.path.join(run_dir, column_dir, file_name)) as f:
+            np.save(f, values, allow_pickle=values.dtype == object)
+        return file_name + (".gz" if self._compression else "")
+
+
+def _load_npy(path: str):
+    """读取 .npy 文件: 未压缩的数值数组使用内存映射，只有被切片的部分会被读入内存"""
+    if path.endswith(".gz"):
+        with gzip.open(path, 'rb') as f:
+            return np.load(f, allow_pickle=True)
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # 对象数组不能内存映射
+        return np.load(path, allow_pickle=True)
+
+
+def _load_npy_rows(path: str, offset: int, stop: Optional[int]):
+    """
+    读取 .npy 文件第一维的 [offset, stop) 部分
+
+    未压缩的文件通过内存映射切片；gzip 压缩的数值数组从头顺序解压，跳过 offset 之前的数据，
+    只把所需的行读入内存。对象数组和 Fortran 顺序的数组只能整体读取后再切片。
+    """
+    if not path.endswith(".gz"):
+        array = _load_npy(path)
+        return array[offset:stop] if array.ndim else array
+    with gzip.open(path, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        if dtype.hasobject or fortran_order or not shape:
+            f.seek(0)
+            array = np.load(f, allow_pickle=True)
+            return array[offset:stop] if array.ndim else array
+        rows = shape[0]
+        start = min(offset, rows)
+        end = rows if stop is None else max(start, min(stop, rows))
+        row_bytes = dtype.itemsize * int(np.prod(shape[1:], dtype=np.int64))
+        # GzipFile 向前 seek 时逐块解压并丢弃，不占用额外内存
+        f.seek(start * row_bytes, os.SEEK_CUR)
+        data = f.read((end - start) * row_bytes)
+        return np.frombuffer(data, dtype=dtype).reshape((end - start,) + tuple(shape[1:]))
+
+
+def _read_bytes(path: str) -> bytes:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rb') as f:
+        return f.read()
+
+
+class StoredRun:
+    """
+    一次已保存运行的结果 (由 ResultStore.open_run 返回)
+
+    只持有清单；get() 按需读取数据，describe() 只返回清单中的元数据 (行数、列、类型等)。
+    """
+    def __init__(self, run_dir: str, manifest: Dict[str, Any]):
+        self._run_dir = run_dir
+        self._manifest = manifest
+
+    @property
+    def run_id(self) -> str:
+        return self._manifest["run_id"]
+
+    @property
+    def workflow_id(self) -> Optional[str]:
+        return self._manifest.get("workflow_id")
+
+    def module_ids(self) -> List[str]:
+        return list(self._manifest["results"])
+
+    def ports(self, module_id: str) -> List[str]:
+        return list(self._manifest["results"].get(module_id, {}))
+
+    def describe(self, module_id: str, port_name: str) -> Dict[str, Any]:
+        """返回结果的元数据 (不读取数据)"""
+        entry = self._entry(module_id, port_name)
+        return {key: value for key, value in entry.items()
+                if key not in ("value", "files", "index", "batch_starts")}
+
+    def _entry(self, module_id: str, port_name: str) -> Dict[str, Any]:
+        entry = self._manifest["results"].get(module_id, {}).get(port_name)
+        if entry is None:
+            raise ValueError(f"结果不存在: {module_id}.{port_name}")
+        return entry
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self._run_dir, *parts)
+
+    def get(self, module_id: str, port_name: str, columns: Optional[Sequence[str]] = None,
+            offset: int = 0, limit: Optional[int] = None) -> Any:
+        """
+        读取一个端口的结果 (或其中的一部分)
+
+        Args:
+            columns: DataFrame 只读取这些列；二维数组为第二维的下标
+            offset / limit: 按行分页 (DataFrame 的行、数组的第一维、列表的元素)；limit 为None时读到末尾
+
+        Returns:
+            数据；DataFrame 和 Series 分页时保留原始行索引
+        """
+        entry = self._entry(module_id, port_name)
+        kind = entry["kind"]
+        stop = None if limit is None else offset + limit
+        if kind == "inline":
+            value = entry["value"]
+            return value[offset:stop] if isinstance(value, list) and (offset or limit is not None) else value
+        if kind == "json":
+            value = json.loads(_read_bytes(self._path(entry["file"])).decode('utf-8'))
+            return value[offset:stop] if isinstance(value, list) else value
+        if kind == "pickle":
+            return pickle.loads(_read_bytes(self._path(entry["file"])))
+        if kind == "npy":
+            array = _load_npy_rows(self._path(entry["file"]), offset, stop)
+            if columns is not None and array.ndim > 1:
+                array = array[:, list(columns)]
+            return np.array(array)
+        if entry.get("series"):
+            columns = None
+        if kind == "arrow":
+            value = self._read_arrow(entry, columns, offset, stop)
+        elif kind == "columns":
+            value = self._read_columns(entry, columns, offset, stop)
+        else:
+            raise ValueError(f"未知的结果类型: {kind}")
+        if entry.get("series"):
+            value = value.iloc[:, 0]
+            value.name = entry.get("name")
+        return value
+
+    def _read_arrow(self, entry: Dict[str, Any], columns: Optional[Sequence[str]], offset: int, stop: Optional[int]):
+        if pa is None:
+            raise ValueError("读取 Arrow 格式的结果需要安装 pyarrow")
+        source = pa.memory_map(self._path(entry["file"]), 'r')
+        reader = pa.ipc.open_file(source)
+        batch_starts = entry.get("batch_starts")
+        if batch_starts is None:
+            # 旧版本写入的文件没有批次信息，读取全部批次 (未压缩时仍是内存映射)
+            table = reader.read_all()
+            table = table.slice(offset, None if stop is None else max(stop - offset, 0))
+        else:
+            # 只读取与 [offset, stop) 重叠的批次，压缩时也只解压这些批次
+            rows = entry["rows"]
+            stop = rows if stop is None else min(stop, rows)
+            first = max(bisect.bisect_right(batch_starts, offset) - 1, 0)
+            batches = []
+            position = first
+            while offset < stop and position < len(batch_starts) and batch_starts[position] < stop:
+                batches.append(reader.get_batch(position))
+                position += 1
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+            if batches:
+                table = table.slice(offset - batch_starts[first], stop - offset)
+        if columns is not None:
+            index_columns = [name for name in (table.schema.pandas_metadata or {}).get("index_columns", [])
+                             if isinstance(name, str)]
+            table = table.select(list(columns) + index_columns)
+        return table.to_pandas()
+
+    def _read_columns(self, entry: Dict[str, Any], columns: Optional[Sequence[str]], offset: int, stop: Optional[int]):
+        names = entry["columns"]
+        selected = range(len(names)) if columns is None else [names.index(column) for column in columns]
+        index = _load_npy_rows(self._path(entry["dir"], entry["index"]), offset, stop)
+        data = {names[position]: np.array(_load_npy_rows(self._path(entry["dir"], entry["files"][position]),
+                                                         offset, stop))
+                for position in selected}
+        return pd.DataFrame(data, index=np.array(index))
@@ -0,0 +1,162 @@
+from typing import Dict, Any, Optional, Tuple
+
+from .base_module import BaseModule, VariantDefinition, Port
+from .workflow import Workflow
+from .execution_plan import ExecutionPlan, PlanStep, get_cached_plan, run_plan, SUB_WORKFLOW_INPUTS_KEY
+
+
+class SubWorkflowModule(BaseModule):
+    """
+    复合模块: 把一个完整的工作流封装为单个模块
+
+    内部工作流的指定端口被暴露为本模块的输入/输出端口 (端口类型与内部端口一致)。
+    引擎执行时会把复合模块展开到外层执行计划中，内部模块作为独立步骤调度，
+    结果键为 "复合模块ID/内部模块ID"，复合模块自身的键下保存暴露的输出端口。
+    同一个内部工作流可以被多个复合模块引用，其执行计划只编译一次并被共享。
+    """
+    is_composite = True
+
+    def __init__(self, name: str = "子工作流", description: str = "封装一个工作流",
+                 initial_variant_id: Optional[str] = None, initial_ports_config: Optional[Dict[str, bool]] = None,
+                 workflow: Optional[Workflow] = None):
+        self._workflow: Optional[Workflow] = None
+        self._exposed_inputs: Dict[str, Tuple[str, str]] = {}   # 暴露的输入端口名称 -> (内部模块ID, 内部端口名称)
+        self._exposed_outputs: Dict[str, Tuple[str, str]] = {}  # 暴露的输出端口名称 -> (内部模块ID, 内部端口名称)
+        super().__init__(name, description, initial_variant_id, initial_ports_config)
+        if workflow is not None:
+            self.set_workflow(workflow)
+
+    @classmethod
+    def _get_variant_definitions(cls) -> Dict[str, VariantDefinition]:
+        # 端口由暴露的内部端口动态生成，变体本身不定义端口
+        return {
+            "default": VariantDefinition(
+                variant_id="default",
+                variant_name="子工作流",
+                description="封装一个工作流，端口由暴露的内部端口决定",
+                port_definitions=[]
+            )
+        }
+
+    @property
+    def workflow(self) -> Optional[Workflow]:
+        """被封装的内部工作流"""
+        return self._workflow
+
+    @property
+    def exposed_inputs(self) -> Dict[str, Tuple[str, str]]:
+        return self._exposed_inputs
+
+    @property
+    def exposed_outputs(self) -> Dict[str, Tuple[str, str]]:
+        return self._exposed_outputs
+
+    def set_workflow(self, workflow: Workflow,
+                     exposed_inputs: Optional[Dict[str, Tuple[str, str]]] = None,
+                     exposed_outputs: Optional[Dict[str, Tuple[str, str]]] = None) -> None:
+        """
+        设置内部工作流，并可同时指定暴露的端口
+
+        Args:
+            workflow: 内部工作流 (可以被多个复合模块共享)
+            exposed_inputs: 暴露的输入端口名称 -> (内部模块ID, 内部输入端口名称)
+            exposed_outputs: 暴露的输出端口名称 -> (内部模块ID, 内部输出端口名称)
+        """
+        self._before_mutation()
+        # 内部工作流随外层快照按纪元写时复制 (见 Workflow.state_at)
+        workflow._cow_tracked = True
+        self._workflow = workflow
+        self._exposed_inputs = {}
+        self._exposed_outputs = {}
+        for name, (module_id, port_name) in (exposed_inputs or {}).items():
+            self.expose_input(name, module_id, port_name)
+        for name, (module_id, port_name) in (exposed_outputs or {}).items():
+            self.expose_output(name, module_id, port_name)
+        self._apply_active_variant_and_config()
+
+    def expose_input(self, name: str, module_id: str, port_name: str) -> None:
+        """把内部模块的输入端口暴露为本模块的输入端口"""
+        self._resolve_inner_port(module_id, port_name, 'input')
+        self._before_mutation()
+        self._exposed_inputs[name] = (module_id, port_name)
+        self._apply_active_variant_and_config()
+
+    def expose_output(self, name: str, module_id: str, port_name: str) -> None:
+        """把内部模块的输出端口暴露为本模块的输出端口"""
+        self._resolve_inner_port(module_id, port_name, 'output')
+        self._before_mutation()
+        self._exposed_outputs[name] = (module_id, port_name)
+        self._apply_active_variant_and_config()
+
+    def _resolve_inner_port(self, module_id: str, port_name: str, port_io_type: str):
+        """查找内部端口，不存在时抛出 ValueError"""
+        if self._workflow is None:
+            raise ValueError(f"复合模块 {self.name} 尚未设置内部工作流")
+        inner_module = self._workflow.modules.get(module_id)
+        if inner_module is None:
+            raise ValueError(f"内部工作流中不存在模块: {module_id}")
+        if port_io_type == 'input':
+            port = inner_module.get_input_port(port_name)
+        else:
+            port = inner_module.get_output_port(port_name)
+        if port is None:
+            raise ValueError(f"内部模块 {inner_module.name} 不存在{'输入' if port_io_type == 'input' else '输出'}端口: {port_name}")
+        return port
+
+    def _apply_active_variant_and_config(self) -> None:
+        """在变体端口 (为空) 的基础上，按暴露的内部端口生成本模块的端口"""
+        previous = {('input', port.name): port for port in self._input_ports.values()}
+        previous.update((('output', port.name), port) for port in self._output_ports.values())
+        super()._apply_active_variant_and_config()
+        if self._workflow is None:
+            return
+        for exposed, ports, ports_by_name, io_type in (
+                (self._exposed_inputs, self._input_ports, self._input_ports_by_name, 'input'),
+                (self._exposed_outputs, self._output_ports, self._output_ports_by_name, 'output')):
+            for name, (module_id, port_name) in exposed.items():
+                inner_port = self._resolve_inner_port(module_id, port_name, io_type)
+                # 类型和描述未变化的端口直接复用，保持端口ID和连接状态
+                port = previous.get((io_type, name))
+                if port is None or port.type != inner_port.type or port.description != inner_port.description:
+                    port = Port(name, inner_port.type, inner_port.description)
+                ports[port.id] = port
+                ports_by_name.setdefault(port.name, port)
+
+    def _snapshot_clone(self) -> 'SubWorkflowModule':
+        clone = super()._snapshot_clone()
+        clone._exposed_inputs = dict(self._exposed_inputs)
+        clone._exposed_outputs = dict(self._exposed_outputs)
+        return clone
+
+    def get_inner_plan(self) -> Optional[ExecutionPlan]:
+        """
+        获取内部工作流当前的执行计划 (按内部工作流的版本号缓存，所有引用者共享)
+        用于脱离引擎单独执行；在快照上编译时改用快照中的内部工作流 (见 compile_plan)
+        """
+        if self._workflow is None:
+            return None
+        return get_cached_plan(self._workflow)
+
+    def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """脱离引擎单独执行: 按内部计划顺序执行内部模块，返回暴露的输出端口"""
+        plan = self.get_inner_plan()
+        if plan is None:
+            return {}
+        input_sources = {}
+        for name, target in self._exposed_inputs.items():
+            input_sources[plan.resolve_input(target)] = [(SUB_WORKFLOW_INPUTS_KEY, name)]
+        steps = plan.flatten_into(self.id, input_sources, self.id)
+        steps.append(PlanStep(self.id, self, [], output_aliases={
+            name: (f"{self.id}/{module_id}", port_name)
+            for name, (module_id, port_name) in self._exposed_outputs.items()
+        }))
+        results = run_plan(steps, {SUB_WORKFLOW_INPUTS_KEY: dict(inputs)})
+        return results[self.id]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化时一并保存内部工作流和暴露的端口映射"""
+        data = super().to_dict()
+        data["sub_workflow"] = self._workflow.to_dict() if self._workflow is not None else None
+        data["exposed_inputs"] = {name: list(target) for name, target in self._exposed_inputs.items()}
+        data["exposed_outputs"] = {name: list(target) for name, target in self._exposed_outputs.items()}
+        return data
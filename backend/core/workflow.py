@@ -1,22 +1,38 @@
-from typing import Dict, List, Any, Set, Tuple, Optional, Union
+from typing import Dict, List, Any, Set, Tuple, Optional, Union, TYPE_CHECKING
 from uuid import uuid4
 import json
+import copy
+import gc
+import mmap
 import os
+import sys
+import threading
+import weakref
 from collections import deque
+from collections.abc import Mapping
+from contextlib import contextmanager
+from types import MappingProxyType
 
-from .base_module import BaseModule, Port
+from .base_module import BaseModule, Port, new_compact_id, gsnapshot_clock
+from .binary_format import encode_workflow, is_binary_workflow, BinaryWorkflowReader
+
+if TYPE_CHECKING:
+    from .workflow_patch import WorkflowPatch
 
 class Connection:
     """
     连接类，表示两个模块的端口之间的连接
+    使用 __slots__、紧凑ID并驻留端口名称，单个连接对象只占用少量内存
     """
+    __slots__ = ('_id', '_source_module_id', '_source_port_name', '_target_module_id', '_target_port_name')
+
     def __init__(self, source_module_id: str, source_port_name: str,
                  target_module_id: str, target_port_name: str):
-        self._id = str(uuid4())
+        self._id = new_compact_id()
         self._source_module_id = source_module_id
-        self._source_port_name = source_port_name
+        self._source_port_name = sys.intern(source_port_name)
         self._target_module_id = target_module_id
-        self._target_port_name = target_port_name
+        self._target_port_name = sys.intern(target_port_name)
     
     @property
     def id(self) -> str:
@@ -49,6 +65,180 @@ class Connection:
         }
 
 
+@contextmanager
+def _gc_paused():
+    """批量创建大量对象期间暂停循环垃圾回收，避免反复扫描整个对象图"""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def are_types_compatible(source_type: str, target_type: str) -> bool:
+    """
+    端口类型兼容性检查 (dev_plan.md 1.3.2)
+    简单实现：精确匹配，或任意一端为 'any'。未来可以扩展为更灵活的兼容性规则。
+    """
+    return source_type == target_type or source_type == 'any' or target_type == 'any'
+
+
+def _topological_sort(module_ids, connections) -> List[str]:
+    """
+    用 Kahn 算法对模块做拓扑排序
+    如果检测到循环依赖，会抛出 ValueError
+    """
+    adj: Dict[str, List[str]] = {module_id: [] for module_id in module_ids}
+    in_degree: Dict[str, int] = {module_id: 0 for module_id in module_ids}
+
+    for conn in connections:
+        # 确保模块存在于 adj 和 in_degree 中 (理论上应该存在，因为它们来自 self._modules)
+        if conn.source_module_id in adj and conn.target_module_id in adj:
+            adj[conn.source_module_id].append(conn.target_module_id)
+            in_degree[conn.target_module_id] += 1
+
+    queue = deque([module_id for module_id in in_degree if in_degree[module_id] == 0])
+    result_order: List[str] = []
+    
+    while queue:
+        u = queue.popleft()
+        result_order.append(u)
+        
+        for v in adj.get(u, []): # 使用 adj.get(u, []) 避免因模块移除等边缘情况导致的KeyError
+            if v in in_degree: # 确保 v 存在于 in_degree
+                in_degree[v] -= 1
+                if in_degree[v] == 0:
+                    queue.append(v)
+    
+    if len(result_order) != len(in_degree):
+        raise ValueError("工作流中存在循环依赖，无法确定执行顺序。")
+    return result_order
+
+
+def _write_file_atomic(filepath: str, data: bytes) -> None:
+    """
+    先写入同一目录下的临时文件再替换目标文件: 目标文件可能正被延迟加载的工作流内存映射，
+    直接截断会使映射失效；写入失败时原文件保持不变
+    """
+    tmp_path = filepath + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class _LazyModules(dict):
+    """
+    延迟加载的模块字典 (Workflow.load(..., lazy=True) 使用)
+
+    键为全部模块ID；尚未创建的模块的值为它在二进制文件中的记录序号 (int)，
+    第一次通过 [] / get / values / items 取值时才通过注册表创建模块实例并替换该序号。
+    只遍历键、判断是否存在、取长度都不会创建模块。
+    """
+    def __init__(self, reader: BinaryWorkflowReader, module_registry_instance, workflow: 'Workflow'):
+        super().__init__()
+        # 读取器放在与 copy() 得到的字典共享的列表中，关闭后所有副本都看到 None
+        self._reader_slot: List[Optional[BinaryWorkflowReader]] = [reader]
+        self._registry = module_registry_instance
+        self._workflow_ref = weakref.ref(workflow)
+        self._sub_workflows: Dict[str, 'Workflow'] = {}
+        # 已创建的模块 (与 copy() 得到的字典共享)，关闭读取器之后未创建的序号只能从这里取
+        self._created: Dict[str, BaseModule] = {}
+        self._lock = threading.RLock()
+        # 模块在加载时就已经存在: 之后创建的快照需要模块在修改前保留副本
+        self._epoch = gsnapshot_clock.epoch
+
+    def _materialize(self, module_id: str, position: int) -> BaseModule:
+        with self._lock:
+            value = dict.get(self, module_id)
+            if type(value) is not int:
+                return value  # 其他线程已经创建
+            module = self._created.get(module_id)
+            if module is not None:
+                # 共享读取器的其他字典 (快照或副本) 已经创建了该模块
+                dict.__setitem__(self, module_id, module)
+                return module
+            reader = self._reader_slot[0]
+            if reader is None:
+                raise ValueError(f"工作流已关闭，无法再创建模块: {module_id}")
+            module = Workflow._module_from_data(reader.module_data(position), self._registry,
+                                                self._sub_workflows, module_id)
+            module._cow_epoch = self._epoch
+            # 恢复端口的连接状态
+            workflow = self._workflow_ref()
+            if workflow is not None:
+                for conn in workflow.get_incoming_connections(module_id):
+                    port = module.get_input_port(conn.target_port_name)
+                    if port is not None:
+                        port.connect(conn.source_port_name)
+                for conn in workflow.get_outgoing_connections(module_id):
+                    port = module.get_output_port(conn.source_port_name)
+                    if port is not None:
+                        port.connect(conn.target_port_name)
+            dict.__setitem__(self, module_id, module)
+            self._created[module_id] = module
+            return module
+
+    def close(self) -> None:
+        """创建全部未创建的模块 (包括快照仍可能引用的模块)，然后关闭读取器和内存映射"""
+        with self._lock:
+            reader = self._reader_slot[0]
+            if reader is None:
+                return
+            self._materialize_all()
+            for position, module_id in enumerate(reader.module_ids()):
+                if module_id not in self._created:
+                    self._created[module_id] = Workflow._module_from_data(
+                        reader.module_data(position), self._registry, self._sub_workflows, module_id)
+                    self._created[module_id]._cow_epoch = self._epoch
+            # 关闭后所有副本都从 _created 中取模块
+            self._reader_slot[0] = None
+            reader.close()
+
+    @property
+    def loaded_count(self) -> int:
+        """已经创建实例的模块数量"""
+        return sum(1 for value in dict.values(self) if type(value) is not int)
+
+    def __getitem__(self, module_id: str) -> BaseModule:
+        value = dict.__getitem__(self, module_id)
+        if type(value) is int:
+            value = self._materialize(module_id, value)
+        return value
+
+    def get(self, module_id: str, default=None):
+        value = dict.get(self, module_id, default)
+        if type(value) is int:
+            value = self._materialize(module_id, value)
+        return value
+
+    def _materialize_all(self) -> None:
+        for module_id, value in list(dict.items(self)):
+            if type(value) is int:
+                self._materialize(module_id, value)
+
+    def values(self):
+        self._materialize_all()
+        return dict.values(self)
+
+    def items(self):
+        self._materialize_all()
+        return dict.items(self)
+
+    def copy(self) -> '_LazyModules':
+        """复制字典 (未创建的模块仍保持未创建状态，与原字典共享加载器)"""
+        clone = _LazyModules.__new__(_LazyModules)
+        dict.update(clone, self)
+        clone.__dict__.update(self.__dict__)
+        return clone
+
+
 class Workflow:
     """
     工作流类，管理模块和连接
@@ -59,6 +249,27 @@ class Workflow:
         self._description = description
         self._modules: Dict[str, BaseModule] = {}
         self._connections: Dict[str, Connection] = {}
+        # 邻接索引: 模块ID -> 连接列表，在每次连接/断开时维护；按端口查询时在该模块的连接中过滤
+        self._outgoing: Dict[str, List[Connection]] = {}  # 按源模块索引
+        self._incoming: Dict[str, List[Connection]] = {}  # 按目标模块索引
+        # 动态拓扑序 (Pearce-Kelly): 模块ID -> 序号，任意连接的源模块序号都小于目标模块序号。
+        # 序号不要求连续，移除模块时直接删除即可，新增连接时只在受影响区间内局部重排
+        self._topo_index: Dict[str, int] = {}
+        self._next_topo_index: int = 0
+        # 结构版本号: 增删模块或连接时递增，用于判断已编译的执行计划是否仍然有效
+        self._version: int = 0
+        # 修订号: 每应用一个补丁 (WorkflowPatch) 加一，用于检测补丁冲突并随工作流一起保存
+        self._revision: int = 0
+        self._compiled_plan = None  # 执行计划缓存 (见 execution_plan.get_cached_plan)
+        self._compiling_plan: bool = False
+        # 写时复制: 共享上面这些字典的存活快照，非空时下一次修改前需要先复制；
+        # 快照被释放 (例如引擎在运行结束后丢弃运行快照) 后自动移除，之后的修改不再复制
+        self._sharing_snapshots: 'weakref.WeakSet[WorkflowSnapshot]' = weakref.WeakSet()
+        # 被复合模块引用的内部工作流不通过自己的快照执行，而是由外层快照按纪元解析 (见 state_at)：
+        # 结构修改前如果期间创建过快照，先保留一份修改前的结构 (纪元, 工作流浅副本)
+        self._cow_tracked: bool = False
+        self._cow_epoch: int = 0
+        self._cow_history: List[Tuple[int, 'Workflow']] = []
         
     @property
     def id(self) -> str:
@@ -88,35 +299,166 @@ class Workflow:
     def connections(self) -> Dict[str, Connection]:
         return self._connections
     
+    @property
+    def version(self) -> int:
+        """工作流结构版本号 (模块或连接发生变化时递增)"""
+        return self._version
+    
+    @property
+    def revision(self) -> int:
+        """补丁修订号 (见 apply_patch)"""
+        return self._revision
+    
+    def apply_patch(self, patch: 'WorkflowPatch', module_registry_instance=None) -> int:
+        """
+        应用一个增量补丁 (添加/删除/更新模块、连接和参数)，开销只与补丁大小有关
+
+        补丁的 base_revision 必须等于当前修订号，否则抛出 ValueError (补丁冲突)；
+        任一操作失败时已应用的操作全部撤销并抛出 ValueError。
+
+        Args:
+            patch: 增量补丁
+            module_registry_instance: 模块注册表实例，补丁中添加的模块需要通过它创建
+
+        Returns:
+            应用后的修订号
+        """
+        from .workflow_patch import apply_patch
+        return apply_patch(self, patch, module_registry_instance)
+    
+    def snapshot(self) -> 'WorkflowSnapshot':
+        """
+        创建工作流的只读快照 (写时复制)
+
+        快照与工作流共享内部字典，创建快照不复制任何数据；之后工作流第一次被修改时
+        才复制这些字典，模块在修改自身参数、变体等状态前也会为快照保留修改前的副本。
+        因此在快照上执行时，界面可以继续编辑工作流而不会影响正在进行的执行。
+        """
+        snapshot = WorkflowSnapshot(self)
+        self._sharing_snapshots.add(snapshot)
+        return snapshot
+
+    def state_at(self, epoch: int) -> 'Workflow':
+        """
+        返回纪元为 epoch 的快照所看到的工作流结构 (之后结构未被修改时就是工作流本身)
+        只对被复合模块引用的内部工作流有效，外层工作流通过自己的快照 (snapshot()) 执行
+        """
+        if epoch <= self._cow_epoch:
+            for entry_epoch, preserved in self._cow_history:
+                if entry_epoch >= epoch:
+                    return preserved
+        return self
+
+    def _preserve_structure(self, epoch: int) -> bool:
+        """为纪元不早于最早存活快照的快照保留修改前的结构，返回是否保留了 (调用方需随后复制内部字典)"""
+        oldest = gsnapshot_clock.oldest_live_epoch()
+        # 丢弃已经没有快照使用的旧结构
+        history = [entry for entry in self._cow_history if oldest is not None and entry[0] >= oldest]
+        preserved = epoch != self._cow_epoch and oldest is not None and epoch >= oldest
+        if preserved:
+            history.append((epoch, copy.copy(self)))
+        self._cow_history = history
+        self._cow_epoch = epoch
+        return preserved
+
+    def _ensure_exclusive(self) -> None:
+        """修改结构前调用: 如果内部字典正被存活的快照共享，先复制一份，快照继续使用原来的字典"""
+        preserved = False
+        if self._cow_tracked:
+            epoch = gsnapshot_clock._epoch
+            if epoch != self._cow_epoch or self._cow_history:
+                preserved = self._preserve_structure(epoch)
+        if self._sharing_snapshots or preserved:
+            self._modules = self._modules.copy()
+            self._connections = dict(self._connections)
+            self._outgoing = {module_id: list(conns) for module_id, conns in self._outgoing.items()}
+            self._incoming = {module_id: list(conns) for module_id, conns in self._incoming.items()}
+            self._topo_index = dict(self._topo_index)
+            self._sharing_snapshots = weakref.WeakSet()
+
     def add_module(self, module: BaseModule) -> str:
         """添加模块到工作流中"""
+        self._ensure_exclusive()
         self._modules[module.id] = module
+        if module.id not in self._topo_index:
+            self._topo_index[module.id] = self._next_topo_index
+            self._next_topo_index += 1
+        self._version += 1
         return module.id
     
     def remove_module(self, module_id: str) -> bool:
         """从工作流中移除模块"""
         if module_id in self._modules:
-            # 移除相关连接
-            connections_to_remove = []
-            for conn_id, conn in self._connections.items():
-                if conn.source_module_id == module_id or conn.target_module_id == module_id:
-                    connections_to_remove.append(conn_id)
+            self._ensure_exclusive()
+            # 移除相关连接 (通过邻接索引只访问该模块自身的连接)
+            connections_to_remove = [conn.id for conn in self.get_outgoing_connections(module_id)]
+            connections_to_remove.extend(conn.id for conn in self.get_incoming_connections(module_id))
             
             for conn_id in connections_to_remove:
                 self.remove_connection(conn_id)
             
             # 移除模块
             del self._modules[module_id]
+            self._outgoing.pop(module_id, None)
+            self._incoming.pop(module_id, None)
+            self._topo_index.pop(module_id, None)
+            self._version += 1
             return True
         return False
     
     def _find_port_by_name(self, module: BaseModule, port_name: str, port_io_type: str) -> Optional[Port]:
         """辅助函数：根据名称和类型查找端口对象"""
-        ports_dict = module.output_ports if port_io_type == 'output' else module.input_ports
-        for port in ports_dict.values(): # 遍历 Port 对象
-            if port.name == port_name:
-                return port
-        return None
+        if port_io_type == 'output':
+            return module.get_output_port(port_name)
+        return module.get_input_port(port_name)
+    
+    def _index_connection(self, conn: Connection) -> None:
+        """将连接加入邻接索引"""
+        self._outgoing.setdefault(conn.source_module_id, []).append(conn)
+        self._incoming.setdefault(conn.target_module_id, []).append(conn)
+    
+    def _unindex_connection(self, conn: Connection) -> None:
+        """将连接从邻接索引中移除"""
+        for index, module_id in ((self._outgoing, conn.source_module_id), (self._incoming, conn.target_module_id)):
+            conns = index.get(module_id)
+            if conns is None:
+                continue
+            try:
+                conns.remove(conn)
+            except ValueError:
+                pass
+            if not conns:
+                del index[module_id]
+    
+    def get_outgoing_connections(self, module_id: str, port_name: Optional[str] = None) -> List[Connection]:
+        """
+        获取从指定模块（或其指定输出端口）出发的连接
+        
+        Args:
+            module_id: 源模块ID
+            port_name: 源端口名称，为None时返回该模块所有输出端口的连接
+        """
+        conns = self._outgoing.get(module_id)
+        if not conns:
+            return []
+        if port_name is not None:
+            return [conn for conn in conns if conn.source_port_name == port_name]
+        return list(conns)
+    
+    def get_incoming_connections(self, module_id: str, port_name: Optional[str] = None) -> List[Connection]:
+        """
+        获取连接到指定模块（或其指定输入端口）的连接
+        
+        Args:
+            module_id: 目标模块ID
+            port_name: 目标端口名称，为None时返回该模块所有输入端口的连接
+        """
+        conns = self._incoming.get(module_id)
+        if not conns:
+            return []
+        if port_name is not None:
+            return [conn for conn in conns if conn.target_port_name == port_name]
+        return list(conns)
 
     def connect(self, source_module_id: str, source_port_name: str, 
                 target_module_id: str, target_port_name: str) -> Optional[str]:
@@ -148,12 +490,25 @@ class Workflow:
             return None
         
         # 类型兼容性检查 (dev_plan.md 1.3.2)
-        # 简单实现：精确匹配。未来可以扩展为更灵活的兼容性规则。
-        if source_port.type != target_port.type and source_port.type != 'any' and target_port.type != 'any':
+        if not are_types_compatible(source_port.type, target_port.type):
+            return None
+        
+        # 环检测与拓扑序维护：会形成环的连接直接拒绝
+        self._ensure_exclusive()
+        if not self._update_topological_order(source_module_id, target_module_id):
             return None
 
-        connection = Connection(source_module_id, source_port_name, target_module_id, target_port_name)
+        return self._attach_connection(source_module, source_port, target_module, target_port)
+    
+    def _attach_connection(self, source_module: BaseModule, source_port: Port,
+                           target_module: BaseModule, target_port: Port) -> str:
+        """创建连接对象并写入连接字典、邻接索引和端口连接状态 (调用方负责校验与拓扑序)"""
+        self._ensure_exclusive()
+        # 使用模块自身持有的ID字符串，避免每条连接各自保存一份相同的字符串
+        connection = Connection(source_module.id, source_port.name, target_module.id, target_port.name)
         self._connections[connection.id] = connection
+        self._index_connection(connection)
+        self._version += 1
         
         # 更新 Port 对象的连接状态 (现在使用 port_name)
         source_port.connect(target_port.name) # 连接到目标端口的名称
@@ -161,10 +516,27 @@ class Workflow:
         
         return connection.id
     
+    def transaction(self, skip_invalid: bool = False) -> 'WorkflowTransaction':
+        """
+        开始一个批量编辑事务，用于一次性添加大量模块和连接
+        
+        用法:
+            with workflow.transaction() as tx:
+                tx.add_module(module_a)
+                tx.add_module(module_b)
+                tx.connect(module_a.id, "result", module_b.id, "number1")
+        
+        Args:
+            skip_invalid: 为False时任何无效连接都会导致整个事务回滚；
+                          为True时跳过无效连接，其余修改照常提交
+        """
+        return WorkflowTransaction(self, skip_invalid)
+    
     def remove_connection(self, connection_id: str) -> bool:
         """移除连接 (基于连接ID)"""
         if connection_id not in self._connections:
             return False
+        self._ensure_exclusive()
             
         conn = self._connections[connection_id]
         
@@ -182,73 +554,145 @@ class Workflow:
                 target_port.disconnect(conn.source_port_name) # 断开与源端口名称的连接
             
         del self._connections[connection_id]
+        self._unindex_connection(conn)
+        self._version += 1
         return True
 
-    def handle_module_variant_change(self, module_id: str, old_ports: Dict[str, Set[str]], new_ports: Dict[str, Set[str]]):
+    def handle_module_variant_change(self, module_id: str, old_ports: Dict[str, Set[str]],
+                                     new_ports: Dict[str, Set[str]]) -> List[Connection]:
         """
         处理模块变体更改导致的端口变化，移除失效的连接。
         old_ports/new_ports: {'input': {port_name1, port_name2}, 'output': {port_name3}}
+
+        Returns:
+            被移除的连接列表
         """
         removed_input_ports = old_ports.get('input', set()) - new_ports.get('input', set())
         removed_output_ports = old_ports.get('output', set()) - new_ports.get('output', set())
         
         connections_to_remove = []
-        for conn_id, conn in self._connections.items():
-            if conn.source_module_id == module_id and conn.source_port_name in removed_output_ports:
-                connections_to_remove.append(conn_id)
-            elif conn.target_module_id == module_id and conn.target_port_name in removed_input_ports:
-                connections_to_remove.append(conn_id)
+        for port_name in removed_output_ports:
+            connections_to_remove.extend(self.get_outgoing_connections(module_id, port_name))
+        for port_name in removed_input_ports:
+            connections_to_remove.extend(self.get_incoming_connections(module_id, port_name))
         
-        for conn_id in connections_to_remove:
-            self.remove_connection(conn_id)
+        for conn in connections_to_remove:
+            self.remove_connection(conn.id)
+        return connections_to_remove
 
     def get_dependent_modules(self, module_id: str) -> Set[str]:
         """获取依赖指定模块的所有模块ID"""
-        dependent_modules = set()
-        for conn in self._connections.values():
-            if conn.source_module_id == module_id:
-                dependent_modules.add(conn.target_module_id)
-        return dependent_modules
+        return {conn.target_module_id for conn in self.get_outgoing_connections(module_id)}
     
     def get_dependency_modules(self, module_id: str) -> Set[str]:
         """获取指定模块依赖的所有模块ID"""
-        dependency_modules = set()
-        for conn in self._connections.values():
-            if conn.target_module_id == module_id:
-                dependency_modules.add(conn.source_module_id)
-        return dependency_modules
+        return {conn.source_module_id for conn in self.get_incoming_connections(module_id)}
     
-    def _get_execution_order(self) -> List[str]:
+    def creates_cycle(self, source_module_id: str, target_module_id: str) -> bool:
         """
-        计算模块执行顺序（拓扑排序）
-        返回模块ID列表，按执行顺序排列
+        检查新增一条 源模块 -> 目标模块 的连接是否会形成环
+        只搜索拓扑序位于两者之间的受影响区间，不修改工作流
         """
-        adj: Dict[str, List[str]] = {module_id: [] for module_id in self._modules}
-        in_degree: Dict[str, int] = {module_id: 0 for module_id in self._modules}
+        if source_module_id == target_module_id:
+            return True
+        topo_index = self._topo_index
+        if source_module_id not in topo_index or target_module_id not in topo_index:
+            return False
+        upper = topo_index[source_module_id]
+        if topo_index[target_module_id] > upper:
+            return False
+        return self._search_forward(target_module_id, upper, source_module_id) is None
 
-        for conn in self._connections.values():
-            # 确保模块存在于 adj 和 in_degree 中 (理论上应该存在，因为它们来自 self._modules)
-            if conn.source_module_id in adj and conn.target_module_id in adj:
-                adj[conn.source_module_id].append(conn.target_module_id)
-                in_degree[conn.target_module_id] += 1
+    def _search_forward(self, start_module_id: str, upper: int, stop_module_id: str) -> Optional[List[str]]:
+        """
+        从 start 沿出边深度优先搜索序号不大于 upper 的模块
+        
+        Returns:
+            访问到的模块列表；如果到达 stop_module_id (即存在环) 则返回None
+        """
+        topo_index = self._topo_index
+        visited = {start_module_id}
+        stack = [start_module_id]
+        result = []
+        while stack:
+            module_id = stack.pop()
+            result.append(module_id)
+            for conn in self._outgoing.get(module_id, ()):
+                next_id = conn.target_module_id
+                if next_id == stop_module_id:
+                    return None
+                if next_id not in visited and topo_index.get(next_id, upper + 1) <= upper:
+                    visited.add(next_id)
+                    stack.append(next_id)
+        return result
+
+    def _search_backward(self, start_module_id: str, lower: int) -> List[str]:
+        """从 start 沿入边深度优先搜索序号不小于 lower 的模块"""
+        topo_index = self._topo_index
+        visited = {start_module_id}
+        stack = [start_module_id]
+        result = []
+        while stack:
+            module_id = stack.pop()
+            result.append(module_id)
+            for conn in self._incoming.get(module_id, ()):
+                prev_id = conn.source_module_id
+                if prev_id not in visited and topo_index.get(prev_id, lower - 1) >= lower:
+                    visited.add(prev_id)
+                    stack.append(prev_id)
+        return result
 
-        queue = deque([module_id for module_id in self._modules if in_degree[module_id] == 0])
-        result_order: List[str] = []
+    def _update_topological_order(self, source_module_id: str, target_module_id: str) -> bool:
+        """
+        在新增连接 源模块 -> 目标模块 之前更新动态拓扑序 (Pearce-Kelly 算法)
+        只有当目标模块的序号小于源模块时才需要重排，且只重排两者之间可达的模块
         
-        while queue:
-            u = queue.popleft()
-            result_order.append(u)
-            
-            for v in adj.get(u, []): # 使用 adj.get(u, []) 避免因模块移除等边缘情况导致的KeyError
-                if v in in_degree: # 确保 v 存在于 in_degree
-                    in_degree[v] -= 1
-                    if in_degree[v] == 0:
-                        queue.append(v)
-        
-        if len(result_order) != len(self._modules):
-            raise ValueError("工作流中存在循环依赖，无法确定执行顺序。")
-            
-        return result_order
+        Returns:
+            True 表示可以添加该连接；False 表示该连接会形成环，拓扑序保持不变
+        """
+        if source_module_id == target_module_id:
+            return False
+        topo_index = self._topo_index
+        if source_module_id not in topo_index or target_module_id not in topo_index:
+            self._rebuild_topological_order()
+            topo_index = self._topo_index
+        lower = topo_index[target_module_id]
+        upper = topo_index[source_module_id]
+        if upper < lower:
+            return True
+        
+        forward = self._search_forward(target_module_id, upper, source_module_id)
+        if forward is None:
+            return False
+        backward = self._search_backward(source_module_id, lower)
+        
+        # 保持两组内部的相对顺序，把 backward 整体放到 forward 之前，复用它们原来占用的序号
+        forward.sort(key=topo_index.__getitem__)
+        backward.sort(key=topo_index.__getitem__)
+        affected = backward + forward
+        slots = sorted(topo_index[module_id] for module_id in affected)
+        for module_id, slot in zip(affected, slots):
+            topo_index[module_id] = slot
+        return True
+
+    def _rebuild_topological_order(self) -> None:
+        """
+        用 Kahn 算法从头重建拓扑序 (用于模块未经 add_module 直接写入 _modules 等情况)
+        如果检测到循环依赖，会抛出 ValueError
+        """
+        result_order = _topological_sort(self._modules, self._connections.values())
+        # 整体替换字典 (而不是原地修改)，与快照共享的旧字典保持不变
+        self._topo_index = {module_id: index for index, module_id in enumerate(result_order)}
+        self._next_topo_index = len(result_order)
+
+    def _get_execution_order(self) -> List[str]:
+        """
+        获取模块执行顺序（拓扑排序）
+        返回模块ID列表，按执行顺序排列。拓扑序在连接时增量维护，这里只需按序号排序
+        """
+        if len(self._topo_index) != len(self._modules):
+            self._rebuild_topological_order()
+        return sorted(self._modules, key=self._topo_index.__getitem__)
     
     def to_dict(self) -> Dict[str, Any]:
         """将工作流转换为字典，用于序列化"""
@@ -256,73 +700,596 @@ class Workflow:
             "id": self._id,
             "name": self._name,
             "description": self._description,
+            "revision": self._revision,
             "modules": {module_id: module.to_dict() for module_id, module in self._modules.items()},
             "connections": {conn_id: conn.to_dict() for conn_id, conn in self._connections.items()}
         }
     
     def save(self, filepath: str) -> None:
-        """保存工作流到文件"""
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        """保存工作流到文件 (JSON 格式，可读且与前端和旧版本兼容)"""
+        _write_file_atomic(filepath, json.dumps(self.to_dict(), indent=2, ensure_ascii=False).encode('utf-8'))
+    
+    def save_binary(self, filepath: str) -> None:
+        """以紧凑的二进制格式保存工作流 (见 binary_format.py)，load() 会自动识别该格式"""
+        _write_file_atomic(filepath, encode_workflow(self.to_dict()))
+    
+    def close(self) -> None:
+        """
+        释放延迟加载 (load(..., lazy=True)) 打开的内存映射和文件句柄: 先创建全部未创建的模块，
+        之后工作流仍可正常使用。非延迟加载的工作流调用此方法没有效果
+        """
+        if isinstance(self._modules, _LazyModules):
+            self._modules.close()
+    
+    def __enter__(self) -> 'Workflow':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
     
     @classmethod
-    def load(cls, filepath: str, module_registry_instance) -> 'Workflow':
+    def load(cls, filepath: str, module_registry_instance, lazy: bool = False) -> 'Workflow':
         """
-        从文件加载工作流
+        从文件加载工作流 (根据文件开头的魔数自动识别 JSON 或二进制格式)
         
         Args:
             filepath: 文件路径
             module_registry_instance: 模块注册表实例
+            lazy: 为True且文件为二进制格式时，通过内存映射只读取头部、字符串表和连接表，
+                  模块在第一次被访问或执行时才创建 (见 _load_lazy)；JSON 文件忽略此参数
             
         Returns:
             工作流实例
         """
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if lazy:
+            workflow = cls._load_lazy(filepath, module_registry_instance)
+            if workflow is not None:
+                return workflow
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        
+        with _gc_paused():
+            if is_binary_workflow(raw):
+                reader = BinaryWorkflowReader(raw)
+                module_items = ((module_data['id'], module_data) for module_data in reader.iter_module_data())
+                return cls._build(reader.meta, module_items, reader.iter_connections(), module_registry_instance)
+            return cls._from_data(json.loads(raw.decode('utf-8')), module_registry_instance)
+    
+    @classmethod
+    def _load_lazy(cls, filepath: str, module_registry_instance) -> Optional['Workflow']:
+        """
+        以内存映射方式打开二进制工作流，只建立模块索引、连接和拓扑序，不创建模块实例
+        文件不是二进制格式时返回None
+
+        连接直接按文件中的记录建立 (文件在保存时已经校验过)，不再逐条检查端口和类型
+        """
+        with open(filepath, 'rb') as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return None  # 空文件
+        if not is_binary_workflow(buffer):
+            buffer.close()
+            return None
+        reader = BinaryWorkflowReader(buffer)
+        meta = reader.meta
+        workflow = cls(meta['name'], meta.get('description', ''))
+        workflow._id = meta.get('id', workflow._id)
+        workflow._revision = meta.get('revision', 0)
+        
+        with _gc_paused():
+            modules = _LazyModules(reader, module_registry_instance, workflow)
+            for position, module_id in enumerate(reader.module_ids()):
+                dict.__setitem__(modules, module_id, position)
+            workflow._modules = modules
+            connections = workflow._connections
+            outgoing = workflow._outgoing
+            incoming = workflow._incoming
+            for source_module_id, source_port_name, target_module_id, target_port_name in reader.iter_connections():
+                if source_module_id not in modules or target_module_id not in modules:
+                    continue
+                connection = Connection(source_module_id, source_port_name, target_module_id, target_port_name)
+                connections[connection._id] = connection
+                outgoing.setdefault(source_module_id, []).append(connection)
+                incoming.setdefault(target_module_id, []).append(connection)
+            order = _topological_sort(modules, connections.values())
+            workflow._topo_index = {module_id: index for index, module_id in enumerate(order)}
+            workflow._next_topo_index = len(order)
+        return workflow
+    
+    @classmethod
+    def _from_data(cls, data: Dict[str, Any], module_registry_instance,
+                   sub_workflows: Optional[Dict[str, 'Workflow']] = None) -> 'Workflow':
+        """
+        根据 to_dict() 格式的数据重建工作流 (模块通过注册表创建，连接通过事务批量提交)
+        sub_workflows 记录已重建的子工作流 (按ID)，同一个子工作流被多处引用时只重建一次并共享
+        """
+        connections = ((conn_data['source_module_id'], conn_data['source_port_name'],
+                        conn_data['target_module_id'], conn_data['target_port_name'])
+                       for conn_data in data.get('connections', {}).values())
+        return cls._build(data, ((module_data.get('id', module_id), module_data)
+                                 for module_id, module_data in data.get('modules', {}).items()),
+                          connections, module_registry_instance, sub_workflows)
+    
+    @classmethod
+    def _build(cls, meta: Dict[str, Any], module_items, connection_specs, module_registry_instance,
+               sub_workflows: Optional[Dict[str, 'Workflow']] = None) -> 'Workflow':
+        """
+        根据工作流元数据 (name/id/description/revision)、模块数据和连接端点重建工作流
         
-        workflow = cls(data['name'], data.get('description', ''))
-        workflow._id = data.get('id', str(uuid4()))
+        Args:
+            meta: 工作流元数据
+            module_items: 可迭代的 (模块ID, 模块数据)，模块数据为 BaseModule.to_dict() 格式
+            connection_specs: 可迭代的 (源模块ID, 源端口名称, 目标模块ID, 目标端口名称)
+        """
+        if sub_workflows is None:
+            sub_workflows = {}
+        workflow = cls(meta['name'], meta.get('description', ''))
+        workflow._id = meta.get('id', str(uuid4()))
+        workflow._revision = meta.get('revision', 0)
         
         # 创建模块
-        for module_id, module_data in data.get('modules', {}).items():
-            module_type_name = module_data.get('module_type')
-            if not module_type_name:
-                module_type_name = module_data.get('name')
+        modules: List[BaseModule] = []
+        for module_id, module_data in module_items:
+            modules.append(cls._module_from_data(module_data, module_registry_instance, sub_workflows, module_id))
+        
+        # 模块与连接通过一个事务批量提交，只做一次校验与拓扑排序；
+        # 与逐条 connect() 一致，无效的连接会被跳过
+        with workflow.transaction(skip_invalid=True) as tx:
+            for module_instance in modules:
+                tx.add_module(module_instance)
+            for spec in connection_specs:
+                tx.connect(*spec)
+        
+        return workflow 
 
-            if not module_type_name or not module_registry_instance.get(module_type_name):
-                raise ValueError(f"加载失败：未知的模块类型 '{module_type_name}' 或模块未在注册表中注册。模块数据: {module_data}")
-            
-            module_instance = module_registry_instance.create_instance(
-                module_type_name,
-                name=module_data.get('name'),
-                description=module_data.get('description'),
-                initial_variant_id=module_data.get('current_variant_id'),
-                initial_ports_config=module_data.get('current_ports_config')
-            )
-            
-            if not module_instance:
-                raise ValueError(f"无法为类型 '{module_type_name}' 创建模块实例。")
-
-            module_instance._id = module_data.get('id', module_id)
-            module_instance._parameters = module_data.get('parameters', {})
-            module_instance.position = tuple(module_data.get('position', (0.0, 0.0)))
-
-            workflow._modules[module_instance.id] = module_instance
-        
-        # 创建连接 (在所有模块都已创建并应用变体后)
-        for conn_id, conn_data in data.get('connections', {}).items():
-            source_module_id = conn_data['source_module_id']
-            target_module_id = conn_data['target_module_id']
-            source_port_name = conn_data['source_port_name']
-            target_port_name = conn_data['target_port_name']
-
-            conn_result_id = workflow.connect(
-                source_module_id, 
-                source_port_name, 
-                target_module_id, 
-                target_port_name
-            )
-            if conn_result_id:
-                pass
+    @classmethod
+    def _module_from_data(cls, module_data: Dict[str, Any], module_registry_instance,
+                          sub_workflows: Optional[Dict[str, 'Workflow']] = None,
+                          module_id: Optional[str] = None) -> BaseModule:
+        """根据 BaseModule.to_dict() 格式的数据通过注册表创建模块实例 (不加入工作流)"""
+        if sub_workflows is None:
+            sub_workflows = {}
+        module_type_name = module_data.get('module_type')
+        if not module_type_name:
+            module_type_name = module_data.get('name')
+
+        if not module_type_name or not module_registry_instance.get(module_type_name):
+            raise ValueError(f"加载失败：未知的模块类型 '{module_type_name}' 或模块未在注册表中注册。模块数据: {module_data}")
+        
+        module_instance = module_registry_instance.create_instance(
+            module_type_name,
+            name=module_data.get('name'),
+            description=module_data.get('description'),
+            initial_variant_id=module_data.get('current_variant_id'),
+            initial_ports_config=module_data.get('current_ports_config')
+        )
+        
+        if not module_instance:
+            raise ValueError(f"无法为类型 '{module_type_name}' 创建模块实例。")
+
+        module_instance._id = module_data.get('id', module_id)
+        module_instance._parameters = module_data.get('parameters', {})
+        module_instance.position = tuple(module_data.get('position', (0.0, 0.0)))
         
-        return workflow 
\ No newline at end of file
+        # 复合模块: 恢复内部工作流与暴露的端口映射
+        sub_data = module_data.get('sub_workflow')
+        if sub_data:
+            sub_workflow = sub_workflows.get(sub_data.get('id'))
+            if sub_workflow is None:
+                sub_workflow = cls._from_data(sub_data, module_registry_instance, sub_workflows)
+                sub_workflows[sub_workflow.id] = sub_workflow
+            module_instance.set_workflow(
+                sub_workflow,
+                {name: tuple(target) for name, target in module_data.get('exposed_inputs', {}).items()},
+                {name: tuple(target) for name, target in module_data.get('exposed_outputs', {}).items()}
+            )
+        return module_instance
+
+class WorkflowTransaction:
+    """
+    工作流批量编辑事务
+
+    add_module / connect 只记录待提交的修改，commit() 时一次性完成校验
+    (模块ID唯一、模块和端口存在、类型兼容、无环)，然后原子地写入工作流；
+    任何校验失败都会抛出 ValueError，工作流保持不变。
+    作为上下文管理器使用时，正常退出自动提交，发生异常则自动回滚。
+    """
+    def __init__(self, workflow: Workflow, skip_invalid: bool = False):
+        self._workflow = workflow
+        self._skip_invalid = skip_invalid
+        self._pending_modules: Dict[str, BaseModule] = {}
+        self._pending_connections: List[Tuple[str, str, str, str]] = []
+        self._rejected: List[Tuple[Tuple[str, str, str, str], str]] = []
+        self._closed = False
+
+    @property
+    def rejected(self) -> List[Tuple[Tuple[str, str, str, str], str]]:
+        """skip_invalid 模式下被跳过的连接及原因"""
+        return list(self._rejected)
+
+    def add_module(self, module: BaseModule) -> str:
+        """记录待添加的模块"""
+        self._check_open()
+        self._pending_modules[module.id] = module
+        return module.id
+
+    def connect(self, source_module_id: str, source_port_name: str,
+                target_module_id: str, target_port_name: str) -> None:
+        """记录待创建的连接 (参数与 Workflow.connect 相同)"""
+        self._check_open()
+        self._pending_connections.append((source_module_id, source_port_name, target_module_id, target_port_name))
+
+    def rollback(self) -> None:
+        """放弃所有待提交的修改"""
+        self._pending_modules.clear()
+        self._pending_connections.clear()
+        self._closed = True
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise ValueError("事务已经提交或回滚")
+
+    def commit(self) -> List[str]:
+        """
+        校验并提交所有修改
+
+        Returns:
+            新建连接的ID列表 (与 connect 调用顺序一致，跳过的连接不包含在内)
+        """
+        self._check_open()
+        with _gc_paused():
+            return self._commit()
+
+    def _commit(self) -> List[str]:
+        workflow = self._workflow
+        workflow._ensure_exclusive()
+        modules = workflow._modules
+        pending_modules = self._pending_modules
+        errors: List[str] = []
+
+        for module_id in pending_modules:
+            if module_id in modules and modules[module_id] is not pending_modules[module_id]:
+                errors.append(f"模块ID重复: {module_id}")
+
+        # 校验连接: 模块与端口存在、类型兼容
+        resolved: List[Tuple[Tuple[str, str, str, str], BaseModule, Port, BaseModule, Port]] = []
+        for spec in self._pending_connections:
+            source_module_id, source_port_name, target_module_id, target_port_name = spec
+            source_module = pending_modules.get(source_module_id) or modules.get(source_module_id)
+            target_module = pending_modules.get(target_module_id) or modules.get(target_module_id)
+            reason = None
+            if source_module is None or target_module is None:
+                reason = "模块不存在"
+            else:
+                # 直接访问端口名称索引，避免大批量时的属性调用开销
+                source_port = source_module._output_ports_by_name.get(source_port_name)
+                target_port = target_module._input_ports_by_name.get(target_port_name)
+                if source_port is None or target_port is None:
+                    reason = "端口不存在"
+                elif source_port._type != target_port._type and not are_types_compatible(source_port._type, target_port._type):
+                    reason = f"端口类型不兼容 ({source_port.type} -> {target_port.type})"
+                elif source_module_id == target_module_id:
+                    reason = "模块不能连接到自身"
+            if reason is None:
+                resolved.append((spec, source_module, source_port, target_module, target_port))
+            elif self._skip_invalid:
+                self._rejected.append((spec, reason))
+            else:
+                errors.append(f"{source_module_id}.{source_port_name} -> {target_module_id}.{target_port_name}: {reason}")
+
+        # 在现有拓扑序上只重排受新连接影响的区间并检测环；现有拓扑序不完整时对整张图做 Kahn 排序
+        incremental = len(workflow._topo_index) == len(modules)
+        ordering = None
+        if not errors:
+            ordering = self._order_incrementally(resolved) if incremental else self._compute_order(resolved)
+            if ordering is None and not self._skip_invalid:
+                errors.append("提交的连接会形成循环依赖")
+
+        if errors:
+            self.rollback()
+            shown = "; ".join(errors[:10])
+            more = f" (另有 {len(errors) - 10} 处错误)" if len(errors) > 10 else ""
+            raise ValueError(f"事务提交失败: {shown}{more}")
+
+        # 写入工作流
+        for module in pending_modules.values():
+            modules[module.id] = module
+        connection_ids: List[str] = []
+        if ordering is not None:
+            connections = workflow._connections
+            outgoing = workflow._outgoing
+            incoming = workflow._incoming
+            for _, source_module, source_port, target_module, target_port in resolved:
+                # 与 _attach_connection 相同，展开以减少大批量提交时的函数调用
+                connection = Connection(source_module._id, source_port._name, target_module._id, target_port._name)
+                connection_id = connection._id
+                connections[connection_id] = connection
+                conns = outgoing.get(connection._source_module_id)
+                if conns is None:
+                    outgoing[connection._source_module_id] = [connection]
+                else:
+                    conns.append(connection)
+                conns = incoming.get(connection._target_module_id)
+                if conns is None:
+                    incoming[connection._target_module_id] = [connection]
+                else:
+                    conns.append(connection)
+                source_port.connect(target_port._name)
+                target_port.connect(source_port._name)
+                connection_ids.append(connection_id)
+            topo_updates, next_topo_index = ordering
+            if incremental:
+                workflow._topo_index.update(topo_updates)
+            else:
+                workflow._topo_index = topo_updates
+            workflow._next_topo_index = next_topo_index
+        else:
+            # skip_invalid 模式下存在环：先登记模块，再逐条增量加入连接，跳过会形成环的连接
+            for module in pending_modules.values():
+                if module.id not in workflow._topo_index:
+                    workflow._topo_index[module.id] = workflow._next_topo_index
+                    workflow._next_topo_index += 1
+            for spec, source_module, source_port, target_module, target_port in resolved:
+                if workflow._update_topological_order(source_module.id, target_module.id):
+                    connection_ids.append(workflow._attach_connection(source_module, source_port, target_module, target_port))
+                else:
+                    self._rejected.append((spec, "会形成循环依赖"))
+        workflow._version += 1
+
+        self._pending_modules = {}
+        self._pending_connections = []
+        self._closed = True
+        return connection_ids
+
+    def _order_incrementally(self, resolved: List[Tuple[Tuple[str, str, str, str], BaseModule, Port, BaseModule, Port]]
+                             ) -> Optional[Tuple[Dict[str, int], int]]:
+        """
+        在现有拓扑序的基础上为待提交的模块和连接计算序号，不修改工作流 (Pearce-Kelly 算法的批量形式)
+
+        新模块依次排在末尾；与现有顺序一致的连接不需要处理，其余连接逐条只重排两端之间
+        受影响的模块 (与 Workflow._update_topological_order 相同)，开销与受影响的区间而不是整张图成正比。
+
+        Returns:
+            (需要更新的 模块ID -> 序号, 下一个可用序号)；存在环时返回None
+        """
+        workflow = self._workflow
+        topo_index = workflow._topo_index
+        existing_outgoing = workflow._outgoing
+        existing_incoming = workflow._incoming
+        updates: Dict[str, int] = {}
+        next_topo_index = workflow._next_topo_index
+        for module_id in self._pending_modules:
+            if module_id not in topo_index:
+                updates[module_id] = next_topo_index
+                next_topo_index += 1
+
+        def index_of(module_id: str) -> int:
+            index = updates.get(module_id)
+            return topo_index[module_id] if index is None else index
+
+        # 已经加入的新连接 (邻接表)，搜索时与工作流中现有的连接一起遍历
+        new_outgoing: Dict[str, List[str]] = {}
+        new_incoming: Dict[str, List[str]] = {}
+
+        def add_edge(source_module_id: str, target_module_id: str) -> None:
+            new_outgoing.setdefault(source_module_id, []).append(target_module_id)
+            new_incoming.setdefault(target_module_id, []).append(source_module_id)
+
+        def successors(module_id: str):
+            for conn in existing_outgoing.get(module_id, ()):
+                yield conn.target_module_id
+            yield from new_outgoing.get(module_id, ())
+
+        def predecessors(module_id: str):
+            for conn in existing_incoming.get(module_id, ()):
+                yield conn.source_module_id
+            yield from new_incoming.get(module_id, ())
+
+        def search(start_module_id: str, neighbors, within, stop_module_id: Optional[str]) -> Optional[List[str]]:
+            visited = {start_module_id}
+            stack = [start_module_id]
+            while stack:
+                for next_id in neighbors(stack.pop()):
+                    if next_id == stop_module_id:
+                        return None
+                    if next_id not in visited and within(index_of(next_id)):
+                        visited.add(next_id)
+                        stack.append(next_id)
+            return list(visited)
+
+        # 先加入与当前顺序一致的连接 (拓扑序对它们仍然有效)，再逐条处理逆序的连接
+        backward_edges: List[Tuple[str, str]] = []
+        for spec, _, _, _, _ in resolved:
+            if index_of(spec[0]) < index_of(spec[2]):
+                add_edge(spec[0], spec[2])
+            else:
+                backward_edges.append((spec[0], spec[2]))
+        for source_module_id, target_module_id in backward_edges:
+            lower = index_of(target_module_id)
+            upper = index_of(source_module_id)
+            if lower < upper:
+                forward = search(target_module_id, successors, lambda index: index <= upper, source_module_id)
+                if forward is None:
+                    return None
+                backward = search(source_module_id, predecessors, lambda index: index >= lower, None)
+                # 保持两组内部的相对顺序，把 backward 整体放到 forward 之前，复用它们原来占用的序号
+                forward.sort(key=index_of)
+                backward.sort(key=index_of)
+                affected = backward + forward
+                slots = sorted(index_of(module_id) for module_id in affected)
+                for module_id, slot in zip(affected, slots):
+                    updates[module_id] = slot
+            add_edge(source_module_id, target_module_id)
+        return updates, next_topo_index
+
+    def _compute_order(self, resolved: List[Tuple[Tuple[str, str, str, str], BaseModule, Port, BaseModule, Port]]
+                       ) -> Optional[Tuple[Dict[str, int], int]]:
+        """
+        对现有图加上待提交的模块和连接做 Kahn 拓扑排序 (现有拓扑序不完整时使用)
+
+        Returns:
+            (全部模块ID -> 序号, 下一个可用序号)；存在环时返回None
+        """
+        workflow = self._workflow
+        # 以现有拓扑序为基础排列节点，使排序结果尽量保持原有顺序
+        topo_index = workflow._topo_index
+        if len(topo_index) == len(workflow._modules):
+            node_ids = sorted(workflow._modules, key=topo_index.__getitem__)
+        else:
+            node_ids = list(workflow._modules)
+        node_ids.extend(module_id for module_id in self._pending_modules if module_id not in workflow._modules)
+
+        in_degree: Dict[str, int] = dict.fromkeys(node_ids, 0)
+        adj: Dict[str, List[str]] = {}
+        for conn in workflow._connections.values():
+            adj.setdefault(conn.source_module_id, []).append(conn.target_module_id)
+            in_degree[conn.target_module_id] += 1
+        for spec, _, _, _, _ in resolved:
+            adj.setdefault(spec[0], []).append(spec[2])
+            in_degree[spec[2]] += 1
+
+        queue = deque(module_id for module_id in node_ids if in_degree[module_id] == 0)
+        order: List[str] = []
+        while queue:
+            u = queue.popleft()
+            order.append(u)
+            for v in adj.get(u, ()):
+                in_degree[v] -= 1
+                if in_degree[v] == 0:
+                    queue.append(v)
+        if len(order) != len(node_ids):
+            return None
+        return {module_id: index for index, module_id in enumerate(order)}, len(order)
+
+    def __enter__(self) -> 'WorkflowTransaction':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is not None:
+            self.rollback()
+            return False
+        if not self._closed:
+            self.commit()
+        return False
+
+
+class _SnapshotModules(Mapping):
+    """快照的模块字典视图: 取出模块时解析为快照创建时的模块状态"""
+    __slots__ = ('_modules', '_epoch')
+
+    def __init__(self, modules: Dict[str, BaseModule], epoch: int):
+        self._modules = modules
+        self._epoch = epoch
+
+    def __getitem__(self, module_id: str) -> BaseModule:
+        return self._modules[module_id].state_at(self._epoch)
+
+    def __contains__(self, module_id) -> bool:
+        return module_id in self._modules
+
+    def __iter__(self):
+        return iter(self._modules)
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+
+class WorkflowSnapshot:
+    """
+    工作流的只读快照 (由 Workflow.snapshot() 创建)
+
+    直接引用工作流当时的内部字典 (结构共享)，工作流之后的修改会先复制字典或为模块保存副本，
+    所以快照看到的模块、参数和连接始终是创建时的状态。提供执行计划编译所需的只读接口。
+    复合模块的内部工作流通过 resolve_workflow 解析为同一纪元的快照。
+    """
+    def __init__(self, workflow: Workflow, epoch: Optional[int] = None,
+                 inner_plans: Optional[Dict[int, Any]] = None):
+        self._id = workflow._id
+        self._name = workflow._name
+        self._description = workflow._description
+        self._version = workflow._version
+        self._revision = workflow._revision
+        self._modules = workflow._modules
+        self._connections = workflow._connections
+        self._outgoing = workflow._outgoing
+        self._incoming = workflow._incoming
+        self._topo_index = workflow._topo_index
+        # 指定纪元时是外层快照中的内部工作流，不登记新的快照 (由外层快照保持纪元存活)
+        self._epoch = gsnapshot_clock.tick(self) if epoch is None else epoch
+        self._module_view = _SnapshotModules(self._modules, self._epoch)
+        # 编译时展开的内部工作流计划 (内部工作流的 id -> 计划，见 execution_plan.compile_plan)，
+        # 与外层快照的内部工作流快照共享；快照只读，缓存在快照上不会与界面线程的编辑冲突
+        self._inner_plans: Dict[int, Any] = {} if inner_plans is None else inner_plans
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @property
+    def version(self) -> int:
+        """创建快照时工作流的结构版本号"""
+        return self._version
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    @property
+    def modules(self) -> Mapping:
+        return self._module_view
+
+    @property
+    def connections(self) -> Mapping:
+        return MappingProxyType(self._connections)
+
+    def resolve_module(self, module: BaseModule) -> BaseModule:
+        """把任意模块 (包括复合模块的内部模块) 解析为快照创建时的状态"""
+        return module.state_at(self._epoch)
+
+    def resolve_workflow(self, workflow: Workflow) -> 'WorkflowSnapshot':
+        """把复合模块的内部工作流解析为本快照创建时的结构 (同一纪元的快照)"""
+        return WorkflowSnapshot(workflow.state_at(self._epoch), self._epoch, self._inner_plans)
+
+    def get_outgoing_connections(self, module_id: str, port_name: Optional[str] = None) -> List[Connection]:
+        """与 Workflow.get_outgoing_connections 相同"""
+        conns = self._outgoing.get(module_id)
+        if not conns:
+            return []
+        if port_name is not None:
+            return [conn for conn in conns if conn.source_port_name == port_name]
+        return list(conns)
+
+    def get_incoming_connections(self, module_id: str, port_name: Optional[str] = None) -> List[Connection]:
+        """与 Workflow.get_incoming_connections 相同"""
+        conns = self._incoming.get(module_id)
+        if not conns:
+            return []
+        if port_name is not None:
+            return [conn for conn in conns if conn.target_port_name == port_name]
+        return list(conns)
+
+    def _get_execution_order(self) -> List[str]:
+        """按快照中的拓扑序返回模块ID列表"""
+        if len(self._topo_index) == len(self._modules):
+            return sorted(self._modules, key=self._topo_index.__getitem__)
+        return _topological_sort(self._modules, self._connections.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """按快照创建时的状态序列化 (格式与 Workflow.to_dict 相同)"""
+        return {
+            "id": self._id,
+            "name": self._name,
+            "description": self._description,
+            "revision": self._revision,
+            "modules": {module_id: module.to_dict() for module_id, module in self._module_view.items()},
+            "connections": {conn_id: conn.to_dict() for conn_id, conn in self._connections.items()}
+        }
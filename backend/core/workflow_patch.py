@@ -0,0 +1,311 @@
+from typing import Dict, List, Any, Optional, Callable, Tuple
+import json
+import os
+
+from .base_module import BaseModule
+
+# 补丁操作类型
+PATCH_OPS = ("add_module", "remove_module", "update_module", "set_parameter", "connect", "disconnect")
+
+# update_module 可以修改的字段
+_UPDATABLE_FIELDS = ("name", "description", "position", "variant_id", "ports_config")
+
+_MISSING = object()
+
+
+class WorkflowPatch:
+    """
+    工作流增量补丁: 基于某个修订号的一组有序编辑操作
+
+    每个操作是一个可以直接 JSON 序列化的字典 ({"op": 操作类型, ...})，
+    前端可以只发送修改的部分，后端用 Workflow.apply_patch 在 O(补丁大小) 内应用。
+    连接按端点 (源模块ID, 源端口名称, 目标模块ID, 目标端口名称) 标识，重新加载后仍然有效。
+
+    用法:
+        patch = WorkflowPatch(workflow.revision)
+        patch.add_module(module)
+        patch.connect(source.id, "result", module.id, "number1")
+        patch.set_parameter(module.id, "operation", "multiply")
+        workflow.apply_patch(patch, gmodule_registry)
+    """
+    def __init__(self, base_revision: Optional[int] = None, ops: Optional[List[Dict[str, Any]]] = None):
+        self.base_revision = base_revision  # 为None时不检查冲突，应用时填入当时的修订号
+        self.ops: List[Dict[str, Any]] = list(ops) if ops is not None else []
+        self._instances: Dict[str, BaseModule] = {}  # 本地添加的模块实例，应用时直接使用而不是重新创建
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def add_module(self, module: BaseModule) -> 'WorkflowPatch':
+        self.ops.append({"op": "add_module", "module": module.to_dict()})
+        self._instances[module.id] = module
+        return self
+
+    def remove_module(self, module_id: str) -> 'WorkflowPatch':
+        self.ops.append({"op": "remove_module", "module_id": module_id})
+        return self
+
+    def update_module(self, module_id: str, **fields: Any) -> 'WorkflowPatch':
+        """修改模块的 name / description / position / variant_id / ports_config"""
+        unknown = set(fields) - set(_UPDATABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"update_module 不支持的字段: {sorted(unknown)}")
+        self.ops.append({"op": "update_module", "module_id": module_id, **fields})
+        return self
+
+    def set_parameter(self, module_id: str, key: str, value: Any) -> 'WorkflowPatch':
+        self.ops.append({"op": "set_parameter", "module_id": module_id, "key": key, "value": value})
+        return self
+
+    def connect(self, source_module_id: str, source_port_name: str,
+                target_module_id: str, target_port_name: str) -> 'WorkflowPatch':
+        self.ops.append({"op": "connect", "source_module_id": source_module_id, "source_port_name": source_port_name,
+                         "target_module_id": target_module_id, "target_port_name": target_port_name})
+        return self
+
+    def disconnect(self, source_module_id: str, source_port_name: str,
+                   target_module_id: str, target_port_name: str) -> 'WorkflowPatch':
+        self.ops.append({"op": "disconnect", "source_module_id": source_module_id, "source_port_name": source_port_name,
+                         "target_module_id": target_module_id, "target_port_name": target_port_name})
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"base_revision": self.base_revision, "ops": self.ops}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WorkflowPatch':
+        ops = data.get("ops", [])
+        for op in ops:
+            if op.get("op") not in PATCH_OPS:
+                raise ValueError(f"未知的补丁操作: {op.get('op')}")
+        return cls(data.get("base_revision"), ops)
+
+
+def _connection_endpoints(conn) -> Tuple[str, str, str, str]:
+    return (conn.source_module_id, conn.source_port_name, conn.target_module_id, conn.target_port_name)
+
+
+def _find_connection(workflow, source_module_id: str, source_port_name: str,
+                     target_module_id: str, target_port_name: str):
+    for conn in workflow.get_outgoing_connections(source_module_id, source_port_name):
+        if conn.target_module_id == target_module_id and conn.target_port_name == target_port_name:
+            return conn
+    return None
+
+
+def _get_module(workflow, module_id: str) -> BaseModule:
+    module = workflow.modules.get(module_id)
+    if module is None:
+        raise ValueError(f"模块不存在: {module_id}")
+    return module
+
+
+def _connect(workflow, endpoints: Tuple[str, str, str, str]) -> str:
+    connection_id = workflow.connect(*endpoints)
+    if connection_id is None:
+        source_module_id, source_port_name, target_module_id, target_port_name = endpoints
+        raise ValueError(f"无法连接 {source_module_id}.{source_port_name} -> {target_module_id}.{target_port_name}")
+    return connection_id
+
+
+def _reconnect_all(workflow, endpoints_list: List[Tuple[str, str, str, str]]) -> None:
+    """撤销时重新创建连接，任何一条连接失败都抛出 ValueError (不能静默丢失连接)"""
+    for endpoints in endpoints_list:
+        _connect(workflow, endpoints)
+
+
+def _apply_op(workflow, op: Dict[str, Any], patch: WorkflowPatch, module_registry_instance,
+              undo: List[Callable[[], Any]]) -> None:
+    """应用单个操作，并把撤销该操作的函数加入 undo"""
+    kind = op.get("op")
+    if kind == "add_module":
+        data = op["module"]
+        module = patch._instances.get(data.get("id"))
+        if module is None:
+            if module_registry_instance is None:
+                raise ValueError("应用添加模块的补丁需要模块注册表")
+            module = workflow._module_from_data(data, module_registry_instance)
+        if module.id in workflow.modules:
+            raise ValueError(f"模块ID重复: {module.id}")
+        workflow.add_module(module)
+        undo.append(lambda: workflow.remove_module(module.id))
+
+    elif kind == "remove_module":
+        module = _get_module(workflow, op["module_id"])
+        endpoints = [_connection_endpoints(conn) for conn in workflow.get_incoming_connections(module.id)]
+        endpoints.extend(_connection_endpoints(conn) for conn in workflow.get_outgoing_connections(module.id))
+        workflow.remove_module(module.id)
+
+        def restore_module():
+            workflow.add_module(module)
+            _reconnect_all(workflow, endpoints)
+        undo.append(restore_module)
+
+    elif kind == "update_module":
+        module = _get_module(workflow, op["module_id"])
+        previous = {"name": module.name, "description": module.description, "position": module.position}
+        if "name" in op:
+            module.name = op["name"]
+        if "description" in op:
+            module.description = op["description"]
+        if "position" in op:
+            module.position = tuple(op["position"])
+        if "variant_id" in op or "ports_config" in op:
+            # 切换变体后移除失效的连接，撤销时先恢复变体，再只重新创建被移除的那些连接
+            old_ports = {'input': {port.name for port in module.input_ports.values()},
+                         'output': {port.name for port in module.output_ports.values()}}
+            previous_variant = (module._current_variant_id, dict(module._current_ports_config))
+            removed_endpoints: List[Tuple[str, str, str, str]] = []
+
+            def restore_variant():
+                module.set_variant(*previous_variant)
+                _reconnect_all(workflow, removed_endpoints)
+            undo.append(restore_variant)
+            module.set_variant(op.get("variant_id", module._current_variant_id), op.get("ports_config"))
+            removed = workflow.handle_module_variant_change(module.id, old_ports, {
+                'input': {port.name for port in module.input_ports.values()},
+                'output': {port.name for port in module.output_ports.values()}
+            })
+            removed_endpoints.extend(_connection_endpoints(conn) for conn in removed)
+
+        def restore_fields():
+            module.name = previous["name"]
+            module.description = previous["description"]
+            module.position = previous["position"]
+        undo.append(restore_fields)
+
+    elif kind == "set_parameter":
+        module = _get_module(workflow, op["module_id"])
+        key = op["key"]
+        old_value = module.parameters.get(key, _MISSING)
+        module.set_parameter(key, op["value"])
+
+        def restore_parameter():
+            if old_value is _MISSING:
+                module._before_mutation()
+                module._parameters.pop(key, None)
+            else:
+                module.set_parameter(key, old_value)
+        undo.append(restore_parameter)
+
+    elif kind == "connect":
+        endpoints = (op["source_module_id"], op["source_port_name"], op["target_module_id"], op["target_port_name"])
+        connection_id = _connect(workflow, endpoints)
+        undo.append(lambda: workflow.remove_connection(connection_id))
+
+    elif kind == "disconnect":
+        endpoints = (op["source_module_id"], op["source_port_name"], op["target_module_id"], op["target_port_name"])
+        conn = _find_connection(workflow, *endpoints)
+        if conn is None:
+            raise ValueError(f"连接不存在: {endpoints[0]}.{endpoints[1]} -> {endpoints[2]}.{endpoints[3]}")
+        workflow.remove_connection(conn.id)
+        undo.append(lambda: _connect(workflow, endpoints))
+
+    else:
+        raise ValueError(f"未知的补丁操作: {kind}")
+
+
+def apply_patch(workflow, patch: WorkflowPatch, module_registry_instance=None) -> int:
+    """
+    把补丁应用到工作流 (见 Workflow.apply_patch)，成功后修订号加一
+
+    Returns:
+        应用后的修订号
+    """
+    if patch.base_revision is None:
+        patch.base_revision = workflow.revision
+    elif patch.base_revision != workflow.revision:
+        raise ValueError(f"补丁冲突: 补丁基于修订号 {patch.base_revision}，工作流当前修订号为 {workflow.revision}")
+
+    undo: List[Callable[[], Any]] = []
+    try:
+        for op in patch.ops:
+            _apply_op(workflow, op, patch, module_registry_instance, undo)
+    except Exception as e:
+        # 逆序撤销已经应用的操作，工作流恢复到应用补丁之前的状态
+        for restore in reversed(undo):
+            restore()
+        if isinstance(e, ValueError):
+            raise
+        raise ValueError(f"补丁应用失败: {str(e)}") from e
+    workflow._revision += 1
+    return workflow._revision
+
+
+class WorkflowPatchLog:
+    """
+    工作流的追加式补丁日志 (用于自动保存)
+
+    完整的工作流保存在 base_path (Workflow.save 的 JSON 格式，含修订号)，
+    之后的每个补丁以一行 JSON 追加到 base_path + ".patches.jsonl"，写入量只与补丁大小有关。
+    补丁数量达到 compact_every，或日志大小超过基础文件的 compact_ratio 倍时，
+    把当前工作流完整写入基础文件并清空日志 (压缩)。
+    """
+    def __init__(self, base_path: str, compact_every: int = 200, compact_ratio: float = 0.5):
+        self._base_path = base_path
+        self._log_path = base_path + ".patches.jsonl"
+        self._compact_every = compact_every
+        self._compact_ratio = compact_ratio
+        self._entries = 0
+        self._log_bytes = os.path.getsize(self._log_path) if os.path.exists(self._log_path) else 0
+        self._base_bytes = os.path.getsize(base_path) if os.path.exists(base_path) else 0
+
+    @property
+    def log_path(self) -> str:
+        return self._log_path
+
+    @property
+    def pending_entries(self) -> int:
+        """自上次压缩以来 (本对象) 追加的补丁数量"""
+        return self._entries
+
+    def load(self, module_registry_instance):
+        """
+        加载基础文件并按顺序重放日志中的补丁
+
+        基础文件已经包含的补丁 (压缩后未来得及清空日志时) 会被跳过；
+        日志末尾不完整的一行 (写入时进程中断) 会被忽略。
+        """
+        from .workflow import Workflow
+        workflow = Workflow.load(self._base_path, module_registry_instance)
+        entries = 0
+        if os.path.exists(self._log_path):
+            with open(self._log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    patch = WorkflowPatch.from_dict(data)
+                    if patch.base_revision is not None and patch.base_revision < workflow.revision:
+                        continue
+                    workflow.apply_patch(patch, module_registry_instance)
+                    entries += 1
+        self._entries = entries
+        return workflow
+
+    def append(self, workflow, patch: WorkflowPatch) -> bool:
+        """
+        追加一个已经应用到 workflow 的补丁，必要时压缩
+
+        Returns:
+            本次是否进行了压缩
+        """
+        line = json.dumps(patch.to_dict(), ensure_ascii=False, separators=(',', ':')) + "\n"
+        with open(self._log_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+        self._entries += 1
+        self._log_bytes += len(line.encode('utf-8'))
+        if self._entries >= self._compact_every or self._log_bytes > self._base_bytes * self._compact_ratio:
+            self.compact(workflow)
+            return True
+        return False
+
+    def compact(self, workflow) -> None:
+        """把工作流完整写入基础文件 (Workflow.save 先写临时文件再替换) 并清空日志"""
+        workflow.save(self._base_path)
+        with open(self._log_path, 'w', encoding='utf-8'):
+            pass
+        self._entries = 0
+        self._log_bytes = 0
+        self._base_bytes = os.path.getsize(self._base_path)
@@ -0,0 +1,323 @@
+from typing import Dict, List, Any, Optional, Tuple
+from collections import Counter, OrderedDict
+import json
+import sqlite3
+import threading
+import time
+
+from .metrics import MetricsRegistry, record_cache_lookup
+from .workflow import Workflow, _gc_paused
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    revision INTEGER NOT NULL DEFAULT 0,
+    module_count INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_workflows_name ON workflows(name);
+
+CREATE TABLE IF NOT EXISTS modules (
+    workflow_id TEXT NOT NULL,
+    module_id TEXT NOT NULL,
+    module_type TEXT NOT NULL,
+    name TEXT,
+    description TEXT,
+    variant_id TEXT,
+    ports_config TEXT,
+    position_x REAL,
+    position_y REAL,
+    extra TEXT,
+    PRIMARY KEY (workflow_id, module_id)
+);
+CREATE INDEX IF NOT EXISTS idx_modules_type ON modules(module_type, workflow_id);
+
+CREATE TABLE IF NOT EXISTS parameters (
+    workflow_id TEXT NOT NULL,
+    module_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (workflow_id, module_id, key)
+);
+
+CREATE TABLE IF NOT EXISTS connections (
+    workflow_id TEXT NOT NULL,
+    source_module_id TEXT NOT NULL,
+    source_port_name TEXT NOT NULL,
+    target_module_id TEXT NOT NULL,
+    target_port_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_connections_workflow ON connections(workflow_id);
+"""
+
+# 模块 to_dict() 中保存在 modules 表固定列、parameters 表，或加载时会重新生成的字段
+_MODULE_COLUMNS = {"id", "module_type", "name", "description", "current_variant_id", "current_ports_config",
+                   "parameters", "position", "input_ports", "output_ports", "execution_status"}
+
+ModuleRow = Tuple[str, str, Optional[str], Optional[str], Optional[str], Optional[str], float, float, Optional[str]]
+ConnectionRow = Tuple[str, str, str, str]
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+class _SavedRows:
+    """某个工作流最近一次保存 (或加载) 时写入数据库的行，用于计算增量"""
+    __slots__ = ('meta', 'modules', 'parameters', 'connections')
+
+    def __init__(self, meta: Tuple, modules: Dict[str, ModuleRow],
+                 parameters: Dict[Tuple[str, str], Optional[str]], connections: Counter):
+        self.meta = meta
+        self.modules = modules
+        self.parameters = parameters
+        self.connections = connections
+
+
+def _workflow_rows(workflow: Workflow) -> _SavedRows:
+    """把工作流规范化为 modules / parameters / connections 表的行"""
+    modules: Dict[str, ModuleRow] = {}
+    parameters: Dict[Tuple[str, str], Optional[str]] = {}
+    for module_id, module in workflow.modules.items():
+        data = module.to_dict()
+        extra = {key: value for key, value in data.items() if key not in _MODULE_COLUMNS}
+        position = data.get("position") or (0.0, 0.0)
+        modules[module_id] = (data["module_type"], data.get("name"), data.get("description"),
+                              data.get("current_variant_id"), _dumps(data.get("current_ports_config")),
+                              float(position[0]), float(position[1]), _dumps(extra) if extra else None)
+        for key, value in (data.get("parameters") or {}).items():
+            parameters[(module_id, key)] = _dumps(value)
+    connections = Counter((conn.source_module_id, conn.source_port_name, conn.target_module_id, conn.target_port_name)
+                          for conn in workflow.connections.values())
+    meta = (workflow.name, workflow.description, workflow.revision)
+    return _SavedRows(meta, modules, parameters, connections)
+
+
+class WorkflowRepository:
+    """
+    基于 SQLite 的本地工作流仓库
+
+    工作流按 工作流 / 模块 / 参数 / 连接 四张表规范化保存，并按工作流ID、名称和模块类型建立索引，
+    因此列出、搜索大量工作流时不需要读取任何工作流的内容。
+    - save() 只写入与上次保存 (或加载) 相比发生变化的行，修改一个参数只更新一行
+    - load() 使用有界的 LRU 缓存保存最近使用的工作流实例，命中时直接返回缓存的实例
+    """
+    def __init__(self, db_path: str, cache_size: int = 16, metrics_registry: Optional[MetricsRegistry] = None):
+        self._db_path = db_path
+        self._metrics_registry = metrics_registry  # 记录缓存命中率的指标注册表 (为None时使用全局注册表)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, Workflow]" = OrderedDict()
+        self._saved_rows: Dict[str, _SavedRows] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+            self._cache.clear()
+            self._saved_rows.clear()
+
+    def __enter__(self) -> 'WorkflowRepository':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.close()
+        return False
+
+    # ---- 查询 ----
+
+    def list_workflows(self, name_prefix: Optional[str] = None, module_type: Optional[str] = None,
+                       limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        列出工作流 (只读取 workflows 表，按名称排序)
+
+        Args:
+            name_prefix: 只返回名称以此开头的工作流
+            module_type: 只返回包含该类型模块的工作流
+            limit / offset: 分页
+        """
+        sql = "SELECT id, name, description, revision, module_count, updated_at FROM workflows"
+        conditions: List[str] = []
+        args: List[Any] = []
+        if name_prefix:
+            # 使用范围条件而不是 LIKE，以便走名称索引
+            conditions.append("name >= ? AND name < ?")
+            args.extend((name_prefix, name_prefix + "\U0010ffff"))
+        if module_type:
+            conditions.append("id IN (SELECT DISTINCT workflow_id FROM modules WHERE module_type = ?)")
+            args.append(module_type)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY name, id LIMIT ? OFFSET ?"
+        args.extend((limit, offset))
+        with self._lock:
+            rows = self._connection.execute(sql, args).fetchall()
+        return [{"id": row[0], "name": row[1], "description": row[2], "revision": row[3],
+                 "module_count": row[4], "updated_at": row[5]} for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM workflows").fetchone()[0]
+
+    def exists(self, workflow_id: str) -> bool:
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM workflows WHERE id = ?", (workflow_id,)).fetchone() is not None
+
+    # ---- 读写 ----
+
+    def load(self, workflow_id: str, module_registry_instance) -> Optional[Workflow]:
+        """
+        加载工作流，不存在时返回None
+
+        命中缓存时返回缓存中的同一个实例 (其他调用者对它的未保存修改也会可见)
+        """
+        with self._lock:
+            workflow = self._cache.get(workflow_id)
+            record_cache_lookup("workflow_repository", workflow is not None, self._metrics_registry)
+            if workflow is not None:
+                self._cache.move_to_end(workflow_id)
+                return workflow
+
+            connection = self._connection
+            meta = connection.execute("SELECT name, description, revision FROM workflows WHERE id = ?",
+                                      (workflow_id,)).fetchone()
+            if meta is None:
+                return None
+            module_rows = connection.execute(
+                "SELECT module_id, module_type, name, description, variant_id, ports_config, position_x, position_y, extra "
+                "FROM modules WHERE workflow_id = ? ORDER BY rowid", (workflow_id,)).fetchall()
+            parameter_rows = connection.execute(
+                "SELECT module_id, key, value FROM parameters WHERE workflow_id = ? ORDER BY rowid", (workflow_id,)).fetchall()
+            connection_rows = connection.execute(
+                "SELECT source_module_id, source_port_name, target_module_id, target_port_name "
+                "FROM connections WHERE workflow_id = ? ORDER BY rowid", (workflow_id,)).fetchall()
+
+        parameters: Dict[str, Dict[str, Any]] = {}
+        for module_id, key, value in parameter_rows:
+            parameters.setdefault(module_id, {})[key] = None if value is None else json.loads(value)
+        module_items = []
+        for module_id, module_type, name, description, variant_id, ports_config, x, y, extra in module_rows:
+            module_data = {
+                "id": module_id,
+                "module_type": module_type,
+                "name": name,
+                "description": description,
+                "current_variant_id": variant_id,
+                "current_ports_config": None if ports_config is None else json.loads(ports_config),
+                "parameters": parameters.get(module_id, {}),
+                "position": (x, y)
+            }
+            if extra is not None:
+                module_data.update(json.loads(extra))
+            module_items.append((module_id, module_data))
+
+        with _gc_paused():
+            workflow = Workflow._build({"id": workflow_id, "name": meta[0], "description": meta[1], "revision": meta[2]},
+                                       module_items, connection_rows, module_registry_instance)
+        with self._lock:
+            # 以实际加载的结果作为下次增量保存的基准 (加载时被跳过的无效连接会在下次保存时删除)
+            self._saved_rows[workflow_id] = _workflow_rows(workflow)
+            self._put_cache(workflow)
+        return workflow
+
+    def save(self, workflow: Workflow) -> int:
+        """
+        保存工作流，只写入发生变化的行
+
+        Returns:
+            写入 (插入、更新或删除) 的模块、参数和连接行数
+        """
+        rows = _workflow_rows(workflow)
+        workflow_id = workflow.id
+        with self._lock:
+            previous = self._saved_rows.get(workflow_id)
+            if previous is None:
+                previous = self._read_rows(workflow_id)
+            connection = self._connection
+            changed = 0
+            with connection:
+                connection.execute(
+                    "INSERT INTO workflows (id, name, description, revision, module_count, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET name = excluded.name, description = excluded.description, "
+                    "revision = excluded.revision, module_count = excluded.module_count, updated_at = excluded.updated_at",
+                    (workflow_id, workflow.name, workflow.description, workflow.revision, len(rows.modules), time.time()))
+
+                removed_modules = [(workflow_id, module_id) for module_id in previous.modules if module_id not in rows.modules]
+                changed_modules = [(workflow_id, module_id) + row for module_id, row in rows.modules.items()
+                                   if previous.modules.get(module_id) != row]
+                connection.executemany("DELETE FROM modules WHERE workflow_id = ? AND module_id = ?", removed_modules)
+                # 使用 UPSERT 原地更新已有的行: INSERT OR REPLACE 会删除旧行再插入，改变 rowid，
+                # 而 load() 按 rowid 还原模块和参数的顺序
+                connection.executemany(
+                    "INSERT INTO modules (workflow_id, module_id, module_type, name, description, variant_id, "
+                    "ports_config, position_x, position_y, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(workflow_id, module_id) DO UPDATE SET module_type = excluded.module_type, "
+                    "name = excluded.name, description = excluded.description, variant_id = excluded.variant_id, "
+                    "ports_config = excluded.ports_config, position_x = excluded.position_x, "
+                    "position_y = excluded.position_y, extra = excluded.extra", changed_modules)
+
+                removed_parameters = [(workflow_id,) + key for key in previous.parameters if key not in rows.parameters]
+                changed_parameters = [(workflow_id,) + key + (value,) for key, value in rows.parameters.items()
+                                      if key not in previous.parameters or previous.parameters[key] != value]
+                connection.executemany("DELETE FROM parameters WHERE workflow_id = ? AND module_id = ? AND key = ?",
+                                       removed_parameters)
+                connection.executemany(
+                    "INSERT INTO parameters (workflow_id, module_id, key, value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(workflow_id, module_id, key) DO UPDATE SET value = excluded.value", changed_parameters)
+
+                # 连接按端点比较 (可能存在重复的连接，按多重集合计算差异)
+                removed_connections = previous.connections - rows.connections
+                added_connections = rows.connections - previous.connections
+                for endpoints, count in removed_connections.items():
+                    connection.execute(
+                        "DELETE FROM connections WHERE rowid IN (SELECT rowid FROM connections WHERE workflow_id = ? AND "
+                        "source_module_id = ? AND source_port_name = ? AND target_module_id = ? AND target_port_name = ? "
+                        "ORDER BY rowid DESC LIMIT ?)", (workflow_id,) + endpoints + (count,))
+                connection.executemany(
+                    "INSERT INTO connections (workflow_id, source_module_id, source_port_name, target_module_id, target_port_name) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(workflow_id,) + endpoints for endpoints, count in added_connections.items() for _ in range(count)])
+
+                changed = (len(removed_modules) + len(changed_modules) + len(removed_parameters) + len(changed_parameters)
+                           + sum(removed_connections.values()) + sum(added_connections.values()))
+            self._saved_rows[workflow_id] = rows
+            self._put_cache(workflow)
+        return changed
+
+    def delete(self, workflow_id: str) -> bool:
+        """删除工作流，不存在时返回False"""
+        with self._lock:
+            with self._connection:
+                cursor = self._connection.execute("DELETE FROM workflows WHERE id = ?", (workflow_id,))
+                for table in ("modules", "parameters", "connections"):
+                    self._connection.execute(f"DELETE FROM {table} WHERE workflow_id = ?", (workflow_id,))
+            self._cache.pop(workflow_id, None)
+            self._saved_rows.pop(workflow_id, None)
+            return cursor.rowcount > 0
+
+    def _read_rows(self, workflow_id: str) -> _SavedRows:
+        """读取数据库中已保存的行 (本进程中尚未加载或保存过该工作流时使用)"""
+        connection = self._connection
+        meta = connection.execute("SELECT name, description, revision FROM workflows WHERE id = ?", (workflow_id,)).fetchone()
+        modules = {row[0]: tuple(row[1:]) for row in connection.execute(
+            "SELECT module_id, module_type, name, description, variant_id, ports_config, position_x, position_y, extra "
+            "FROM modules WHERE workflow_id = ?", (workflow_id,))}
+        parameters = {(row[0], row[1]): row[2] for row in connection.execute(
+            "SELECT module_id, key, value FROM parameters WHERE workflow_id = ?", (workflow_id,))}
+        connections = Counter(tuple(row) for row in connection.execute(
+            "SELECT source_module_id, source_port_name, target_module_id, target_port_name FROM connections WHERE workflow_id = ?",
+            (workflow_id,)))
+        return _SavedRows(tuple(meta) if meta else None, modules, parameters, connections)
+
+    def _put_cache(self, workflow: Workflow) -> None:
+        if self._cache_size <= 0:
+            return
+        self._cache[workflow.id] = workflow
+        self._cache.move_to_end(workflow.id)
+        while len(self._cache) > self._cache_size:
+            evicted_id, _ = self._cache.popitem(last=False)
+            # 被淘汰的工作流下次保存时从数据库读取基准行
+            self._saved_rows.pop(evicted_id, None)
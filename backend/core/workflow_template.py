@@ -0,0 +1,202 @@
+from typing import Dict, List, Any, Optional, Mapping
+from types import MappingProxyType
+from uuid import uuid4
+
+from .base_module import BaseModule
+from .execution_plan import ExecutionPlan, compile_plan
+from .workflow import Workflow, WorkflowSnapshot, _SnapshotModules
+
+
+class WorkflowTemplate:
+    """
+    工作流模板: 用于批量创建只有少量参数不同的工作流实例
+
+    创建模板时对工作流取一次快照 (写时复制，之后对原工作流的编辑不影响模板)，并编译一次执行计划，
+    以检查拓扑 (无环) 和端口绑定。所有实例共享这份不可变的结构 (模块、连接、拓扑序)，
+    每个实例只保存自己的参数覆盖，创建实例的时间和内存只与覆盖的数量有关。
+    """
+    def __init__(self, workflow: Workflow, name: Optional[str] = None):
+        self._snapshot = workflow.snapshot()
+        self._name = name if name is not None else workflow.name
+        # 编译执行计划: 存在循环依赖时抛出 ValueError
+        self._plan = compile_plan(self._snapshot)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def snapshot(self) -> WorkflowSnapshot:
+        """模板共享的工作流快照"""
+        return self._snapshot
+
+    @property
+    def plan(self) -> ExecutionPlan:
+        """创建模板时编译的执行计划 (不包含参数覆盖)"""
+        return self._plan
+
+    @property
+    def module_ids(self) -> List[str]:
+        return list(self._snapshot.modules)
+
+    def get_parameter(self, module_id: str, key: str, default: Any = None) -> Any:
+        """模板中模块参数的默认值"""
+        return self._module(module_id).get_parameter(key, default)
+
+    def _module(self, module_id: str) -> BaseModule:
+        if module_id not in self._snapshot.modules:
+            raise ValueError(f"模板中不存在模块: {module_id}")
+        return self._snapshot.modules[module_id]
+
+    def instantiate(self, overrides: Optional[Mapping[str, Mapping[str, Any]]] = None,
+                    name: Optional[str] = None) -> 'WorkflowInstance':
+        """
+        创建工作流实例
+
+        Args:
+            overrides: 参数覆盖 (模块ID -> {参数名: 值})
+            name: 实例名称，为None时使用模板名称
+
+        Returns:
+            工作流实例；覆盖中的模块ID不存在时抛出 ValueError
+        """
+        instance = WorkflowInstance(self, name if name is not None else self._name)
+        if overrides:
+            for module_id, parameters in overrides.items():
+                for key, value in parameters.items():
+                    instance.set_parameter(module_id, key, value)
+        return instance
+
+
+class _InstanceModules(_SnapshotModules):
+    """实例的模块字典视图: 有参数覆盖的模块返回应用了覆盖的副本"""
+    __slots__ = ('_instance',)
+
+    def __init__(self, instance: 'WorkflowInstance', modules: Dict[str, BaseModule], epoch: int):
+        super().__init__(modules, epoch)
+        self._instance = instance
+
+    def __getitem__(self, module_id: str) -> BaseModule:
+        return self._instance._resolve(self._modules[module_id].state_at(self._epoch))
+
+
+class _InstanceSnapshot(WorkflowSnapshot):
+    """
+    实例的只读快照 (由 WorkflowInstance.snapshot() 创建)，执行接口与 WorkflowSnapshot 相同
+
+    直接引用模板快照的内部字典和纪元，不登记新的快照，创建只需 O(1)。
+    """
+    def __init__(self, instance: 'WorkflowInstance'):
+        template_snapshot = instance.template.snapshot
+        self._id = instance.id
+        self._name = instance.name
+        self._description = template_snapshot._description
+        self._version = template_snapshot._version
+        self._revision = template_snapshot._revision
+        self._modules = template_snapshot._modules
+        self._connections = template_snapshot._connections
+        self._outgoing = template_snapshot._outgoing
+        self._incoming = template_snapshot._incoming
+        self._topo_index = template_snapshot._topo_index
+        self._epoch = template_snapshot._epoch
+        self._module_view = _InstanceModules(instance, self._modules, self._epoch)
+        self._inner_plans = {}
+        self._instance = instance
+        self._template_snapshot = template_snapshot  # 保持模板快照存活，模块为它保留的状态副本不会被丢弃
+
+    def resolve_module(self, module: BaseModule) -> BaseModule:
+        return self._instance._resolve(module.state_at(self._epoch))
+
+
+class WorkflowInstance:
+    """
+    工作流模板的实例 (由 WorkflowTemplate.instantiate() 创建)
+
+    只保存ID、名称和参数覆盖，模块和连接与模板共享。有覆盖的模块在第一次需要时
+    (执行或访问 modules) 复制一份并应用覆盖，其余模块直接使用模板中的模块。
+    可以像工作流一样放入 WorkflowEngine.workflows 中执行 (引擎只通过 snapshot() 访问它)。
+    """
+    __slots__ = ('_id', '_name', '_template', '_overrides', '_resolved')
+
+    def __init__(self, template: WorkflowTemplate, name: str):
+        self._id = str(uuid4())
+        self._name = name
+        self._template = template
+        self._overrides: Dict[str, Dict[str, Any]] = {}
+        self._resolved: Optional[Dict[str, BaseModule]] = None  # 模块ID -> 应用了覆盖的模块副本
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self._name = value
+
+    @property
+    def template(self) -> WorkflowTemplate:
+        return self._template
+
+    @property
+    def overrides(self) -> Mapping[str, Mapping[str, Any]]:
+        """参数覆盖 (模块ID -> {参数名: 值})，只读"""
+        return MappingProxyType(self._overrides)
+
+    @property
+    def modules(self) -> Mapping:
+        """模块字典视图 (有覆盖的模块为应用了覆盖的副本)"""
+        return self.snapshot().modules
+
+    def set_parameter(self, module_id: str, key: str, value: Any) -> None:
+        """覆盖一个模块参数 (模块ID不存在时抛出 ValueError)"""
+        self._template._module(module_id)
+        self._overrides.setdefault(module_id, {})[key] = value
+        if self._resolved:
+            self._resolved.pop(module_id, None)
+
+    def get_parameter(self, module_id: str, key: str, default: Any = None) -> Any:
+        """获取模块参数 (有覆盖时返回覆盖值，否则返回模板中的值)"""
+        parameters = self._overrides.get(module_id)
+        if parameters is not None and key in parameters:
+            return parameters[key]
+        return self._template.get_parameter(module_id, key, default)
+
+    def clear_overrides(self, module_id: Optional[str] = None) -> None:
+        """清除一个模块 (module_id 为None时为全部模块) 的参数覆盖"""
+        if module_id is None:
+            self._overrides.clear()
+            self._resolved = None
+            return
+        self._overrides.pop(module_id, None)
+        if self._resolved:
+            self._resolved.pop(module_id, None)
+
+    def _resolve(self, module: BaseModule) -> BaseModule:
+        """返回应用了本实例参数覆盖的模块 (没有覆盖时返回模块本身)"""
+        parameters = self._overrides.get(module.id)
+        if not parameters:
+            return module
+        if self._resolved is None:
+            self._resolved = {}
+        resolved = self._resolved.get(module.id)
+        if resolved is None:
+            resolved = module._snapshot_clone()
+            resolved._parameters.update(parameters)
+            self._resolved[module.id] = resolved
+        return resolved
+
+    def snapshot(self) -> WorkflowSnapshot:
+        """创建用于执行的只读快照 (O(1))"""
+        return _InstanceSnapshot(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """按应用覆盖后的状态序列化 (格式与 Workflow.to_dict 相同，ID为实例ID)"""
+        return self.snapshot().to_dict()
+
+    def to_workflow(self, module_registry_instance) -> Workflow:
+        """展开为一个独立的、可编辑的工作流 (需要创建全部模块，O(模块数))"""
+        return Workflow._from_data(self.to_dict(), module_registry_instance)
@@ -10,7 +10,7 @@ import os
 # 添加父目录到系统路径，以便导入核心模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.base_module import BaseModule, PortDefinition, VariantDefinition, Port
+from backend.core.base_module import BaseModule, PortDefinition, VariantDefinition, Port
 
 # 配置日志
 logging.basicConfig(
@@ -57,6 +57,14 @@ class NumberGeneratorModule(BaseModule):
         # 输出字典的键应为当前活动变体的输出端口名
         return {"number": random_number} # 假设 "default" 变体的输出端口名为 "number"
     
+    def get_constant_outputs(self) -> Optional[Dict[str, Any]]:
+        # 上下限相同时输出固定 (与 random.uniform 的结果一致)
+        min_value = self.get_parameter("min_value")
+        max_value = self.get_parameter("max_value")
+        if min_value == max_value:
+            return {"number": float(min_value)}
+        return None
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'NumberGeneratorModule':
         # 使用基类的 from_dict 来处理通用属性和变体相关的初始化
@@ -71,6 +79,9 @@ class MathOperationModule(BaseModule):
     """
     数学运算模块，对输入的数字进行指定运算
     """
+    deterministic = True
+    fusible = True
+
     def __init__(self, name: str = "数学运算", description: str = "执行数学运算",
                  initial_variant_id: Optional[str] = None, 
                  initial_ports_config: Optional[Dict[str, bool]] = None):
@@ -148,6 +159,9 @@ class TextProcessingModule(BaseModule):
     """
     文本处理模块，对输入的文本进行处理
     """
+    deterministic = True
+    fusible = True
+
     def __init__(self, name: str = "文本处理", description: str = "处理文本",
                  initial_variant_id: Optional[str] = None, 
                  initial_ports_config: Optional[Dict[str, bool]] = None):
@@ -281,6 +295,9 @@ class ConditionalModule(BaseModule):
     """
     条件分支模块，根据条件选择不同的输出
     """
+    deterministic = True
+    fusible = True
+
     def __init__(self, name: str = "条件分支", description: str = "条件判断",
                  initial_variant_id: Optional[str] = None, 
                  initial_ports_config: Optional[Dict[str, bool]] = None):
@@ -0,0 +1,55 @@
+import unittest
+
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+class AdjacencyIndexTest(unittest.TestCase):
+    """连接的邻接索引与连接字典保持一致"""
+
+    def setUp(self):
+        self.workflow = Workflow("adjacency")
+        self.source = NumberGeneratorModule("source")
+        self.left = MathOperationModule("left")
+        self.right = MathOperationModule("right")
+        for module in (self.source, self.left, self.right):
+            self.workflow.add_module(module)
+        self.to_left1 = self.workflow.connect(self.source.id, "number", self.left.id, "number1")
+        self.to_left2 = self.workflow.connect(self.source.id, "number", self.left.id, "number2")
+        self.to_right = self.workflow.connect(self.left.id, "result", self.right.id, "number1")
+
+    def _assert_consistent(self):
+        # 邻接索引中的连接与按连接字典线性扫描得到的结果相同
+        for module_id in self.workflow.modules:
+            outgoing = {conn.id for conn in self.workflow.connections.values() if conn.source_module_id == module_id}
+            incoming = {conn.id for conn in self.workflow.connections.values() if conn.target_module_id == module_id}
+            self.assertEqual({conn.id for conn in self.workflow.get_outgoing_connections(module_id)}, outgoing)
+            self.assertEqual({conn.id for conn in self.workflow.get_incoming_connections(module_id)}, incoming)
+
+    def test_lookup_by_port(self):
+        self._assert_consistent()
+        self.assertEqual(len(self.workflow.get_outgoing_connections(self.source.id, "number")), 2)
+        self.assertEqual([conn.id for conn in self.workflow.get_incoming_connections(self.left.id, "number2")],
+                         [self.to_left2])
+        self.assertEqual(self.workflow.get_incoming_connections(self.left.id, "missing"), [])
+        self.assertEqual(self.workflow.get_dependent_modules(self.source.id), {self.left.id})
+        self.assertEqual(self.workflow.get_dependency_modules(self.right.id), {self.left.id})
+
+    def test_remove_connection_and_module(self):
+        self.assertTrue(self.workflow.remove_connection(self.to_left1))
+        self._assert_consistent()
+        self.assertEqual(len(self.workflow.get_outgoing_connections(self.source.id)), 1)
+        self.assertTrue(self.workflow.remove_module(self.left.id))
+        self._assert_consistent()
+        self.assertEqual(self.workflow.get_outgoing_connections(self.source.id), [])
+        self.assertEqual(self.workflow.get_incoming_connections(self.right.id), [])
+        self.assertNotIn(self.left.id, self.workflow._outgoing)
+        self.assertNotIn(self.left.id, self.workflow._incoming)
+
+    def test_returned_lists_are_copies(self):
+        self.workflow.get_outgoing_connections(self.source.id).clear()
+        self.assertEqual(len(self.workflow.get_outgoing_connections(self.source.id)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from backend.core.binary_format import HEADER, BinaryWorkflowReader, encode_workflow
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+def _encode_v1(data):
+    """把数据编码为版本 1 的文件 (字符串表记录字符数)，用于检查旧文件仍可读取"""
+    buffer = encode_workflow(data)
+    (magic, _, flags, n_strings, n_modules, n_connections, meta_index,
+     strings_offset, modules_offset, connections_offset) = HEADER.unpack_from(buffer, 0)
+    reader = BinaryWorkflowReader(buffer)
+    strings = [reader._get_string(index) for index in range(n_strings)]
+    string_section = array('I', map(len, strings)).tobytes() + "".join(strings).encode('utf-8')
+    shift = strings_offset + len(string_section) - modules_offset
+    header = HEADER.pack(magic, 1, flags, n_strings, n_modules, n_connections, meta_index,
+                         strings_offset, modules_offset + shift, connections_offset + shift)
+    return header + string_section + buffer[modules_offset:]
+
+
+class BinaryFormatTest(unittest.TestCase):
+    """二进制格式的往返、延迟加载和旧版本兼容"""
+
+    def setUp(self):
+        self.registry = ModuleRegistry()
+        for module_class in (NumberGeneratorModule, MathOperationModule):
+            self.registry.register(module_class)
+        self.workflow = Workflow("二进制", "非 ASCII 描述 ✓")
+        self.sources = []
+        for index in range(5):
+            source = NumberGeneratorModule(f"数字{index}")
+            source.set_parameter("min_value", index)
+            source.set_parameter("max_value", index + 100)
+            self.workflow.add_module(source)
+            self.sources.append(source)
+        self.math = MathOperationModule("求和")
+        self.math.set_parameter("operation", "multiply")
+        self.workflow.add_module(self.math)
+        self.workflow.connect(self.sources[0].id, "number", self.math.id, "number1")
+        self.workflow.connect(self.sources[1].id, "number", self.math.id, "number2")
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "workflow.wfb")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _assert_same(self, loaded):
+        self.assertEqual(loaded.id, self.workflow.id)
+        self.assertEqual(loaded.name, "二进制")
+        self.assertEqual(list(loaded.modules), list(self.workflow.modules))
+        for module_id, module in self.workflow.modules.items():
+            self.assertEqual(loaded.modules[module_id].name, module.name)
+            self.assertEqual(dict(loaded.modules[module_id].parameters), dict(module.parameters))
+        self.assertEqual(len(loaded.get_incoming_connections(self.math.id)), 2)
+
+    def test_round_trip(self):
+        self.workflow.save_binary(self.path)
+        self._assert_same(Workflow.load(self.path, self.registry))
+
+    def test_same_data_as_json(self):
+        # 二进制格式与 JSON 格式保存相同的信息 (端口ID等加载时重新生成的字段除外)
+        json_path = os.path.join(self.directory, "workflow.json")
+        self.workflow.save(json_path)
+        self.workflow.save_binary(self.path)
+        from_json = Workflow.load(json_path, self.registry)
+        from_binary = Workflow.load(self.path, self.registry)
+        self.assertEqual(from_binary.to_dict()["modules"].keys(), from_json.to_dict()["modules"].keys())
+        for module_id in self.workflow.modules:
+            binary_data = from_binary.modules[module_id].to_dict()
+            json_data = from_json.modules[module_id].to_dict()
+            for key in ("module_type", "name", "description", "current_variant_id", "parameters", "position"):
+                self.assertEqual(binary_data[key], json_data[key], key)
+        self.assertEqual(sorted(conn.to_dict()["target_port_name"] for conn in from_binary.connections.values()),
+                         sorted(conn.to_dict()["target_port_name"] for conn in from_json.connections.values()))
+        self.assertLess(os.path.getsize(self.path), os.path.getsize(json_path))
+
+    def test_shared_strings_stored_once(self):
+        for source in self.sources:
+            source.set_parameter("min_value", 1)
+            source.set_parameter("max_value", 2)
+        reader = BinaryWorkflowReader(encode_workflow(self.workflow.to_dict()))
+        strings = [reader._get_string(index) for index in range(len(reader._strings))]
+        self.assertEqual(len(strings), len(set(strings)))
+        # 五个数字生成模块的参数相同，只驻留一份
+        self.assertEqual(sum('"max_value":2' in value for value in strings), 1)
+
+    def test_lazy_load_decodes_on_access(self):
+        self.workflow.save_binary(self.path)
+        with Workflow.load(self.path, self.registry, lazy=True) as loaded:
+            reader = loaded.modules._reader_slot[0]
+            self.assertEqual(loaded.modules.loaded_count, 0)
+            # 打开时只解码元数据、模块ID和连接用到的字符串，参数 JSON 尚未解码
+            decoded = [value for value in reader._strings if value is not None]
+            self.assertFalse(any("max_value" in value for value in decoded))
+            self.assertIn(self.math.id, decoded)
+            module = loaded.modules[self.sources[3].id]
+            self.assertEqual(loaded.modules.loaded_count, 1)
+            self.assertEqual(module.get_parameter("max_value"), 103)
+            self.assertEqual(sum("max_value" in value for value in reader._strings if value is not None), 1)
+            self._assert_same(loaded)
+
+    def test_read_version_1(self):
+        with open(self.path, 'wb') as f:
+            f.write(_encode_v1(self.workflow.to_dict()))
+        self._assert_same(Workflow.load(self.path, self.registry))
+        self._assert_same(Workflow.load(self.path, self.registry, lazy=True))
+
+    def test_meta_and_invalid_buffer(self):
+        reader = BinaryWorkflowReader(encode_workflow(self.workflow.to_dict()))
+        self.assertEqual(reader.meta["description"], "非 ASCII 描述 ✓")
+        self.assertEqual(reader.module_count, 6)
+        with self.assertRaises(ValueError):
+            BinaryWorkflowReader(json.dumps(self.workflow.to_dict()).encode('utf-8'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from backend.core.base_module import Port
+from backend.core.workflow import Workflow, Connection
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+class CompactPortTest(unittest.TestCase):
+    """端口和连接的紧凑表示: __slots__、紧凑ID、元组保存连接状态"""
+
+    def test_port_connections(self):
+        port = Port("number", "number")
+        self.assertFalse(hasattr(port, "__dict__"))
+        port.connect("a")
+        port.connect("a")
+        port.connect("b")
+        self.assertEqual(port.connected_to, {"a", "b"})
+        port.connected_to.add("c")  # 返回的是副本
+        self.assertEqual(port.connected_to, {"a", "b"})
+        port.disconnect("a")
+        self.assertEqual(port.connected_to, {"b"})
+        port.disconnect_all()
+        self.assertEqual(port.connected_to, set())
+
+    def test_unique_compact_ids(self):
+        ids = {Port("number", "number").id for _ in range(1000)}
+        self.assertEqual(len(ids), 1000)
+        self.assertTrue(all(len(port_id) < 36 for port_id in ids))
+
+    def test_connection_reuses_module_ids(self):
+        workflow = Workflow("compact")
+        source = NumberGeneratorModule("source")
+        target = MathOperationModule("target")
+        workflow.add_module(source)
+        workflow.add_module(target)
+        connection = workflow.connections[workflow.connect(source.id, "number", target.id, "number1")]
+        self.assertIsInstance(connection, Connection)
+        self.assertFalse(hasattr(connection, "__dict__"))
+        self.assertIs(connection.source_module_id, source.id)
+        self.assertIs(connection.target_module_id, target.id)
+
+    def test_variant_change_reuses_unchanged_ports(self):
+        module = MathOperationModule("math", initial_variant_id="unary_op")
+        input_port = module.get_input_port("input_val")
+        input_port.connect("number")
+        self.assertIsNone(module.get_output_port("original_val_passthrough"))
+        module.set_variant("unary_op", {"original_val_passthrough": True})
+        self.assertIs(module.get_input_port("input_val"), input_port)
+        self.assertEqual(module.get_input_port("input_val").connected_to, {"number"})
+        self.assertIsNotNone(module.get_output_port("original_val_passthrough"))
+
+
+if __name__ == '__main__':
+    unittest.main()
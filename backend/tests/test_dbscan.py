@@ -0,0 +1,103 @@
+import unittest
+
+try:
+    import numpy as np
+    import pandas as pd
+    from sklearn.cluster import DBSCAN
+
+    from backend.workflow_modules.analysis.dbscan_module import DBSCANModule, dbscan_chunked
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def _points(num_rows, n_dims=2, seed=0):
+    """若干高斯簇加少量重复点"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(0, 10, size=(8, n_dims))
+    points = centers[rng.integers(0, len(centers), size=num_rows)] + rng.normal(0, 0.4, size=(num_rows, n_dims))
+    points[: num_rows // 20] = points[num_rows // 20: 2 * (num_rows // 20)]
+    return points
+
+
+@unittest.skipIf(np is None, "需要 numpy、pandas 和 scikit-learn")
+class ParameterSweepTest(unittest.TestCase):
+    """参数扫描共享一次邻居搜索，每组参数的标签与单独运行 sklearn DBSCAN 相同"""
+
+    def test_labels_match_separate_fits(self):
+        points = _points(1500)
+        data = pd.DataFrame(points, columns=["x", "y"])
+        module = DBSCANModule(initial_variant_id="parameter_sweep")
+        module.set_parameter("eps_values", [0.1, 0.3, 0.3, 0.6])
+        module.set_parameter("min_samples_values", [1, 5, 12])
+        outputs = module.execute({"data_input": data})
+
+        labels = outputs["sweep_labels"]
+        summary = outputs["sweep_summary"]
+        self.assertEqual(labels.shape, (len(data), 9))  # 重复的取值只运行一次
+        self.assertTrue(labels.index.equals(data.index))
+        for column, (_, row) in zip(labels.columns, summary.iterrows()):
+            expected = DBSCAN(eps=row["eps"], min_samples=row["min_samples"]).fit(points).labels_
+            np.testing.assert_array_equal(labels[column].to_numpy(), expected, err_msg=column)
+            self.assertEqual(row["setting"], column)
+            self.assertEqual(row["n_clusters"], expected.max() + 1)
+            self.assertEqual(row["n_noise"], np.count_nonzero(expected == -1))
+
+    def test_empty_input(self):
+        module = DBSCANModule(initial_variant_id="parameter_sweep")
+        module.set_parameter("eps_values", [0.2, 0.4])
+        outputs = module.execute({"data_input": pd.DataFrame({"x": [], "y": []})})
+        self.assertEqual(outputs["sweep_labels"].shape, (0, 2))
+        self.assertEqual(list(outputs["sweep_summary"]["n_clusters"]), [0, 0])
+
+    def test_invalid_values(self):
+        module = DBSCANModule(initial_variant_id="parameter_sweep")
+        module.set_parameter("eps_values", [])
+        with self.assertRaises(ValueError):
+            module.execute({"data_input": pd.DataFrame({"x": [0.0]})})
+
+
+@unittest.skipIf(np is None, "需要 numpy、pandas 和 scikit-learn")
+class ChunkedDBSCANTest(unittest.TestCase):
+    """分批查询邻居的 DBSCAN 与 sklearn DBSCAN 的标签 (包括簇编号) 完全相同"""
+
+    def _assert_same(self, points, eps, min_samples, metric='euclidean', **kwargs):
+        expected = DBSCAN(eps=eps, min_samples=min_samples, metric=metric).fit(points).labels_
+        actual = dbscan_chunked(points, eps, min_samples, metric, **kwargs)
+        np.testing.assert_array_equal(actual, expected, err_msg=f"eps={eps}, min_samples={min_samples}, {kwargs}")
+
+    def test_tiny_working_memory(self):
+        # 工作内存极小时每批只有最少行数，覆盖多批查询和跨批合并
+        points = _points(3000)
+        for eps in (0.05, 0.3, 1.0):
+            for min_samples in (1, 4, 15):
+                self._assert_same(points, eps, min_samples, working_memory_mb=0.001)
+
+    def test_metrics_and_threads(self):
+        points = _points(1200, n_dims=3, seed=1)
+        self._assert_same(points, 0.5, 5, metric='manhattan', working_memory_mb=0.01)
+        self._assert_same(points, 0.5, 5, metric='canberra', working_memory_mb=0.01)  # BallTree
+        self._assert_same(points, 0.5, 5, n_jobs=2, working_memory_mb=0.01)
+
+    def test_float32_input(self):
+        points = _points(1000).astype(np.float32)
+        self._assert_same(points, 0.3, 5, working_memory_mb=0.001)
+
+    def test_empty(self):
+        self.assertEqual(len(dbscan_chunked(np.empty((0, 2)), 0.5, 5)), 0)
+
+    def test_large_data_variant(self):
+        points = _points(800)
+        data = pd.DataFrame(points, columns=["x", "y"], index=np.arange(800) * 2)
+        module = DBSCANModule(initial_variant_id="large_data")
+        module.set_parameter("eps", 0.3)
+        module.set_parameter("working_memory_mb", 0.001)
+        outputs = module.execute({"data_input": data})
+        expected = DBSCAN(eps=0.3, min_samples=5).fit(points).labels_
+        clustered = outputs["clustered_data"]
+        self.assertTrue(clustered.index.equals(data.index[expected != -1]))
+        np.testing.assert_array_equal(clustered["cluster_label"].to_numpy(), expected[expected != -1])
+        self.assertNotIn("noise_data", outputs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from backend.core.engine import WorkflowEngine, ProgressCallbackType
+from backend.core.execution_plan import compile_plan
+from backend.core.module_registry import ModuleRegistry
+from backend.core.optimizer import fuse_chains
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+class FuseChainsTest(unittest.TestCase):
+    """轻量模块组成、中间结果只有一个下游的线性链融合为一个执行任务"""
+
+    def setUp(self):
+        # source -> a -> b -> c -> (d, e)；source 不可融合，c 有两个下游
+        self.engine = WorkflowEngine(ModuleRegistry())
+        self.workflow = self.engine.create_workflow("fuse")
+        self.source = NumberGeneratorModule("source")
+        self.source.set_parameter("min_value", 2)
+        self.source.set_parameter("max_value", 2)
+        self.a, self.b, self.c, self.d, self.e = (MathOperationModule(name) for name in "abcde")
+        for module in (self.source, self.a, self.b, self.c, self.d, self.e):
+            self.workflow.add_module(module)
+            if module is not self.source:
+                module.set_parameter("operation", "multiply")
+        connect = self.workflow.connect
+        connect(self.source.id, "number", self.a.id, "number1")
+        connect(self.source.id, "number", self.a.id, "number2")
+        connect(self.a.id, "result", self.b.id, "number1")
+        connect(self.source.id, "number", self.b.id, "number2")
+        connect(self.b.id, "result", self.c.id, "number1")
+        connect(self.source.id, "number", self.c.id, "number2")
+        connect(self.c.id, "result", self.d.id, "number1")
+        connect(self.c.id, "result", self.e.id, "number1")
+        self.events = []
+        self.engine.register_progress_callback(lambda event_type, data: self.events.append((event_type, data)))
+
+    def test_chains(self):
+        plan = compile_plan(self.workflow)
+        fused, chains = fuse_chains(plan)
+        self.assertEqual(chains, [[self.a.id, self.b.id, self.c.id]])
+        self.assertEqual(len(fused.steps), len(plan.steps) - 2)
+        self.assertEqual([member.key for member in fused.steps[1].members], chains[0])
+        self.assertEqual(fuse_chains(plan, min_length=4), (plan, []))
+
+    def test_fused_run_matches_plain_run(self):
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        expected = dict(self.engine.execution_results)
+        self.events.clear()
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False, fuse=True))
+        self.assertEqual(self.engine.execution_results, expected)
+        self.assertEqual(expected[self.c.id], {"result": 16.0})
+        batches = [data for event_type, data in self.events if event_type == ProgressCallbackType.MODULE_BATCH_COMPLETE]
+        self.assertEqual(len(batches), 1)
+        self.assertEqual([item["module_id"] for item in batches[0]["modules"]], [self.a.id, self.b.id, self.c.id])
+        started = [data["module_id"] for event_type, data in self.events if event_type == ProgressCallbackType.MODULE_START]
+        self.assertNotIn(self.b.id, started)
+
+    def test_error_inside_chain(self):
+        self.b.set_parameter("operation", "divide")
+        self.source.set_parameter("min_value", 0)
+        self.source.set_parameter("max_value", 0)
+        self.engine.execute(self.workflow.id, async_run=False, fuse=True)
+        self.assertEqual(self.engine.execution_status, "error")
+        self.assertIn(self.a.id, self.engine.execution_results)
+        self.assertNotIn(self.c.id, self.engine.execution_results)
+        errors = [data for event_type, data in self.events if event_type == ProgressCallbackType.MODULE_ERROR]
+        self.assertEqual([data["module_id"] for data in errors], [self.b.id])
+        batches = [data for event_type, data in self.events if event_type == ProgressCallbackType.MODULE_BATCH_COMPLETE]
+        self.assertEqual([item["module_id"] for item in batches[0]["modules"]], [self.a.id])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+try:
+    import numpy as np
+    import pandas as pd
+    from sklearn.cluster import DBSCAN
+
+    from backend.workflow_modules.analysis.grid_dbscan_module import GridDBSCANModule, grid_dbscan
+except ImportError:  # pragma: no cover
+    np = None
+
+
+@unittest.skipIf(np is None, "需要 numpy、pandas 和 scikit-learn")
+class GridDBSCANTest(unittest.TestCase):
+    """网格 DBSCAN 的标签 (包括簇编号) 与 sklearn DBSCAN 完全相同"""
+
+    def _assert_same(self, points, eps, min_samples, working_memory_mb=256):
+        expected = DBSCAN(eps=eps, min_samples=min_samples).fit(points).labels_
+        actual = grid_dbscan(points, eps, min_samples, working_memory_mb)
+        np.testing.assert_array_equal(actual, expected,
+                                      err_msg=f"{points.shape}, eps={eps}, min_samples={min_samples}, "
+                                              f"working_memory_mb={working_memory_mb}")
+
+    def test_matches_sklearn(self):
+        # 1 ~ 3 维、含重复点；很小的工作内存覆盖分批和拆分格子的路径
+        rng = np.random.default_rng(1)
+        for n_dims in (1, 2, 3):
+            for num_rows in (1, 50, 1000):
+                points = rng.normal(0, 1, size=(num_rows, n_dims))
+                if num_rows > 10:
+                    points[: num_rows // 10] = points[num_rows // 10: 2 * (num_rows // 10)]
+                for eps in (0.05, 0.2, 0.7):
+                    for min_samples in (1, 3, 10):
+                        for working_memory_mb in (256, 0.001):
+                            self._assert_same(points, eps, min_samples, working_memory_mb)
+
+    def test_huge_bounding_box(self):
+        # 数据范围相对于 eps 极大: 线性化的格子编号会溢出，稀疏的格子索引不受影响
+        rng = np.random.default_rng(2)
+        for n_dims in (1, 2, 3):
+            centers = rng.uniform(-1e12, 1e12, size=(6, n_dims))
+            centers[0] = 0.0
+            points = centers[rng.integers(0, len(centers), size=1500)] + rng.normal(0, 0.3, size=(1500, n_dims))
+            for working_memory_mb in (256, 0.001):
+                self._assert_same(points, 0.25, 4, working_memory_mb)
+
+    def test_empty_and_invalid(self):
+        self.assertEqual(len(grid_dbscan(np.empty((0, 2)), 0.5, 5)), 0)
+        with self.assertRaises(ValueError):
+            grid_dbscan(np.zeros((5, 4)), 0.5, 5)
+
+    def test_module_labels_variant(self):
+        rng = np.random.default_rng(3)
+        points = rng.normal(0, 1, size=(500, 2))
+        data = pd.DataFrame(points, columns=["lon", "lat"], index=np.arange(500) + 100)
+        module = GridDBSCANModule(initial_variant_id="labels")
+        module.set_parameter("eps", 0.2)
+        module.set_parameter("min_samples", 4)
+        outputs = module.execute({"data_input": data})
+        expected = DBSCAN(eps=0.2, min_samples=4).fit(points).labels_
+        self.assertTrue(outputs["cluster_labels"].index.equals(data.index))
+        np.testing.assert_array_equal(outputs["cluster_labels"].to_numpy(), expected)
+        np.testing.assert_array_equal(outputs["clustered_mask"].to_numpy(), expected != -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from backend.core.engine import WorkflowEngine, ProgressCallbackType
+from backend.core.metrics import MetricsRegistry
+from backend.core.module_registry import ModuleRegistry
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+def _constant(name, value):
+    module = NumberGeneratorModule(name)
+    module.set_parameter("min_value", value)
+    module.set_parameter("max_value", value)
+    return module
+
+
+class HotRunTest(unittest.TestCase):
+    """热运行复用预备计划，工作流改变后自动重新准备"""
+
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+        self.engine = WorkflowEngine(ModuleRegistry(), metrics_registry=self.metrics)
+        self.workflow = self.engine.create_workflow("hot")
+        self.source = _constant("source", 3)
+        self.first = MathOperationModule("first")
+        self.second = MathOperationModule("second")
+        for module in (self.source, self.first, self.second):
+            self.workflow.add_module(module)
+        self.workflow.connect(self.source.id, "number", self.first.id, "number1")
+        self.workflow.connect(self.source.id, "number", self.first.id, "number2")
+        self.workflow.connect(self.first.id, "result", self.second.id, "number1")
+
+    def _lookups(self, result):
+        return self.metrics.get("workflow_cache_requests_total").get(cache="prepared_plan", result=result)
+
+    def test_matches_execute(self):
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        expected = dict(self.engine.execution_results)
+        self.assertTrue(self.engine.run_hot(self.workflow.id))
+        self.assertEqual(self.engine.execution_results, expected)
+        self.assertEqual(self.engine.execution_status, "completed")
+
+    def test_plan_reused_until_changed(self):
+        self.assertTrue(self.engine.run_hot(self.workflow.id))
+        self.assertTrue(self.engine.run_hot(self.workflow.id))
+        self.assertEqual((self._lookups("miss"), self._lookups("hit")), (1, 1))
+        self.first.set_parameter("operation", "multiply")
+        self.assertTrue(self.engine.run_hot(self.workflow.id))
+        self.assertEqual(self.engine.execution_results[self.second.id]["result"], 9)
+        self.workflow.connect(self.source.id, "number", self.second.id, "number2")
+        self.assertTrue(self.engine.run_hot(self.workflow.id))
+        self.assertEqual(self.engine.execution_results[self.second.id]["result"], 12)
+        self.assertTrue(self.engine.run_hot(self.workflow.id, requested_outputs=[self.first.id]))
+        self.assertEqual(set(self.engine.execution_results), {self.source.id, self.first.id})
+        self.assertEqual((self._lookups("miss"), self._lookups("hit")), (4, 1))
+
+    def test_events_and_errors(self):
+        events = []
+        self.engine.register_progress_callback(lambda event_type, data: events.append(event_type))
+        self.assertTrue(self.engine.run_hot(self.workflow.id))
+        self.assertEqual(events.count(ProgressCallbackType.MODULE_START), 3)
+        self.assertEqual(events.count(ProgressCallbackType.MODULE_COMPLETE), 3)
+        self.assertEqual(events[-1], ProgressCallbackType.COMPLETE)
+        self.second.set_parameter("operation", "divide")
+        self.assertFalse(self.engine.run_hot(self.workflow.id))
+        self.assertEqual(self.engine.execution_status, "error")
+        self.assertIn(ProgressCallbackType.MODULE_ERROR, events)
+        self.assertEqual(self.metrics.get("workflow_runs_failed_total").get(), 1)
+
+    def test_prepared_with_optimize_and_fuse(self):
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        expected = dict(self.engine.execution_results)
+        prepared = self.engine.prepare(self.workflow.id, optimize=True, fuse=True)
+        for _ in range(2):
+            self.assertTrue(self.engine.run_prepared(prepared))
+            self.assertEqual(self.engine.execution_results, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import gc
+import unittest
+import urllib.request
+
+from backend.core.engine import WorkflowEngine
+from backend.core.metrics import MetricsRegistry
+from backend.core.module_registry import ModuleRegistry
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    """指标的 Prometheus 文本导出"""
+
+    def test_render_prometheus(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("jobs_total", "任务数", ["kind"])
+        counter.inc(kind='a"b')
+        histogram = registry.histogram("latency_seconds", "耗时", buckets=(0.1, 1.0))
+        histogram.observe_many([0.05, 0.5, 5.0])
+        text = registry.render_prometheus()
+        self.assertIn("# TYPE jobs_total counter", text)
+        self.assertIn('jobs_total{kind="a\\"b"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("latency_seconds_count 3", text)
+        with self.assertRaises(ValueError):
+            counter.inc(-1, kind="a")
+        with self.assertRaises(ValueError):
+            counter.inc(other="a")
+        with self.assertRaises(TypeError):
+            registry.gauge("jobs_total", "任务数")
+
+    def test_http_server(self):
+        registry = MetricsRegistry()
+        registry.gauge("queue_depth", "队列深度").set(3)
+        server = registry.start_http_server(port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertIn("queue_depth 3", response.read().decode('utf-8'))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class EngineMetricsTest(unittest.TestCase):
+    """引擎记录运行次数、模块耗时和结果占用"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.engine = WorkflowEngine(ModuleRegistry(), metrics_registry=self.registry)
+        self.workflow = self.engine.create_workflow("metrics")
+        source = NumberGeneratorModule("source")
+        math = MathOperationModule("math")
+        self.workflow.add_module(source)
+        self.workflow.add_module(math)
+        self.workflow.connect(source.id, "number", math.id, "number1")
+
+    def test_run_counters(self):
+        for _ in range(2):
+            self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        self.assertEqual(self.registry.get("workflow_runs_started_total").get(), 2)
+        self.assertEqual(self.registry.get("workflow_runs_completed_total").get(), 2)
+        self.assertEqual(self.registry.get("workflow_active_runs").get(), 0)
+        self.assertEqual(self.registry.get("workflow_run_duration_seconds").get_count(), 2)
+        module_duration = self.registry.get("workflow_module_duration_seconds")
+        self.assertEqual(module_duration.get_count(module_type="MathOperationModule"), 2)
+        self.assertEqual(module_duration.get_count(module_type="NumberGeneratorModule"), 2)
+
+    def test_result_bytes_per_engine(self):
+        other = WorkflowEngine(ModuleRegistry(), metrics_registry=self.registry)
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        result_bytes = self.registry.get("workflow_execution_results_bytes")
+        label = self.engine._metrics.engine_label
+        self.assertGreater(result_bytes.get(engine=label), 0)
+        other_label = other._metrics.engine_label
+        self.assertNotEqual(label, other_label)
+        other_workflow = other.create_workflow("other")
+        other_workflow.add_module(NumberGeneratorModule("source"))
+        self.assertTrue(other.execute(other_workflow.id, async_run=False))
+        self.assertIn(f'engine="{other_label}"', self.registry.render_prometheus())
+        # 引擎被释放后删除它的样本，不影响其他引擎
+        del other, other_workflow
+        gc.collect()
+        self.assertNotIn(f'engine="{other_label}"', self.registry.render_prometheus())
+        self.assertIn(f'engine="{label}"', self.registry.render_prometheus())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from backend.core.module_manifest import ModuleManifest, refresh_manifest
+from backend.core.module_registry import ModuleRegistry
+
+_PROBE_SOURCE = '''from backend.examples.example_modules import MathOperationModule
+
+
+class ProbeModule(MathOperationModule):
+    """{doc}"""
+'''
+
+
+class ModuleManifestTest(unittest.TestCase):
+    """模块定义清单: 不导入模块即可查询变体，源文件内容改变的条目视为过期"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.directory, "wf_manifest_probe.py")
+        self._write_source("v1")
+        sys.path.insert(0, self.directory)
+        self.registry = ModuleRegistry()
+        self.registry.register_lazy("ProbeModule", "wf_manifest_probe:ProbeModule", "测试")
+        self.registry.register_lazy("MathOperationModule", "backend.examples.example_modules:MathOperationModule", "数学")
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+
+    def tearDown(self):
+        sys.path.remove(self.directory)
+        sys.modules.pop("wf_manifest_probe", None)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write_source(self, doc):
+        with open(self.source_path, 'w', encoding='utf-8') as f:
+            f.write(_PROBE_SOURCE.format(doc=doc))
+
+    def test_variants_without_import(self):
+        ModuleManifest.build(self.registry).save(self.manifest_path)
+        sys.modules.pop("wf_manifest_probe", None)
+        registry = ModuleRegistry()
+        registry.register_lazy("ProbeModule", "wf_manifest_probe:ProbeModule", "测试")
+        self.assertEqual(registry.use_manifest(ModuleManifest.load(self.manifest_path)), [])
+        variants = registry.get_module_variant_details("ProbeModule")
+        self.assertEqual(sorted(variants), ["default", "unary_op"])
+        self.assertEqual([port.name for port in variants["default"].port_definitions], ["number1", "number2", "result"])
+        self.assertFalse(registry.is_loaded("ProbeModule"))
+        self.assertNotIn("wf_manifest_probe", sys.modules)
+        self.assertIn(b'"ProbeModule"', registry.manifest.definitions_json())
+
+    def test_package_paths_are_relative(self):
+        entry = ModuleManifest.build(self.registry).entry("MathOperationModule")
+        paths = [fingerprint["path"] for fingerprint in entry["fingerprints"]]
+        self.assertIn("backend/examples/example_modules.py", paths)
+        self.assertIn("backend/core/base_module.py", paths)
+
+    def test_staleness(self):
+        manifest = ModuleManifest.build(self.registry)
+        self.assertEqual(manifest.stale_modules(), [])
+        # 只改变修改时间 (内容不变) 不算过期
+        stat = os.stat(self.source_path)
+        os.utime(self.source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertFalse(manifest.is_stale("ProbeModule"))
+        self._write_source("v2")
+        self.assertTrue(manifest.is_stale("ProbeModule"))
+        self.assertFalse(manifest.is_stale("MathOperationModule"))
+        self.assertEqual(self.registry.use_manifest(manifest), ["ProbeModule"])
+        self.assertNotIn("ProbeModule", manifest)
+        # 过期的模块退回到导入模块类
+        self.assertEqual(sorted(self.registry.get_module_variant_details("ProbeModule")), ["default", "unary_op"])
+        self.assertTrue(self.registry.is_loaded("ProbeModule"))
+
+    def test_refresh_rebuilds_stale_entries(self):
+        first = refresh_manifest(self.registry, self.manifest_path)
+        # 没有过期条目时不重新生成
+        self.assertEqual(refresh_manifest(self.registry, self.manifest_path).created_at, first.created_at)
+        self._write_source("v2")
+        sys.modules.pop("wf_manifest_probe", None)
+        importlib.invalidate_caches()
+        self.registry.unregister("ProbeModule")
+        self.registry.register_lazy("ProbeModule", "wf_manifest_probe:ProbeModule", "测试")
+        refreshed = refresh_manifest(self.registry, self.manifest_path)
+        self.assertNotEqual(refreshed.entry("ProbeModule")["fingerprints"][0]["sha256"],
+                            first.entry("ProbeModule")["fingerprints"][0]["sha256"])
+        self.assertEqual(ModuleManifest.load(self.manifest_path).stale_modules(), [])
+        self.registry.unregister("MathOperationModule")
+        self.assertEqual(refresh_manifest(self.registry, self.manifest_path).module_names(), ["ProbeModule"])
+
+
+if __name__ == '__main__':
+    unittest.main()
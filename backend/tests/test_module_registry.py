@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from backend.core.module_registry import ModuleRegistry
+from backend.examples.example_modules import MathOperationModule
+
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LazyRegistryTest(unittest.TestCase):
+    """延迟注册的模块在第一次需要类时才导入"""
+
+    def setUp(self):
+        self.registry = ModuleRegistry()
+        self.registry.register_lazy("MathOperationModule",
+                                    "backend.examples.example_modules:MathOperationModule", "数学")
+
+    def test_names_without_import(self):
+        self.assertTrue(self.registry.is_registered("MathOperationModule"))
+        self.assertFalse(self.registry.is_loaded("MathOperationModule"))
+        self.assertEqual(self.registry.get_names(), ["MathOperationModule"])
+        self.assertEqual(self.registry.get_categories(), {"数学": ["MathOperationModule"]})
+        self.assertFalse(self.registry.is_loaded("MathOperationModule"))
+
+    def test_import_on_first_use(self):
+        module = self.registry.create_instance("MathOperationModule", "math")
+        self.assertIsInstance(module, MathOperationModule)
+        self.assertTrue(self.registry.is_loaded("MathOperationModule"))
+        self.assertIs(self.registry.get("MathOperationModule"), MathOperationModule)
+        self.assertEqual(self.registry.get_names(), ["MathOperationModule"])
+        self.assertTrue(self.registry.unregister("MathOperationModule"))
+        self.assertFalse(self.registry.is_registered("MathOperationModule"))
+
+    def test_invalid_paths(self):
+        with self.assertRaises(ValueError):
+            self.registry.register_lazy("Broken", "backend.examples.example_modules")
+        self.registry.register_lazy("Missing", "backend.examples.example_modules:Missing")
+        with self.assertRaises(ImportError):
+            self.registry.get("Missing")
+        self.registry.register_lazy("NotModule", "backend.examples.example_modules:glogger")
+        with self.assertRaises(TypeError):
+            self.registry.get("NotModule")
+        self.assertIsNone(self.registry.get("Unknown"))
+
+    def test_register_all_does_not_import_heavy_modules(self):
+        code = ("import sys\n"
+                "from backend.workflow_modules.registry import register_all_workflow_modules\n"
+                "from backend.core.module_registry import gmodule_registry\n"
+                "register_all_workflow_modules()\n"
+                "assert gmodule_registry.is_registered('DBSCANModule')\n"
+                "loaded = [name for name in ('sklearn', 'backend.workflow_modules.analysis.dbscan_module') "
+                "if name in sys.modules]\n"
+                "assert not loaded, loaded\n")
+        result = subprocess.run([sys.executable, "-c", code], cwd=_PACKAGE_ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
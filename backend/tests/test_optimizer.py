@@ -0,0 +1,103 @@
+import unittest
+
+from backend.core.engine import WorkflowEngine
+from backend.core.execution_plan import compile_plan
+from backend.core.module_registry import ModuleRegistry
+from backend.core.optimizer import optimize_plan
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+def _constant(name, value):
+    module = NumberGeneratorModule(name)
+    module.set_parameter("min_value", value)
+    module.set_parameter("max_value", value)
+    return module
+
+
+class OptimizePlanTest(unittest.TestCase):
+    """常量折叠、公共子表达式消除和死模块消除"""
+
+    def setUp(self):
+        self.engine = WorkflowEngine(ModuleRegistry())
+        self.workflow = self.engine.create_workflow("optimize")
+        self.threshold = _constant("threshold_gen", 5)
+        self.threshold_copy = _constant("threshold_gen2", 5)
+        self.random = NumberGeneratorModule("random")
+        self.left = MathOperationModule("left")      # random + threshold
+        self.right = MathOperationModule("right")    # random + threshold_copy，与 left 重复
+        self.total = MathOperationModule("total")    # left + right
+        self.unused = MathOperationModule("unused")  # 只依赖 random，没有下游
+        self.folded = MathOperationModule("folded")  # threshold + threshold_copy，可以预先计算
+        for module in (self.threshold, self.threshold_copy, self.random, self.left, self.right,
+                       self.total, self.unused, self.folded):
+            self.workflow.add_module(module)
+        connect = self.workflow.connect
+        connect(self.random.id, "number", self.left.id, "number1")
+        connect(self.threshold.id, "number", self.left.id, "number2")
+        connect(self.random.id, "number", self.right.id, "number1")
+        connect(self.threshold_copy.id, "number", self.right.id, "number2")
+        connect(self.left.id, "result", self.total.id, "number1")
+        connect(self.right.id, "result", self.total.id, "number2")
+        connect(self.random.id, "number", self.unused.id, "number1")
+        connect(self.threshold.id, "number", self.folded.id, "number1")
+        connect(self.threshold_copy.id, "number", self.folded.id, "number2")
+
+    def test_fold_merge_and_remove(self):
+        plan, report = optimize_plan(compile_plan(self.workflow), [self.total.id])
+        self.assertEqual(report.merged, {self.threshold_copy.id: self.threshold.id, self.right.id: self.left.id})
+        self.assertIn(self.threshold.id, report.folded)
+        self.assertEqual(set(report.removed), {self.unused.id, self.folded.id})
+        keys = [step.key for step in plan.steps]
+        self.assertNotIn(self.unused.id, keys)
+        # 需要执行的只剩 random、left 和 total
+        self.assertEqual(report.steps_after, 3)
+
+    def test_optimized_run_matches_plain_run(self):
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False, optimize=True,
+                                            requested_outputs=[self.total.id]))
+        results = self.engine.execution_results
+        number = results[self.random.id]["number"]
+        self.assertEqual(results[self.total.id]["result"], 2 * (number + 5))
+        self.assertNotIn(self.unused.id, results)
+
+    def test_all_top_level_results_kept(self):
+        # 未指定 requested_outputs 时，优化不能丢掉任何顶层模块的结果 (包括被折叠步骤的常量来源)
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        expected_keys = set(self.engine.execution_results)
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False, optimize=True))
+        results = self.engine.execution_results
+        self.assertEqual(set(results), expected_keys)
+        self.assertEqual(results[self.threshold.id], {"number": 5.0})
+        self.assertEqual(results[self.threshold_copy.id], {"number": 5.0})
+        self.assertEqual(results[self.folded.id], {"result": 10.0})
+        self.assertEqual(self.engine.last_optimization_report.removed, [])
+
+    def test_constant_sources_of_folded_steps_kept(self):
+        # base 只被折叠的 doubled 使用，折叠后 doubled 不再依赖它，但 base 的结果仍然保留
+        workflow = self.engine.create_workflow("fold")
+        base = _constant("base", 2)
+        doubled = MathOperationModule("doubled")
+        sink = MathOperationModule("sink")
+        for module in (base, doubled, sink, self.random):
+            workflow.add_module(module)
+        workflow.connect(base.id, "number", doubled.id, "number1")
+        workflow.connect(base.id, "number", doubled.id, "number2")
+        workflow.connect(doubled.id, "result", sink.id, "number1")
+        workflow.connect(self.random.id, "number", sink.id, "number2")
+        self.assertTrue(self.engine.execute(workflow.id, async_run=False, optimize=True))
+        report = self.engine.last_optimization_report
+        self.assertEqual(report.folded, [base.id, doubled.id])
+        self.assertEqual(report.removed, [])
+        results = self.engine.execution_results
+        self.assertEqual(set(results), {base.id, doubled.id, sink.id, self.random.id})
+        self.assertEqual(results[base.id], {"number": 2.0})
+
+    def test_original_plan_unchanged(self):
+        plan = compile_plan(self.workflow)
+        steps = [(step.key, step.input_bindings, step.constant_outputs) for step in plan.steps]
+        optimize_plan(plan)
+        self.assertEqual([(step.key, step.input_bindings, step.constant_outputs) for step in plan.steps], steps)
+
+
+if __name__ == '__main__':
+    unittest.main()
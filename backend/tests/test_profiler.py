@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from backend.core.engine import WorkflowEngine
+from backend.core.module_registry import ModuleRegistry
+from backend.core.profiler import ProfileMode, RunProfiler
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+class _BusyModule:
+    """占用执行线程一段时间的模块，保证采样线程能采到样本"""
+    name = "busy"
+
+    def execute(self, inputs):
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+        return {"done": True}
+
+
+class RunProfilerTest(unittest.TestCase):
+    """按需剖析单次运行: 折叠栈以模块名为栈底，cProfile 按模块输出"""
+
+    def setUp(self):
+        self.engine = WorkflowEngine(ModuleRegistry())
+        self.workflow = self.engine.create_workflow("profile")
+        self.source = NumberGeneratorModule("source")
+        self.math = MathOperationModule("math")
+        self.workflow.add_module(self.source)
+        self.workflow.add_module(self.math)
+        self.workflow.connect(self.source.id, "number", self.math.id, "number1")
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_disabled_by_default(self):
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        self.assertIsNone(self.engine.last_profile)
+
+    def test_cprofile_per_module(self):
+        output_dir = os.path.join(self.directory, "prof")
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False,
+                                            profile=ProfileMode.CPROFILE, profile_output=output_dir))
+        profile = self.engine.last_profile
+        self.assertEqual(profile.mode, ProfileMode.CPROFILE)
+        self.assertEqual(set(profile.module_durations), {self.source.id, self.math.id})
+        self.assertIn("execute", profile.get_module_stats(self.math.id))
+        self.assertEqual(profile.get_module_stats("missing"), "")
+        files = set(os.listdir(output_dir))
+        self.assertTrue({f"{self.source.id}.prof", f"{self.math.id}.prof", "all_modules.prof",
+                         "modules.txt"} <= files)
+        with self.assertRaises(ValueError):
+            profile.write_collapsed(os.path.join(self.directory, "stacks.txt"))
+
+    def test_sampling_collapsed_stacks(self):
+        profiler = RunProfiler(ProfileMode.SAMPLING, sample_interval=0.001)
+        profiler.start()
+        try:
+            self.assertEqual(profiler.run_module("busy_id", _BusyModule(), {}), {"done": True})
+        finally:
+            profiler.stop()
+        self.assertGreater(profiler.sample_count, 0)
+        stacks = [stack for stack, _ in profiler.get_collapsed_stacks()]
+        self.assertTrue(any(stack.startswith("module:busy [_BusyModule:busy_id];") for stack in stacks))
+        path = os.path.join(self.directory, "stacks.txt")
+        profiler.write_collapsed(path)
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                stack, count = line.rsplit(" ", 1)
+                self.assertNotIn(" ", stack)
+                self.assertGreater(int(count), 0)
+        with self.assertRaises(ValueError):
+            profiler.dump_stats(self.directory)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            RunProfiler("tracing")
+
+
+if __name__ == '__main__':
+    unittest.main()
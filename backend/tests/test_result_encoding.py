@@ -0,0 +1,73 @@
+import json
+import shutil
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # pragma: no cover
+    np = None
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+from backend.core.result_encoding import encode_result, encode_stored_result, iter_chunks
+from backend.core.result_store import ResultStore
+
+
+def _ndjson_rows(parts):
+    return [json.loads(line) for line in b"".join(parts).decode('utf-8').splitlines()]
+
+
+class ResultEncodingTest(unittest.TestCase):
+    """大结果按分块流式编码: 每个分块一段输出，支持列选择和行范围"""
+
+    def test_list_of_records(self):
+        rows = [{"id": index, "score": index / 2, "name": f"第{index}行"} for index in range(25)]
+        parts = list(encode_result(rows, columns=["id", "name"], offset=5, limit=12, chunk_rows=5))
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(_ndjson_rows(parts), [{"id": index, "name": f"第{index}行"} for index in range(5, 17)])
+        self.assertEqual(_ndjson_rows(encode_result({"nan": float("nan"), "n": 1})), [{"nan": None, "n": 1}])
+        with self.assertRaises(ValueError):
+            list(iter_chunks(rows, chunk_rows=0))
+        with self.assertRaises(ValueError):
+            list(encode_result(rows, format="xml"))
+
+    @unittest.skipIf(np is None, "需要 numpy 和 pandas")
+    def test_frames_series_and_arrays(self):
+        df = pd.DataFrame({"x": np.arange(10, dtype=np.int64), "y": [1.5, np.nan] * 5})
+        parts = list(encode_result(df, chunk_rows=4))
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(_ndjson_rows(parts)[:2], [{"x": 0, "y": 1.5}, {"x": 1, "y": None}])
+        series = pd.Series(np.arange(3), name="value")
+        self.assertEqual(_ndjson_rows(encode_result(series)), [{"value": 0}, {"value": 1}, {"value": 2}])
+        matrix = np.arange(12).reshape(4, 3)
+        self.assertEqual(_ndjson_rows(encode_result(matrix, columns=[0, 2], offset=2)), [[6, 8], [9, 11]])
+
+    @unittest.skipIf(np is None, "需要 numpy 和 pandas")
+    def test_stored_result_paged(self):
+        directory = tempfile.mkdtemp()
+        try:
+            store = ResultStore(directory)
+            df = pd.DataFrame({"x": np.arange(100), "y": np.arange(100) * 2.0})
+            run = store.open_run(store.save_run({"m": {"df": df, "items": list(range(30))}}))
+            rows = _ndjson_rows(encode_stored_result(run, "m", "df", columns=["y"], offset=90, chunk_rows=4))
+            self.assertEqual(rows, [{"y": value * 2.0} for value in range(90, 100)])
+            self.assertEqual(len(list(encode_stored_result(run, "m", "df", chunk_rows=30))), 4)
+            self.assertEqual(_ndjson_rows(encode_stored_result(run, "m", "items", offset=28)), [28, 29])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    @unittest.skipIf(np is None or pa is None, "需要 numpy、pandas 和 pyarrow")
+    def test_arrow_stream(self):
+        df = pd.DataFrame({"x": np.arange(10), "y": np.arange(10) * 0.5})
+        data = b"".join(encode_result(df, format="arrow", chunk_rows=3))
+        table = pa.ipc.open_stream(data).read_all()
+        self.assertEqual(table.num_rows, 10)
+        self.assertEqual(table.column("y").to_pylist(), list(df["y"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # pragma: no cover
+    np = None
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+from backend.core import result_store
+from backend.core.engine import WorkflowEngine
+from backend.core.module_registry import ModuleRegistry
+from backend.core.result_store import ResultStore
+from backend.examples.example_modules import NumberGeneratorModule
+
+
+class _Opaque:
+    """不能 JSON 编码的对象，按 pickle 保存"""
+    def __init__(self, value):
+        self.value = value
+
+
+class ResultStoreTest(unittest.TestCase):
+    """结果按 (运行, 模块, 端口) 持久化，读取时按需加载并支持分页"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_plain_values(self):
+        store = ResultStore(self.directory)
+        large = list(range(result_store.INLINE_LIMIT // 4))
+        run_id = store.save_run({"m": {"count": 3, "items": [1, 2, 3], "large": large, "obj": _Opaque(5)}},
+                                workflow_id="wf")
+        run = store.open_run(run_id)
+        self.assertEqual(run.workflow_id, "wf")
+        self.assertEqual(run.ports("m"), ["count", "items", "large", "obj"])
+        self.assertEqual(run.describe("m", "large")["kind"], "json")
+        self.assertEqual(run.get("m", "count"), 3)
+        self.assertEqual(run.get("m", "items", offset=1, limit=1), [2])
+        self.assertEqual(run.get("m", "large", offset=10, limit=3), [10, 11, 12])
+        self.assertEqual(run.get("m", "obj").value, 5)
+        self.assertEqual([run["run_id"] for run in store.list_runs("wf")], [run_id])
+        with self.assertRaises(ValueError):
+            run.get("m", "missing")
+        self.assertTrue(store.delete_run(run_id))
+        with self.assertRaises(ValueError):
+            store.open_run(run_id)
+
+    @unittest.skipIf(np is None, "需要 numpy 和 pandas")
+    def test_frames_and_arrays(self):
+        for compression in (None, "gzip"):
+            store = ResultStore(os.path.join(self.directory, str(compression)), compression=compression)
+            df = pd.DataFrame({"a": np.arange(100, dtype=np.int64), "b": np.linspace(0, 1, 100),
+                               "c": [f"s{index}" for index in range(100)]}, index=np.arange(100) * 3)
+            series = pd.Series(np.arange(50.0), name="values")
+            matrix = np.arange(300, dtype=np.float32).reshape(100, 3)
+            run = store.open_run(store.save_run({"m": {"df": df, "series": series, "matrix": matrix}}))
+            pd.testing.assert_frame_equal(run.get("m", "df"), df, check_index_type=False)
+            page = run.get("m", "df", columns=["b"], offset=10, limit=5)
+            self.assertEqual(list(page.columns), ["b"])
+            self.assertEqual(list(page.index), [30, 33, 36, 39, 42])
+            pd.testing.assert_series_equal(run.get("m", "series", offset=48), series[48:], check_index_type=False)
+            np.testing.assert_array_equal(run.get("m", "matrix", offset=95, limit=10), matrix[95:])
+            np.testing.assert_array_equal(run.get("m", "matrix", columns=[2], offset=1, limit=2), matrix[1:3, [2]])
+            self.assertEqual(run.describe("m", "matrix")["rows"], 100)
+
+    @unittest.skipIf(np is None, "需要 numpy 和 pandas")
+    def test_gzip_npy_paging_reads_only_page(self):
+        store = ResultStore(self.directory, compression="gzip")
+        array = np.arange(100000, dtype=np.int64)
+        run = store.open_run(store.save_run({"m": {"array": array}}))
+        self.assertTrue(run.describe("m", "array")["file"].endswith(".npy.gz"))
+        with mock.patch.object(np, "load", side_effect=AssertionError("不应整体读取")):
+            page = run.get("m", "array", offset=99990, limit=20)
+        np.testing.assert_array_equal(page, array[99990:])
+        self.assertEqual(len(run.get("m", "array", offset=200000, limit=5)), 0)
+
+    @unittest.skipIf(np is None or pa is None, "需要 numpy、pandas 和 pyarrow")
+    def test_arrow_paging_across_batches(self):
+        for compression in (None, "zstd"):
+            store = ResultStore(os.path.join(self.directory, str(compression)), compression=compression)
+            df = pd.DataFrame({"a": np.arange(1000), "b": np.arange(1000) * 0.5}, index=np.arange(1000) + 7)
+            with mock.patch.object(result_store, "ARROW_BATCH_ROWS", 64):
+                run = store.open_run(store.save_run({"m": {"df": df}}))
+            self.assertEqual(len(run._entry("m", "df")["batch_starts"]), 16)
+            for offset, limit in ((0, 10), (60, 10), (100, 300), (990, 50), (2000, 5)):
+                pd.testing.assert_frame_equal(run.get("m", "df", offset=offset, limit=limit),
+                                              df.iloc[offset:offset + limit], check_index_type=False)
+
+    def test_engine_persists_runs(self):
+        store = ResultStore(self.directory)
+        engine = WorkflowEngine(ModuleRegistry(), result_store=store)
+        workflow = engine.create_workflow("persist")
+        source = NumberGeneratorModule("source")
+        workflow.add_module(source)
+        self.assertTrue(engine.execute(workflow.id, async_run=False))
+        run = store.open_run(engine.last_run_id)
+        self.assertEqual(run.workflow_id, workflow.id)
+        self.assertEqual(run.get(source.id, "number"), engine.execution_results[source.id]["number"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from backend.core.engine import WorkflowEngine, ProgressCallbackType
+from backend.core.module_registry import ModuleRegistry
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+class SnapshotRunTest(unittest.TestCase):
+    """运行基于快照: 运行期间对工作流的修改不影响本次运行"""
+
+    def setUp(self):
+        self.registry = ModuleRegistry()
+        for module_class in (NumberGeneratorModule, MathOperationModule):
+            self.registry.register(module_class)
+        self.engine = WorkflowEngine(self.registry)
+        self.workflow = self.engine.create_workflow("snapshot")
+        self.source = NumberGeneratorModule("source")
+        self.source.set_parameter("min_value", 3)
+        self.source.set_parameter("max_value", 3)
+        self.math = MathOperationModule("math")
+        self.math.set_parameter("operation", "add")
+        for module in (self.source, self.math):
+            self.workflow.add_module(module)
+        self.workflow.connect(self.source.id, "number", self.math.id, "number1")
+        self.workflow.connect(self.source.id, "number", self.math.id, "number2")
+
+    def test_edit_during_run(self):
+        # 第一个模块完成后修改下游模块的参数，下游模块仍使用运行开始时的参数
+        def on_progress(event_type, data):
+            if event_type == ProgressCallbackType.MODULE_COMPLETE and data["module_id"] == self.source.id:
+                self.math.set_parameter("operation", "multiply")
+        self.engine.register_progress_callback(on_progress)
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        self.assertEqual(self.engine.execution_results[self.math.id]["result"], 6)
+        self.assertEqual(self.math.get_parameter("operation"), "multiply")
+
+        self.engine.unregister_progress_callback(on_progress)
+        self.assertTrue(self.engine.execute(self.workflow.id, async_run=False))
+        self.assertEqual(self.engine.execution_results[self.math.id]["result"], 9)
+
+    def test_run_prepared_after_edit(self):
+        prepared = self.engine.prepare(self.workflow.id)
+        self.math.set_parameter("operation", "multiply")
+        self.assertFalse(prepared.is_current(self.workflow))
+        # 过期的预备计划仍然执行快照创建时的状态
+        self.assertTrue(self.engine.run_prepared(prepared))
+        self.assertEqual(self.engine.execution_results[self.math.id]["result"], 6)
+        self.assertTrue(self.engine.run_hot(self.workflow.id))
+        self.assertEqual(self.engine.execution_results[self.math.id]["result"], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+from backend.core.engine import WorkflowEngine, ProgressCallbackType
+from backend.core.execution_plan import compile_plan
+from backend.core.module_registry import ModuleRegistry
+from backend.core.sub_workflow import SubWorkflowModule
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+def _constant(name, value):
+    module = NumberGeneratorModule(name)
+    module.set_parameter("min_value", value)
+    module.set_parameter("max_value", value)
+    return module
+
+
+class SubWorkflowRunTest(unittest.TestCase):
+    """复合模块在执行计划中展开；内部工作流与外层快照一起冻结"""
+
+    def setUp(self):
+        # 内部工作流: y = (x + 10) + 10
+        self.inner = Workflow("inner")
+        self.ten = _constant("ten", 10)
+        self.add1 = MathOperationModule("add1")
+        self.add2 = MathOperationModule("add2")
+        for module in (self.ten, self.add1, self.add2):
+            self.inner.add_module(module)
+        self.inner.connect(self.ten.id, "number", self.add1.id, "number2")
+        self.inner.connect(self.add1.id, "result", self.add2.id, "number1")
+        self.inner_link = self.inner.connect(self.ten.id, "number", self.add2.id, "number2")
+
+        self.engine = WorkflowEngine(ModuleRegistry())
+        self.outer = self.engine.create_workflow("outer")
+        self.source = _constant("source", 7)
+        self.first = SubWorkflowModule("first")
+        self.first.set_workflow(self.inner, {"x": (self.add1.id, "number1")}, {"y": (self.add2.id, "result")})
+        self.second = SubWorkflowModule("second", workflow=self.inner)
+        self.second.expose_input("x", self.add1.id, "number1")
+        self.second.expose_output("y", self.add2.id, "result")
+        for module in (self.source, self.first, self.second):
+            self.outer.add_module(module)
+        self.outer.connect(self.source.id, "number", self.first.id, "x")
+        self.outer.connect(self.first.id, "y", self.second.id, "x")
+
+    def test_expanded_results(self):
+        self.assertTrue(self.engine.execute(self.outer.id, async_run=False))
+        results = self.engine.execution_results
+        self.assertEqual(results[self.first.id]["y"], 27)
+        self.assertEqual(results[self.second.id]["y"], 47)
+        self.assertEqual(results[f"{self.first.id}/{self.add1.id}"]["result"], 17)
+        # 在快照上编译不会把计划缓存到正在编辑的内部工作流上
+        self.assertIsNone(self.inner._compiled_plan)
+
+    def test_standalone_execute(self):
+        self.assertEqual(self.first.execute({"x": 1}), {"y": 21})
+        self.assertIs(self.first.get_inner_plan(), self.second.get_inner_plan())
+
+    def test_edit_inner_workflow_during_run(self):
+        def on_progress(event_type, data):
+            if event_type == ProgressCallbackType.MODULE_COMPLETE and data["module_id"] == self.source.id:
+                self.inner.remove_connection(self.inner_link)
+                self.ten.set_parameter("max_value", 30)
+                self.ten.set_parameter("min_value", 30)
+        self.engine.register_progress_callback(on_progress)
+        self.assertTrue(self.engine.execute(self.outer.id, async_run=False))
+        self.assertEqual(self.engine.execution_results[self.first.id]["y"], 27)
+        self.assertEqual(self.engine.execution_results[self.second.id]["y"], 47)
+
+        self.engine.unregister_progress_callback(on_progress)
+        self.assertTrue(self.engine.execute(self.outer.id, async_run=False))
+        # add2 的 number2 已断开: y = x + 30
+        self.assertEqual(self.engine.execution_results[self.first.id]["y"], 37)
+
+    def test_snapshot_freezes_inner_structure(self):
+        # 快照之后、编译之前修改内部工作流的结构，编译结果仍是快照创建时的结构
+        snapshot = self.outer.snapshot()
+        self.inner.remove_connection(self.inner_link)
+        self.inner.add_module(MathOperationModule("extra"))
+        plan = compile_plan(snapshot)
+        step = next(step for step in plan.steps if step.key == f"{self.first.id}/{self.add2.id}")
+        self.assertEqual([port_name for port_name, _ in step.input_bindings], ["number1", "number2"])
+        self.assertEqual(len(plan), 2 * 4 + 1)
+        self.assertEqual(len(compile_plan(self.outer.snapshot())), 2 * 5 + 1)
+
+    def test_prepared_plan_expires_on_inner_edit(self):
+        prepared = self.engine.prepare(self.outer.id)
+        self.assertTrue(prepared.is_current(self.outer))
+        self.inner.remove_connection(self.inner_link)
+        self.assertFalse(prepared.is_current(self.outer))
+        self.assertTrue(self.engine.run_prepared(prepared))
+        self.assertEqual(self.engine.execution_results[self.second.id]["y"], 47)
+
+    def test_self_reference(self):
+        loop = SubWorkflowModule("loop")
+        loop.set_workflow(self.outer)
+        self.outer.add_module(loop)
+        self.engine.execute(self.outer.id, async_run=False)
+        self.assertEqual(self.engine.execution_status, "error")
+        self.assertIn("循环引用", self.engine.error_message)
+
+
+if __name__ == '__main__':
+    unittest.main()
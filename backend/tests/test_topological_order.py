@@ -0,0 +1,65 @@
+import random
+import unittest
+
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import MathOperationModule
+
+
+class TopologicalOrderTest(unittest.TestCase):
+    """拓扑序在连接时增量维护 (Pearce-Kelly)，形成环的连接在 connect 时被拒绝"""
+
+    def setUp(self):
+        self.workflow = Workflow("order")
+        self.modules = [MathOperationModule(f"m{index}") for index in range(30)]
+        for module in self.modules:
+            self.workflow.add_module(module)
+
+    def _assert_valid_order(self):
+        order = self.workflow._get_execution_order()
+        self.assertEqual(sorted(order), sorted(self.workflow.modules))
+        position = {module_id: index for index, module_id in enumerate(order)}
+        for conn in self.workflow.connections.values():
+            self.assertLess(position[conn.source_module_id], position[conn.target_module_id])
+
+    def test_backward_edges_reorder(self):
+        # 按添加顺序逆向连接: 每条连接都需要重排
+        for index in range(len(self.modules) - 1, 0, -1):
+            self.assertIsNotNone(self.workflow.connect(self.modules[index].id, "result",
+                                                       self.modules[index - 1].id, "number1"))
+        self._assert_valid_order()
+        self.assertEqual(self.workflow._get_execution_order(), [module.id for module in reversed(self.modules)])
+
+    def test_cycle_rejected(self):
+        first, second, third = self.modules[:3]
+        self.workflow.connect(first.id, "result", second.id, "number1")
+        self.workflow.connect(second.id, "result", third.id, "number1")
+        order = self.workflow._get_execution_order()
+        self.assertTrue(self.workflow.creates_cycle(third.id, first.id))
+        self.assertFalse(self.workflow.creates_cycle(first.id, third.id))
+        self.assertIsNone(self.workflow.connect(third.id, "result", first.id, "number2"))
+        self.assertIsNone(self.workflow.connect(first.id, "result", first.id, "number2"))
+        self.assertEqual(len(self.workflow.connections), 2)
+        self.assertEqual(self.workflow._get_execution_order(), order)
+
+    def test_random_edits(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            source, target = rng.sample(self.modules, 2)
+            port = rng.choice(("number1", "number2"))
+            cyclic = self.workflow.creates_cycle(source.id, target.id)
+            connection_id = self.workflow.connect(source.id, "result", target.id, port)
+            self.assertEqual(connection_id is None, cyclic)
+            if connection_id is not None and rng.random() < 0.3:
+                self.workflow.remove_connection(connection_id)
+            if rng.random() < 0.05:
+                removed = rng.choice(self.modules)
+                self.workflow.remove_module(removed.id)
+                self.modules.remove(removed)
+                replacement = MathOperationModule("new")
+                self.workflow.add_module(replacement)
+                self.modules.append(replacement)
+            self._assert_valid_order()
+
+
+if __name__ == '__main__':
+    unittest.main()
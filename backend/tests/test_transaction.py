@@ -0,0 +1,82 @@
+import unittest
+
+from backend.core.workflow import Workflow
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+class TransactionTest(unittest.TestCase):
+    """批量编辑事务: 一次校验、原子提交"""
+
+    def setUp(self):
+        self.workflow = Workflow("transaction")
+        self.source = NumberGeneratorModule("source")
+        self.existing = MathOperationModule("existing")
+        self.workflow.add_module(self.source)
+        self.workflow.add_module(self.existing)
+        self.workflow.connect(self.source.id, "number", self.existing.id, "number1")
+
+    def _assert_valid_order(self):
+        order = self.workflow._get_execution_order()
+        self.assertEqual(sorted(order), sorted(self.workflow.modules))
+        position = {module_id: index for index, module_id in enumerate(order)}
+        for conn in self.workflow.connections.values():
+            self.assertLess(position[conn.source_module_id], position[conn.target_module_id])
+
+    def test_commit(self):
+        chain = [MathOperationModule(f"m{index}") for index in range(50)]
+        with self.workflow.transaction() as tx:
+            # 逆序添加连接，提交时才排序
+            for index in range(len(chain) - 1, 0, -1):
+                tx.connect(chain[index - 1].id, "result", chain[index].id, "number1")
+            for module in chain:
+                tx.add_module(module)
+            tx.connect(self.existing.id, "result", chain[0].id, "number1")
+        self.assertEqual(len(self.workflow.modules), 52)
+        self.assertEqual(len(self.workflow.connections), 51)
+        self.assertEqual(chain[10].get_input_port("number1").connected_to, {"result"})
+        self.assertEqual(len(self.workflow.get_incoming_connections(chain[-1].id)), 1)
+        self._assert_valid_order()
+        # 提交后的拓扑序仍能拒绝形成环的连接
+        self.assertIsNone(self.workflow.connect(chain[-1].id, "result", self.existing.id, "number2"))
+
+    def test_invalid_connection_rolls_back(self):
+        new = MathOperationModule("new")
+        version = self.workflow.version
+        with self.assertRaises(ValueError):
+            with self.workflow.transaction() as tx:
+                tx.add_module(new)
+                tx.connect(self.existing.id, "result", new.id, "number1")
+                tx.connect(self.existing.id, "result", new.id, "missing")
+        self.assertNotIn(new.id, self.workflow.modules)
+        self.assertEqual(len(self.workflow.connections), 1)
+        self.assertEqual(self.workflow.version, version)
+        self.assertEqual(new.get_input_port("number1").connected_to, set())
+
+    def test_cycle_rolls_back(self):
+        new = MathOperationModule("new")
+        tx = self.workflow.transaction()
+        tx.add_module(new)
+        tx.connect(self.existing.id, "result", new.id, "number1")
+        tx.connect(new.id, "result", self.existing.id, "number2")
+        with self.assertRaises(ValueError):
+            tx.commit()
+        self.assertNotIn(new.id, self.workflow.modules)
+        with self.assertRaises(ValueError):
+            tx.connect(self.existing.id, "result", new.id, "number2")
+
+    def test_skip_invalid(self):
+        new = MathOperationModule("new")
+        tx = self.workflow.transaction(skip_invalid=True)
+        tx.add_module(new)
+        tx.connect(self.existing.id, "result", new.id, "number1")
+        tx.connect(new.id, "result", self.existing.id, "number2")  # 形成环
+        tx.connect(new.id, "missing", self.existing.id, "number2")
+        connection_ids = tx.commit()
+        self.assertEqual(len(connection_ids), 1)
+        self.assertEqual([reason for _, reason in tx.rejected], ["端口不存在", "会形成循环依赖"])
+        self.assertIn(new.id, self.workflow.modules)
+        self._assert_valid_order()
+
+
+if __name__ == '__main__':
+    unittest.main()
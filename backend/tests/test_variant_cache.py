@@ -0,0 +1,86 @@
+import dataclasses
+import itertools
+import unittest
+
+from backend.core.base_module import BaseModule, PortDefinition, VariantDefinition
+from backend.examples.example_modules import (NumberGeneratorModule, MathOperationModule, TextProcessingModule,
+                                              ConditionalModule, TimeDelayModule)
+
+
+class _CountingModule(BaseModule):
+    """记录 _get_variant_definitions 的调用次数"""
+    calls = 0
+
+    @classmethod
+    def _get_variant_definitions(cls):
+        cls.calls += 1
+        return {
+            "default": VariantDefinition(
+                variant_id="default", variant_name="默认", description="",
+                port_definitions=[
+                    PortDefinition(name="value", port_io_type="input", data_type="number", description="",
+                                   is_optional=False, default_enabled=True, allow_multiple_connections=False),
+                    PortDefinition(name="extra", port_io_type="output", data_type="number", description="",
+                                   is_optional=True, default_enabled=False, allow_multiple_connections=True),
+                ]
+            )
+        }
+
+    def execute(self, inputs):
+        return {}
+
+
+class VariantCacheTest(unittest.TestCase):
+    """变体定义和端口模板按类缓存，创建的端口与定义一致"""
+
+    def setUp(self):
+        _CountingModule.clear_variant_cache()
+        _CountingModule.calls = 0
+
+    def test_definitions_cached_and_frozen(self):
+        first = _CountingModule.get_variant_definitions()
+        for _ in range(3):
+            _CountingModule("module")
+        self.assertIs(_CountingModule.get_variant_definitions(), first)
+        self.assertEqual(_CountingModule.calls, 1)
+        with self.assertRaises(TypeError):
+            first["other"] = first["default"]
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            first["default"].variant_name = "changed"
+        self.assertIsInstance(first["default"].port_definitions, tuple)
+        _CountingModule.clear_variant_cache()
+        self.assertIsNot(_CountingModule.get_variant_definitions(), first)
+        self.assertEqual(_CountingModule.calls, 2)
+
+    def test_instances_get_own_ports(self):
+        first = _CountingModule("first")
+        second = _CountingModule("second")
+        self.assertIsNot(first.get_input_port("value"), second.get_input_port("value"))
+        first.get_input_port("value").connect("x")
+        self.assertEqual(second.get_input_port("value").connected_to, set())
+        self.assertIsNone(first.get_output_port("extra"))
+        first.set_variant("default", {"extra": True})
+        self.assertIsNotNone(first.get_output_port("extra"))
+        self.assertIsNone(second.get_output_port("extra"))
+
+    def test_ports_match_definitions(self):
+        # 每个示例模块的每个变体和可选端口组合，生成的端口都与变体定义一致
+        for module_class in (NumberGeneratorModule, MathOperationModule, TextProcessingModule,
+                             ConditionalModule, TimeDelayModule):
+            for variant_id, variant in module_class.get_variant_definitions().items():
+                optional = [pd.name for pd in variant.port_definitions if pd.is_optional]
+                for enabled in itertools.product((False, True), repeat=len(optional)):
+                    config = dict(zip(optional, enabled))
+                    module = module_class("module")
+                    module.set_variant(variant_id, config)
+                    expected = {(pd.port_io_type, pd.name, pd.data_type, pd.description)
+                                for pd in variant.port_definitions
+                                if not pd.is_optional or config[pd.name]}
+                    actual = {("input", port.name, port.type, port.description) for port in module.input_ports.values()}
+                    actual |= {("output", port.name, port.type, port.description)
+                               for port in module.output_ports.values()}
+                    self.assertEqual(actual, expected, f"{module_class.__name__} {variant_id} {config}")
+
+
+if __name__ == '__main__':
+    unittest.main()
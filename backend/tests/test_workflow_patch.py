@@ -0,0 +1,156 @@
+import os
+import tempfile
+import unittest
+
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow import Workflow
+from backend.core.workflow_patch import WorkflowPatch, WorkflowPatchLog
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+def _endpoints(workflow):
+    return sorted((conn.source_module_id, conn.source_port_name, conn.target_module_id, conn.target_port_name)
+                  for conn in workflow.connections.values())
+
+
+class ApplyPatchRollbackTest(unittest.TestCase):
+    """补丁中任意一个操作失败时，已经应用的操作全部撤销，工作流与应用前完全一致"""
+
+    def setUp(self):
+        self.registry = ModuleRegistry()
+        for module_class in (NumberGeneratorModule, MathOperationModule):
+            self.registry.register(module_class)
+        self.workflow = Workflow("patch")
+        self.source_a = NumberGeneratorModule("a")
+        self.source_b = NumberGeneratorModule("b")
+        self.math = MathOperationModule("math")
+        self.sink = MathOperationModule("sink")
+        for module in (self.source_a, self.source_b, self.math, self.sink):
+            self.workflow.add_module(module)
+        self.workflow.connect(self.source_a.id, "number", self.math.id, "number1")
+        self.workflow.connect(self.source_b.id, "number", self.math.id, "number2")
+        self.workflow.connect(self.math.id, "result", self.sink.id, "number1")
+        self.workflow.connect(self.source_b.id, "number", self.sink.id, "number2")
+
+    def _state(self):
+        modules = {module_id: (module.name, module.description, module.position, module._current_variant_id,
+                               dict(module.parameters))
+                   for module_id, module in self.workflow.modules.items()}
+        return modules, _endpoints(self.workflow), self.workflow.revision
+
+    def _assert_rolled_back(self, patch):
+        before = self._state()
+        patch.connect("missing", "result", self.sink.id, "number1")  # 最后一个操作必定失败
+        with self.assertRaises(ValueError):
+            self.workflow.apply_patch(patch, self.registry)
+        self.assertEqual(self._state(), before)
+
+    def test_add_module(self):
+        module = MathOperationModule("added")
+        self._assert_rolled_back(WorkflowPatch().add_module(module))
+        self.assertNotIn(module.id, self.workflow.modules)
+
+    def test_remove_module(self):
+        self._assert_rolled_back(WorkflowPatch().remove_module(self.math.id))
+
+    def test_update_module_fields(self):
+        self._assert_rolled_back(WorkflowPatch().update_module(
+            self.math.id, name="renamed", description="changed", position=(5, 6)))
+
+    def test_update_module_variant(self):
+        # 切换到 unary_op 会移除 number1/number2/result 上的连接，撤销时只恢复这些连接且不产生重复
+        self._assert_rolled_back(WorkflowPatch().update_module(self.math.id, variant_id="unary_op"))
+        self.assertEqual(len(self.workflow.get_incoming_connections(self.math.id)), 2)
+        self.assertEqual(len(self.workflow.get_outgoing_connections(self.math.id)), 1)
+
+    def test_update_module_same_variant(self):
+        # 变体不变时没有连接被移除，撤销不能重复创建连接
+        self._assert_rolled_back(WorkflowPatch().update_module(self.math.id, variant_id="default"))
+
+    def test_set_parameter(self):
+        self._assert_rolled_back(WorkflowPatch()
+                                 .set_parameter(self.math.id, "operation", "multiply")
+                                 .set_parameter(self.math.id, "new_key", 1))
+        self.assertNotIn("new_key", self.math.parameters)
+
+    def test_connect(self):
+        extra = MathOperationModule("extra")
+        self.workflow.add_module(extra)
+        self._assert_rolled_back(WorkflowPatch().connect(self.math.id, "result", extra.id, "number1"))
+
+    def test_disconnect(self):
+        self._assert_rolled_back(WorkflowPatch().disconnect(self.math.id, "result", self.sink.id, "number1"))
+
+    def test_all_ops(self):
+        module = MathOperationModule("added")
+        self._assert_rolled_back(WorkflowPatch()
+                                 .add_module(module)
+                                 .disconnect(self.math.id, "result", self.sink.id, "number1")
+                                 .connect(module.id, "result", self.sink.id, "number1")
+                                 .update_module(self.math.id, variant_id="unary_op", name="unary")
+                                 .set_parameter(module.id, "operation", "subtract")
+                                 .remove_module(self.source_a.id))
+
+
+class PatchLogTest(unittest.TestCase):
+    """补丁日志: 追加、重放和压缩"""
+
+    def setUp(self):
+        self.registry = ModuleRegistry()
+        for module_class in (NumberGeneratorModule, MathOperationModule):
+            self.registry.register(module_class)
+        self.directory = tempfile.TemporaryDirectory()
+        self.base_path = os.path.join(self.directory.name, "workflow.json")
+        self.workflow = Workflow("log")
+        self.source = NumberGeneratorModule("source")
+        self.workflow.add_module(self.source)
+        self.workflow.save(self.base_path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _apply(self, log, patch):
+        self.workflow.apply_patch(patch, self.registry)
+        return log.append(self.workflow, patch)
+
+    def test_replay(self):
+        log = WorkflowPatchLog(self.base_path, compact_every=100, compact_ratio=100)
+        math = MathOperationModule("math")
+        self.assertFalse(self._apply(log, WorkflowPatch(self.workflow.revision).add_module(math)))
+        self.assertFalse(self._apply(log, WorkflowPatch(self.workflow.revision)
+                                     .connect(self.source.id, "number", math.id, "number1")
+                                     .set_parameter(math.id, "operation", "multiply")))
+        self.assertEqual(log.pending_entries, 2)
+
+        loaded = WorkflowPatchLog(self.base_path).load(self.registry)
+        self.assertEqual(loaded.revision, 2)
+        self.assertEqual(loaded.modules[math.id].get_parameter("operation"), "multiply")
+        self.assertEqual(_endpoints(loaded), _endpoints(self.workflow))
+
+    def test_compact(self):
+        log = WorkflowPatchLog(self.base_path, compact_every=3, compact_ratio=100)
+        compacted = [self._apply(log, WorkflowPatch(self.workflow.revision).set_parameter(self.source.id, "max_value", value))
+                     for value in (10, 20, 30, 40)]
+        self.assertEqual(compacted, [False, False, True, False])
+        self.assertEqual(log.pending_entries, 1)
+        # 压缩直接写入基础文件，不留下临时文件
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["workflow.json", "workflow.json.patches.jsonl"])
+        with open(log.log_path, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+        loaded = WorkflowPatchLog(self.base_path).load(self.registry)
+        self.assertEqual(loaded.revision, 4)
+        self.assertEqual(loaded.modules[self.source.id].get_parameter("max_value"), 40)
+
+    def test_truncated_last_line(self):
+        log = WorkflowPatchLog(self.base_path, compact_every=100, compact_ratio=100)
+        self._apply(log, WorkflowPatch(self.workflow.revision).set_parameter(self.source.id, "max_value", 10))
+        with open(log.log_path, 'a', encoding='utf-8') as f:
+            f.write('{"base_revision": 1, "ops": [')
+        loaded = WorkflowPatchLog(self.base_path).load(self.registry)
+        self.assertEqual(loaded.revision, 1)
+        self.assertEqual(loaded.modules[self.source.id].get_parameter("max_value"), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
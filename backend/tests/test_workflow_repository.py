@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow import Workflow
+from backend.core.workflow_repository import WorkflowRepository
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule, TextProcessingModule
+
+
+class WorkflowRepositoryTest(unittest.TestCase):
+    """SQLite 工作流仓库: 增量保存、加载顺序、查询和缓存"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, "workflows.db")
+        self.registry = ModuleRegistry()
+        for module_class in (NumberGeneratorModule, MathOperationModule, TextProcessingModule):
+            self.registry.register(module_class)
+        self.repository = WorkflowRepository(self.db_path)
+        self.workflow = Workflow("analysis", "描述")
+        self.modules = [NumberGeneratorModule(f"source{index}") for index in range(5)]
+        self.math = MathOperationModule("math")
+        for module in self.modules + [self.math]:
+            self.workflow.add_module(module)
+        self.workflow.connect(self.modules[0].id, "number", self.math.id, "number1")
+        self.workflow.connect(self.modules[1].id, "number", self.math.id, "number2")
+
+    def tearDown(self):
+        self.repository.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _reopen(self):
+        self.repository.close()
+        self.repository = WorkflowRepository(self.db_path)
+        return self.repository.load(self.workflow.id, self.registry)
+
+    def test_incremental_save(self):
+        self.assertGreater(self.repository.save(self.workflow), 0)
+        self.assertEqual(self.repository.save(self.workflow), 0)
+        self.modules[2].set_parameter("max_value", 7)
+        self.assertEqual(self.repository.save(self.workflow), 1)
+        connection_id = next(iter(self.workflow.connections))
+        self.workflow.remove_connection(connection_id)
+        self.assertEqual(self.repository.save(self.workflow), 1)
+        loaded = self._reopen()
+        self.assertEqual(loaded.modules[self.modules[2].id].get_parameter("max_value"), 7)
+        self.assertEqual(len(loaded.connections), 1)
+        # 新打开的仓库从数据库读取基准行，未修改时不写入任何行
+        self.assertEqual(self.repository.save(loaded), 0)
+
+    def test_order_kept_after_updates(self):
+        self.repository.save(self.workflow)
+        parameter_order = {module_id: list(module.parameters) for module_id, module in self.workflow.modules.items()}
+        # 修改第一个模块和它的第一个参数，更新后的行仍保持原来的位置
+        self.modules[0].name = "renamed"
+        first_key = parameter_order[self.modules[0].id][0]
+        self.modules[0].set_parameter(first_key, 42)
+        self.repository.save(self.workflow)
+        loaded = self._reopen()
+        self.assertEqual(list(loaded.modules), list(self.workflow.modules))
+        self.assertEqual(loaded.modules[self.modules[0].id].name, "renamed")
+        self.assertEqual({module_id: list(module.parameters) for module_id, module in loaded.modules.items()},
+                         parameter_order)
+
+    def test_list_and_delete(self):
+        self.repository.save(self.workflow)
+        other = Workflow("text jobs")
+        other.add_module(TextProcessingModule("text"))
+        self.repository.save(other)
+        self.assertEqual(self.repository.count(), 2)
+        self.assertEqual([row["id"] for row in self.repository.list_workflows(name_prefix="ana")], [self.workflow.id])
+        self.assertEqual([row["id"] for row in self.repository.list_workflows(module_type="TextProcessingModule")],
+                         [other.id])
+        self.assertEqual(self.repository.list_workflows(limit=1, offset=1)[0]["name"], "text jobs")
+        self.assertTrue(self.repository.delete(other.id))
+        self.assertFalse(self.repository.delete(other.id))
+        self.assertFalse(self.repository.exists(other.id))
+        self.assertIsNone(self.repository.load(other.id, self.registry))
+
+    def test_cache(self):
+        repository = WorkflowRepository(self.db_path, cache_size=1)
+        try:
+            repository.save(self.workflow)
+            self.assertIs(repository.load(self.workflow.id, self.registry), self.workflow)
+            other = Workflow("other")
+            repository.save(other)  # 淘汰 self.workflow
+            loaded = repository.load(self.workflow.id, self.registry)
+            self.assertIsNot(loaded, self.workflow)
+            self.assertEqual(list(loaded.modules), list(self.workflow.modules))
+        finally:
+            repository.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
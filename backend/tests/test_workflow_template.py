@@ -0,0 +1,78 @@
+import unittest
+
+from backend.core.engine import WorkflowEngine
+from backend.core.module_registry import ModuleRegistry
+from backend.core.workflow_template import WorkflowTemplate
+from backend.examples.example_modules import NumberGeneratorModule, MathOperationModule
+
+
+class WorkflowTemplateTest(unittest.TestCase):
+    """模板实例共享结构，只保存参数覆盖"""
+
+    def setUp(self):
+        self.registry = ModuleRegistry()
+        for module_class in (NumberGeneratorModule, MathOperationModule):
+            self.registry.register(module_class)
+        self.engine = WorkflowEngine(self.registry)
+        self.workflow = self.engine.create_workflow("template")
+        self.source = NumberGeneratorModule("source")
+        self.source.set_parameter("min_value", 4)
+        self.source.set_parameter("max_value", 4)
+        self.math = MathOperationModule("math")
+        self.workflow.add_module(self.source)
+        self.workflow.add_module(self.math)
+        self.workflow.connect(self.source.id, "number", self.math.id, "number1")
+        self.workflow.connect(self.source.id, "number", self.math.id, "number2")
+        self.template = WorkflowTemplate(self.workflow)
+
+    def _run(self, instance):
+        self.engine.workflows[instance.id] = instance
+        self.assertTrue(self.engine.execute(instance.id, async_run=False))
+        return self.engine.execution_results[self.math.id]["result"]
+
+    def test_overrides_only(self):
+        instance = self.template.instantiate({self.math.id: {"operation": "multiply"}}, name="乘法")
+        self.assertEqual(instance.name, "乘法")
+        self.assertEqual(dict(instance.overrides), {self.math.id: {"operation": "multiply"}})
+        # 没有覆盖的模块直接使用模板中的模块，有覆盖的模块是副本
+        self.assertIs(instance.modules[self.source.id], self.template.snapshot.modules[self.source.id])
+        resolved = instance.modules[self.math.id]
+        self.assertIsNot(resolved, self.math)
+        self.assertEqual(resolved.get_parameter("operation"), "multiply")
+        self.assertEqual(self.math.get_parameter("operation"), "add")
+        self.assertEqual(instance.get_parameter(self.math.id, "operation"), "multiply")
+        self.assertEqual(instance.get_parameter(self.source.id, "max_value"), 4)
+        with self.assertRaises(ValueError):
+            instance.set_parameter("missing", "operation", "add")
+
+    def test_instances_run_independently(self):
+        multiply = self.template.instantiate({self.math.id: {"operation": "multiply"}})
+        plain = self.template.instantiate()
+        self.assertEqual(self._run(multiply), 16)
+        self.assertEqual(self._run(plain), 8)
+        multiply.set_parameter(self.source.id, "min_value", 5)
+        multiply.set_parameter(self.source.id, "max_value", 5)
+        self.assertEqual(self._run(multiply), 25)
+        multiply.clear_overrides(self.source.id)
+        self.assertEqual(self._run(multiply), 16)
+
+    def test_template_frozen_against_edits(self):
+        instance = self.template.instantiate()
+        self.math.set_parameter("operation", "subtract")
+        self.workflow.remove_module(self.source.id)
+        self.assertEqual(self.template.module_ids, [self.source.id, self.math.id])
+        self.assertEqual(len(self.template.plan), 2)
+        self.assertEqual(self._run(instance), 8)
+
+    def test_to_workflow(self):
+        instance = self.template.instantiate({self.math.id: {"operation": "multiply"}})
+        workflow = instance.to_workflow(self.registry)
+        self.assertEqual(workflow.id, instance.id)
+        self.assertEqual(workflow.modules[self.math.id].get_parameter("operation"), "multiply")
+        self.assertEqual(len(workflow.connections), 2)
+        workflow.modules[self.math.id].set_parameter("operation", "divide")
+        self.assertEqual(instance.get_parameter(self.math.id, "operation"), "multiply")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,2 +1,21 @@
 # 此文件使 Python 将 'analysis' 目录视为一个子包。
-from .dbscan_module import DBSCANModule 
\ No newline at end of file
+# 模块类在第一次访问时才导入 (例如 from backend.workflow_modules.analysis import DBSCANModule)，
+# 导入本包不会加载 pandas / numpy / sklearn
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "DBSCANModule": ".dbscan_module",
+    "GridDBSCANModule": ".grid_dbscan_module",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
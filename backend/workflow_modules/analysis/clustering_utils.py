@@ -0,0 +1,122 @@
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class UnionFind:
+    """
+    基于 NumPy 数组的并查集，按批合并 (合并操作的输入是两组下标数组)，供聚类模块合并邻接的核心点
+
+    合并时总是把下标较大的根挂到下标较小的根下，所以每个集合的根就是集合中最小的下标，
+    按根排序得到的簇编号与 sklearn DBSCAN 按样本顺序编号的方式一致。
+    """
+    def __init__(self, size: int):
+        self._parent = np.arange(size, dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def find(self, items: np.ndarray) -> np.ndarray:
+        """返回每个元素所在集合的根 (沿路径压缩)"""
+        parent = self._parent
+        roots = parent[items]
+        while True:
+            next_roots = parent[roots]
+            if np.array_equal(next_roots, roots):
+                break
+            roots = next_roots
+        parent[items] = roots
+        return roots
+
+    def union(self, a: np.ndarray, b: np.ndarray) -> None:
+        """合并每一对 (a[i], b[i]) 所在的集合"""
+        a = np.asarray(a, dtype=np.intp)
+        b = np.asarray(b, dtype=np.intp)
+        while len(a):
+            root_a = self.find(a)
+            root_b = self.find(b)
+            pending = root_a != root_b
+            if not pending.any():
+                break
+            a, b = a[pending], b[pending]
+            low = np.minimum(root_a[pending], root_b[pending])
+            high = np.maximum(root_a[pending], root_b[pending])
+            # 同一个根可能同时挂到多个根下，只保留最小的一个，其余的对在下一轮重新合并
+            np.minimum.at(self._parent, high, low)
+
+    def roots(self) -> np.ndarray:
+        """所有元素的根 (完全压缩后的父节点数组)"""
+        parent = self._parent
+        while True:
+            grand_parent = parent[parent]
+            if np.array_equal(grand_parent, parent):
+                break
+            parent = grand_parent
+        self._parent = parent
+        return parent.copy()
+
+
+def label_components(roots: np.ndarray, members: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    把集合的根转换为从0开始的连续簇编号 (按根从小到大编号)
+
+    Args:
+        roots: 每个元素的根 (UnionFind.roots())
+        members: 参与编号的元素 (布尔掩码)，其余元素的编号为 -1
+
+    Returns:
+        (每个元素的簇编号, 簇数量)
+    """
+    labels = np.full(len(roots), -1, dtype=np.intp)
+    unique_roots, inverse = np.unique(roots[members], return_inverse=True)
+    labels[members] = inverse
+    return labels, len(unique_roots)
+
+
+def feature_array(input_df: pd.DataFrame, feature_columns: Optional[Sequence[Any]] = None,
+                  dtype: Optional[str] = None, scaling: Optional[str] = None) -> np.ndarray:
+    """
+    聚类使用的 C 连续数值数组，只包含 feature_columns 指定的列 (为None时为全部列)
+
+    输入本身就是所需类型的 C 连续数据且使用全部列时直接返回它的视图 (不复制)，
+    否则把各特征列逐列写入一个新数组 (只复制一次)。dtype 为 'float32' 时内存减半；
+    scaling 为 'standard' (零均值、单位方差) 或 'minmax' (缩放到 [0, 1]) 时按列缩放。
+    参数不合法或特征列不存在时抛出 ValueError。
+    """
+    if dtype not in (None, 'float32', 'float64'):
+        raise ValueError(f"参数 'dtype' 必须是 None、'float32' 或 'float64'，但收到了 {dtype}")
+    dtype = np.dtype(dtype or np.float64)
+    if scaling not in (None, 'standard', 'minmax'):
+        raise ValueError(f"参数 'scaling' 必须是 None、'standard' 或 'minmax'，但收到了 {scaling}")
+
+    if feature_columns is None:
+        feature_columns = list(input_df.columns)
+    elif not isinstance(feature_columns, (list, tuple)) or not feature_columns:
+        raise ValueError(f"参数 'feature_columns' 必须是非空列表，但收到了 {feature_columns}")
+    else:
+        missing = [column for column in feature_columns if column not in input_df.columns]
+        if missing:
+            raise ValueError(f"输入数据中不存在特征列: {missing}")
+
+    features = None
+    if len(feature_columns) == input_df.shape[1] and list(feature_columns) == list(input_df.columns):
+        values = input_df.to_numpy(copy=False)
+        if values.dtype == dtype and values.flags.c_contiguous:
+            features = values
+    if features is None:
+        features = np.empty((len(input_df), len(feature_columns)), dtype=dtype)
+        for position, column in enumerate(feature_columns):
+            features[:, position] = input_df[column].to_numpy()
+
+    if scaling is not None and len(features) > 0:
+        if scaling == 'standard':
+            offset = features.mean(axis=0)
+            scale = features.std(axis=0)
+        else:
+            offset = features.min(axis=0)
+            scale = features.max(axis=0) - offset
+        scale[scale == 0] = 1
+        # features 可能是输入数据的视图，不能原地缩放
+        features = ((features - offset) / scale).astype(dtype, copy=False)
+    return features
@@ -1,15 +1,115 @@
 from typing import Dict, Any, Optional, List
 import pandas as pd
 import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.cluster import DBSCAN
+from sklearn.neighbors import BallTree, KDTree, NearestNeighbors
+from sklearn.utils import gen_even_slices
 
 from backend.core.base_module import BaseModule, PortDefinition, VariantDefinition
+from .clustering_utils import UnionFind, feature_array, label_components
+
+# KDTree 支持的距离度量，其他度量使用 BallTree
+_KD_TREE_METRICS = ('euclidean', 'l2', 'minkowski', 'manhattan', 'cityblock', 'l1', 'chebyshev', 'infinity')
+# 大数据变体中每个邻居 (下标和合并时的临时数组) 占用的工作内存估计 (字节)
+_BYTES_PER_NEIGHBOR = 32
+# 大数据变体每批查询的最少行数
+_MIN_CHUNK_ROWS = 256
+
+
+def _build_tree(X: np.ndarray, metric: str):
+    """在 float64 数据上建立空间树 (X 须已转换为 float64，见 dbscan_chunked)"""
+    tree_class = KDTree if metric in _KD_TREE_METRICS else BallTree
+    return tree_class(X, metric=metric)
+
+
+def _query_radius(tree, X: np.ndarray, eps: float, n_jobs: Optional[int], count_only: bool) -> np.ndarray:
+    """半径查询 (n_jobs 个线程分段查询，空间树查询时释放GIL)"""
+    n_jobs = effective_n_jobs(n_jobs)
+    if n_jobs == 1 or len(X) < n_jobs * _MIN_CHUNK_ROWS:
+        return tree.query_radius(X, eps, count_only=count_only)
+    parts = Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(tree.query_radius)(X[part], eps, count_only=count_only) for part in gen_even_slices(len(X), n_jobs))
+    return np.concatenate(parts)
+
+
+def _iter_neighborhoods(tree, X: np.ndarray, eps: float, n_jobs: Optional[int], working_memory_mb: float):
+    """
+    分批查询 X 中每个点的邻居 (包括自身)，产生 (起始行, 结束行, 邻居下标数组的数组, 邻居数量)
+    每批的行数按上一批的平均邻居数调整，使一批的邻居列表不超过 working_memory_mb
+    """
+    budget = working_memory_mb * 1024 * 1024
+    rows = 16 * _MIN_CHUNK_ROWS
+    start = 0
+    while start < len(X):
+        stop = min(len(X), start + rows)
+        neighborhoods = _query_radius(tree, X[start:stop], eps, n_jobs, count_only=False)
+        counts = np.fromiter((len(neighbors) for neighbors in neighborhoods), dtype=np.intp, count=stop - start)
+        yield start, stop, neighborhoods, counts
+        rows = max(_MIN_CHUNK_ROWS, int(budget // (max(counts.mean(), 1.0) * _BYTES_PER_NEIGHBOR)))
+        start = stop
+
+
+def dbscan_chunked(X: np.ndarray, eps: float, min_samples: int, metric: str = 'euclidean',
+                   n_jobs: Optional[int] = None, working_memory_mb: float = 256) -> np.ndarray:
+    """
+    工作内存有界的 DBSCAN: 在空间树上分批做半径查询，不同时保存所有点的邻域
+
+    第一遍只统计邻居数量确定核心点；第二遍分批取出邻居，用并查集合并相邻的核心点；
+    第三遍只重新查询与核心点相邻的边界点，把它归入相邻核心点中编号最小的簇。
+    结果 (包括簇编号) 与 sklearn DBSCAN 相同。
+
+    Returns:
+        每个点的簇标签 (噪声为 -1)
+    """
+    n_samples = len(X)
+    if n_samples == 0:
+        return np.empty(0, dtype=np.intp)
+    # 公开的 KDTree / BallTree 只支持 float64: 显式转换一次 (已是 float64 时不复制)，建树和分批查询共用
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    tree = _build_tree(X, metric)
+
+    # 第一遍: 邻居数量 (包括自身) 不少于 min_samples 的点为核心点
+    core = np.empty(n_samples, dtype=bool)
+    chunk_rows = max(_MIN_CHUNK_ROWS, int(working_memory_mb * 1024 * 1024 // 8))
+    for start in range(0, n_samples, chunk_rows):
+        stop = min(n_samples, start + chunk_rows)
+        core[start:stop] = _query_radius(tree, X[start:stop], eps, n_jobs, count_only=True) >= min_samples
+
+    # 第二遍: 合并相邻的核心点，并标记与核心点相邻的非核心点 (边界点)
+    components = UnionFind(n_samples)
+    border = np.zeros(n_samples, dtype=bool)
+    for start, stop, neighborhoods, counts in _iter_neighborhoods(tree, X, eps, n_jobs, working_memory_mb):
+        rows = np.repeat(np.arange(start, stop, dtype=np.intp), counts)
+        neighbors = np.concatenate(neighborhoods).astype(np.intp, copy=False)
+        neighbor_is_core = core[neighbors]
+        row_is_core = core[rows]
+        # 每条边在两个端点的邻域中各出现一次，只合并一次
+        core_edges = row_is_core & neighbor_is_core & (rows < neighbors)
+        components.union(rows[core_edges], neighbors[core_edges])
+        border[rows[~row_is_core & neighbor_is_core]] = True
+    labels, n_clusters = label_components(components.roots(), core)
+
+    # 第三遍: 边界点归入相邻核心点中编号最小的簇 (与 sklearn 按样本顺序扩展簇的结果一致)
+    border_points = np.flatnonzero(border)
+    for start, stop, neighborhoods, counts in _iter_neighborhoods(tree, X[border_points], eps, n_jobs,
+                                                                  working_memory_mb):
+        rows = np.repeat(np.arange(stop - start, dtype=np.intp), counts)
+        neighbors = np.concatenate(neighborhoods).astype(np.intp, copy=False)
+        neighbor_is_core = core[neighbors]
+        border_labels = np.full(stop - start, n_clusters, dtype=np.intp)
+        np.minimum.at(border_labels, rows[neighbor_is_core], labels[neighbors[neighbor_is_core]])
+        labels[border_points[start:stop]] = border_labels
+    return labels
+
 
 class DBSCANModule(BaseModule):
     """
     DBSCAN 聚类模块
     使用DBSCAN算法对输入数据进行基于密度的空间聚类。
     """
+    deterministic = True
+
     def __init__(self, name: str = "DBSCAN 聚类", 
                  description: str = "使用DBSCAN算法进行聚类分析",
                  initial_variant_id: Optional[str] = None, 
@@ -19,6 +119,16 @@ class DBSCANModule(BaseModule):
         self._parameters['eps'] = 0.5
         self._parameters['min_samples'] = 5
         self._parameters['metric'] = 'euclidean'
+        # parameter_sweep 变体: 要尝试的 eps / min_samples 取值列表 (为None时只使用 eps / min_samples)
+        self._parameters['eps_values'] = None
+        self._parameters['min_samples_values'] = None
+        # large_data 变体: 并行查询的线程数 (None 为 1，-1 为全部 CPU)、聚类使用的数据类型 (None 或 'float32')、每批邻居查询的工作内存上限 (MB)
+        self._parameters['n_jobs'] = None
+        self._parameters['dtype'] = None
+        self._parameters['working_memory_mb'] = 256
+        # 参与距离计算的特征列 (None 为全部列) 和特征缩放方式 (None、'standard' 或 'minmax')
+        self._parameters['feature_columns'] = None
+        self._parameters['scaling'] = None
 
     @classmethod
     def _get_variant_definitions(cls) -> Dict[str, VariantDefinition]:
@@ -41,9 +151,59 @@ class DBSCANModule(BaseModule):
                     PortDefinition(name="clustered_data", port_io_type="output", data_type="dataframe", description="聚类后的核心点数据，并带有簇标签列 'cluster_label'", is_optional=False, default_enabled=True, allow_multiple_connections=True),
                     PortDefinition(name="noise_data", port_io_type="output", data_type="dataframe", description="被识别为噪声的点数据", is_optional=False, default_enabled=True, allow_multiple_connections=True)
                 ]
+            ),
+            "parameter_sweep": VariantDefinition(
+                variant_id="parameter_sweep",
+                variant_name="参数扫描",
+                description="对 eps_values × min_samples_values 的每组参数进行聚类，邻域只在最大的 eps 下计算一次。",
+                port_definitions=[
+                    PortDefinition(name="data_input", port_io_type="input", data_type="dataframe", description="待聚类的数据集 (Pandas DataFrame)", is_optional=False, default_enabled=True, allow_multiple_connections=False),
+                    PortDefinition(name="sweep_labels", port_io_type="output", data_type="dataframe", description="簇标签矩阵: 行与输入数据相同，每组参数一列 (列名 'eps=...,min_samples=...')，噪声点为 -1", is_optional=False, default_enabled=True, allow_multiple_connections=True),
+                    PortDefinition(name="sweep_summary", port_io_type="output", data_type="dataframe", description="每组参数一行: 'setting'、'eps'、'min_samples'、簇数量 'n_clusters' 和噪声点数量 'n_noise'", is_optional=False, default_enabled=True, allow_multiple_connections=True)
+                ]
+            ),
+            "large_data": VariantDefinition(
+                variant_id="large_data",
+                variant_name="大数据聚类",
+                description="适用于百万行以上的数据: 在空间树上分批查询邻居，工作内存有界，可选多线程查询；噪声点输出默认关闭。",
+                port_definitions=[
+                    PortDefinition(name="data_input", port_io_type="input", data_type="dataframe", description="待聚类的数据集 (Pandas DataFrame，全部为数值列)", is_optional=False, default_enabled=True, allow_multiple_connections=False),
+                    PortDefinition(name="clustered_data", port_io_type="output", data_type="dataframe", description="聚类后的核心点数据，并带有簇标签列 'cluster_label'", is_optional=False, default_enabled=True, allow_multiple_connections=True),
+                    PortDefinition(name="noise_data", port_io_type="output", data_type="dataframe", description="被识别为噪声的点数据", is_optional=True, default_enabled=False, allow_multiple_connections=True)
+                ]
+            ),
+            "labels": VariantDefinition(
+                variant_id="labels",
+                variant_name="标签与掩码输出",
+                description="不复制输入数据，只输出与输入行对齐的簇标签和布尔掩码，下游按需切片 (例如 df[clustered_mask])。",
+                port_definitions=[
+                    PortDefinition(name="data_input", port_io_type="input", data_type="dataframe", description="待聚类的数据集 (Pandas DataFrame)", is_optional=False, default_enabled=True, allow_multiple_connections=False),
+                    PortDefinition(name="cluster_labels", port_io_type="output", data_type="series", description="每行的簇标签 (Pandas Series 'cluster_label'，索引与输入相同)，噪声点为 -1", is_optional=False, default_enabled=True, allow_multiple_connections=True),
+                    PortDefinition(name="clustered_mask", port_io_type="output", data_type="series", description="非噪声点的布尔掩码 (Pandas Series，索引与输入相同)", is_optional=False, default_enabled=True, allow_multiple_connections=True),
+                    PortDefinition(name="noise_mask", port_io_type="output", data_type="series", description="噪声点的布尔掩码 (Pandas Series，索引与输入相同)", is_optional=True, default_enabled=False, allow_multiple_connections=True)
+                ]
             )
         }
 
+    @staticmethod
+    def _check_eps(eps: Any) -> None:
+        if not isinstance(eps, (int, float)) or eps <= 0:
+            raise ValueError(f"参数 'eps' 必须是正数，但收到了 {eps}")
+
+    @staticmethod
+    def _check_min_samples(min_samples: Any) -> None:
+        if not isinstance(min_samples, int) or min_samples <= 0:
+            raise ValueError(f"参数 'min_samples' 必须是正整数，但收到了 {min_samples}")
+
+    def _sweep_values(self, list_key: str, single_key: str, default: Any) -> List[Any]:
+        """读取参数扫描的取值列表 (去重并保持顺序)，未设置时使用单个参数的值"""
+        values = self.get_parameter(list_key)
+        if values is None:
+            values = [self.get_parameter(single_key, default)]
+        elif not isinstance(values, (list, tuple)) or not values:
+            raise ValueError(f"参数 '{list_key}' 必须是非空列表，但收到了 {values}")
+        return list(dict.fromkeys(values))
+
     def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         input_df = inputs.get("data_input")
         if input_df is None:
@@ -51,42 +211,83 @@ class DBSCANModule(BaseModule):
         if not isinstance(input_df, pd.DataFrame):
             raise TypeError(f"输入数据 'data_input' 必须是 Pandas DataFrame，但收到了 {type(input_df)}")
 
+        metric = self.get_parameter('metric', 'euclidean')
+        features = self._fit_array(input_df)
+        if self._current_variant_id == "parameter_sweep":
+            return self._execute_parameter_sweep(input_df, features, metric)
+
         eps = self.get_parameter('eps', 0.5)
         min_samples = self.get_parameter('min_samples', 5)
-        metric = self.get_parameter('metric', 'euclidean')
+        self._check_eps(eps)
+        self._check_min_samples(min_samples)
 
-        if not isinstance(eps, (int, float)) or eps <= 0:
-            raise ValueError(f"参数 'eps' 必须是正数，但收到了 {eps}")
-        if not isinstance(min_samples, int) or min_samples <= 0:
-            raise ValueError(f"参数 'min_samples' 必须是正整数，但收到了 {min_samples}")
+        if self._current_variant_id == "large_data":
+            labels = dbscan_chunked(features, eps, min_samples, metric,
+                                    n_jobs=self.get_parameter('n_jobs'),
+                                    working_memory_mb=self.get_parameter('working_memory_mb', 256))
+        else:
+            labels = DBSCAN(eps=eps, min_samples=min_samples, metric=metric).fit(features).labels_
 
-        try:
-            data_to_cluster = input_df.copy()
-            
-            db = DBSCAN(eps=eps, min_samples=min_samples, metric=metric).fit(data_to_cluster)
-            labels = db.labels_
-            
-            core_samples_mask = np.zeros_like(labels, dtype=bool)
-            if hasattr(db, 'core_sample_indices_') and db.core_sample_indices_ is not None and len(db.core_sample_indices_) > 0 :
-                 core_samples_mask[db.core_sample_indices_] = True
-
-            outputs = {}
-
-            clustered_points_mask = (labels != -1)
-            clustered_data_df = input_df[clustered_points_mask].copy() 
-            clustered_data_df['cluster_label'] = labels[clustered_points_mask]
-            outputs["clustered_data"] = clustered_data_df
-
-            if self._current_variant_id == "detailed_output":
-                noise_points_mask = (labels == -1)
-                noise_data_df = input_df[noise_points_mask].copy()
-                outputs["noise_data"] = noise_data_df
-            
+        outputs = {}
+
+        if self._current_variant_id == "labels":
+            # 掩码和标签与输入行对齐，不复制输入数据
+            clustered_mask = labels != -1
+            outputs["cluster_labels"] = pd.Series(labels, index=input_df.index, name='cluster_label')
+            outputs["clustered_mask"] = pd.Series(clustered_mask, index=input_df.index, name='clustered')
+            if self.get_output_port("noise_mask") is not None:
+                outputs["noise_mask"] = pd.Series(~clustered_mask, index=input_df.index, name='noise')
             return outputs
 
-        except Exception as e:
-            print(f"DBSCANModule execute error: {e}")
-            raise 
+        # take 直接生成新的 DataFrame (布尔索引得到的结果再 .copy() 会多复制一次)，添加标签列不复制已有的列
+        clustered_points_mask = (labels != -1)
+        clustered_data_df = input_df.take(np.flatnonzero(clustered_points_mask))
+        clustered_data_df['cluster_label'] = labels[clustered_points_mask]
+        outputs["clustered_data"] = clustered_data_df
+
+        if self._current_variant_id == "detailed_output" or (
+                self._current_variant_id == "large_data" and self.get_output_port("noise_data") is not None):
+            outputs["noise_data"] = input_df.take(np.flatnonzero(labels == -1))
+
+        return outputs
+
+    def _fit_array(self, input_df: pd.DataFrame) -> np.ndarray:
+        """聚类使用的特征数组 (按 feature_columns / dtype / scaling 参数，见 clustering_utils.feature_array)"""
+        return feature_array(input_df, self.get_parameter('feature_columns'), self.get_parameter('dtype'),
+                             self.get_parameter('scaling'))
+
+    def _execute_parameter_sweep(self, input_df: pd.DataFrame, features: np.ndarray, metric: str) -> Dict[str, Any]:
+        eps_values = self._sweep_values('eps_values', 'eps', 0.5)
+        min_samples_values = self._sweep_values('min_samples_values', 'min_samples', 5)
+        for eps in eps_values:
+            self._check_eps(eps)
+        for min_samples in min_samples_values:
+            self._check_min_samples(min_samples)
+        settings = [(eps, min_samples) for eps in eps_values for min_samples in min_samples_values]
+        columns = [f"eps={eps},min_samples={min_samples}" for eps, min_samples in settings]
+
+        labels = np.full((len(input_df), len(settings)), -1, dtype=np.intp)
+        if len(input_df) > 0:
+            # 在最大的 eps 下只搜索一次邻居，得到以距离为边权的稀疏邻域图；
+            # 每组参数的 DBSCAN 直接在该图上按自己的 eps 筛选邻居 (metric='precomputed')，不再重新搜索
+            neighbors = NearestNeighbors(radius=max(eps_values), metric=metric).fit(features)
+            graph = neighbors.radius_neighbors_graph(features, mode='distance')
+            for i, (eps, min_samples) in enumerate(settings):
+                labels[:, i] = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit(graph).labels_
+
+        n_noise = np.count_nonzero(labels == -1, axis=0)
+        n_clusters = labels.max(axis=0, initial=-1) + 1
+        summary_df = pd.DataFrame({
+            'setting': columns,
+            'eps': [eps for eps, _ in settings],
+            'min_samples': [min_samples for _, min_samples in settings],
+            'n_clusters': n_clusters.astype(np.int64),
+            'n_noise': n_noise.astype(np.int64),
+        })
+        return {
+            "sweep_labels": pd.DataFrame(labels, index=input_df.index, columns=columns),
+            "sweep_summary": summary_df,
+        }
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'DBSCANModule':
@@ -0,0 +1,250 @@
+from typing import Dict, Any, Optional, Iterator, Tuple
+import itertools
+
+import pandas as pd
+import numpy as np
+
+from backend.core.base_module import BaseModule, PortDefinition, VariantDefinition
+from .clustering_utils import UnionFind, feature_array, label_components
+
+# 网格哈希只适用于低维数据: 每个格子需要检查 3^维数 个相邻格子
+MAX_GRID_DIMENSIONS = 3
+# 每个候选点对在距离计算过程中占用的工作内存估计 (字节，不含坐标)
+_BYTES_PER_PAIR = 64
+
+
+class _Grid:
+    """
+    边长为 eps 的网格: 点按所在格子排序，每个非空格子对应排序后的一段连续下标
+
+    格子以各维格子坐标组成的元组表示，只为非空格子建立索引 (稀疏)，内存只与点数有关，
+    与数据范围相对于 eps 的大小无关；相邻格子通过在按字典序排列的格子坐标中二分查找定位。
+    两个点的距离不超过 eps 时，它们所在的格子在每一维上最多相差 1，
+    所以只需要比较每个格子与它的 3^维数 个相邻格子 (包括自身) 中的点。
+    """
+    def __init__(self, X: np.ndarray, eps: float, working_memory_mb: float):
+        n_dims = X.shape[1]
+        lower = X.min(axis=0)
+        if not np.all((X.max(axis=0) - lower) / eps < 2 ** 62):
+            raise ValueError("数据范围相对于 eps 过大，格子坐标超出 int64 范围")
+        cells = np.floor((X - lower) / eps).astype(np.int64)
+        # 按格子坐标的字典序排序 (np.lexsort 以最后一个键为主键)，同一格子内保持原始顺序
+        self.order = np.lexsort(cells.T[::-1])
+        cells = cells[self.order]
+        boundary = np.ones(len(cells), dtype=bool)
+        boundary[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+        self.cell_start = np.flatnonzero(boundary)
+        self.cell_count = np.diff(np.append(self.cell_start, len(cells)))
+        self.cell_coords = cells[self.cell_start]
+        del cells, boundary
+        # 结构化数组按字段依次比较，即格子坐标的字典序，与上面的排序一致
+        self._record_dtype = np.dtype([(f"d{dim}", np.int64) for dim in range(n_dims)])
+        self.cell_keys = self._records(self.cell_coords)
+        self.points = X[self.order]
+        self.eps2 = float(eps) * float(eps)
+        self.offsets = [np.array(offset, dtype=np.int64) for offset in itertools.product((-1, 0, 1), repeat=n_dims)]
+        budget = working_memory_mb * 1024 * 1024
+        self.max_pairs = max(1024, int(budget // (_BYTES_PER_PAIR + 16 * n_dims)))
+
+    def _records(self, coords: np.ndarray) -> np.ndarray:
+        """把格子坐标 (每行一个格子) 视为一维结构化数组，以便按字典序二分查找"""
+        return np.ascontiguousarray(coords).view(self._record_dtype).ravel()
+
+    def cell_pairs(self, offset: np.ndarray, cell_mask_a: Optional[np.ndarray] = None,
+                   cell_mask_b: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """格子坐标相差 offset 的非空格子对 (格子序号)，可以用掩码限制两侧的格子"""
+        cell_keys = self.cell_keys
+        target = self._records(self.cell_coords + offset)
+        position = np.minimum(np.searchsorted(cell_keys, target), len(cell_keys) - 1)
+        found = cell_keys[position] == target
+        if cell_mask_a is not None:
+            found &= cell_mask_a
+        a = np.flatnonzero(found)
+        b = position[found]
+        if cell_mask_b is not None:
+            keep = cell_mask_b[b]
+            a, b = a[keep], b[keep]
+        return a, b
+
+    def close_pairs(self, half: bool = False, cell_mask_a: Optional[np.ndarray] = None,
+                    cell_mask_b: Optional[np.ndarray] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        分批产生距离不超过 eps 的点对 (排序后的下标 i, j)，每批的候选点对数量有上限
+
+        half 为True时每个无序点对只产生一次 (只检查一半方向的相邻格子，同一格子内只取 i < j)，
+        否则每个有序点对 (包括 i == j) 都会产生。
+        """
+        for offset in self.offsets:
+            # 每对相邻格子只保留字典序为正 (第一个非零分量为正) 的方向
+            same_cell = not offset.any()
+            if half and not same_cell and offset[np.flatnonzero(offset)[0]] < 0:
+                continue
+            a, b = self.cell_pairs(offset, cell_mask_a, cell_mask_b)
+            if len(a) == 0:
+                continue
+            count_a = self.cell_count[a]
+            count_b = self.cell_count[b]
+            # 候选点对过多的格子对按 a 侧的行拆分为多个块
+            n_blocks = -(-(count_a * count_b) // self.max_pairs)
+            block_rows = -(-count_a // n_blocks)
+            n_blocks = -(-count_a // block_rows)
+            pair = np.repeat(np.arange(len(a)), n_blocks)
+            block = np.arange(len(pair)) - np.repeat(np.cumsum(n_blocks) - n_blocks, n_blocks)
+            rows_a = block_rows[pair]
+            start_a = self.cell_start[a][pair] + block * rows_a
+            len_a = np.minimum(rows_a, count_a[pair] - block * rows_a)
+            start_b = self.cell_start[b][pair]
+            len_b = count_b[pair]
+            sizes = len_a * len_b
+            # 按累计的候选点对数量分批，每批不超过两倍的上限
+            batch = (np.cumsum(sizes) - sizes) // self.max_pairs
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(batch)) + 1, [len(sizes)]))
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                yield self._block_pairs(start_a[lo:hi], len_a[lo:hi], start_b[lo:hi], len_b[lo:hi],
+                                        same_cell=half and same_cell)
+
+    def _block_pairs(self, start_a: np.ndarray, len_a: np.ndarray, start_b: np.ndarray, len_b: np.ndarray,
+                     same_cell: bool) -> Tuple[np.ndarray, np.ndarray]:
+        sizes = len_a * len_b
+        block = np.repeat(np.arange(len(sizes)), sizes)
+        local = np.arange(int(sizes.sum()), dtype=np.int64) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        i = start_a[block] + local // len_b[block]
+        j = start_b[block] + local % len_b[block]
+        if same_cell:
+            keep = i < j
+            i, j = i[keep], j[keep]
+        delta = self.points[i] - self.points[j]
+        close = np.einsum('ij,ij->i', delta, delta) <= self.eps2
+        return i[close], j[close]
+
+
+def grid_dbscan(X: np.ndarray, eps: float, min_samples: int, working_memory_mb: float = 256) -> np.ndarray:
+    """
+    基于网格哈希的 DBSCAN (欧氏距离，适用于 1 ~ 3 维的大规模点集)
+
+    把点按边长为 eps 的格子排序，只在相邻格子之间用向量化的 NumPy 计算距离:
+    第一遍统计每个点的邻居数量 (包括自身) 确定核心点，第二遍用并查集合并相邻的核心点，
+    第三遍把边界点归入相邻核心点中编号最小的簇。每批候选点对的数量由 working_memory_mb 限制。
+    结果 (包括簇编号) 与 sklearn DBSCAN(metric='euclidean') 相同。
+
+    Returns:
+        每个点的簇标签 (噪声为 -1)
+    """
+    n_samples = len(X)
+    if n_samples == 0:
+        return np.empty(0, dtype=np.intp)
+    if X.ndim != 2 or not 1 <= X.shape[1] <= MAX_GRID_DIMENSIONS:
+        raise ValueError(f"网格 DBSCAN 只支持 1 ~ {MAX_GRID_DIMENSIONS} 维数据，但收到了形状 {X.shape}")
+    grid = _Grid(X, eps, working_memory_mb)
+    order = grid.order
+
+    # 第一遍: 统计邻居数量 (每批中的 i 按格子顺序单调不减，只对覆盖的下标范围计数)
+    counts = np.zeros(n_samples, dtype=np.intp)
+    for i, _ in grid.close_pairs():
+        if len(i):
+            counts[i[0]:i[-1] + 1] += np.bincount(i - i[0])
+    sorted_core = counts >= min_samples
+    del counts
+    core = np.empty(n_samples, dtype=bool)
+    core[order] = sorted_core
+
+    # 第二遍: 合并相邻的核心点 (在原始下标上合并，簇编号按原始顺序中最小的核心点排列)
+    cell_has_core = np.add.reduceat(sorted_core, grid.cell_start) > 0
+    components = UnionFind(n_samples)
+    for i, j in grid.close_pairs(half=True, cell_mask_a=cell_has_core, cell_mask_b=cell_has_core):
+        both = sorted_core[i] & sorted_core[j]
+        components.union(order[i[both]], order[j[both]])
+    labels, n_clusters = label_components(components.roots(), core)
+
+    # 第三遍: 边界点归入相邻核心点中编号最小的簇 (与 sklearn 按样本顺序扩展簇的结果一致)
+    cell_has_other = np.add.reduceat(~sorted_core, grid.cell_start) > 0
+    border_labels = np.full(n_samples, n_clusters, dtype=np.intp)
+    for i, j in grid.close_pairs(cell_mask_a=cell_has_other, cell_mask_b=cell_has_core):
+        border = ~sorted_core[i] & sorted_core[j]
+        np.minimum.at(border_labels, order[i[border]], labels[order[j[border]]])
+    border = border_labels < n_clusters
+    labels[border] = border_labels[border]
+    return labels
+
+
+class GridDBSCANModule(BaseModule):
+    """
+    网格 DBSCAN 聚类模块
+    面向千万级的二维/三维点集 (地理坐标、传感器数据)，用网格哈希代替通用的邻居搜索，结果与 DBSCAN 相同。
+    """
+    deterministic = True
+
+    def __init__(self, name: str = "网格 DBSCAN 聚类",
+                 description: str = "使用网格哈希加速的DBSCAN算法对低维大规模点集进行聚类",
+                 initial_variant_id: Optional[str] = None,
+                 initial_ports_config: Optional[Dict[str, bool]] = None):
+        super().__init__(name, description, initial_variant_id, initial_ports_config)
+
+        self._parameters['eps'] = 0.5
+        self._parameters['min_samples'] = 5
+        # 参与距离计算的特征列 (None 为全部列，最多 3 列)、特征缩放方式、聚类使用的数据类型
+        self._parameters['feature_columns'] = None
+        self._parameters['scaling'] = None
+        self._parameters['dtype'] = None
+        # 每批距离计算的工作内存上限 (MB)
+        self._parameters['working_memory_mb'] = 256
+
+    @classmethod
+    def _get_variant_definitions(cls) -> Dict[str, VariantDefinition]:
+        return {
+            "default": VariantDefinition(
+                variant_id="default",
+                variant_name="核心点输出",
+                description="输出带簇标签的非噪声点，噪声点输出默认关闭。",
+                port_definitions=[
+                    PortDefinition(name="data_input", port_io_type="input", data_type="dataframe", description="待聚类的点集 (Pandas DataFrame，1 ~ 3 个特征列)", is_optional=False, default_enabled=True, allow_multiple_connections=False),
+                    PortDefinition(name="clustered_data", port_io_type="output", data_type="dataframe", description="聚类后的非噪声点数据，并带有簇标签列 'cluster_label'", is_optional=False, default_enabled=True, allow_multiple_connections=True),
+                    PortDefinition(name="noise_data", port_io_type="output", data_type="dataframe", description="被识别为噪声的点数据", is_optional=True, default_enabled=False, allow_multiple_connections=True)
+                ]
+            ),
+            "labels": VariantDefinition(
+                variant_id="labels",
+                variant_name="标签与掩码输出",
+                description="不复制输入数据，只输出与输入行对齐的簇标签和布尔掩码。",
+                port_definitions=[
+                    PortDefinition(name="data_input", port_io_type="input", data_type="dataframe", description="待聚类的点集 (Pandas DataFrame，1 ~ 3 个特征列)", is_optional=False, default_enabled=True, allow_multiple_connections=False),
+                    PortDefinition(name="cluster_labels", port_io_type="output", data_type="series", description="每行的簇标签 (Pandas Series 'cluster_label'，索引与输入相同)，噪声点为 -1", is_optional=False, default_enabled=True, allow_multiple_connections=True),
+                    PortDefinition(name="clustered_mask", port_io_type="output", data_type="series", description="非噪声点的布尔掩码 (Pandas Series，索引与输入相同)", is_optional=False, default_enabled=True, allow_multiple_connections=True),
+                    PortDefinition(name="noise_mask", port_io_type="output", data_type="series", description="噪声点的布尔掩码 (Pandas Series，索引与输入相同)", is_optional=True, default_enabled=False, allow_multiple_connections=True)
+                ]
+            )
+        }
+
+    def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        input_df = inputs.get("data_input")
+        if input_df is None:
+            raise ValueError("输入端口 'data_input' 未提供数据或数据为None")
+        if not isinstance(input_df, pd.DataFrame):
+            raise TypeError(f"输入数据 'data_input' 必须是 Pandas DataFrame，但收到了 {type(input_df)}")
+
+        eps = self.get_parameter('eps', 0.5)
+        min_samples = self.get_parameter('min_samples', 5)
+        if not isinstance(eps, (int, float)) or eps <= 0:
+            raise ValueError(f"参数 'eps' 必须是正数，但收到了 {eps}")
+        if not isinstance(min_samples, int) or min_samples <= 0:
+            raise ValueError(f"参数 'min_samples' 必须是正整数，但收到了 {min_samples}")
+
+        features = feature_array(input_df, self.get_parameter('feature_columns'), self.get_parameter('dtype'),
+                                 self.get_parameter('scaling'))
+        labels = grid_dbscan(features, eps, min_samples, self.get_parameter('working_memory_mb', 256))
+        clustered_mask = labels != -1
+
+        outputs = {}
+        if self._current_variant_id == "labels":
+            outputs["cluster_labels"] = pd.Series(labels, index=input_df.index, name='cluster_label')
+            outputs["clustered_mask"] = pd.Series(clustered_mask, index=input_df.index, name='clustered')
+            if self.get_output_port("noise_mask") is not None:
+                outputs["noise_mask"] = pd.Series(~clustered_mask, index=input_df.index, name='noise')
+            return outputs
+
+        clustered_data_df = input_df.take(np.flatnonzero(clustered_mask))
+        clustered_data_df['cluster_label'] = labels[clustered_mask]
+        outputs["clustered_data"] = clustered_data_df
+        if self.get_output_port("noise_data") is not None:
+            outputs["noise_data"] = input_df.take(np.flatnonzero(~clustered_mask))
+        return outputs
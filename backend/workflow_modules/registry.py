@@ -1,9 +1,12 @@
+import os
+
+from backend.core.module_manifest import DEFAULT_MANIFEST_PATH, ModuleManifest
 from backend.core.module_registry import gmodule_registry
-from backend.workflow_modules.analysis.dbscan_module import DBSCANModule
-# 在此导入其他核心模块类别及其模块（随着开发进行）
+from backend.core.sub_workflow import SubWorkflowModule
+# 依赖较重的模块 (pandas / numpy / sklearn) 按导入路径延迟注册，第一次创建实例或查询变体时才导入，
+# 导入本包不会加载这些依赖
 # 例如:
-# from .data_sources import YourCoreDataSourceModule
-# from .data_processing import YourCoreDataProcessingModule
+# gmodule_registry.register_lazy("YourCoreDataSourceModule", "backend.workflow_modules.data_sources.your_module:YourCoreDataSourceModule", "数据源")
 
 def register_all_workflow_modules():
     """
@@ -11,11 +14,22 @@ def register_all_workflow_modules():
     示例模块在其各自的示例文件中单独注册。
     """
     # 注册分析模块
-    gmodule_registry.register(DBSCANModule, "聚类分析")
+    gmodule_registry.register_lazy("DBSCANModule", "backend.workflow_modules.analysis.dbscan_module:DBSCANModule", "聚类分析")
+    gmodule_registry.register_lazy("GridDBSCANModule", "backend.workflow_modules.analysis.grid_dbscan_module:GridDBSCANModule", "聚类分析")
+
+    # 注册复合模块
+    gmodule_registry.register(SubWorkflowModule, "复合模块")
 
     # 注册其他核心类别模块的示例 (在添加模块后取消注释并调整)
-    # gmodule_registry.register(YourCoreDataSourceModule, "数据源")
-    # gmodule_registry.register(YourCoreDataProcessingModule, "数据处理")
+    # gmodule_registry.register_lazy("YourCoreDataSourceModule", "...:YourCoreDataSourceModule", "数据源")
+    # gmodule_registry.register_lazy("YourCoreDataProcessingModule", "...:YourCoreDataProcessingModule", "数据处理")
+
+    # 有预先生成的模块定义清单时，查询变体定义不再导入模块代码 (过期的条目会被忽略)
+    if os.path.exists(DEFAULT_MANIFEST_PATH):
+        try:
+            gmodule_registry.use_manifest(ModuleManifest.load(DEFAULT_MANIFEST_PATH))
+        except (OSError, ValueError, KeyError):
+            pass
 
     # print("核心工作流模块已注册。") # 除非调试，否则保持静默
 